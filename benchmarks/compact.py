@@ -0,0 +1,57 @@
+"""Benchmark the memory used by a `CompactGraph` compared with the
+`Geneagraph` dictionary that it is built from.
+
+Run with `python -m benchmarks.compact`.
+"""
+
+from geneagrapher.types import CompactGraph, Geneagraph
+
+from .synthetic import make_graph
+
+from argparse import ArgumentParser
+import json
+import tracemalloc
+from typing import Callable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def measure(build: Callable[[], T]) -> Tuple[T, int]:
+    """Return the result of `build` and the number of bytes that it
+    retains.
+    """
+    tracemalloc.start()
+    try:
+        result = build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=300_000)
+    args = parser.parse_args()
+
+    # Decode the graphs from JSON, as they are received from the
+    # backend. The compact graph's measurement includes its strings
+    # because the dictionary it is built from is freed.
+    message = json.dumps(make_graph(args.records))
+    graph: Geneagraph
+    graph, graph_size = measure(lambda: json.loads(message))
+    compact, compact_size = measure(lambda: CompactGraph(json.loads(message)))
+    assert compact.to_geneagraph()["nodes"] == {
+        int(k): v for k, v in graph["nodes"].items()
+    }
+
+    print(f"{args.records} records")
+    print(f"  Geneagraph:   {graph_size / 2**20:8.1f} MiB")
+    print(
+        f"  CompactGraph: {compact_size / 2**20:8.1f} MiB \
+({graph_size / compact_size:.1f}x smaller)"
+    )
+
+
+if __name__ == "__main__":
+    main()
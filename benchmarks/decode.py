@@ -0,0 +1,70 @@
+"""Benchmark decoding of backend messages by `decode_response`,
+compared with the `object_hook`-based decoding that it replaced.
+
+Run with `python -m benchmarks.decode`.
+"""
+
+from geneagrapher.backend import decode_response
+
+from .synthetic import make_graph
+
+from argparse import ArgumentParser
+import json
+import timeit
+from typing import Any, Callable, Dict
+
+
+def decode_with_object_hook(response_json: str) -> Dict[str, Any]:
+    def intify_record_keys(d: Dict[Any, Any]) -> Dict[Any, Any]:
+        if "nodes" in d:
+            ret = {k: v for k, v in d.items() if k != "nodes"}
+            ret["nodes"] = {int(k): v for k, v in d["nodes"].items()}
+            return ret
+
+        return d
+
+    response: Dict[str, Any] = json.loads(response_json, object_hook=intify_record_keys)
+    return response
+
+
+def best_time(
+    func: Callable[[str], Dict[str, Any]], message: str, repeat: int
+) -> float:
+    return min(timeit.repeat(lambda: func(message), number=1, repeat=repeat))
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    graph_message = json.dumps({"kind": "graph", "payload": make_graph(args.records)})
+    progress_message = json.dumps(
+        {"kind": "progress", "payload": {"queued": 10, "fetching": 4, "done": 200}}
+    )
+    assert decode_response(graph_message) == decode_with_object_hook(graph_message)
+
+    print(f"graph message: {args.records} records, {len(graph_message)} bytes")
+    old = best_time(decode_with_object_hook, graph_message, args.repeat)
+    new = best_time(decode_response, graph_message, args.repeat)
+    print(f"  object_hook:     {old * 1000:8.1f} ms")
+    print(f"  decode_response: {new * 1000:8.1f} ms ({old / new:.2f}x)")
+
+    print("progress message (100000 decodes)")
+    old = best_time(
+        lambda m: [decode_with_object_hook(m) for _ in range(100_000)][0],
+        progress_message,
+        args.repeat,
+    )
+    new = best_time(
+        lambda m: [decode_response(m) for _ in range(100_000)][0],
+        progress_message,
+        args.repeat,
+    )
+    print(f"  object_hook:     {old * 1000:8.1f} ms")
+    print(f"  decode_response: {new * 1000:8.1f} ms ({old / new:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark `ggrapher diff` on two versions of a synthetic genealogy.
+
+The newer version is the older one with a fraction of its records
+removed, as many modified, and as many new records added, each with an
+advisor among the existing records. Both versions are saved as
+snapshots (`-f snapshot`), as NDJSON (`-f ndjson`), and as JSON (`-f
+json`), and `ggrapher diff
+--stat`'s comparison is run on each pair. Its wall-clock time is
+reported, along with the peak memory that it allocates, which is
+measured in a second run with `tracemalloc`.
+
+Run with `python -m benchmarks.diff`.
+"""
+
+from geneagrapher.diff import write_text_diff
+from geneagrapher.output.identity import IdentityOutput
+from geneagrapher.output.ndjson import NdjsonOutput
+from geneagrapher.output.snapshot import SnapshotOutput
+from geneagrapher.reader import open_graph
+from geneagrapher.types import Geneagraph, RecordId
+
+from .synthetic import make_graph
+
+from argparse import ArgumentParser
+import copy
+import io
+import random
+import tempfile
+import time
+import tracemalloc
+
+
+def mutate(graph: Geneagraph, fraction: float, *, seed: int = 0) -> Geneagraph:
+    """Return a copy of `graph` in which `fraction` of the records were
+    removed, as many were modified, and as many were added.
+    """
+    rng = random.Random(seed)
+    new = copy.deepcopy(graph)
+    nodes = new["nodes"]
+    ids = sorted(nodes)
+    count = int(len(ids) * fraction)
+    for rid in rng.sample(ids[1:], count):
+        del nodes[rid]
+    remaining = sorted(nodes)
+    for rid in rng.sample(remaining, count):
+        nodes[rid]["name"] += " Jr."
+    for i in range(count):
+        rid = RecordId(ids[-1] + 1 + i)
+        nodes[rid] = {
+            "id": rid,
+            "name": f"Mathematician {rid}",
+            "institution": None,
+            "year": None,
+            "descendants": [],
+            "advisors": [rng.choice(remaining)],
+        }
+    return new
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--fraction", type=float, default=0.01)
+    args = parser.parse_args()
+
+    old = make_graph(args.records)
+    versions = {"old": old, "new": mutate(old, args.fraction)}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, graph in versions.items():
+            with open(f"{tmp}/{name}.snapshot", "wb") as f:
+                SnapshotOutput(graph).write_binary(f)
+            with open(f"{tmp}/{name}.ndjson", "w") as f:
+                NdjsonOutput(graph).write(f)
+            with open(f"{tmp}/{name}.json", "w") as f:
+                IdentityOutput(graph).write(f)
+
+        print(f"{args.records:,} records, {args.fraction:.1%} changed")
+        print(f"  {'Format':8}  {'time (s)':>8}  {'peak (MiB)':>10}")
+        del old, versions
+        for suffix in ["snapshot", "ndjson", "json"]:
+            old_path = f"{tmp}/old.{suffix}"
+            new_path = f"{tmp}/new.{suffix}"
+
+            start = time.perf_counter()
+            summary = write_text_diff(
+                open_graph(old_path), open_graph(new_path), io.StringIO(), stat=True
+            )
+            elapsed = time.perf_counter() - start
+
+            tracemalloc.start()
+            write_text_diff(
+                open_graph(old_path), open_graph(new_path), io.StringIO(), stat=True
+            )
+            peak = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+            print(f"  {suffix:8}  {elapsed:8.2f}  {peak:10.1f}  {summary}")
+
+
+if __name__ == "__main__":
+    main()
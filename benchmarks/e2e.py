@@ -0,0 +1,119 @@
+"""End-to-end benchmark of building graphs against a local stand-in
+backend (see `geneagrapher.standin`), across graph sizes.
+
+For each size, a stand-in serving a synthetic genealogy of that size
+is started in a separate process, and the graph of all of its records
+is requested repeatedly. Reported are the p50 and p99 end-to-end
+latency of `get_graph`, and the time to decode the graph message and
+to format the graph as DOT and JSON.
+
+Run with `python -m benchmarks.e2e`. Sizes of 1M records need several
+GB of memory.
+"""
+
+from geneagrapher.backend import decode_response, get_graph
+from geneagrapher.geneagrapher import StartNodeArg, make_payload
+from geneagrapher.output.dot import DotOutput
+from geneagrapher.output.identity import IdentityOutput
+
+from argparse import ArgumentParser, Namespace
+import asyncio
+from contextlib import redirect_stderr
+import io
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, List
+from unittest.mock import patch
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Return the nearest-rank `p`th percentile of `values`."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def best_time(func: Callable[[], object], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def bench_size(size: int, args: Namespace) -> str:
+    standin = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "geneagrapher.geneagrapher",
+            "standin",
+            f"--size={size}",
+            f"--latency={args.latency}",
+            f"--progress-messages={args.progress_messages}",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert standin.stdout is not None
+        uri = standin.stdout.readline().strip()
+        payload = make_payload([StartNodeArg("1:d")], args.progress_messages == 0)
+
+        latencies = []
+        with open(os.devnull, "w") as devnull, redirect_stderr(devnull), patch(
+            "geneagrapher.backend.GGRAPHER_URI", uri
+        ):
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                graph = asyncio.run(get_graph(payload))
+                latencies.append(time.perf_counter() - start)
+    finally:
+        standin.terminate()
+        standin.wait()
+
+    assert len(graph["nodes"]) == size
+    message = json.dumps({"kind": "graph", "payload": graph})
+    repeat = max(1, min(args.repeat, 1_000_000 // size))
+    decode = best_time(lambda: decode_response(message), repeat)
+    dot = best_time(lambda: DotOutput(graph).write(io.StringIO()), repeat)
+    identity = best_time(lambda: IdentityOutput(graph).write(io.StringIO()), repeat)
+
+    return f"{size:>8}  {percentile(latencies, 50) * 1000:>10.1f}  \
+{percentile(latencies, 99) * 1000:>10.1f}  {decode * 1000:>10.1f}  \
+{dot * 1000:>10.1f}  {identity * 1000:>10.1f}"
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        default="10,100,1000,10000,100000",
+        help="comma-separated graph sizes (default: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="stand-in response latency"
+    )
+    parser.add_argument(
+        "--progress-messages",
+        type=int,
+        default=10,
+        help="progress messages per response; 0 requests none",
+    )
+    args = parser.parse_args()
+
+    print(
+        f"{'size':>8}  {'p50 (ms)':>10}  {'p99 (ms)':>10}  {'decode (ms)':>10}  \
+{'dot (ms)':>10}  {'json (ms)':>10}"
+    )
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(bench_size(size, args), flush=True)
+
+
+if __name__ == "__main__":
+    main()
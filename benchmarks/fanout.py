@@ -0,0 +1,108 @@
+"""Benchmark splitting a request with many start nodes into concurrent
+requests (`GeneagrapherClient`'s `fan_out`) against a local stand-in
+backend (see `geneagrapher.standin`).
+
+The stand-in serves a synthetic genealogy and delays each response in
+proportion to the number of records in its graph, as the backend does
+when it fetches records. The ancestry graph of randomly chosen records
+is requested with each fan-out, and the best wall-clock time and the
+speedup over a single request are reported. Records reached by more
+than one of the split requests are fetched by each of them, so the
+number of records fetched, which is also reported, grows with the
+fan-out, and the speedup is near-linear only while the requests'
+graphs share few records.
+
+Run with `python -m benchmarks.fanout`.
+"""
+
+from geneagrapher.client import GeneagrapherClient, split_start_nodes
+from geneagrapher.geneagrapher import StartNodeArg
+from geneagrapher.standin import synthetic_records
+from geneagrapher.traverse import build_graph
+
+from argparse import ArgumentParser
+import asyncio
+import random
+import subprocess
+import sys
+import time
+from typing import List
+
+
+async def build(uri: str, start_nodes: List[str], fan_out: int) -> int:
+    async with GeneagrapherClient(
+        uri=uri, max_connections=fan_out, fan_out=fan_out
+    ) as client:
+        graph = await client.build_graph(start_nodes)
+    return len(graph["nodes"])
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--start-nodes", type=int, default=200)
+    parser.add_argument("--fan-outs", default="1,2,4,8,16")
+    parser.add_argument(
+        "--record-latency",
+        type=float,
+        default=0.0002,
+        help="stand-in latency per record, in seconds (default: %(default)s)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    genealogy = synthetic_records(args.size)
+    rng = random.Random(0)
+    start_nodes = [
+        f"{rid}:a" for rid in rng.sample(range(1, args.size + 1), args.start_nodes)
+    ]
+
+    standin = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "geneagrapher.geneagrapher",
+            "standin",
+            f"--size={args.size}",
+            f"--record-latency={args.record_latency}",
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        assert standin.stdout is not None
+        uri = standin.stdout.readline().strip()
+
+        print(
+            f"{'fan-out':>8}  {'records':>8}  {'fetched':>8}  {'best (s)':>9}  \
+{'speedup':>8}"
+        )
+        baseline = None
+        for fan_out in (int(k) for k in args.fan_outs.split(",")):
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                records = asyncio.run(build(uri, start_nodes, fan_out))
+                times.append(time.perf_counter() - start)
+            best = min(times)
+            baseline = baseline or best
+
+            chunks = split_start_nodes(
+                [StartNodeArg(sn).start_node for sn in start_nodes], fan_out
+            )
+            fetched = sum(
+                len(build_graph(chunk, lambda ids: genealogy)[0]["nodes"])
+                for chunk in chunks
+            )
+            print(
+                f"{fan_out:>8}  {records:>8}  {fetched:>8}  {best:>9.3f}  \
+{baseline / best:>7.2f}x",
+                flush=True,
+            )
+    finally:
+        standin.terminate()
+        standin.wait()
+
+
+if __name__ == "__main__":
+    main()
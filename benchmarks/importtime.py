@@ -0,0 +1,137 @@
+"""Benchmark the startup time of `ggrapher` commands, as measured by
+`python -X importtime`, to guard against regressions in what they
+import.
+
+Each command is run repeatedly in a fresh interpreter, as the `ggrapher`
+script runs it. Reported for each are the median total import time, the
+median wall-clock time of the command, the number of modules imported,
+and the modules with the longest cumulative import times. Commands that
+make no requests must not import the network stack; the benchmark fails
+if one does, or, with `--budget`, if a command's median import time
+exceeds the budget.
+
+Run with `python -m benchmarks.importtime`.
+"""
+
+from geneagrapher.output.identity import IdentityOutput
+
+from .synthetic import make_graph
+
+from argparse import ArgumentParser
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+# Modules that commands that make no requests must not import.
+NETWORK_MODULES = {"asyncio", "websockets", "geneagrapher.backend"}
+
+SCRIPT = """\
+import sys
+from geneagrapher.geneagrapher import run
+sys.argv = ["ggrapher"] + sys.argv[1:]
+run()
+"""
+
+
+class ImportTimes(NamedTuple):
+    total: float  # seconds
+    # The cumulative import time of each module, in seconds.
+    modules: Dict[str, float]
+
+
+def parse_importtime(output: str) -> ImportTimes:
+    """Return the import times in `output`, the standard error of an
+    interpreter run with `-X importtime`.
+    """
+    total = 0.0
+    modules: Dict[str, float] = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        total += int(self_us) / 1e6
+        modules[name.strip()] = int(cumulative_us) / 1e6
+    return ImportTimes(total, modules)
+
+
+def run_command(argv: List[str]) -> Tuple[ImportTimes, float]:
+    """Run `ggrapher` with `argv` and return its import times and its
+    wall-clock time, in seconds.
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT] + argv,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if process.returncode != 0:
+        sys.exit(f"ggrapher {' '.join(argv)} failed:\n{process.stderr}")
+    return parse_importtime(process.stderr), elapsed
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=1_000)
+    parser.add_argument("--runs", type=int, default=15)
+    parser.add_argument(
+        "--top", type=int, default=5, help="modules to list per command"
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        help="fail if a command's median import time exceeds MS milliseconds",
+        metavar="MS",
+    )
+    args = parser.parse_args()
+
+    failures: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        infile = os.path.join(tmp, "graph.json")
+        with open(infile, "w") as f:
+            IdentityOutput(make_graph(args.size)).write(f)
+
+        commands = [
+            ["--version"],
+            ["--help"],
+            ["convert", "-f", "dot", infile],
+            ["convert", "-f", "svg", infile],
+        ]
+        print(
+            f"  {'command':>24}  {'import (ms)':>11}  {'wall (ms)':>9}  \
+{'modules':>7}"
+        )
+        for argv in commands:
+            runs = [run_command(argv) for _ in range(args.runs)]
+            import_ms = 1e3 * statistics.median(times.total for times, _ in runs)
+            wall_ms = 1e3 * statistics.median(elapsed for _, elapsed in runs)
+            modules = runs[0][0].modules
+            name = " ".join(argv).replace(infile, "FILE")
+            print(
+                f"  {name:>24}  {import_ms:>11.1f}  {wall_ms:>9.1f}  \
+{len(modules):>7}"
+            )
+            top = sorted(modules.items(), key=lambda item: -item[1])[: args.top]
+            for module, cumulative in top:
+                print(f"  {'':>24}    {1e3 * cumulative:>9.1f}  {module}")
+
+            network = sorted(NETWORK_MODULES.intersection(modules))
+            if network:
+                failures.append(f"{name} imports {', '.join(network)}")
+            if args.budget is not None and import_ms > args.budget:
+                failures.append(
+                    f"{name} imports for {import_ms:.1f} ms (budget: \
+{args.budget:.1f} ms)"
+                )
+
+    if failures:
+        sys.exit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
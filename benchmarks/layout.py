@@ -0,0 +1,65 @@
+"""Benchmark the built-in layered layout (`geneagrapher.output.layout`)
+on synthetic genealogies of increasing size.
+
+For each size, the time of `Layout`, the number of bend points that it
+added for relationships spanning several generations, and the number of
+edge crossings of its ordering are reported. If Graphviz is installed,
+the time of laying out the same graph with `dot` is reported too.
+
+The synthetic genealogies choose advisors uniformly among all earlier
+records, so their relationships span many more generations than real
+ones do, and they need many more bend points.
+
+Run with `python -m benchmarks.layout`.
+"""
+
+from geneagrapher.output.dot import DotOutput
+from geneagrapher.output.layout import Layout
+
+from .synthetic import make_graph
+
+from argparse import ArgumentParser
+import shutil
+import subprocess
+import time
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="1000,10000,50000,100000")
+    parser.add_argument(
+        "--dot-limit",
+        type=int,
+        default=10_000,
+        help="largest size to also lay out with Graphviz (default: %(default)s)",
+    )
+    args = parser.parse_args()
+    has_dot = shutil.which("dot") is not None
+
+    print(
+        f"  {'records':>8}  {'layout (s)':>10}  {'bends':>9}  {'crossings':>12}", end=""
+    )
+    print(f"  {'dot (s)':>8}" if has_dot else "")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        graph = make_graph(size)
+        start = time.perf_counter()
+        layout = Layout(graph)
+        elapsed = time.perf_counter() - start
+        bends = len(layout.ranks) - len(layout.records)
+        print(
+            f"  {size:8,}  {elapsed:10.2f}  {bends:9,}  {layout.crossings:12,}", end=""
+        )
+
+        if has_dot and size <= args.dot_limit:
+            start = time.perf_counter()
+            subprocess.run(
+                ["dot", "-Tdot", "-o", "/dev/null"],
+                input=DotOutput(graph).output.encode(),
+                check=True,
+            )
+            print(f"  {time.perf_counter() - start:8.2f}", end="")
+        print()
+
+
+if __name__ == "__main__":
+    main()
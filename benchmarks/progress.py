@@ -0,0 +1,97 @@
+"""Benchmark the handling of progress messages: drawing the progress bar
+for every message (`print_progress`) against recording it and redrawing
+at a fixed rate (`ProgressReporter`), with and without an event stream.
+
+The messages are handled as a chatty backend would send them, with
+short pauses in which the event loop runs, and the bar is written to a
+file that discards the bar and counts writes. The time per message and
+the number of writes are reported.
+
+Run with `python -m benchmarks.progress`.
+"""
+
+from geneagrapher.backend import print_progress
+from geneagrapher.progress import ProgressReporter
+from geneagrapher.types import ProgressCallback
+
+from argparse import ArgumentParser
+import asyncio
+import io
+import os
+import time
+from typing import Callable, Optional, TextIO
+from unittest.mock import patch
+
+
+class CountingFile(io.TextIOWrapper):
+    """A text file that discards what is written to it, counts the
+    writes, and claims to be a terminal.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(open(os.devnull, "wb"))
+        self.writes = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        return super().write(s)
+
+    def isatty(self) -> bool:
+        return True
+
+
+async def handle(
+    messages: int, on_progress: Callable[[ProgressCallback], None], batch: int
+) -> None:
+    for done in range(messages):
+        on_progress({"queued": messages - done, "fetching": 1, "done": done})
+        if done % batch == 0:
+            # Let other tasks (e.g., the redraw task) run, as they would
+            # between messages received from the backend.
+            await asyncio.sleep(0)
+
+
+def run_case(
+    messages: int, batch: int, *, reporter: bool, events: Optional[TextIO] = None
+) -> None:
+    bar = CountingFile()
+
+    async def main() -> None:
+        if reporter:
+            async with ProgressReporter(bar=bar, events=events) as r:
+                await handle(messages, r.update, batch)
+        else:
+            with patch("geneagrapher.backend.sys.stderr", bar):
+                await handle(messages, print_progress, batch)
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    bar.close()
+    print(f"  {1e6 * elapsed / messages:12.2f}  {bar.writes:8,}", end="")
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument(
+        "--batch",
+        type=int,
+        default=100,
+        help="messages handled between event loop iterations (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    print(f"  {'handler':>24}  {'us/message':>12}  {'writes':>8}")
+    print(f"  {'print_progress':>24}", end="")
+    run_case(args.messages, args.batch, reporter=False)
+    print(f"\n  {'ProgressReporter':>24}", end="")
+    run_case(args.messages, args.batch, reporter=True)
+    with open(os.devnull, "w") as devnull:
+        print(f"\n  {'ProgressReporter+events':>24}", end="")
+        run_case(args.messages, args.batch, reporter=True, events=devnull)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark building an `AncestorIndex` and the time of its queries.
+
+Pairs of records are chosen at random from a synthetic genealogy, and
+each query is timed for each pair. The first query involving a record
+computes its ancestor set, so the report distinguishes the first pass
+over the pairs from a second pass over the same pairs.
+
+Run with `python -m benchmarks.query`.
+"""
+
+from geneagrapher.query import AncestorIndex
+
+from .synthetic import make_graph
+
+from argparse import ArgumentParser
+import random
+import time
+from typing import Callable, List, Tuple
+
+
+def time_queries(
+    pairs: List[Tuple[int, int]], query: Callable[[int, int], object]
+) -> float:
+    """Return the mean time of `query` over `pairs`, in seconds."""
+    start = time.perf_counter()
+    for a, b in pairs:
+        query(a, b)
+    return (time.perf_counter() - start) / len(pairs)
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--pairs", type=int, default=1_000)
+    args = parser.parse_args()
+
+    graph = make_graph(args.records)
+    start = time.perf_counter()
+    index = AncestorIndex(graph)
+    build = time.perf_counter() - start
+
+    rng = random.Random(0)
+    pairs = [
+        (rng.randint(1, args.records), rng.randint(1, args.records))
+        for _ in range(args.pairs)
+    ]
+
+    print(f"{args.records} records; index built in {build * 1000:.1f} ms")
+    print(f"Mean query time over {args.pairs} random pairs (ms):")
+    print(f"  {'Query':24}  {'first':>8}  {'repeat':>8}")
+    queries: List[Tuple[str, Callable[[int, int], object]]] = [
+        ("is_ancestor", index.is_ancestor),
+        ("lowest_common_ancestors", index.lowest_common_ancestors),
+        ("common_ancestors", index.common_ancestors),
+        ("shortest_path", index.shortest_path),
+        ("depth", lambda a, b: index.depth(a)),
+    ]
+    for name, query in queries:
+        first = time_queries(pairs, query)
+        repeat = time_queries(pairs, query)
+        print(f"  {name:24}  {first * 1000:8.3f}  {repeat * 1000:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Benchmark the latency of requests to an unreliable backend with
+retries and with hedging (see `geneagrapher.retry`), against a local
+stand-in backend (see `geneagrapher.standin`) that stalls or drops a
+fraction of its requests.
+
+Requests are made with a `GeneagrapherClient` under each policy:
+retrying requests that fail or go idle, and also hedging requests that
+are slow. The median, 99th percentile, and maximum latency of the
+requests, the number that failed, and the numbers of retries and hedged
+attempts are reported. A stalled request costs a retry the idle timeout
+before it is retried, but costs a hedged request only the hedging
+delay.
+
+Run with `python -m benchmarks.retry`.
+"""
+
+from geneagrapher.client import GeneagrapherClient
+from geneagrapher.geneagrapher import GgrapherError
+from geneagrapher.retry import RetryPolicy
+from geneagrapher.timing import Timings
+
+from argparse import ArgumentParser
+import asyncio
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import List, Optional, Tuple
+
+
+async def run_requests(
+    uri: str, start_nodes: List[str], policy: RetryPolicy, concurrency: int
+) -> Tuple[List[float], int, Timings]:
+    """Request the graph of each start node, and return the latency of
+    each request that succeeded, the number that failed, and the
+    client's timings.
+    """
+    timings = Timings()
+    latencies: List[float] = []
+    failures = 0
+
+    pending = list(start_nodes)
+
+    # Each worker makes one request at a time, so that the latencies do
+    # not include waiting for a connection.
+    async def worker(client: GeneagrapherClient) -> None:
+        nonlocal failures
+        while pending:
+            start_node = pending.pop()
+            start = time.perf_counter()
+            try:
+                await client.build_graph([start_node])
+            except GgrapherError:
+                failures += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    async with GeneagrapherClient(
+        uri=uri, max_connections=concurrency, timings=timings, retry_policy=policy
+    ) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return latencies, failures, timings
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="stand-in latency per response, in seconds (default: %(default)s)",
+    )
+    parser.add_argument("--stall-rate", type=float, default=0.03)
+    parser.add_argument("--drop-rate", type=float, default=0.02)
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        default=1.0,
+        help="seconds between messages before a request is retried \
+(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--hedge-after",
+        type=float,
+        default=0.15,
+        help="seconds before a request is hedged (default: %(default)s)",
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    start_nodes = [
+        f"{rid}:a" for rid in rng.sample(range(1, args.size + 1), args.requests)
+    ]
+    policies: List[Tuple[str, Optional[float]]] = [
+        ("retries", None),
+        ("retries+hedging", args.hedge_after),
+    ]
+
+    print(
+        f"  {'policy':>16}  {'p50 (s)':>8}  {'p99 (s)':>8}  {'max (s)':>8}  \
+{'failed':>6}  {'retries':>7}  {'hedged':>6}"
+    )
+    for name, hedge_after in policies:
+        # Each policy gets a stand-in of its own, so that both see the
+        # same sequence of faults.
+        standin = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "geneagrapher.geneagrapher",
+                "standin",
+                f"--size={args.size}",
+                f"--latency={args.latency}",
+                f"--stall-rate={args.stall_rate}",
+                f"--drop-rate={args.drop_rate}",
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert standin.stdout is not None
+            uri = standin.stdout.readline().strip()
+            policy = RetryPolicy(
+                idle_timeout=args.idle_timeout,
+                retries=3,
+                backoff=0.05,
+                hedge_after=hedge_after,
+            )
+            latencies, failures, timings = asyncio.run(
+                run_requests(uri, start_nodes, policy, args.concurrency)
+            )
+        finally:
+            standin.terminate()
+            standin.wait()
+
+        p50 = statistics.median(latencies)
+        p99 = statistics.quantiles(latencies, n=100)[98]
+        print(
+            f"  {name:>16}  {p50:>8.3f}  {p99:>8.3f}  {max(latencies):>8.3f}  \
+{failures:>6}  {timings.counts.get('retries', 0):>7}  \
+{timings.counts.get('hedged attempts', 0):>6}",
+            flush=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Benchmark the search index (`geneagrapher.search`) on synthetic
+records with realistic names.
+
+Names are made of common given names and family names built from
+random syllables, so that, like real names, they share many trigrams. For
+each size, the time to build the index, the time to add the same
+records again (which changes nothing), and the median and slowest
+times of queries for exact names, misspelled names, and family names
+alone are reported.
+
+Run with `python -m benchmarks.search`.
+"""
+
+from geneagrapher.search import SearchIndex
+from geneagrapher.types import Record, RecordId
+
+from argparse import ArgumentParser
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Callable, List
+
+# Family names are two or three syllables, each an onset, a vowel, and
+# a coda, which gives a Zipf-like spread of shared trigrams.
+SYLLABLES = [
+    onset + vowel + coda
+    for onset in "b br ch d f g h j k kr l m n p r s sch st t v w z".split()
+    for vowel in "a e i o u ei au ie".split()
+    for coda in ["", "n", "r", "l", "s", "nd", "rt", "ck", "mann", "berg"]
+]
+GIVEN_NAMES = "Carl Johann Maria Sophie Henri Pierre Emmy David Ada Leonhard \
+Bernhard Felix Hermann Olga Sofia Nikolai Pafnuty Andrey Srinivasa Alan John \
+William James Robert Richard Thomas Charles George Edward Paul Peter Michael \
+Anna Elizabeth Mary Margaret Helen Ruth Emil Friedrich Wilhelm Heinrich Karl \
+Giuseppe Giovanni Luigi Jean Louis Joseph Ivan Sergei Hans Otto".split()
+INSTITUTIONS = [
+    "Universität Göttingen",
+    "Université de Paris",
+    "University of Cambridge",
+    "Moscow State University",
+    "Princeton University",
+    "ETH Zürich",
+    "Universität Berlin",
+    "University of Chicago",
+]
+
+
+def make_records(size: int, *, seed: int = 0) -> List[Record]:
+    rng = random.Random(seed)
+    records: List[Record] = []
+    for i in range(size):
+        family = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+        given = rng.sample(GIVEN_NAMES, rng.randint(1, 2))
+        records.append(
+            {
+                "id": RecordId(i + 1),
+                "name": " ".join(given + [family.capitalize()]),
+                "institution": rng.choice(INSTITUTIONS),
+                "year": 1500 + i * 500 // size,
+                "descendants": [],
+                "advisors": [],
+            }
+        )
+    return records
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    i = rng.randrange(len(name) - 1)
+    return name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+
+
+def time_queries(queries: List[str], search: Callable[[str], object]) -> List[float]:
+    times = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        times.append(1000 * (time.perf_counter() - start))
+    return times
+
+
+def main() -> None:
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="10000,100000,300000")
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    print(
+        f"  {'records':>8}  {'build (s)':>9}  {'re-add (s)':>10}  {'MB':>5}  "
+        f"{'query':>10}  {'median (ms)':>11}  {'max (ms)':>8}"
+    )
+    for size in [int(s) for s in args.sizes.split(",")]:
+        records = make_records(size)
+        rng = random.Random(1)
+        sample = [r["name"] for r in rng.sample(records, args.queries)]
+        kinds = [
+            ("exact", sample),
+            ("misspelled", [misspell(name, rng) for name in sample]),
+            ("family", [name.split()[-1] for name in sample]),
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "search.db")
+            with SearchIndex(path) as index:
+                start = time.perf_counter()
+                index.add_many(records)
+                build = time.perf_counter() - start
+                start = time.perf_counter()
+                index.add_many(records)
+                readd = time.perf_counter() - start
+                size_mb = os.path.getsize(path) / 1e6
+
+                for i, (kind, queries) in enumerate(kinds):
+                    times = time_queries(queries, index.search)
+                    print(
+                        f"  {size:8,}  {build:9.2f}  {readd:10.2f}  {size_mb:5.0f}"
+                        if i == 0
+                        else f"  {'':8}  {'':9}  {'':10}  {'':5}",
+                        end="",
+                    )
+                    print(
+                        f"  {kind:>10}  {statistics.median(times):11.1f}  "
+                        f"{max(times):8.1f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""Synthetic genealogies for benchmarks."""
+
+from geneagrapher.standin import synthetic_records
+from geneagrapher.types import Geneagraph, RecordId
+
+
+def make_graph(size: int, *, seed: int = 0) -> Geneagraph:
+    """Return the graph of `size` synthetic records that the stand-in
+    backend serves for the start node 1:d.
+    """
+    return {
+        "start_nodes": [RecordId(1)],
+        "nodes": synthetic_records(size, seed=seed),
+        "status": "complete",
+    }
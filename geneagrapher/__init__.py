@@ -0,0 +1,22 @@
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .client import GeneagrapherClient
+    from .retry import RetryPolicy
+
+__all__ = ["GeneagrapherClient", "RetryPolicy"]
+
+
+def __getattr__(name: str) -> Any:
+    # The client is imported when it is first used, rather than with
+    # the package, so that running a module of the package (e.g.,
+    # `python -m geneagrapher.geneagrapher`) does not import it first.
+    if name == "GeneagrapherClient":
+        from .client import GeneagrapherClient
+
+        return GeneagrapherClient
+    if name == "RetryPolicy":
+        from .retry import RetryPolicy
+
+        return RetryPolicy
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
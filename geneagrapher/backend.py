@@ -0,0 +1,176 @@
+"""This module implements requests to the Geneagrapher backend: opening
+connections, sending `build-graph` requests, and receiving the graphs
+and progress messages that the backend responds with.
+
+It is the only module of the command-line interface that imports the
+network stack (`asyncio` and `websockets`), and it is imported only when
+a request is made, so that commands that do not make requests (e.g.,
+`ggrapher convert` and `ggrapher --version`) start without it.
+"""
+
+from .cache import RecordCache
+from .geneagrapher import (
+    DEFAULT_CONNECT_TIMEOUT,
+    GgrapherError,
+    RequestPayload,
+    get_version,
+)
+from .progress import format_bar
+from .retry import RetryPolicy
+from .timing import Timings, timed
+from .types import Geneagraph, ProgressCallback, ProgressHandler
+
+import asyncio
+from contextlib import AsyncExitStack
+import json
+import os
+import platform
+import sys
+from typing import Any, Dict, Optional, Union, cast
+import websockets
+import websockets.client
+
+GGRAPHER_URI = os.environ.get("GGRAPHER_URI", "wss://ggrphr.davidalber.net")
+
+
+def display_progress(queued: int, doing: int, done: int) -> None:
+    print(format_bar(queued, doing, done), end="\r", file=sys.stderr, flush=True)
+
+
+def print_progress(progress: ProgressCallback) -> None:
+    display_progress(progress["queued"], progress["fetching"], progress["done"])
+
+
+def connect(
+    uri: Optional[str] = None,
+    *,
+    timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+) -> websockets.client.connect:
+    """Return a connection to the Geneagrapher backend at `uri` (by
+    default, `GGRAPHER_URI`), which raises `asyncio.TimeoutError` if it
+    is not open within `timeout` seconds. The returned object can be
+    awaited or used as an asynchronous context manager.
+    """
+    return websockets.client.connect(
+        uri or GGRAPHER_URI,
+        max_size=None,
+        open_timeout=timeout,
+        user_agent_header=f"Python/{platform.python_version()} \
+Geneagrapher/{get_version()}",
+    )
+
+
+def decode_response(response_json: Union[str, bytes]) -> Dict[str, Any]:
+    """Decode a message from the backend.
+
+    JSON object keys are strings, but the Geneagraph type expects the
+    keys of the nodes object to be integers. Those keys are converted
+    after the message is parsed, rather than with an `object_hook`,
+    which would be called for every object in the message (i.e., every
+    record). The nodes object is moved to the end of the graph, where
+    the `object_hook` put it, so that JSON output lists the records
+    after the graph's other fields.
+    """
+    response: Dict[str, Any] = json.loads(response_json)
+    if response.get("kind") == "graph":
+        graph = response.get("payload")
+        if isinstance(graph, dict) and "nodes" in graph:
+            graph["nodes"] = {int(k): v for k, v in graph.pop("nodes").items()}
+    return response
+
+
+async def request_graph(
+    ws: websockets.client.WebSocketClientProtocol,
+    payload: RequestPayload,
+    *,
+    on_progress: Optional[ProgressHandler] = None,
+    timings: Optional[Timings] = None,
+    idle_timeout: Optional[float] = None,
+) -> Geneagraph:
+    """Send `payload` on the open backend connection `ws` and return
+    the graph that the backend responds with. Progress messages are
+    passed to `on_progress`, if it is given. If `timings` is given, the
+    time spent waiting for and decoding each message is recorded in it.
+    Raise `asyncio.TimeoutError` if no message is received for
+    `idle_timeout` seconds.
+    """
+
+    await ws.send(json.dumps(payload))
+    while True:
+        with timed(timings, "receive"):
+            if idle_timeout is None:
+                response_json = await ws.recv()
+            else:
+                response_json = await asyncio.wait_for(ws.recv(), idle_timeout)
+        with timed(timings, "decode"):
+            response = decode_response(response_json)
+        response_payload: Union[Geneagraph, ProgressCallback, None] = response.get(
+            "payload"
+        )
+        if timings is not None:
+            timings.count("characters received", len(response_json))
+            timings.count(f"{response.get('kind')} messages")
+
+        if response["kind"] == "graph":
+            return cast(Geneagraph, response_payload)
+        elif response["kind"] == "progress":
+            if on_progress is not None:
+                on_progress(cast(ProgressCallback, response_payload))
+        else:
+            raise GgrapherError(
+                "Request to Geneagrapher backend failed.",
+                extra={"Response": str(response_json)},
+            )
+
+
+async def get_graph(
+    payload: RequestPayload,
+    *,
+    cache: Optional[RecordCache] = None,
+    timings: Optional[Timings] = None,
+    on_progress: Optional[ProgressHandler] = print_progress,
+    retry_policy: Optional[RetryPolicy] = None,
+) -> Geneagraph:
+    """Return the graph described by `payload`. If `cache` is given,
+    the graph is built from it when it has every record that the graph
+    contains, and every record received from the backend is stored in
+    it. If `timings` is given, the time spent in each phase is recorded
+    in it. Progress messages are passed to `on_progress` (by default,
+    `print_progress`, which draws a progress bar for each message). The
+    request is timed out and retried as `retry_policy` specifies (by
+    default, it is made once, with only a connect timeout).
+    """
+    if cache is not None:
+        with timed(timings, "cache lookup"):
+            graph = cache.get_graph(payload["startNodes"])
+        if graph is not None:
+            return graph
+
+    policy = retry_policy or RetryPolicy()
+
+    async def attempt(on_progress: Optional[ProgressHandler]) -> Geneagraph:
+        async with AsyncExitStack() as stack:
+            with timed(timings, "connect"):
+                ws = await stack.enter_async_context(
+                    connect(timeout=policy.connect_timeout)
+                )
+            with timed(timings, "request"):
+                return await request_graph(
+                    ws,
+                    payload,
+                    on_progress=on_progress,
+                    timings=timings,
+                    idle_timeout=policy.idle_timeout,
+                )
+
+    try:
+        graph = await policy.run(attempt, on_progress, timings=timings)
+    except asyncio.TimeoutError:
+        raise GgrapherError("Geneagrapher backend did not respond in time.")
+    except (OSError, websockets.exceptions.WebSocketException):
+        raise GgrapherError("Geneagrapher backend is currently unavailable.")
+
+    if cache is not None:
+        with timed(timings, "cache store"):
+            cache.put_graph(graph)
+    return graph
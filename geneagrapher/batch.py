@@ -0,0 +1,430 @@
+"""This module implements the `batch` command, which builds the graphs
+for many jobs in one process.
+
+The jobs are described by a manifest file, which is either JSON or TOML
+(reading TOML requires Python 3.11 or later). For example:
+
+```toml
+concurrency = 4
+
+[[jobs]]
+name = "me"
+ids = ["162833:ad"]
+out = "me.dot"
+
+[[jobs]]
+ids = ["6871:ad"]
+format = "json"
+out = "all.json"
+```
+
+Jobs run concurrently on one event loop. Each concurrent worker keeps
+its backend connection open across the jobs it runs, reconnecting if
+the backend closes it. Requests are timed out and retried as the
+`--timeout`, `--retries`, and related options specify (see
+`geneagrapher.retry`). Records received for one job are stored in a
+record cache that every job reads from, so a job whose graph was
+already received as part of other jobs' graphs is built without a
+request to the backend.
+
+With `--shard`, the DOT output of each job is split into shards (see
+`geneagrapher.output.shard`). With `--render`, the DOT output of the
+jobs is rendered with Graphviz after every job has run (see
+`geneagrapher.render`).
+"""
+
+from .backend import connect, request_graph
+from .cache import RecordCache
+from .geneagrapher import (
+    DOT_FORMATS,
+    DRAWN_FORMATS,
+    FORMATS,
+    GgrapherError,
+    OutputFormat,
+    RequestPayload,
+    StartNodeArg,
+    add_cache_arguments,
+    add_incremental_argument,
+    add_render_argument,
+    add_retry_arguments,
+    add_shard_argument,
+    add_summary_arguments,
+    add_timing_arguments,
+    check_render_paths,
+    get_build_options,
+    get_retry_policy,
+    make_payload,
+    open_cache,
+    render,
+    report_timings,
+    start_timings,
+    write_output,
+)
+from .incremental import BuildManifest, check_build, record_build
+from .output.shard import ShardStrategy
+from .render import RenderJob
+from .retry import RetryPolicy
+from .timing import Timings, timed
+from .types import Geneagraph
+
+from argparse import ArgumentParser, ArgumentTypeError
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple, cast
+import websockets
+import websockets.client
+
+DEFAULT_CONCURRENCY = 4
+
+
+class BatchJob:
+    def __init__(
+        self,
+        name: str,
+        ids: List[StartNodeArg],
+        format: OutputFormat,
+        outfile: str,
+    ) -> None:
+        self.name = name
+        self.ids = ids
+        self.format = format
+        self.outfile = outfile
+
+        # These are set when the job has been run.
+        self.elapsed: Optional[float] = None
+        self.records: Optional[int] = None
+        self.error: Optional[Exception] = None
+        self.dot_paths: List[str] = []
+
+        # These are set when the job is run with `--incremental`.
+        self.manifest: Optional[BuildManifest] = None
+        self.skipped = False
+
+
+def load_manifest(path: str) -> Tuple[List[BatchJob], Optional[int]]:
+    """Return the jobs described by the manifest at `path` and the
+    concurrency limit that the manifest specifies, if any. Relative
+    output paths are relative to the manifest's directory. Raise
+    `ValueError` if the manifest is not valid.
+    """
+    if path.endswith(".toml"):
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError(
+                "TOML manifests require Python 3.11 or later; use a JSON manifest"
+            )
+        with open(path, "rb") as f:
+            manifest: Dict[str, Any] = tomllib.load(f)
+    else:
+        with open(path) as f:
+            manifest = json.load(f)
+
+    base_dir = os.path.dirname(path)
+    jobs = []
+    for i, job in enumerate(manifest.get("jobs", [])):
+        name = str(job.get("name", f"job-{i + 1}"))
+        if "out" not in job:
+            raise ValueError(f"{name}: missing 'out'")
+        format = job.get("format", "dot")
+        if format not in FORMATS:
+            raise ValueError(f"{name}: invalid format '{format}'")
+        job_ids = job.get("ids", [])
+        if not isinstance(job_ids, list) or not all(
+            isinstance(id, str) for id in job_ids
+        ):
+            raise ValueError(f"{name}: 'ids' must be a list of strings")
+        ids = []
+        for id in job_ids:
+            try:
+                ids.append(StartNodeArg(id))
+            except ArgumentTypeError as e:
+                raise ValueError(f"{name}: {e}")
+            except ValueError:
+                raise ValueError(f"{name}: invalid ID '{id}'")
+        if not ids:
+            raise ValueError(f"{name}: no IDs")
+
+        jobs.append(
+            BatchJob(
+                name,
+                ids,
+                cast(OutputFormat, format),
+                os.path.join(base_dir, job["out"]),
+            )
+        )
+
+    concurrency = manifest.get("concurrency")
+    if concurrency is None:
+        return jobs, None
+    if isinstance(concurrency, bool) or not isinstance(concurrency, int):
+        raise ValueError(f"invalid 'concurrency' value {concurrency!r}")
+    if concurrency < 1:
+        raise ValueError("'concurrency' must be at least 1")
+    return jobs, concurrency
+
+
+async def run_jobs(
+    jobs: List[BatchJob],
+    *,
+    concurrency: int,
+    cache: RecordCache,
+    shard: Optional[ShardStrategy] = None,
+    max_depth: Optional[int] = None,
+    max_nodes: Optional[int] = None,
+    timings: Optional[Timings] = None,
+    incremental: bool = False,
+    render_formats: Optional[List[str]] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+) -> None:
+    """Run `jobs`, with at most `concurrency` of them in progress at a
+    time, and write each job's output to its output file. The output of
+    jobs in DOT format is sharded and summarized as `shard`,
+    `max_depth`, and `max_nodes` specify (see `write_output`). If
+    `timings` is given, the time spent in each phase of each job is
+    recorded in it. If `incremental` is True, jobs whose graph and
+    options (including the `render_formats` that DOT output will be
+    rendered in) have not changed since their last build are skipped,
+    and the manifest of each other job's build is set (see
+    `geneagrapher.incremental`). Requests are timed out and retried as
+    `retry_policy` specifies.
+    """
+    pending = list(reversed(jobs))
+    policy = retry_policy or RetryPolicy()
+
+    async def worker() -> None:
+        ws: Optional[websockets.client.WebSocketClientProtocol] = None
+
+        async def send(
+            conn: websockets.client.WebSocketClientProtocol, payload: RequestPayload
+        ) -> Geneagraph:
+            nonlocal ws
+            try:
+                with timed(timings, "request"):
+                    graph = await request_graph(
+                        conn,
+                        payload,
+                        timings=timings,
+                        idle_timeout=policy.idle_timeout,
+                    )
+            except BaseException:
+                # The connection may still have a response in flight
+                # (e.g., if the request timed out), so it is not kept.
+                await conn.close()
+                raise
+            # Keep the connection for the worker's next job, unless a
+            # concurrent (hedged) request already kept its own.
+            if ws is None:
+                ws = conn
+            else:
+                await conn.close()
+            return graph
+
+        async def attempt(payload: RequestPayload) -> Geneagraph:
+            nonlocal ws
+            # The worker's connection is taken for this attempt, so that
+            # a hedged attempt opens a connection of its own.
+            conn, ws = ws, None
+            if conn is not None and not conn.closed:
+                try:
+                    return await send(conn, payload)
+                except websockets.exceptions.ConnectionClosed:
+                    pass  # the backend closed the reused connection
+            with timed(timings, "connect"):
+                conn = await connect(timeout=policy.connect_timeout)
+            return await send(conn, payload)
+
+        async def fetch_graph(job: BatchJob) -> Geneagraph:
+            # With an idle timeout, progress messages are requested, so
+            # that a long traversal is not timed out.
+            payload = make_payload(job.ids, policy.idle_timeout is None)
+            try:
+                return await policy.run(
+                    lambda on_progress: attempt(payload), timings=timings
+                )
+            except asyncio.TimeoutError:
+                raise GgrapherError("Geneagrapher backend did not respond in time.")
+            except (OSError, websockets.exceptions.WebSocketException):
+                raise GgrapherError("Geneagrapher backend is currently unavailable.")
+
+        try:
+            while pending:
+                job = pending.pop()
+                start = time.perf_counter()
+                try:
+                    with timed(timings, "cache lookup"):
+                        graph = cache.get_graph([sn.start_node for sn in job.ids])
+                    if graph is None:
+                        graph = await fetch_graph(job)
+                        with timed(timings, "cache store"):
+                            cache.put_graph(graph)
+
+                    # Each option applies only to the formats that support
+                    # it.
+                    job_shard = shard if job.format == "dot" else None
+                    is_drawn = job.format in DRAWN_FORMATS
+                    job_max_depth = max_depth if is_drawn else None
+                    job_max_nodes = max_nodes if is_drawn else None
+                    if incremental:
+                        options = get_build_options(
+                            job.format,
+                            job_shard,
+                            job_max_depth,
+                            job_max_nodes,
+                            render_formats if job.format in DOT_FORMATS else None,
+                        )
+                        job.manifest = check_build(
+                            job.outfile, graph, options, sys.stderr
+                        )
+                        job.skipped = job.manifest is None
+                    job.records = len(graph["nodes"])
+                    if job.skipped:
+                        continue
+
+                    with open(job.outfile, "w") as f:
+                        job.dot_paths = write_output(
+                            job.format,
+                            graph,
+                            f,
+                            job_shard,
+                            max_depth=job_max_depth,
+                            max_nodes=job_max_nodes,
+                            timings=timings,
+                        )
+                except (GgrapherError, OSError) as e:
+                    job.error = e
+                job.elapsed = time.perf_counter() - start
+        finally:
+            if ws is not None:
+                await ws.close()
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(jobs)))))
+
+
+def print_summary(jobs: List[BatchJob], elapsed: float) -> None:
+    name_width = max([len("Job")] + [len(job.name) for job in jobs])
+    print(f"{'Job':{name_width}}  {'Status':7}  {'Records':>7}  {'Time (s)':>8}")
+    for job in jobs:
+        status = (
+            "failed" if job.error is not None else ("skipped" if job.skipped else "ok")
+        )
+        records = "" if job.records is None else job.records
+        print(
+            f"{job.name:{name_width}}  {status:7}  {records:>7}  \
+{job.elapsed or 0:>8.2f}"
+        )
+    print(f"Total wall-clock time: {elapsed:.2f} s")
+
+
+def run_batch(argv: List[str]) -> None:
+    parser = ArgumentParser(
+        prog="ggrapher batch",
+        description="Build the graphs for the jobs described by a JSON or TOML \
+manifest file, running several jobs concurrently.",
+    )
+    parser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        help=f"maximum number of jobs in progress at a time [default: the \
+manifest's 'concurrency' value, or {DEFAULT_CONCURRENCY}]",
+        metavar="N",
+    )
+    add_cache_arguments(parser)
+    add_retry_arguments(parser)
+    add_summary_arguments(parser)
+    add_shard_argument(parser)
+    add_render_argument(parser)
+    add_incremental_argument(parser)
+    add_timing_arguments(parser)
+    parser.add_argument("manifest", metavar="MANIFEST", help="manifest file")
+
+    args = parser.parse_args(argv)
+    if args.concurrency is not None and args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    try:
+        jobs, manifest_concurrency = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(f"{args.manifest}: {e}")
+
+    if args.concurrency is not None:
+        concurrency = args.concurrency
+    elif manifest_concurrency is not None:
+        concurrency = manifest_concurrency
+    else:
+        concurrency = DEFAULT_CONCURRENCY
+    check_render_paths(
+        parser, args.render, [job.outfile for job in jobs if job.format in DOT_FORMATS]
+    )
+    retry_policy = get_retry_policy(parser, args)
+
+    # Without a persistent cache, an in-memory cache still lets jobs
+    # share records.
+    cache = open_cache(args)
+    if cache is None:
+        cache = RecordCache(":memory:")
+    timings = start_timings(args)
+    start = time.perf_counter()
+    try:
+        asyncio.run(
+            run_jobs(
+                jobs,
+                concurrency=concurrency,
+                cache=cache,
+                shard=args.shard,
+                max_depth=args.max_depth,
+                max_nodes=args.max_nodes,
+                timings=timings,
+                incremental=args.incremental,
+                render_formats=args.render,
+                retry_policy=retry_policy,
+            )
+        )
+    finally:
+        cache.close()
+
+    for job in jobs:
+        if job.error is not None:
+            print(f"{job.name}:", job.error, file=sys.stderr)
+    print_summary(jobs, time.perf_counter() - start)
+
+    # The render jobs of each job that succeeded, in the order of `jobs`.
+    # They are run together, in one pool of Graphviz processes, so that
+    # the machine stays busy while a large job's layouts run rather than
+    # waiting for each job's slowest render before starting the next.
+    renders: List[List[RenderJob]] = [
+        (
+            [
+                RenderJob(path, args.render, positioned=job.format == "dot-pos")
+                for path in job.dot_paths
+            ]
+            if args.render is not None and job.error is None
+            else []
+        )
+        for job in jobs
+    ]
+    rendered = True
+    if args.render is not None:
+        with timed(timings, "render"):
+            rendered = render([r for job_renders in renders for r in job_renders])
+
+    # Record the builds of the jobs whose output was written and rendered,
+    # so that the next incremental build can skip them if they have not
+    # changed.
+    for job, job_renders in zip(jobs, renders):
+        if (
+            job.manifest is not None
+            and job.error is None
+            and not any(r.errors for r in job_renders)
+        ):
+            outputs = job.dot_paths + [
+                r.output_path(format) for r in job_renders for format in r.formats
+            ]
+            record_build(job.outfile, job.manifest, outputs)
+    report_timings(args, timings)
+
+    if any(job.error is not None for job in jobs) or not rendered:
+        sys.exit(1)
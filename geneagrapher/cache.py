@@ -0,0 +1,206 @@
+"""This module implements `RecordCache`, a persistent store of
+`Record` objects that are received from the Geneagrapher backend.
+
+The store is a SQLite database keyed by record ID. Each record has its
+own expiration time, after which it is treated as absent (but kept,
+so that an offline build can still use it), and the number of stored
+records can be bounded, in which case the least recently used records
+are evicted first. Records that were received in a truncated graph are
+marked.
+"""
+
+from .traverse import build_graph
+from .types import Geneagraph, Record, RecordId, StartNodeRequest
+
+import json
+import os
+import time
+from types import TracebackType
+from typing import Dict, Iterable, Iterator, List, Optional, Type
+
+DEFAULT_TTL = 7 * 24 * 60 * 60  # one week, in seconds
+
+# SQLite limits the number of parameters in a statement (999 in older
+# versions), so lookups are done in chunks of this many IDs.
+QUERY_CHUNK_SIZE = 500
+
+
+class RecordCache:
+    def __init__(
+        self,
+        path: str,
+        *,
+        ttl: float = DEFAULT_TTL,
+        max_records: Optional[int] = None,
+    ) -> None:
+        """Open (creating, if needed) the record store at `path`.
+
+        `ttl` is the number of seconds that stored records remain
+        valid. If `max_records` is given, the store holds at most that
+        many records.
+        """
+        self.ttl = ttl
+        self.max_records = max_records
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # sqlite3 is imported here, rather than with the module, so that
+        # commands that parse the cache arguments but do not open a
+        # cache do not import it.
+        import sqlite3
+
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    record TEXT NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    truncated INTEGER NOT NULL DEFAULT 0
+)"""
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS records_accessed ON records (accessed)"
+            )
+
+    def __enter__(self) -> "RecordCache":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        (count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM records WHERE expires > ?", (time.time(),)
+        ).fetchone()
+        return int(count)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get_many(
+        self, record_ids: Iterable[RecordId], *, include_expired: bool = False
+    ) -> Dict[RecordId, Record]:
+        """Return the unexpired (or, if `include_expired` is True, all)
+        stored records for the given IDs. IDs that are not stored are
+        absent from the returned dictionary.
+        """
+        now = time.time()
+        min_expires = float("-inf") if include_expired else now
+        ids = list(record_ids)
+        records: Dict[RecordId, Record] = {}
+
+        with self.conn:
+            for start in range(0, len(ids), QUERY_CHUNK_SIZE):
+                chunk = ids[start : start + QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT id, record FROM records WHERE id IN ({placeholders}) \
+AND expires > ?",
+                    (*chunk, min_expires),
+                ).fetchall()
+                for record_id, record in rows:
+                    records[RecordId(record_id)] = json.loads(record)
+
+                self.conn.execute(
+                    f"UPDATE records SET accessed = ? WHERE id IN ({placeholders})",
+                    (now, *chunk),
+                )
+
+        return records
+
+    def iter_records(self) -> Iterator[Record]:
+        """Generate all stored records, including expired ones, in ID
+        order, without updating their access times.
+        """
+        last_id = -1
+        while True:
+            rows = self.conn.execute(
+                "SELECT id, record FROM records WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, QUERY_CHUNK_SIZE),
+            ).fetchall()
+            if not rows:
+                return
+            for _, record in rows:
+                yield json.loads(record)
+            last_id = rows[-1][0]
+
+    def put_many(
+        self,
+        records: Iterable[Record],
+        *,
+        ttl: Optional[float] = None,
+        truncated: bool = False,
+    ) -> None:
+        """Store `records`, replacing any stored records with the same
+        IDs. `ttl` overrides the store's default time-to-live for these
+        records. `truncated` marks records that were received in a
+        truncated graph.
+        """
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO records (id, record, expires, accessed, \
+truncated) VALUES (?, ?, ?, ?, ?)",
+                ((r["id"], json.dumps(r), expires, now, truncated) for r in records),
+            )
+        self.evict()
+
+    def put_graph(self, graph: Geneagraph) -> None:
+        """Store the records of `graph`, marking them if the graph is
+        truncated.
+        """
+        self.put_many(graph["nodes"].values(), truncated=graph["status"] == "truncated")
+
+    def any_truncated(self, record_ids: Iterable[RecordId]) -> bool:
+        """Return True if any of the stored records with the given IDs
+        was received in a truncated graph.
+        """
+        ids = list(record_ids)
+        for start in range(0, len(ids), QUERY_CHUNK_SIZE):
+            chunk = ids[start : start + QUERY_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            row = self.conn.execute(
+                f"SELECT 1 FROM records WHERE id IN ({placeholders}) AND truncated \
+LIMIT 1",
+                chunk,
+            ).fetchone()
+            if row is not None:
+                return True
+        return False
+
+    def evict(self) -> None:
+        """Remove the least recently used records if the store is over
+        its size bound. Expired records are kept until they are evicted,
+        and, among records that were used equally recently, are evicted
+        first.
+        """
+        if self.max_records is None:
+            return
+        with self.conn:
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM records").fetchone()
+            if count > self.max_records:
+                self.conn.execute(
+                    "DELETE FROM records WHERE id IN \
+(SELECT id FROM records ORDER BY accessed ASC, expires ASC LIMIT ?)",
+                    (count - self.max_records,),
+                )
+
+    def get_graph(self, start_nodes: List[StartNodeRequest]) -> Optional[Geneagraph]:
+        """Return the graph for `start_nodes` if every record that it
+        contains is stored, otherwise return None. A graph whose records
+        were received in a truncated graph is complete if the store has
+        every record that it reaches.
+        """
+        graph, missing = build_graph(start_nodes, self.get_many)
+        return None if missing else graph
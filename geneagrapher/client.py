@@ -0,0 +1,293 @@
+"""This module implements `GeneagrapherClient`, an asynchronous client
+for the Geneagrapher backend, for programs that build many graphs or
+that already run an event loop (e.g., web services and Jupyter
+notebooks), where `ggrapher`'s use of `asyncio.run` is not possible.
+
+```python
+async with GeneagrapherClient(max_connections=4) as client:
+    graph = await client.build_graph(["18231:a", "18230:a"])
+```
+
+The backend answers one request at a time on each connection, so the
+client keeps a pool of at most `max_connections` connections, which
+is also the limit on the number of requests in flight. Connections are
+opened when they are first needed and kept open across requests until
+the client is closed. A connection that the backend has closed while
+it was idle is replaced.
+
+With `fan_out` greater than 1, a request with many start nodes is split
+into as many as `fan_out` requests, which the backend traverses
+concurrently, and their graphs are merged. Each request gets at least
+`MIN_START_NODES_PER_REQUEST` start nodes, because a small request is
+dominated by its round trip rather than its traversal, so splitting it
+would only add requests. The start nodes are dealt to the requests in
+turn, which spreads start nodes that are near each other in the
+request (often the members of one department) across the requests.
+Records reached from more than one request are received more than once
+but appear once in the merged graph.
+
+Each request is timed out and retried as the client's `RetryPolicy`
+specifies (see `geneagrapher.retry`). A hedged request is sent on a
+connection of its own, in addition to the `max_connections` that hold
+the requests in flight.
+"""
+
+from .backend import connect, request_graph
+from .cache import RecordCache
+from .geneagrapher import GgrapherError, RequestPayload, StartNodeArg
+from .merge import merge_graphs
+from .retry import RetryPolicy
+from .timing import Timings, timed
+from .types import Geneagraph, ProgressCallback, ProgressHandler, StartNodeRequest
+
+from argparse import ArgumentTypeError
+import asyncio
+from types import TracebackType
+from typing import Iterable, List, Optional, Set, Type, Union
+import websockets
+import websockets.client
+
+DEFAULT_MAX_CONNECTIONS = 4
+MIN_START_NODES_PER_REQUEST = 8
+
+
+def split_start_nodes(
+    start_nodes: List[StartNodeRequest], fan_out: int
+) -> List[List[StartNodeRequest]]:
+    """Return `start_nodes` dealt into at most `fan_out` requests of at
+    least `MIN_START_NODES_PER_REQUEST` start nodes each (or one request,
+    if there are too few start nodes to split).
+    """
+    count = max(1, min(fan_out, len(start_nodes) // MIN_START_NODES_PER_REQUEST))
+    return [start_nodes[i::count] for i in range(count)]
+
+
+def combine_progress(handler: ProgressHandler, count: int) -> List[ProgressHandler]:
+    """Return a progress handler for each of `count` requests that
+    passes the sum of the requests' latest progress to `handler`.
+    """
+    latest: List[ProgressCallback] = [
+        {"queued": 0, "fetching": 0, "done": 0} for _ in range(count)
+    ]
+
+    def make_handler(i: int) -> ProgressHandler:
+        def on_progress(progress: ProgressCallback) -> None:
+            latest[i] = progress
+            handler(
+                {
+                    "queued": sum(p["queued"] for p in latest),
+                    "fetching": sum(p["fetching"] for p in latest),
+                    "done": sum(p["done"] for p in latest),
+                }
+            )
+
+        return on_progress
+
+    return [make_handler(i) for i in range(count)]
+
+
+class GeneagrapherClient:
+    def __init__(
+        self,
+        *,
+        uri: Optional[str] = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        fan_out: int = 1,
+        cache: Optional[RecordCache] = None,
+        on_progress: Optional[ProgressHandler] = None,
+        timings: Optional[Timings] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+    ) -> None:
+        """Create a client of the backend at `uri` (by default,
+        `GGRAPHER_URI`) that has at most `max_connections` requests in
+        flight, and that splits requests with many start nodes into at
+        most `fan_out` concurrent requests. If `cache` is given, graphs
+        are built from it when it has every record they contain, and
+        received records are stored in it. `on_progress` is called
+        with the progress messages of every request, unless a request
+        gives its own handler. If `timings` is given, the time spent in
+        each phase of each request is recorded in it. Requests are timed
+        out and retried as `retry_policy` specifies (by default, each
+        request is made once, with only a connect timeout).
+        """
+        if max_connections < 1:
+            raise ValueError("max_connections must be at least 1")
+        if fan_out < 1:
+            raise ValueError("fan_out must be at least 1")
+        self.uri = uri
+        self.max_connections = max_connections
+        self.fan_out = fan_out
+        self.cache = cache
+        self.on_progress = on_progress
+        self.timings = timings
+        self.retry_policy = retry_policy or RetryPolicy()
+
+        # These are set when the client is opened.
+        self.slots: Optional[asyncio.Semaphore] = None
+        self.idle: List[websockets.client.WebSocketClientProtocol] = []
+        self.connections: Set[websockets.client.WebSocketClientProtocol] = set()
+
+    async def __aenter__(self) -> "GeneagrapherClient":
+        # The semaphore is created here, rather than in `__init__`,
+        # because before Python 3.10 it is bound to the event loop that
+        # is current when it is created.
+        self.slots = asyncio.Semaphore(self.max_connections)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close every connection to the backend. The client cannot be
+        used after it is closed.
+        """
+        self.slots = None
+        connections = list(self.connections)
+        self.idle.clear()
+        self.connections.clear()
+        await asyncio.gather(*(ws.close() for ws in connections))
+
+    def get_slots(self) -> asyncio.Semaphore:
+        if self.slots is None:
+            raise RuntimeError("GeneagrapherClient is not open; use `async with`")
+        return self.slots
+
+    async def build_graph(
+        self,
+        start_nodes: Iterable[Union[str, StartNodeRequest]],
+        *,
+        on_progress: Optional[ProgressHandler] = None,
+    ) -> Geneagraph:
+        """Return the graph for `start_nodes`, which are given either in
+        `ggrapher`'s command-line syntax (e.g., "18231:a") or as
+        `StartNodeRequest` dictionaries. Progress messages are passed to
+        `on_progress`, or to the client's handler if it is not given.
+        Raise `ValueError` if a start node is not valid and
+        `GgrapherError` if the request fails.
+        """
+        try:
+            requests: List[StartNodeRequest] = [
+                StartNodeArg(sn).start_node if isinstance(sn, str) else sn
+                for sn in start_nodes
+            ]
+        except ArgumentTypeError as e:
+            # A name that the search index does not resolve.
+            raise ValueError(str(e))
+        self.get_slots()  # fail early if the client is not open
+
+        handler = on_progress or self.on_progress
+        chunks = split_start_nodes(requests, self.fan_out)
+        if len(chunks) == 1:
+            return await self.build_chunk(requests, handler)
+
+        handlers = (
+            [None] * len(chunks)
+            if handler is None
+            else combine_progress(handler, len(chunks))
+        )
+        graphs = await asyncio.gather(
+            *(self.build_chunk(c, h) for c, h in zip(chunks, handlers))
+        )
+        graph = merge_graphs(graphs)
+
+        # Put the start nodes back in the order they were requested in.
+        order = {sn["recordId"]: i for i, sn in enumerate(requests)}
+        graph["start_nodes"].sort(key=lambda rid: order.get(rid, len(order)))
+        return graph
+
+    async def build_chunk(
+        self,
+        start_nodes: List[StartNodeRequest],
+        on_progress: Optional[ProgressHandler],
+    ) -> Geneagraph:
+        """Return the graph for `start_nodes`, from the cache if it has
+        every record, or else from one request to the backend.
+        """
+        if self.cache is not None:
+            with timed(self.timings, "cache lookup"):
+                graph = self.cache.get_graph(start_nodes)
+            if graph is not None:
+                return graph
+
+        # With an idle timeout, progress messages are requested even if
+        # there is no handler for them, so that a long traversal is not
+        # timed out.
+        policy = self.retry_policy
+        payload: RequestPayload = {
+            "kind": "build-graph",
+            "options": {
+                "reportingCallback": on_progress is not None
+                or policy.idle_timeout is not None
+            },
+            "startNodes": start_nodes,
+        }
+        async with self.get_slots():
+            try:
+                graph = await policy.run(
+                    lambda handler: self.request(payload, handler),
+                    on_progress,
+                    timings=self.timings,
+                )
+            except asyncio.TimeoutError:
+                raise GgrapherError("Geneagrapher backend did not respond in time.")
+            except (OSError, websockets.exceptions.WebSocketException):
+                raise GgrapherError("Geneagrapher backend is currently unavailable.")
+
+        if self.cache is not None:
+            with timed(self.timings, "cache store"):
+                self.cache.put_graph(graph)
+        return graph
+
+    async def request(
+        self, payload: RequestPayload, on_progress: Optional[ProgressHandler]
+    ) -> Geneagraph:
+        """Send `payload` on an idle connection, or on a new one if
+        there is none, and return the graph that the backend responds
+        with.
+        """
+        if self.idle:
+            try:
+                return await self.send(self.idle.pop(), payload, on_progress)
+            except websockets.exceptions.ConnectionClosed:
+                pass  # the backend closed the idle connection
+
+        with timed(self.timings, "connect"):
+            ws = await connect(self.uri, timeout=self.retry_policy.connect_timeout)
+        self.connections.add(ws)
+        return await self.send(ws, payload, on_progress)
+
+    async def send(
+        self,
+        ws: websockets.client.WebSocketClientProtocol,
+        payload: RequestPayload,
+        on_progress: Optional[ProgressHandler],
+    ) -> Geneagraph:
+        """Send `payload` on `ws`, and return `ws` to the pool of idle
+        connections when the graph has been received.
+        """
+        try:
+            with timed(self.timings, "request"):
+                graph = await request_graph(
+                    ws,
+                    payload,
+                    on_progress=on_progress,
+                    timings=self.timings,
+                    idle_timeout=self.retry_policy.idle_timeout,
+                )
+        except BaseException:
+            # The connection may still have a response in flight (e.g.,
+            # if the request was cancelled), so it cannot be reused.
+            self.connections.discard(ws)
+            await ws.close()
+            raise
+
+        # The connection is not in the pool if the client was closed
+        # during the request.
+        if ws in self.connections:
+            self.idle.append(ws)
+        return graph
@@ -0,0 +1,116 @@
+"""This module implements the `convert` command, which writes a saved
+geneagraph (the output of `ggrapher -f json`, `-f ndjson`, or `-f
+snapshot`) in another output format without making requests to the
+backend.
+
+NDJSON input is read as a stream: its records are written to JSON or
+NDJSON output one at a time, in the order in which they are in the
+file, and for every other format they are read into a `CompactGraph`,
+so the graph is never held in memory as a `Geneagraph`.
+
+The output is written to a temporary file in the output file's
+directory, which replaces the output file only once the whole graph has
+been written, so a conversion that fails partway (e.g., on an invalid
+line of NDJSON input) leaves an existing output file as it was.
+
+Neither this module nor the modules that it imports import the network
+stack, so converting a graph starts faster than requesting one.
+"""
+
+from .geneagrapher import (
+    DRAWN_FORMATS,
+    OutputFormat,
+    add_output_arguments,
+    add_summary_arguments,
+    write_output,
+)
+from .output.identity import write_nodes
+from .output.ndjson import NdjsonGraph, make_header
+from .reader import SavedGraph, open_graph
+from .types import CompactGraph
+
+from argparse import ArgumentParser
+import json
+import os
+import sys
+from typing import List, Optional, TextIO
+
+
+def write_stream(format: OutputFormat, graph: NdjsonGraph, fp: TextIO) -> None:
+    """Write `graph` to `fp` in `format`, which is "json" or "ndjson",
+    one record at a time.
+    """
+    if format == "ndjson":
+        fp.write(make_header(graph.start_nodes, graph.status))
+        fp.write("\n")
+        for record in graph.records():
+            fp.write(json.dumps(record))
+            fp.write("\n")
+    else:
+        fp.write(
+            f'{{"start_nodes": {json.dumps(graph.start_nodes)}, \
+"status": {json.dumps(graph.status)}, "nodes": '
+        )
+        write_nodes(fp, ((record["id"], record) for record in graph.records()))
+        fp.write("}\n")
+
+
+def run_convert(argv: List[str]) -> None:
+    parser = ArgumentParser(
+        prog="ggrapher convert",
+        description="Convert a saved graph (written with '-f json', '-f ndjson', \
+or '-f snapshot') to another output format.",
+    )
+    add_output_arguments(parser)
+    add_summary_arguments(parser)
+    parser.add_argument("infile", metavar="FILE", help="saved graph to convert")
+    args = parser.parse_args(argv)
+    for option in ["max_depth", "max_nodes"]:
+        if getattr(args, option) is not None and args.format not in DRAWN_FORMATS:
+            parser.error(f"--{option.replace('_', '-')} requires DOT or SVG output")
+
+    try:
+        graph: SavedGraph = open_graph(args.infile)
+        if isinstance(graph, NdjsonGraph) and args.format not in ("json", "ndjson"):
+            graph = CompactGraph.from_records(
+                graph.start_nodes, graph.records(), graph.status
+            )
+    except (OSError, ValueError) as e:
+        parser.error(f"{args.infile}: {e}")
+
+    # The temporary file that the output is written to, if it is written
+    # to a file.
+    tmp_path: Optional[str] = None
+    outfile: TextIO = sys.stdout
+    if args.outfile is not None and args.outfile != "-":
+        directory, name = os.path.split(args.outfile)
+        tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.tmp")
+        try:
+            outfile = open(tmp_path, "w")
+        except OSError as e:
+            parser.error(f"can't open '{args.outfile}': {e}")
+
+    written = False
+    try:
+        if isinstance(graph, NdjsonGraph):
+            write_stream(args.format, graph, outfile)
+        else:
+            write_output(
+                args.format,
+                graph,
+                outfile,
+                max_depth=args.max_depth,
+                max_nodes=args.max_nodes,
+            )
+        written = True
+    except ValueError as e:
+        # The records of NDJSON input are read, and can fail, while they
+        # are written.
+        parser.error(str(e))
+    finally:
+        if tmp_path is not None:
+            outfile.close()
+            if written:
+                os.replace(tmp_path, args.outfile)
+            else:
+                os.remove(tmp_path)
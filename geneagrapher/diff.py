@@ -0,0 +1,310 @@
+"""This module implements the `diff` command, which reports how a saved
+graph (`ggrapher -f json`, `-f ndjson`, or `-f snapshot` output)
+changed from an older one: the records that were added, removed, or
+modified (name, institution, or year), and the advisor relationships
+that were added or removed. The diff is written either as text or as a
+DOT overlay of both graphs, with added elements drawn in green and
+removed ones in red.
+
+The graphs are compared by walking both of their records in record ID
+order at once, as a merge join, so the comparison takes linear time
+and holds only the current pair of records. Snapshots are already
+indexed by record ID and memory-mapped, and NDJSON graphs list their
+records in ID order, so the records of either are read one at a time
+as the walk reaches them; the records of a JSON graph are sorted by ID
+first.
+
+Each advisor relationship is listed in the advisors of the student's
+record (and in the descendants of the advisor's record), so
+relationships are compared through the advisors of each record only.
+"""
+
+from .geneagrapher import open_output
+from .output.dot import DotOutput, add_attributes, make_node_str
+from .output.ndjson import NdjsonGraph
+from .reader import SavedGraph, open_graph
+from .types import CompactGraph, Record, RecordId
+
+from argparse import ArgumentParser
+import sys
+from typing import (
+    Any,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+)
+
+# The fields of a record that are compared, other than the advisor
+# relationships.
+FIELDS: Tuple[Literal["name", "institution", "year"], ...] = (
+    "name",
+    "institution",
+    "year",
+)
+
+ADDED_COLOR = "green4"
+REMOVED_COLOR = "red3"
+MODIFIED_COLOR = "darkorange3"
+
+
+def sorted_records(graph: SavedGraph) -> Iterator[Record]:
+    """Generate the records of `graph` in record ID order. Raise
+    `ValueError` if the records of an `NdjsonGraph` are not in ID order.
+    """
+    if isinstance(graph, CompactGraph):
+        for index in graph.order:
+            yield graph.record(index)
+    elif isinstance(graph, NdjsonGraph):
+        previous: Optional[RecordId] = None
+        for record in graph.records():
+            if previous is not None and record["id"] <= previous:
+                raise ValueError(
+                    f"{graph.path}: records are not in ID order \
+({record['id']} follows {previous})"
+                )
+            previous = record["id"]
+            yield record
+    else:
+        nodes = graph["nodes"]
+        for record_id in sorted(nodes):
+            yield nodes[record_id]
+
+
+class RecordChange:
+    """The change to one record between an old and a new graph. `old`
+    is None for an added record, and `new` is None for a removed one.
+    """
+
+    def __init__(self, old: Optional[Record], new: Optional[Record]) -> None:
+        self.old = old
+        self.new = new
+        record = new if new is not None else old
+        assert record is not None
+        self.record = record
+
+        self.fields: Dict[str, Tuple[Any, Any]] = {}
+        if old is not None and new is not None:
+            for field in FIELDS:
+                if old[field] != new[field]:
+                    self.fields[field] = (old[field], new[field])
+
+        old_advisors = set() if old is None else set(old["advisors"])
+        new_advisors = set() if new is None else set(new["advisors"])
+        self.added_advisors = sorted(new_advisors - old_advisors)
+        self.removed_advisors = sorted(old_advisors - new_advisors)
+        self.kept_advisors = sorted(old_advisors & new_advisors)
+
+    @property
+    def kind(self) -> Optional[Literal["added", "removed", "modified"]]:
+        """Return how the record changed, or None if it did not."""
+        if self.old is None:
+            return "added"
+        if self.new is None:
+            return "removed"
+        if self.fields or self.added_advisors or self.removed_advisors:
+            return "modified"
+        return None
+
+
+def diff_graphs(
+    old: SavedGraph, new: SavedGraph
+) -> Generator[RecordChange, None, None]:
+    """Generate the change to each record in `old` or `new`, including
+    unchanged records, in record ID order.
+    """
+    old_records = sorted_records(old)
+    new_records = sorted_records(new)
+    old_record = next(old_records, None)
+    new_record = next(new_records, None)
+    while old_record is not None or new_record is not None:
+        if new_record is None or (
+            old_record is not None and old_record["id"] < new_record["id"]
+        ):
+            yield RecordChange(old_record, None)
+            old_record = next(old_records, None)
+        elif old_record is None or new_record["id"] < old_record["id"]:
+            yield RecordChange(None, new_record)
+            new_record = next(new_records, None)
+        else:
+            yield RecordChange(old_record, new_record)
+            old_record = next(old_records, None)
+            new_record = next(new_records, None)
+
+
+class DiffSummary:
+    def __init__(self) -> None:
+        self.records: Dict[str, int] = {"added": 0, "removed": 0, "modified": 0}
+        self.edges: Dict[str, int] = {"added": 0, "removed": 0}
+
+    def add(self, change: RecordChange) -> None:
+        if change.kind is not None:
+            self.records[change.kind] += 1
+        self.edges["added"] += len(change.added_advisors)
+        self.edges["removed"] += len(change.removed_advisors)
+
+    @property
+    def changed(self) -> bool:
+        return any(self.records.values()) or any(self.edges.values())
+
+    def __str__(self) -> str:
+        return f"records: {self.records['added']:,} added, \
+{self.records['removed']:,} removed, {self.records['modified']:,} modified; \
+advisor relationships: {self.edges['added']:,} added, {self.edges['removed']:,} removed"
+
+
+def format_value(value: Any) -> str:
+    return "none" if value is None else repr(value)
+
+
+def change_lines(change: RecordChange) -> Generator[str, None, None]:
+    """Generate the lines of the text diff of `change`."""
+    record = change.record
+    kind = change.kind
+    if kind == "added":
+        yield f"+ {record['id']} {record['name']}"
+    elif kind == "removed":
+        yield f"- {record['id']} {record['name']}"
+    elif kind == "modified" and change.fields:
+        fields = "; ".join(
+            f"{field}: {format_value(old)} -> {format_value(new)}"
+            for field, (old, new) in change.fields.items()
+        )
+        yield f"~ {record['id']} {record['name']}: {fields}"
+    for advisor_id in change.added_advisors:
+        yield f"+ {advisor_id} -> {record['id']}"
+    for advisor_id in change.removed_advisors:
+        yield f"- {advisor_id} -> {record['id']}"
+
+
+class DiffDotOutput(DotOutput):
+    """A DOT overlay of an old and a new graph. Records and advisor
+    relationships that were added are green, those that were removed
+    are red and dashed, and modified records are orange and labeled
+    with their new values. `summary` counts the changes once the
+    output has been generated.
+    """
+
+    def __init__(self, old: SavedGraph, new: SavedGraph) -> None:
+        # `DotOutput.__init__` is not called: the graphs are read only
+        # by `node_strs` and `edge_strs`, which walk both of them.
+        self.old = old
+        self.new = new
+        self.summary = DiffSummary()
+        self.record_ids: Set[int] = set()
+
+    def node_strs(self) -> Generator[str, None, None]:
+        self.summary = DiffSummary()
+        for change in diff_graphs(self.old, self.new):
+            self.summary.add(change)
+            self.record_ids.add(change.record["id"])
+            node_str = make_node_str(change.record)
+            if change.kind == "added":
+                node_str = add_attributes(node_str, f"fontcolor={ADDED_COLOR}")
+            elif change.kind == "removed":
+                node_str = add_attributes(
+                    node_str, f"fontcolor={REMOVED_COLOR}, shape=box, style=dashed"
+                )
+            elif change.kind == "modified" and change.fields:
+                node_str = add_attributes(node_str, f"fontcolor={MODIFIED_COLOR}")
+            yield node_str
+
+    def edge_strs(self) -> Generator[str, None, None]:
+        for change in diff_graphs(self.old, self.new):
+            record_id = change.record["id"]
+            edges: List[Tuple[List[int], str]] = [
+                (change.kept_advisors, ""),
+                (change.added_advisors, f" [color={ADDED_COLOR}]"),
+                (change.removed_advisors, f" [color={REMOVED_COLOR}, style=dashed]"),
+            ]
+            for advisor_ids, attributes in edges:
+                for advisor_id in advisor_ids:
+                    # Leave out advisors that are in neither graph.
+                    if advisor_id in self.record_ids:
+                        yield f"{advisor_id} -> {record_id}{attributes};"
+
+
+def write_text_diff(
+    old: SavedGraph, new: SavedGraph, fp: TextIO, *, stat: bool = False
+) -> DiffSummary:
+    """Write the text diff of `old` and `new`, followed by a summary
+    line, to `fp`, or only the summary line if `stat` is True. Return
+    the summary.
+    """
+    summary = DiffSummary()
+    for change in diff_graphs(old, new):
+        summary.add(change)
+        if not stat:
+            for line in change_lines(change):
+                fp.write(line + "\n")
+    fp.write(f"{summary}\n")
+    return summary
+
+
+def run_diff(argv: List[str]) -> None:
+    parser = ArgumentParser(
+        prog="ggrapher diff",
+        description="Report the records and advisor relationships that were added, \
+removed, or modified between two saved graphs (written with '-f json', \
+'-f ndjson', or '-f snapshot'). The exit status is 1 if the graphs differ and 0 if \
+they do not.",
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=["text", "dot"],
+        default="text",
+        help="'text' lists each change, prefixed with '+' (added), '-' (removed), \
+or '~' (modified); 'dot' draws both graphs, with added elements in green and removed \
+ones in red (default: text)",
+    )
+    parser.add_argument(
+        "-o",
+        "--out",
+        dest="outfile",
+        help="write the diff to FILE [default: stdout]",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--stat",
+        action="store_true",
+        default=False,
+        help="only print the numbers of changes (text format)",
+    )
+    parser.add_argument("old", metavar="OLD", help="older saved graph")
+    parser.add_argument("new", metavar="NEW", help="newer saved graph")
+    args = parser.parse_args(argv)
+    if args.stat and args.format != "text":
+        parser.error("--stat requires text output")
+
+    graphs = []
+    for path in [args.old, args.new]:
+        try:
+            graphs.append(open_graph(path))
+        except (OSError, ValueError) as e:
+            parser.error(f"{path}: {e}")
+    old, new = graphs
+
+    outfile = open_output(parser, args)
+    try:
+        if args.format == "dot":
+            output = DiffDotOutput(old, new)
+            output.write(outfile)
+            summary = output.summary
+            print(summary, file=sys.stderr)
+        else:
+            summary = write_text_diff(old, new, outfile, stat=args.stat)
+    except (OSError, ValueError) as e:
+        # The records of NDJSON inputs are read, and can fail, as they
+        # are compared.
+        parser.error(str(e))
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+    if summary.changed:
+        sys.exit(1)
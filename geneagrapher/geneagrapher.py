@@ -1,70 +1,128 @@
-from .output.dot import DotOutput
-from .output.identity import IdentityOutput
-from .types import Geneagraph
-
-from argparse import ArgumentParser, FileType
-import asyncio
-from importlib.metadata import PackageNotFoundError, version
-import json
-import platform
+from .cache import DEFAULT_TTL, RecordCache
+from .render import (
+    RenderJob,
+    print_render_report,
+    render_formats,
+    render_jobs,
+    render_path,
+)
+from .timing import TimedWriter, Timings, timed
+from .traverse import build_graph
+from .types import AnyGraph, Geneagraph, ProgressHandler, StartNodeRequest
+
+from argparse import SUPPRESS, Action, ArgumentParser, ArgumentTypeError, Namespace
+from importlib import import_module
+import os
 import textwrap
 from typing import (
+    TYPE_CHECKING,
     Any,
     Dict,
     List,
     Literal,
+    Optional,
     Protocol,
+    Sequence,
+    TextIO,
+    Tuple,
     Type,
     TypedDict,
     Union,
     cast,
+    get_args,
 )
 import re
 import sys
-import websockets
-import websockets.client
 
+# Modules that are slow to import (the network stack and the formatters)
+# are imported where they are used, so that commands that do not use
+# them start without them. They are imported here only for type
+# checking.
+if TYPE_CHECKING:
+    from .output.shard import ShardStrategy
+    from .retry import RetryPolicy
+
+
+OutputFormat = Literal["dot", "dot-pos", "json", "ndjson", "snapshot", "svg"]
+FORMATS: Tuple[OutputFormat, ...] = get_args(OutputFormat)
+# The formats that are written as DOT files, which can be rendered.
+DOT_FORMATS: Tuple[OutputFormat, ...] = ("dot", "dot-pos")
+# The formats that draw the graph, whose size can be bounded.
+DRAWN_FORMATS: Tuple[OutputFormat, ...] = DOT_FORMATS + ("svg",)
 
-GGRAPHER_URI = "wss://ggrphr.davidalber.net"
 TEXTWRAP_WIDTH = 79
 
+# The defaults of the options of `RetryPolicy`, which are also the
+# defaults of the arguments added by `add_retry_arguments`.
+DEFAULT_CONNECT_TIMEOUT = 10.0
+DEFAULT_BACKOFF = 0.5
+DEFAULT_MAX_BACKOFF = 30.0
+
+# Commands other than graph building, mapped to the module and function
+# that implement them. Modules are imported only when their command is
+# run.
+SUBCOMMANDS: Dict[str, Tuple[str, str]] = {
+    "batch": (".batch", "run_batch"),
+    "convert": (".convert", "run_convert"),
+    "diff": (".diff", "run_diff"),
+    "merge": (".merge", "run_merge"),
+    "proxy": (".proxy", "run_proxy"),
+    "query": (".query", "run_query"),
+    "search": (".search", "run_search"),
+    "standin": (".standin", "run_standin"),
+}
+
+
+# The module and class of the formatter of each output format. Modules
+# are imported only when output is written in their format.
+FORMATTERS: Dict[OutputFormat, Tuple[str, str]] = {
+    "dot": (".output.dot", "DotOutput"),
+    "dot-pos": (".output.dot", "PositionedDotOutput"),
+    "json": (".output.identity", "IdentityOutput"),
+    "ndjson": (".output.ndjson", "NdjsonOutput"),
+    "snapshot": (".output.snapshot", "SnapshotOutput"),
+    "svg": (".output.svg", "SvgOutput"),
+}
+
 
 class OutputFormatter(Protocol):
-    """This defines an interface that output classes must implement."""
+    """This defines an interface that output classes must implement.
+    Formatters of text formats also provide an `output` property that
+    returns the formatted output as a string.
+    """
 
-    def __init__(self, graph: Geneagraph) -> None:
+    def __init__(self, graph: AnyGraph) -> None:
         ...
 
-    @property
-    def output(self) -> str:
-        """Return the graph's formatted output."""
+    def write(self, fp: TextIO) -> None:
+        """Write the graph's formatted output, followed by a newline,
+        to `fp` without building the whole output in memory first.
+        Binary formats write to `fp.buffer` and do not add a newline.
+        """
         ...
 
 
-class StartNodeRequest(TypedDict):
-    recordId: int
-    getAdvisors: bool
-    getDescendants: bool
-
-
 class RequestPayload(TypedDict):
     kind: Literal["build-graph"]
     options: Dict[Literal["reportingCallback"], bool]
     startNodes: List[StartNodeRequest]
 
 
-class ProgressCallback(TypedDict):
-    queued: int
-    fetching: int
-    done: int
-
-
 class GgrapherError(Exception):
-    def __init__(self, msg: str, *, extra: Dict[str, str] = {}) -> None:
+    def __init__(
+        self, msg: str, *, extra: Dict[str, str] = {}, report: bool = True
+    ) -> None:
+        """`report` indicates whether the user should be asked to
+        report the problem if it persists.
+        """
         self.msg = msg
         self.extra = extra
+        self.report = report
 
     def __str__(self) -> str:
+        if not self.report:
+            return textwrap.fill(self.msg, width=TEXTWRAP_WIDTH)
+
         ret_arr = [
             textwrap.fill(self.msg, width=TEXTWRAP_WIDTH),
             "",
@@ -94,11 +152,21 @@ the issue body:",
 
 class StartNodeArg:
     def __init__(self, val: str) -> None:
-        # Validate the input.
-        match = re.fullmatch(r"(\d+)(:(a|d|ad|da))", val)
+        # Validate the input. A record can be given by name, as
+        # 'name:QUERY:DIRECTIONS', which is resolved through the search
+        # index (see `geneagrapher.search`).
+        match = re.fullmatch(r"(\d+|name:.*\S.*)(:(a|d|ad|da))", val)
         if match is None:
             raise ValueError()
-        self.record_id = int(match.group(1))
+        if match.group(1).startswith("name:"):
+            from .search import resolve_name
+
+            try:
+                self.record_id = int(resolve_name(match.group(1)[len("name:") :]))
+            except ValueError as e:
+                raise ArgumentTypeError(str(e))
+        else:
+            self.record_id = int(match.group(1))
 
         self.request_advisors = "a" in (match.group(2) or [])
         self.request_descendants = "d" in (match.group(2) or [])
@@ -124,90 +192,134 @@ def make_payload(start_nodes: List[StartNodeArg], quiet: bool) -> RequestPayload
     }
 
 
-def display_progress(queued: int, doing: int, done: int) -> None:
-    prefix = "Progress: "
-    size = 60
-    count = queued + doing + done
-
-    x = int(size * done / count)
-    y = int(size * doing / count)
-
-    print(
-        f"{prefix}[{u'█'*x}{u':'*y}{('.'*(size - x - y))}] {done}/{count}",
-        end="\r",
-        file=sys.stderr,
-        flush=True,
+def get_offline_graph(
+    payload: RequestPayload, cache: RecordCache, *, max_records: Optional[int] = None
+) -> Geneagraph:
+    """Return the graph described by `payload`, built only from the
+    records in `cache` (including expired ones), with at most
+    `max_records` records if it is given. Raise `GgrapherError` if the
+    cache does not have every record the graph needs. The graph is
+    truncated only if it reaches `max_records`.
+    """
+    graph, missing = build_graph(
+        payload["startNodes"],
+        lambda ids: cache.get_many(ids, include_expired=True),
+        max_records=max_records,
+    )
+    if missing:
+        examples = ", ".join(str(rid) for rid in sorted(missing)[:5])
+        raise GgrapherError(
+            f"The record cache does not have {len(missing)} of the records in this \
+graph (e.g., {examples}). Run without --offline to fetch them.",
+            report=False,
+        )
+    return graph
+
+
+def get_formatter(format: OutputFormat, graph: AnyGraph) -> OutputFormatter:
+    module_name, class_name = FORMATTERS[format]
+    formatter: Type[OutputFormatter] = getattr(
+        import_module(module_name, __package__), class_name
+    )
+    return formatter(graph)
+
+
+def write_output(
+    format: OutputFormat,
+    graph: AnyGraph,
+    outfile: TextIO,
+    shard: Optional["ShardStrategy"] = None,
+    *,
+    max_depth: Optional[int] = None,
+    max_nodes: Optional[int] = None,
+    timings: Optional[Timings] = None,
+) -> List[str]:
+    """Write `graph` to `outfile` in `format`, or, if `shard` is given,
+    write its shards to DOT files and the shard index to `outfile`.
+    If `max_depth` or `max_nodes` is given, the graph is summarized
+    first (see `summarize`). Return the paths of the DOT files that
+    were written.
+    """
+    if max_depth is not None or max_nodes is not None:
+        from .output.summary import summarize
+
+        with timed(timings, "summarize"):
+            graph = summarize(graph, max_depth=max_depth, max_nodes=max_nodes)
+
+    if timings is not None:
+        count_graph(timings, graph)
+
+    with timed(timings, "output"):
+        writer = None if timings is None else TimedWriter(outfile, timings)
+        fp = outfile if writer is None else cast(TextIO, writer)
+
+        if shard is not None:
+            from .output.shard import ShardedDotOutput
+
+            paths = [outfile.name] + ShardedDotOutput(graph, shard).write_files(fp)
+        else:
+            formatter: OutputFormatter = get_formatter(format, graph)
+            formatter.write(fp)
+            paths = [outfile.name] if format in DOT_FORMATS else []
+
+        if writer is not None:
+            writer.finish()
+    return paths
+
+
+def count_graph(timings: Timings, graph: AnyGraph) -> None:
+    """Count the records and advisor relationships in `graph`."""
+    nodes = graph["nodes"]
+    timings.count("records", len(nodes))
+    timings.count(
+        "edges",
+        sum(
+            sum(1 for advisor_id in set(nodes[rid]["advisors"]) if advisor_id in nodes)
+            for rid in nodes
+        ),
     )
-
-
-async def get_graph(payload: RequestPayload) -> Geneagraph:
-    def intify_record_keys(d: Dict[Any, Any]) -> Dict[Any, Any]:
-        """JSON object keys are strings, but the Geneagraph type
-        expects the keys of the nodes object to be integers. This
-        function converts those keys to ints during deserialization.
-        """
-        if "nodes" in d:
-            ret = {k: v for k, v in d.items() if k != "nodes"}
-            ret["nodes"] = {int(k): v for k, v in d["nodes"].items()}
-            return ret
-
-        return d
-
-    try:
-        async with websockets.client.connect(
-            GGRAPHER_URI,
-            user_agent_header=f"Python/{platform.python_version()} \
-Geneagrapher/{get_version()}",
-        ) as ws:
-            await ws.send(json.dumps(payload))
-            while True:
-                response_json = await ws.recv()
-                response = json.loads(response_json, object_hook=intify_record_keys)
-                response_payload: Union[
-                    Geneagraph, ProgressCallback, None
-                ] = response.get("payload")
-
-                if response["kind"] == "graph":
-                    return cast(Geneagraph, response_payload)
-                elif response["kind"] == "progress":
-                    progress = cast(ProgressCallback, response_payload)
-                    display_progress(
-                        progress["queued"], progress["fetching"], progress["done"]
-                    )
-                else:
-                    raise GgrapherError(
-                        "Request to Geneagrapher backend failed.",
-                        extra={"Response": str(response_json)},
-                    )
-    except websockets.exceptions.WebSocketException:
-        raise GgrapherError("Geneagrapher backend is currently unavailable.")
-
-
-def get_formatter(format: Literal["dot", "json"], graph: Geneagraph) -> OutputFormatter:
-    format_map: Dict[str, Type[OutputFormatter]] = {
-        "dot": DotOutput,
-        "json": IdentityOutput,
-    }
-    return format_map[format](graph)
 
 
 def get_version() -> str:
+    from importlib.metadata import PackageNotFoundError, version
+
     try:
         return version("geneagrapher")
     except PackageNotFoundError:
         return "dev"
 
 
-def run() -> None:
-    description = 'Create a Graphviz "dot" file for a mathematics \
-genealogy, where ID is a record identifier from the Mathematics Genealogy \
-Project.'
-    parser = ArgumentParser(description=description)
-
+class VersionAction(Action):
+    """An argparse action that prints the program's version and exits,
+    like the "version" action, but that looks the version up only when
+    it is run.
+    """
+
+    def __init__(self, option_strings: Sequence[str], dest: str = SUPPRESS) -> None:
+        super().__init__(
+            option_strings,
+            dest,
+            nargs=0,
+            default=SUPPRESS,
+            help="show program's version number and exit",
+        )
+
+    def __call__(
+        self,
+        parser: ArgumentParser,
+        namespace: Namespace,
+        values: Union[str, Sequence[Any], None],
+        option_string: Optional[str] = None,
+    ) -> None:
+        print(f"{parser.prog} {get_version()}")
+        parser.exit()
+
+
+def add_output_arguments(parser: ArgumentParser) -> None:
     parser.add_argument(
         "-f",
         "--format",
-        choices=("dot", "json"),
+        choices=FORMATS,
         default="dot",
         help="graph output format (default: dot)",
     )
@@ -216,10 +328,326 @@ Project.'
         "--out",
         dest="outfile",
         help="write output to FILE [default: stdout]",
-        type=FileType("w"),
         metavar="FILE",
-        default=sys.stdout,
     )
+
+
+def open_output(parser: ArgumentParser, args: Namespace) -> TextIO:
+    """Open the output file given by the arguments added by
+    `add_output_arguments`, or return standard output if there is none.
+    The file is opened only when output is about to be written, so that
+    a run that fails or skips its output leaves an existing file as it
+    was.
+    """
+    if args.outfile is None or args.outfile == "-":
+        return sys.stdout
+    try:
+        return open(args.outfile, "w")
+    except OSError as e:
+        parser.error(f"can't open '{args.outfile}': {e}")
+
+
+def add_render_argument(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--render",
+        type=render_formats,
+        help="render DOT output with Graphviz in each of the comma-separated \
+FORMATS (e.g., pdf,png,svg), laying it out only once; each rendered file is named \
+after the DOT file, with the format as its extension",
+        metavar="FORMATS",
+    )
+
+
+def add_summary_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        help="in DOT output, replace the records more than N advisor relationships \
+from the start nodes with summary nodes [default: unbounded]",
+        metavar="N",
+    )
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        help="in DOT output, keep only the N records nearest to the start nodes \
+and replace the others with summary nodes [default: unbounded]",
+        metavar="N",
+    )
+
+
+def shard_strategy(value: str) -> "ShardStrategy":
+    """Return the shard strategy described by `value`, for use as an
+    argparse argument type, importing the sharding module only when the
+    argument is given.
+    """
+    from .output.shard import ShardStrategy
+
+    return ShardStrategy(value)
+
+
+def add_shard_argument(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--shard",
+        type=shard_strategy,
+        help="split DOT output into shards, each written to its own DOT file named \
+after the output file, and write an index of the shards to the output file; \
+STRATEGY is 'components' (one shard per connected component), 'generations:K' \
+(one shard per K generations from the start nodes), or 'size:N' (shards of at most \
+N records)",
+        metavar="STRATEGY",
+    )
+
+
+def add_incremental_argument(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=False,
+        help="skip writing and rendering output whose graph and options have not \
+changed since it was last built, and otherwise report which records changed; a \
+manifest of each build is stored next to its output file",
+    )
+
+
+def get_build_options(
+    format: OutputFormat,
+    shard: Optional["ShardStrategy"],
+    max_depth: Optional[int],
+    max_nodes: Optional[int],
+    render: Optional[List[str]],
+) -> Dict[str, Any]:
+    """Return the options that output is built with, for comparison
+    with the options of an incremental build's previous build.
+    """
+    return {
+        "version": get_version(),
+        "format": format,
+        "shard": None if shard is None else vars(shard),
+        "max_depth": max_depth,
+        "max_nodes": max_nodes,
+        "render": render,
+    }
+
+
+def add_timing_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        default=False,
+        help="print the wall-clock and CPU time spent in each phase of the run, \
+and counts of what was received and written, to stderr",
+    )
+    parser.add_argument(
+        "--trace",
+        help="write the time spent in each phase to FILE, as JSON lines if FILE \
+ends in '.jsonl' and in the Chrome trace event format otherwise",
+        metavar="FILE",
+    )
+
+
+def add_progress_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--progress-json",
+        action="store_true",
+        default=False,
+        help="write progress as JSON lines of timestamped queued, fetching, and \
+done counts, to stderr in place of the progress bar or to --progress-fd",
+    )
+    parser.add_argument(
+        "--progress-fd",
+        type=int,
+        help="write JSON progress events to the open file descriptor N (implies \
+--progress-json)",
+        metavar="N",
+    )
+
+
+def open_progress_events(parser: ArgumentParser, args: Namespace) -> Optional[TextIO]:
+    """Return the stream that the arguments added by
+    `add_progress_arguments` ask for progress events to be written to,
+    or None if they do not ask for events.
+    """
+    if args.progress_fd is None:
+        return sys.stderr if args.progress_json else None
+    try:
+        return os.fdopen(args.progress_fd, "w", closefd=False)
+    except OSError as e:
+        parser.error(f"--progress-fd: {e.strerror}")
+
+
+def start_timings(args: Namespace) -> Optional[Timings]:
+    """Return a `Timings` if the arguments added by
+    `add_timing_arguments` ask for one, otherwise return None.
+    """
+    return Timings() if args.timings or args.trace is not None else None
+
+
+def report_timings(args: Namespace, timings: Optional[Timings]) -> None:
+    if timings is None:
+        return
+    if args.timings:
+        timings.print_summary(sys.stderr)
+    if args.trace is not None:
+        timings.write_trace(args.trace)
+
+
+def check_render_paths(
+    parser: ArgumentParser, formats: Optional[List[str]], dot_paths: List[str]
+) -> None:
+    """Exit with a usage error if rendering any of the DOT files at
+    `dot_paths` in any of `formats` would overwrite the DOT file.
+    """
+    for path in dot_paths:
+        for format in formats or []:
+            if render_path(path, format) == path:
+                parser.error(
+                    f"--render {format} would overwrite the DOT output file {path}"
+                )
+
+
+def render(jobs: List[RenderJob]) -> bool:
+    """Render `jobs`, report the time spent on each to stderr, and
+    return True if every render succeeded.
+    """
+    render_jobs(jobs)
+    print_render_report(jobs, sys.stderr)
+    return not any(job.errors for job in jobs)
+
+
+# The flags of the options of `RetryPolicy`.
+RETRY_FLAGS = {
+    "connect_timeout": "--connect-timeout",
+    "idle_timeout": "--idle-timeout",
+    "total_timeout": "--timeout",
+    "retries": "--retries",
+    "backoff": "--retry-backoff",
+    "hedge_after": "--hedge-after",
+}
+
+
+def add_retry_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=DEFAULT_CONNECT_TIMEOUT,
+        help=f"seconds to wait for a connection to the backend to open \
+(default: {DEFAULT_CONNECT_TIMEOUT})",
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        type=float,
+        help="seconds to wait for each message from the backend, including \
+progress messages [default: unbounded]",
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="seconds to wait for a graph, including retries [default: \
+unbounded]",
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=0,
+        help="number of times to retry a request whose connection fails or times \
+out (default: 0)",
+        metavar="N",
+    )
+    parser.add_argument(
+        "--retry-backoff",
+        type=float,
+        default=DEFAULT_BACKOFF,
+        help=f"maximum seconds to wait before the first retry, doubled for each \
+further retry; the wait is random, up to the maximum (default: \
+{DEFAULT_BACKOFF})",
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--hedge-after",
+        type=float,
+        help="if a request has not finished after SECONDS, send it again on \
+another connection and use whichever response arrives first",
+        metavar="SECONDS",
+    )
+
+
+def get_retry_policy(parser: ArgumentParser, args: Namespace) -> "RetryPolicy":
+    """Return the retry policy described by the arguments added by
+    `add_retry_arguments`.
+    """
+    from .retry import RetryPolicy
+
+    try:
+        return RetryPolicy(
+            connect_timeout=args.connect_timeout,
+            idle_timeout=args.idle_timeout,
+            total_timeout=args.timeout,
+            retries=args.retries,
+            backoff=args.retry_backoff,
+            hedge_after=args.hedge_after,
+        )
+    except ValueError as e:
+        # The error names the option of `RetryPolicy`, rather than its
+        # flag.
+        option, _, message = str(e).partition(" ")
+        parser.error(f"{RETRY_FLAGS.get(option, option)} {message}")
+
+
+def add_cache_arguments(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--cache",
+        help="store records received from the backend in the record cache FILE \
+and build graphs from it when it has every record they contain",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help=f"number of seconds that cached records remain valid; expired records \
+are kept, for --offline, until --cache-max-records evicts them \
+(default: {DEFAULT_TTL})",
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--cache-max-records",
+        type=int,
+        help="maximum number of records in the record cache; the least recently \
+used records are evicted first [default: unbounded]",
+        metavar="N",
+    )
+
+
+def open_cache(args: Namespace) -> Optional[RecordCache]:
+    """Return the record cache described by the arguments added by
+    `add_cache_arguments`, or None if no cache was requested.
+    """
+    if args.cache is None:
+        return None
+    return RecordCache(
+        args.cache, ttl=args.cache_ttl, max_records=args.cache_max_records
+    )
+
+
+def run() -> None:
+    argv = sys.argv[1:]
+    if argv and argv[0] in SUBCOMMANDS:
+        module_name, function_name = SUBCOMMANDS[argv[0]]
+        command = getattr(import_module(module_name, __package__), function_name)
+        command(argv[1:])
+        return
+
+    description = 'Create a Graphviz "dot" file for a mathematics \
+genealogy, where ID is a record identifier from the Mathematics Genealogy \
+Project.'
+    epilog = f"other commands: {', '.join(SUBCOMMANDS)} (run 'ggrapher COMMAND \
+--help' for details)"
+    parser = ArgumentParser(description=description, epilog=epilog)
+
+    add_output_arguments(parser)
     parser.add_argument(
         "-q",
         "--quiet",
@@ -227,9 +655,38 @@ Project.'
         default=False,
         help="do not display the progress bar",
     )
+    add_progress_arguments(parser)
+    add_cache_arguments(parser)
+    add_retry_arguments(parser)
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        default=False,
+        help="build the graph from the record cache only, without making a request \
+to the backend (requires --cache)",
+    )
+    parser.add_argument(
+        "--max-records",
+        type=int,
+        help="with --offline, stop after N records and mark the graph as truncated \
+[default: unbounded]",
+        metavar="N",
+    )
     parser.add_argument(
-        "--version", action="version", version=f"%(prog)s {get_version()}"
+        "--fan-out",
+        type=int,
+        default=1,
+        help="split a request with many start nodes into as many as K concurrent \
+requests, whose graphs are merged; requests are split by their numbers of start \
+nodes only, not by the sizes of their graphs (default: 1)",
+        metavar="K",
     )
+    add_summary_arguments(parser)
+    add_shard_argument(parser)
+    add_render_argument(parser)
+    add_incremental_argument(parser)
+    add_timing_arguments(parser)
+    parser.add_argument("--version", action=VersionAction)
     parser.add_argument(
         "ids",
         metavar="ID",
@@ -237,26 +694,147 @@ Project.'
         nargs="+",
         help="mathematician record ID; valid formats are 'ID:a' for advisor \
 traversal, 'ID:d' for descendant traversal, or 'ID:ad' for advisor and descendant \
-traversal",
+traversal; 'name:NAME' can be given in place of ID to look the ID up in the search \
+index (see 'ggrapher search')",
     )
 
-    args = parser.parse_args()
-    payload = make_payload(args.ids, args.quiet)
-
-    async def build_graph() -> None:
-        graph = await get_graph(payload)
+    args = parser.parse_args(argv)
+    if args.offline and args.cache is None:
+        parser.error("--offline requires --cache")
+    if args.fan_out < 1:
+        parser.error("--fan-out must be at least 1")
+    if args.fan_out > 1 and args.offline:
+        parser.error("--fan-out cannot be used with --offline")
+    for option in ["max_depth", "max_nodes"]:
+        if getattr(args, option) is not None and args.format not in DRAWN_FORMATS:
+            parser.error(f"--{option.replace('_', '-')} requires DOT or SVG output")
+    for option, formats in [("shard", ("dot",)), ("render", DOT_FORMATS)]:
+        if getattr(args, option) is not None and (
+            args.format not in formats or args.outfile in (None, "-")
+        ):
+            parser.error(f"--{option} requires DOT output to a file (-o FILE)")
+    check_render_paths(parser, args.render, [args.outfile])
+    if args.incremental and args.outfile in (None, "-"):
+        parser.error("--incremental requires output to a file (-o FILE)")
+    retry_policy = get_retry_policy(parser, args)
+    progress_events = open_progress_events(parser, args)
+    show_bar = not args.quiet and not (args.progress_json and args.progress_fd is None)
+    # With an idle timeout, progress messages are requested even if they
+    # are not shown, so that a long traversal is not timed out.
+    payload = make_payload(
+        args.ids,
+        not show_bar and progress_events is None and retry_policy.idle_timeout is None,
+    )
 
-        if not args.quiet:
-            # Output a line break to end the progress bar.
-            print(file=sys.stderr)
+    timings = start_timings(args)
 
-        formatter: OutputFormatter = get_formatter(args.format, graph)
-        print(formatter.output, file=args.outfile)
+    def build_graph() -> Geneagraph:
+        cache = open_cache(args)
+        try:
+            if cache is not None and args.offline:
+                with timed(timings, "offline build"):
+                    return get_offline_graph(
+                        payload, cache, max_records=args.max_records
+                    )
+            return fetch_graph(cache)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    def fetch_graph(cache: Optional[RecordCache]) -> Geneagraph:
+        # The network stack is imported only when a request is made.
+        from .backend import get_graph
+        from .progress import ProgressReporter
+        import asyncio
+
+        async def run_request() -> Geneagraph:
+            reporter = ProgressReporter(
+                bar=sys.stderr if show_bar else None, events=progress_events
+            )
+            async with reporter:
+                if args.fan_out > 1:
+                    return await fan_out_request(cache, reporter.update)
+                return await get_graph(
+                    payload,
+                    cache=cache,
+                    timings=timings,
+                    on_progress=reporter.update,
+                    retry_policy=retry_policy,
+                )
+
+        return asyncio.run(run_request())
+
+    async def fan_out_request(
+        cache: Optional[RecordCache], on_progress: ProgressHandler
+    ) -> Geneagraph:
+        from .client import GeneagrapherClient
+
+        # Each of the split requests gets a connection of its own.
+        async with GeneagrapherClient(
+            max_connections=args.fan_out,
+            fan_out=args.fan_out,
+            cache=cache,
+            timings=timings,
+            retry_policy=retry_policy,
+        ) as client:
+            return await client.build_graph(
+                payload["startNodes"],
+                on_progress=(
+                    on_progress if payload["options"]["reportingCallback"] else None
+                ),
+            )
 
     try:
-        asyncio.run(build_graph())
-    except GgrapherError as e:
-        print(e, file=sys.stderr)
+        try:
+            graph = build_graph()
+        except GgrapherError as e:
+            print(e, file=sys.stderr)
+            return
+
+        manifest = None
+        if args.incremental:
+            from .incremental import check_build, record_build
+
+            options = get_build_options(
+                args.format, args.shard, args.max_depth, args.max_nodes, args.render
+            )
+            manifest = check_build(args.outfile, graph, options, sys.stderr)
+            if manifest is None:
+                return
+
+        outfile = open_output(parser, args)
+        try:
+            dot_paths = write_output(
+                args.format,
+                graph,
+                outfile,
+                args.shard,
+                max_depth=args.max_depth,
+                max_nodes=args.max_nodes,
+                timings=timings,
+            )
+        finally:
+            if outfile is not sys.stdout:
+                outfile.close()
+
+        renders = []
+        if args.render is not None:
+            renders = [
+                RenderJob(path, args.render, positioned=args.format == "dot-pos")
+                for path in dot_paths
+            ]
+            with timed(timings, "render"):
+                rendered = render(renders)
+            if not rendered:
+                sys.exit(1)
+
+        if manifest is not None:
+            outputs = dot_paths + [
+                job.output_path(format) for job in renders for format in job.formats
+            ]
+            record_build(args.outfile, manifest, outputs)
+    finally:
+        report_timings(args, timings)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+"""This module implements incremental builds (`--incremental`), which
+skip formatting and rendering a graph's output when neither the graph
+nor the options that it is output with have changed since the output
+was last built.
+
+After a build, a manifest is written next to the output file (e.g.,
+"graph.dot.manifest.json" for "graph.dot"). It records a content hash
+of the graph, a hash of each record, the build options, and the files
+that the build wrote. The hashes are computed from a canonical form of
+the graph, in which records are ordered by ID and each record's
+advisors and descendants are sorted, so they do not depend on the order
+in which the backend sent the records. The next build is skipped if the
+graph's hash and the options match the manifest and every file that the
+manifest lists still exists. Otherwise, the records that were added,
+removed, or modified since the last build are reported, by comparing
+the record hashes.
+"""
+
+from .types import AnyGraph, Record, RecordId
+
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, TextIO, Tuple, TypedDict, cast
+
+MANIFEST_VERSION = 1
+
+# The number of record IDs of each kind of change that are listed.
+MAX_LISTED_CHANGES = 10
+
+
+class BuildManifest(TypedDict):
+    version: int
+    options: Dict[str, Any]
+    digest: str
+    records: Dict[str, str]  # record ID -> record hash
+    outputs: List[str]
+
+
+def get_manifest_path(outfile: str) -> str:
+    return f"{outfile}.manifest.json"
+
+
+def record_digest(record: Record) -> str:
+    canonical = {
+        **record,
+        "advisors": sorted(record["advisors"]),
+        "descendants": sorted(record["descendants"]),
+    }
+    data = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()[:16]
+
+
+def make_manifest(graph: AnyGraph, options: Dict[str, Any]) -> BuildManifest:
+    """Return the manifest of building `graph` with `options`, with no
+    outputs.
+    """
+    nodes = graph["nodes"]
+    records = {str(rid): record_digest(nodes[rid]) for rid in sorted(nodes)}
+    graph_hash = hashlib.sha256()
+    graph_hash.update(
+        json.dumps([list(graph["start_nodes"]), graph["status"]]).encode()
+    )
+    for rid, digest in records.items():
+        graph_hash.update(f"\n{rid}:{digest}".encode())
+    return {
+        "version": MANIFEST_VERSION,
+        "options": options,
+        "digest": graph_hash.hexdigest(),
+        "records": records,
+        "outputs": [],
+    }
+
+
+def load_manifest(path: str) -> Optional[BuildManifest]:
+    """Return the manifest at `path`, or None if there is no valid
+    manifest there.
+    """
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return cast(BuildManifest, manifest)
+
+
+def is_unchanged(previous: Optional[BuildManifest], current: BuildManifest) -> bool:
+    return (
+        previous is not None
+        and previous["digest"] == current["digest"]
+        and previous["options"] == current["options"]
+        and all(os.path.exists(path) for path in previous["outputs"])
+    )
+
+
+def get_changes(
+    previous: BuildManifest, current: BuildManifest
+) -> Tuple[List[RecordId], List[RecordId], List[RecordId]]:
+    """Return the IDs of the records that were added, removed, and
+    modified between the `previous` and `current` builds.
+    """
+    old = previous["records"]
+    new = current["records"]
+    added = [RecordId(int(rid)) for rid in new if rid not in old]
+    removed = [RecordId(int(rid)) for rid in old if rid not in new]
+    modified = [
+        RecordId(int(rid)) for rid in new if rid in old and old[rid] != new[rid]
+    ]
+    return sorted(added), sorted(removed), sorted(modified)
+
+
+def format_ids(ids: List[RecordId]) -> str:
+    listed = ", ".join(str(rid) for rid in ids[:MAX_LISTED_CHANGES])
+    if len(ids) > MAX_LISTED_CHANGES:
+        listed += f", and {len(ids) - MAX_LISTED_CHANGES:,} more"
+    return listed
+
+
+def check_build(
+    outfile: str, graph: AnyGraph, options: Dict[str, Any], file: TextIO
+) -> Optional[BuildManifest]:
+    """Compare the build of `graph` into `outfile` with `options` to
+    the previous build. If nothing changed, report that the build is
+    skipped to `file` and return None. Otherwise, report the changes to
+    `file` and return the manifest of the new build.
+    """
+    previous = load_manifest(get_manifest_path(outfile))
+    current = make_manifest(graph, options)
+    if is_unchanged(previous, current):
+        print(f"{outfile}: unchanged; skipped", file=file)
+        return None
+
+    if previous is None:
+        print(f"{outfile}: no previous build", file=file)
+        return current
+
+    changes = get_changes(previous, current)
+    counts = [
+        f"{len(ids):,} {kind}"
+        for kind, ids in zip(["added", "removed", "modified"], changes)
+    ]
+    summary = f"{outfile}: {', '.join(counts)} records"
+    if previous["options"] != current["options"]:
+        summary += "; options changed"
+    elif previous["digest"] == current["digest"]:
+        summary += "; outputs missing"
+    print(summary, file=file)
+    for kind, ids in zip(["added", "removed", "modified"], changes):
+        if ids:
+            print(f"  {kind}: {format_ids(ids)}", file=file)
+    return current
+
+
+def record_build(outfile: str, manifest: BuildManifest, outputs: List[str]) -> None:
+    """Write `manifest`, with the files that the build wrote, next to
+    `outfile`.
+    """
+    manifest["outputs"] = list(dict.fromkeys([outfile] + outputs))
+    with open(get_manifest_path(outfile), "w") as f:
+        json.dump(manifest, f)
+        f.write("\n")
@@ -0,0 +1,83 @@
+"""This module implements the `merge` command, which combines saved
+geneagraphs (the output of `ggrapher -f json`, `-f ndjson`, or `-f
+snapshot`) into one graph without making requests to the backend.
+"""
+
+from .geneagrapher import (
+    OutputFormatter,
+    add_output_arguments,
+    get_formatter,
+    open_output,
+)
+from .output.ndjson import NdjsonGraph
+from .reader import SavedGraph, open_graph
+from .types import Geneagraph, Record, RecordId
+
+from argparse import ArgumentParser
+import sys
+from typing import Iterable, Iterator, List, Set
+
+
+def merge_graphs(graphs: Iterable[SavedGraph]) -> Geneagraph:
+    """Return the union of `graphs`.
+
+    The merged graph's start nodes are those of the inputs, in order,
+    without repeats, and it is truncated if any input is. When inputs
+    disagree about a record, the record from the later input is used.
+    `graphs` is consumed one graph at a time, so if it is a generator,
+    only one input graph needs to be in memory at once. The records of
+    an `NdjsonGraph` are merged as they are read from its file.
+    """
+    merged: Geneagraph = {"start_nodes": [], "status": "complete", "nodes": {}}
+    seen_start_nodes: Set[RecordId] = set()
+
+    for graph in graphs:
+        if isinstance(graph, NdjsonGraph):
+            start_nodes, status = graph.start_nodes, graph.status
+            records: Iterable[Record] = graph.records()
+        else:
+            start_nodes, status = graph["start_nodes"], graph["status"]
+            records = graph["nodes"].values()
+
+        for start_node in start_nodes:
+            if start_node not in seen_start_nodes:
+                seen_start_nodes.add(start_node)
+                merged["start_nodes"].append(start_node)
+        for record in records:
+            merged["nodes"][record["id"]] = record
+        if status == "truncated":
+            merged["status"] = "truncated"
+
+    return merged
+
+
+def run_merge(argv: List[str]) -> None:
+    parser = ArgumentParser(
+        prog="ggrapher merge",
+        description="Merge saved graphs (written with '-f json', '-f ndjson', or \
+'-f snapshot') into one graph.",
+    )
+    add_output_arguments(parser)
+    parser.add_argument(
+        "infiles", metavar="FILE", nargs="+", help="saved graph to merge"
+    )
+    args = parser.parse_args(argv)
+
+    def read_graphs() -> Iterator[SavedGraph]:
+        for path in args.infiles:
+            try:
+                yield open_graph(path)
+            except (OSError, ValueError) as e:
+                parser.error(f"{path}: {e}")
+
+    try:
+        graph = merge_graphs(read_graphs())
+    except (OSError, ValueError) as e:
+        # The records of NDJSON inputs are read, and can fail, while
+        # they are merged.
+        parser.error(str(e))
+    formatter: OutputFormatter = get_formatter(args.format, graph)
+    outfile = open_output(parser, args)
+    formatter.write(outfile)
+    if outfile is not sys.stdout:
+        outfile.close()
@@ -7,12 +7,16 @@ used. It was decided to not take on a dependency since the DOT files
 being generated in this project are very simple.
 """
 
-from ..types import Geneagraph, Record
+from ..types import AnyGraph, Record
 
-from typing import Generator
+from typing import Generator, TextIO
 
 
 def make_node_str(record: Record) -> str:
+    if record["id"] < 0:
+        # A summary node (see `geneagrapher.output.summary`).
+        return f'{record["id"]} [label="{record["name"]}", shape=box, style=dashed];'
+
     label = record["name"]
     institution = record["institution"]
     year = record["year"]
@@ -24,7 +28,14 @@ def make_node_str(record: Record) -> str:
     return f'{record["id"]} [label="{label}"];'
 
 
-def make_edge_str(record: Record, graph: Geneagraph) -> Generator[str, None, None]:
+def add_attributes(statement: str, attributes: str) -> str:
+    """Return the DOT node statement `statement`, which ends with "];",
+    with `attributes` added to its attribute list.
+    """
+    return f"{statement[:-2]}, {attributes}];"
+
+
+def make_edge_str(record: Record, graph: AnyGraph) -> Generator[str, None, None]:
     for advisor_id in filter(
         lambda aid: aid in graph["nodes"],
         set(
@@ -36,31 +47,68 @@ def make_edge_str(record: Record, graph: Geneagraph) -> Generator[str, None, Non
 
 
 class DotOutput:
-    def __init__(self, graph: Geneagraph) -> None:
+    def __init__(self, graph: AnyGraph) -> None:
         self.graph = graph
 
-    @property
-    def output(self) -> str:
-        template = """digraph {{
+    def node_strs(self) -> Generator[str, None, None]:
+        # Sort record IDs, rather than records, so that a `CompactGraph`
+        # does not have to build every record at once.
+        nodes = self.graph["nodes"]
+        for record_id in sorted(nodes):
+            yield make_node_str(nodes[record_id])
+
+    def edge_strs(self) -> Generator[str, None, None]:
+        nodes = self.graph["nodes"]
+        for record_id in sorted(
+            nodes, key=lambda rid: (nodes[rid]["year"] or -10000, nodes[rid]["name"])
+        ):
+            yield from make_edge_str(nodes[record_id], self.graph)
+
+    def chunks(self) -> Generator[str, None, None]:
+        """Generate the graph's formatted output in pieces, with one
+        piece per node and edge, so that the output never has to be
+        held in memory in full.
+        """
+        prefix = "\n    "
+        yield """digraph {
     graph [ordering="out"];
     node [shape=plaintext];
     edge [style=bold];
 
-    {nodes}
-
-    {edges}
-}}"""
-        nodes = [
-            make_node_str(record)
-            for record in sorted(self.graph["nodes"].values(), key=lambda r: r["id"])
-        ]
-        edges = [
-            edge_str
-            for record in sorted(
-                self.graph["nodes"].values(),
-                key=lambda r: (r["year"] or -10000, r["name"]),
+    """
+        for i, node_str in enumerate(self.node_strs()):
+            yield prefix + node_str if i else node_str
+
+        yield "\n\n    "
+        for i, edge_str in enumerate(self.edge_strs()):
+            yield prefix + edge_str if i else edge_str
+        yield "\n}"
+
+    @property
+    def output(self) -> str:
+        return "".join(self.chunks())
+
+    def write(self, fp: TextIO) -> None:
+        for chunk in self.chunks():
+            fp.write(chunk)
+        fp.write("\n")
+
+
+class PositionedDotOutput(DotOutput):
+    """DOT output with each node's position assigned by the built-in
+    layout (see `geneagrapher.output.layout`), in points, for rendering
+    with `neato -n2`, which uses the positions instead of laying out
+    the graph.
+    """
+
+    def node_strs(self) -> Generator[str, None, None]:
+        # The layout module is imported only for positioned output, so
+        # that plain DOT output does not import it.
+        from .layout import Layout
+
+        layout = Layout(self.graph)
+        for record, (x, y), _ in layout.nodes():
+            # Graphviz's y axis points up.
+            yield add_attributes(
+                make_node_str(record), f'pos="{x:.1f},{layout.height - y:.1f}"'
             )
-            for edge_str in make_edge_str(record, self.graph)
-        ]
-        prefix = "\n    "
-        return template.format(nodes=prefix.join(nodes), edges=prefix.join(edges))
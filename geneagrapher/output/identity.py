@@ -3,15 +3,44 @@ Geneagraph JSON structure. This is simply the structure that is
 returned by the Geneagrapher backend.
 """
 
-from ..types import Geneagraph
+from ..types import AnyGraph, CompactGraph
 
 import json
+from typing import Iterable, Mapping, TextIO, Tuple, cast
+
+
+def write_nodes(fp: TextIO, nodes: Iterable[Tuple[int, object]]) -> None:
+    """Write the JSON object of `nodes`, pairs of a record ID and a
+    record, to `fp`, encoding and writing one record at a time.
+    """
+    fp.write("{")
+    for i, (record_id, record) in enumerate(nodes):
+        fp.write(
+            f"{', ' if i else ''}{json.dumps(str(record_id))}: {json.dumps(record)}"
+        )
+    fp.write("}")
 
 
 class IdentityOutput:
-    def __init__(self, graph: Geneagraph) -> None:
+    def __init__(self, graph: AnyGraph) -> None:
         self.graph = graph
 
     @property
     def output(self) -> str:
+        if isinstance(self.graph, CompactGraph):
+            return json.dumps(self.graph.to_geneagraph())
         return json.dumps(self.graph)
+
+    def write(self, fp: TextIO) -> None:
+        """Write the same text as `output`, followed by a newline, to
+        `fp`. Records are encoded and written one at a time, so the
+        document is never held in memory in full.
+        """
+        fp.write("{")
+        for i, (key, value) in enumerate(self.graph.items()):
+            fp.write(f"{', ' if i else ''}{json.dumps(key)}: ")
+            if key == "nodes":
+                write_nodes(fp, cast(Mapping[int, object], value).items())
+            else:
+                fp.write(json.dumps(value))
+        fp.write("}\n")
@@ -0,0 +1,325 @@
+"""This module implements `Layout`, a layered layout of a graph's
+records, in the style of Sugiyama et al., with which the `svg` and
+`dot-pos` output formats draw graphs without running Graphviz's layout.
+
+Records are drawn in rows, with advisors above their students. The
+layout is computed in three steps:
+
+1. Ranks. A record's rank (its row) is the length of the longest chain
+   of its advisors in the graph, found in one pass over the records in
+   topological order. A record that has students but no advisors in
+   the graph is then moved down to the row just above its highest
+   student, so that, for example, a co-advisor whose own advisors are
+   not in the graph is drawn next to its students rather than in the
+   top row. Cycles in the advisor relationships, which the data
+   occasionally has, are broken at the lowest record ID.
+2. Ordering. Each advisor relationship that spans more than one row is
+   routed through a bend point in each row that it passes through. The
+   rows start out ordered by year and name and are reordered by the
+   barycenter heuristic, in which each row is sorted by the mean
+   position of each member's neighbors in the row above (on downward
+   sweeps) or below (on upward sweeps). The sweeps alternate, and of
+   the orderings after each downward and upward pair of sweeps, the one
+   with the fewest edge crossings is kept.
+3. Coordinates. The rows are packed from the left and then, for a fixed
+   number of passes, each member is pulled toward the mean x
+   coordinate of its neighbors in the adjacent row, without
+   overlapping its row's other members.
+
+Apart from sorting the rows, each step, including each sweep, takes
+time linear in the number of records and bend points, and the number
+of sweeps is bounded, so large graphs are laid out in seconds.
+"""
+
+from ..types import AnyGraph, Record, RecordId
+
+from collections import deque
+from typing import Deque, Dict, Generator, List, Set, Tuple
+
+DEFAULT_SWEEPS = 4
+COORDINATE_PASSES = 4
+
+# Sizes, in points. Label widths are estimated from an average glyph
+# width rather than measured.
+FONT_SIZE = 14.0
+CHAR_WIDTH = 0.5 * FONT_SIZE
+LINE_HEIGHT = 1.2 * FONT_SIZE
+NODE_PADDING = 8.0
+NODE_HEIGHT = 2 * LINE_HEIGHT + NODE_PADDING
+NODE_SEP = 18.0
+RANK_SEP = NODE_HEIGHT + 36.0
+MARGIN = 8.0
+
+Point = Tuple[float, float]
+
+
+def get_label_lines(record: Record) -> List[str]:
+    """Return the lines of the label of `record`, which are those of its
+    DOT output label.
+    """
+    if record["id"] < 0:
+        # A summary node (see `geneagrapher.output.summary`).
+        return [record["name"]]
+    institution = record["institution"]
+    year = record["year"]
+    details = ([institution] if institution is not None else []) + (
+        [f"({year})"] if year is not None else []
+    )
+    return [record["name"]] + ([" ".join(details)] if details else [])
+
+
+def assign_ranks(count: int, edges: List[Tuple[int, int]]) -> List[int]:
+    """Return the rank of each of `count` vertices, given the edges
+    between them as (advisor, student) pairs.
+    """
+    children: List[List[int]] = [[] for _ in range(count)]
+    waiting = [0] * count  # the number of unranked advisors
+    for advisor, student in edges:
+        children[advisor].append(student)
+        waiting[student] += 1
+    has_advisors = [w > 0 for w in waiting]
+
+    ranks = [0] * count
+    ranked = [False] * count
+    queue: Deque[int] = deque(i for i in range(count) if waiting[i] == 0)
+    next_unranked = 0
+    for _ in range(count):
+        if not queue:
+            # Every unranked vertex is in or below a cycle.
+            while ranked[next_unranked]:
+                next_unranked += 1
+            queue.append(next_unranked)
+        vertex = queue.popleft()
+        ranked[vertex] = True
+        for child in children[vertex]:
+            if not ranked[child]:
+                ranks[child] = max(ranks[child], ranks[vertex] + 1)
+                waiting[child] -= 1
+                if waiting[child] == 0:
+                    queue.append(child)
+
+    for vertex in range(count):
+        if not has_advisors[vertex] and children[vertex]:
+            ranks[vertex] = max(0, min(ranks[c] for c in children[vertex]) - 1)
+    return ranks
+
+
+def count_crossings(
+    rows: List[List[int]], down: List[List[int]], position: List[int]
+) -> int:
+    """Return the number of crossings of the edges between adjacent
+    rows, counted as inversions with a binary indexed tree.
+    """
+    crossings = 0
+    for upper, lower in zip(rows, rows[1:]):
+        targets = [
+            position[w]
+            for _, w in sorted(
+                (position[v], w) for v in upper for w in down[v]
+            )  # sorted by upper position, then by lower position
+        ]
+        size = len(lower)
+        tree = [0] * (size + 1)
+        for seen, target in enumerate(targets):
+            # Count the earlier edges that end to the right of `target`.
+            i = target + 1
+            not_right = 0
+            while i > 0:
+                not_right += tree[i]
+                i -= i & -i
+            crossings += seen - not_right
+            i = target + 1
+            while i <= size:
+                tree[i] += 1
+                i += i & -i
+    return crossings
+
+
+class Layout:
+    """The positions of the records of a graph, and the points that its
+    advisor relationships pass through. Coordinates are in points, with
+    the origin at the top left.
+    """
+
+    def __init__(self, graph: AnyGraph, *, sweeps: int = DEFAULT_SWEEPS) -> None:
+        nodes = graph["nodes"]
+        self.records: List[Record] = [nodes[rid] for rid in sorted(nodes)]
+        index = {record["id"]: i for i, record in enumerate(self.records)}
+        edge_set: Set[Tuple[int, int]] = set()
+        for i, record in enumerate(self.records):
+            for advisor_id in record["advisors"]:
+                advisor = index.get(RecordId(advisor_id))
+                if advisor is not None and advisor != i:
+                    edge_set.add((advisor, i))
+        self.edges = sorted(edge_set)
+
+        # Vertices are the records, by their index in `records`,
+        # followed by the bend points.
+        self.ranks = assign_ranks(len(self.records), self.edges)
+        self.up: List[List[int]] = [[] for _ in self.records]
+        self.down: List[List[int]] = [[] for _ in self.records]
+        self.routes = [self.add_route(a, s) for a, s in self.edges]
+
+        self.rows = self.order_rows(sweeps)
+        self.widths = [
+            max(len(line) for line in get_label_lines(record)) * CHAR_WIDTH
+            + 2 * NODE_PADDING
+            for record in self.records
+        ] + [0.0] * (len(self.ranks) - len(self.records))
+        self.x = self.assign_x()
+        self.width = max(
+            (self.x[v] + self.widths[v] / 2 for v in range(len(self.x))), default=0.0
+        )
+        self.width += MARGIN
+        self.height = 2 * MARGIN + NODE_HEIGHT + max(len(self.rows) - 1, 0) * RANK_SEP
+
+    def add_route(self, advisor: int, student: int) -> List[int]:
+        """Add the edge from `advisor` to `student`, with a bend point
+        in each row between them, and return its vertices.
+        """
+        route = [advisor]
+        # An edge that does not point down the rows is part of a
+        # cycle, and is drawn without bend points or affecting the
+        # order.
+        if self.ranks[student] > self.ranks[advisor]:
+            previous = advisor
+            for rank in range(self.ranks[advisor] + 1, self.ranks[student]):
+                bend = len(self.ranks)
+                self.ranks.append(rank)
+                self.up.append([previous])
+                self.down.append([])
+                self.down[previous].append(bend)
+                route.append(bend)
+                previous = bend
+            self.down[previous].append(student)
+            self.up[student].append(previous)
+        route.append(student)
+        return route
+
+    def get_positions(self) -> List[int]:
+        position = [0] * len(self.ranks)
+        for row in self.rows:
+            for i, vertex in enumerate(row):
+                position[vertex] = i
+        return position
+
+    def order_rows(self, sweeps: int) -> List[List[int]]:
+        """Return the vertices of each row, in order, with the fewest
+        crossings found in `sweeps` sweeps, and set `crossings` to
+        their number of crossings.
+        """
+        rows: List[List[int]] = [[] for _ in range(max(self.ranks, default=-1) + 1)]
+
+        def initial_key(vertex: int) -> Tuple[int, str, int]:
+            record = self.records[vertex]
+            year = record["year"]
+            return (10000 if year is None else year, record["name"], vertex)
+
+        for vertex in sorted(range(len(self.records)), key=initial_key):
+            rows[self.ranks[vertex]].append(vertex)
+        for vertex in range(len(self.records), len(self.ranks)):
+            rows[self.ranks[vertex]].append(vertex)
+        self.rows = rows
+
+        position = self.get_positions()
+        best: List[List[int]] = []
+        self.crossings = 0
+        for sweep in range(max(sweeps, 1)):
+            downward = sweep % 2 == 0
+            neighbors = self.up if downward else self.down
+            order = range(1, len(rows)) if downward else range(len(rows) - 2, -1, -1)
+            for r in order:
+                keys: Dict[int, float] = {}
+                for vertex in rows[r]:
+                    adjacent = neighbors[vertex]
+                    keys[vertex] = (
+                        sum(position[v] for v in adjacent) / len(adjacent)
+                        if adjacent
+                        else position[vertex]
+                    )
+                rows[r].sort(key=keys.__getitem__)
+                for i, vertex in enumerate(rows[r]):
+                    position[vertex] = i
+
+            # Crossings are counted after each pair of sweeps (and the
+            # last sweep), since counting takes longer than a sweep.
+            if downward and sweep < sweeps - 1:
+                continue
+            crossings = count_crossings(rows, self.down, position)
+            if not best or crossings < self.crossings:
+                self.crossings = crossings
+                best = [list(row) for row in rows]
+            if crossings == 0:
+                break
+        return best
+
+    def assign_x(self) -> List[float]:
+        """Return the x coordinate of the center of each vertex."""
+        x = [0.0] * len(self.ranks)
+
+        def gap(left: int, right: int) -> float:
+            return (self.widths[left] + self.widths[right]) / 2 + NODE_SEP
+
+        for row in self.rows:
+            for i, vertex in enumerate(row):
+                x[vertex] = (
+                    x[row[i - 1]] + gap(row[i - 1], vertex)
+                    if i
+                    else self.widths[vertex] / 2
+                )
+
+        for p in range(COORDINATE_PASSES):
+            downward = p % 2 == 0
+            neighbors = self.up if downward else self.down
+            rows = self.rows if downward else self.rows[::-1]
+            for row in rows:
+                desired = [
+                    (
+                        sum(x[v] for v in neighbors[vertex]) / len(neighbors[vertex])
+                        if neighbors[vertex]
+                        else x[vertex]
+                    )
+                    for vertex in row
+                ]
+                # Place the row as close to `desired` as it can be from
+                # the left and from the right. The mean of the two
+                # placements does not overlap either.
+                left = list(desired)
+                for i in range(1, len(row)):
+                    left[i] = max(left[i], left[i - 1] + gap(row[i - 1], row[i]))
+                right = list(desired)
+                for i in range(len(row) - 2, -1, -1):
+                    right[i] = min(right[i], right[i + 1] - gap(row[i], row[i + 1]))
+                for i, vertex in enumerate(row):
+                    x[vertex] = (left[i] + right[i]) / 2
+
+        shift = MARGIN - min(
+            (x[v] - self.widths[v] / 2 for v in range(len(x))), default=0.0
+        )
+        return [value + shift for value in x]
+
+    def get_y(self, vertex: int) -> float:
+        """Return the y coordinate of the center of `vertex`."""
+        return MARGIN + NODE_HEIGHT / 2 + self.ranks[vertex] * RANK_SEP
+
+    def nodes(self) -> Generator[Tuple[Record, Point, float], None, None]:
+        """Generate each record, with its center and width, in record ID
+        order.
+        """
+        for vertex, record in enumerate(self.records):
+            yield record, (self.x[vertex], self.get_y(vertex)), self.widths[vertex]
+
+    def edge_points(
+        self,
+    ) -> Generator[Tuple[RecordId, RecordId, List[Point]], None, None]:
+        """Generate each advisor relationship, as the IDs of the advisor
+        and the student, and the points that its line passes through,
+        from the bottom of the advisor's label to the top of the
+        student's.
+        """
+        for route in self.routes:
+            advisor, student = route[0], route[-1]
+            points = [(self.x[v], self.get_y(v)) for v in route]
+            points[0] = (points[0][0], points[0][1] + NODE_HEIGHT / 2)
+            points[-1] = (points[-1][0], points[-1][1] - NODE_HEIGHT / 2)
+            yield self.records[advisor]["id"], self.records[student]["id"], points
@@ -0,0 +1,118 @@
+"""This module implements `NdjsonOutput`, a class that outputs a graph
+as newline-delimited JSON, and `NdjsonGraph`, which reads one.
+
+The first line of the output is a header object holding the graph's
+metadata:
+
+    {"kind": "geneagraph", "version": 1, "start_nodes": [...], "status": "..."}
+
+Each following line is one `Record`, and the records are in ID order.
+Records are written and read one line at a time, so neither side needs
+to hold the graph in memory, and tools that read JSON lines (e.g., `jq
+-c`, bulk loaders) can process the records as they arrive.
+"""
+
+from ..types import AnyGraph, CompactGraph, Geneagraph, Record, RecordId
+
+import json
+from typing import Generator, Iterable, Iterator, Literal, TextIO, cast
+
+VERSION = 1
+
+# The start of the header line, which identifies NDJSON output.
+HEADER_PREFIX = '{"kind": "geneagraph"'
+
+
+def make_header(start_nodes: Iterable[RecordId], status: str) -> str:
+    return json.dumps(
+        {
+            "kind": "geneagraph",
+            "version": VERSION,
+            "start_nodes": list(start_nodes),
+            "status": status,
+        }
+    )
+
+
+class NdjsonOutput:
+    def __init__(self, graph: AnyGraph) -> None:
+        self.graph = graph
+
+    def records(self) -> Iterator[Record]:
+        """Generate the graph's records in ID order."""
+        if isinstance(self.graph, CompactGraph):
+            # The ID index gives the order without sorting.
+            for index in self.graph.order:
+                yield self.graph.record(index)
+        else:
+            nodes = self.graph["nodes"]
+            for record_id in sorted(nodes):
+                yield nodes[record_id]
+
+    def lines(self) -> Generator[str, None, None]:
+        yield make_header(self.graph["start_nodes"], self.graph["status"])
+        for record in self.records():
+            yield json.dumps(record)
+
+    @property
+    def output(self) -> str:
+        return "\n".join(self.lines())
+
+    def write(self, fp: TextIO) -> None:
+        for line in self.lines():
+            fp.write(line)
+            fp.write("\n")
+
+
+class NdjsonGraph:
+    """A graph saved as NDJSON. Opening one reads only the header;
+    `records` reads the records from the file one line at a time, each
+    time that it is called.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open the NDJSON graph at `path`. Raise `ValueError` if the
+        file does not start with an NDJSON header.
+        """
+        self.path = path
+        with open(path) as f:
+            line = f.readline()
+        try:
+            header = json.loads(line)
+            if header["kind"] != "geneagraph":
+                raise ValueError(f"unknown kind {header['kind']!r}")
+            if header["version"] != VERSION:
+                raise ValueError(f"unsupported version {header['version']}")
+            self.start_nodes = [RecordId(int(rid)) for rid in header["start_nodes"]]
+            if header["status"] not in ("complete", "truncated"):
+                raise ValueError(f"unknown status {header['status']!r}")
+            self.status: Literal["complete", "truncated"] = header["status"]
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"not a geneagraph NDJSON file ({e})")
+
+    def records(self) -> Generator[Record, None, None]:
+        """Generate the graph's records in the order in which they are
+        in the file. Raise `ValueError`, with a message that names the
+        file, at the first line that is not a record.
+        """
+        with open(self.path) as f:
+            f.readline()  # the header
+            for line_number, line in enumerate(f, 2):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    raise ValueError(f"{self.path}, line {line_number}: invalid JSON")
+                if not isinstance(record, dict) or not isinstance(
+                    record.get("id"), int
+                ):
+                    raise ValueError(f"{self.path}, line {line_number}: not a record")
+                yield cast(Record, record)
+
+    def to_geneagraph(self) -> Geneagraph:
+        return {
+            "start_nodes": list(self.start_nodes),
+            "status": self.status,
+            "nodes": {record["id"]: record for record in self.records()},
+        }
@@ -0,0 +1,274 @@
+"""This module implements `ShardedDotOutput`, a class that splits a
+graph into shards and outputs each shard as its own Graphviz DOT file,
+for graphs that are too large for Graphviz to lay out in one piece.
+
+A graph is partitioned by one of these strategies:
+
+- `components`: one shard per connected component of the graph.
+- `generations:K`: one shard per band of K generations, where a
+  record's generation is its distance in advisor relationships from
+  the nearest start node.
+- `size:N`: shards of at most N records, taken in breadth-first order
+  from the start nodes, one connected component after another, so that
+  each shard holds neighboring records.
+
+When an advisor relationship crosses from one shard to another, each
+shard draws the record from the other shard as a gray stub node, with a
+dashed edge, that names the shard the record is in. An index DOT file
+draws the shards as nodes, with an edge from shard A to shard B when a
+record in A advised a record in B.
+"""
+
+from ..types import AnyGraph, Geneagraph, Record, RecordId
+from .dot import DotOutput
+
+from collections import deque
+import os
+import re
+from typing import (
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Set,
+    TextIO,
+    Tuple,
+    cast,
+)
+
+
+class ShardStrategy:
+    def __init__(self, val: str) -> None:
+        # Validate the input.
+        match = re.fullmatch(r"components|(generations|size):([1-9]\d*)", val)
+        if match is None:
+            raise ValueError()
+        self.kind = cast(
+            Literal["components", "generations", "size"],
+            match.group(1) or "components",
+        )
+        self.size: Optional[int] = (
+            None if match.group(2) is None else int(match.group(2))
+        )
+
+
+def make_stub_str(record: Record, shard: int) -> str:
+    return f'{record["id"]} [label="{record["name"]}\\n(shard {shard})", \
+fontcolor=gray40];'
+
+
+def get_neighbors(graph: AnyGraph) -> Dict[RecordId, List[RecordId]]:
+    """Return the records that each record in `graph` advised or was
+    advised by, in record ID order.
+    """
+    nodes = graph["nodes"]
+    neighbors: Dict[RecordId, Set[RecordId]] = {rid: set() for rid in nodes}
+    for record_id in nodes:
+        for advisor_id in nodes[record_id]["advisors"]:
+            advisor = RecordId(advisor_id)
+            if advisor in neighbors and advisor != record_id:
+                neighbors[record_id].add(advisor)
+                neighbors[advisor].add(record_id)
+    return {rid: sorted(ids) for rid, ids in neighbors.items()}
+
+
+def breadth_first(
+    neighbors: Dict[RecordId, List[RecordId]], start_nodes: Iterable[RecordId]
+) -> Dict[RecordId, Tuple[int, Optional[RecordId]]]:
+    """Return the distance of each record from the nearest of
+    `start_nodes` and the record it was reached from (None for the
+    records the search started from), ordered by when the record was
+    reached. Records that cannot be reached from a start node are
+    measured from the lowest unreached record ID in their component.
+    """
+    visits: Dict[RecordId, Tuple[int, Optional[RecordId]]] = {}
+    queue: Deque[RecordId] = deque()
+
+    def search() -> None:
+        while queue:
+            record_id = queue.popleft()
+            distance = visits[record_id][0] + 1
+            for neighbor in neighbors[record_id]:
+                if neighbor not in visits:
+                    visits[neighbor] = (distance, record_id)
+                    queue.append(neighbor)
+
+    for record_id in start_nodes:
+        if record_id in neighbors and record_id not in visits:
+            visits[record_id] = (0, None)
+            queue.append(record_id)
+    search()
+    for record_id in sorted(neighbors):
+        if record_id not in visits:
+            visits[record_id] = (0, None)
+            queue.append(record_id)
+            search()
+    return visits
+
+
+def get_components(neighbors: Dict[RecordId, List[RecordId]]) -> List[List[RecordId]]:
+    """Return the record IDs of each connected component, ordered by
+    their lowest record IDs.
+    """
+    components: List[List[RecordId]] = []
+    seen: Set[RecordId] = set()
+    for record_id in sorted(neighbors):
+        if record_id in seen:
+            continue
+        seen.add(record_id)
+        component = [record_id]
+        for member in component:
+            for neighbor in neighbors[member]:
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    component.append(neighbor)
+        components.append(sorted(component))
+    return components
+
+
+def partition(graph: AnyGraph, strategy: ShardStrategy) -> List[List[RecordId]]:
+    """Return the record IDs of each shard of `graph`."""
+    neighbors = get_neighbors(graph)
+    components = get_components(neighbors)
+    if strategy.kind == "components":
+        return components
+
+    assert strategy.size is not None
+    visits = breadth_first(neighbors, graph["start_nodes"])
+    if strategy.kind == "generations":
+        bands: Dict[int, List[RecordId]] = {}
+        for record_id, (distance, _) in visits.items():
+            bands.setdefault(distance // strategy.size, []).append(record_id)
+        return [sorted(bands[band]) for band in sorted(bands)]
+
+    # Keep the records of each component together, in breadth-first
+    # order, with the components ordered by when they were reached.
+    component_of = {rid: i for i, c in enumerate(components) for rid in c}
+    rank: Dict[int, int] = {}
+    for record_id in visits:
+        rank.setdefault(component_of[record_id], len(rank))
+    order = sorted(visits, key=lambda rid: rank[component_of[rid]])
+    return [
+        sorted(order[i : i + strategy.size])
+        for i in range(0, len(order), strategy.size)
+    ]
+
+
+class ShardOutput(DotOutput):
+    """The DOT output of one shard of a `ShardedDotOutput`."""
+
+    def __init__(self, sharded: "ShardedDotOutput", number: int) -> None:
+        nodes = sharded.graph["nodes"]
+        shard: Geneagraph = {
+            "start_nodes": [
+                rid
+                for rid in sharded.graph["start_nodes"]
+                if sharded.shard_of.get(rid) == number
+            ],
+            "nodes": {rid: nodes[rid] for rid in sharded.shards[number - 1]},
+            "status": sharded.graph["status"],
+        }
+        super().__init__(shard)
+        self.sharded = sharded
+        self.number = number
+        self.crossing_edges = self.get_crossing_edges()
+
+    def get_crossing_edges(self) -> List[Tuple[RecordId, RecordId]]:
+        """Return the advisor relationships, as (advisor, student)
+        pairs, between records in this shard and records in others.
+        """
+        graph = self.sharded.graph
+        shard_of = self.sharded.shard_of
+        edges: Set[Tuple[RecordId, RecordId]] = set()
+        for record_id, record in self.graph["nodes"].items():
+            for advisor_id in record["advisors"]:
+                advisor = RecordId(advisor_id)
+                if shard_of.get(advisor, self.number) != self.number:
+                    edges.add((advisor, record_id))
+            for descendant_id in record["descendants"]:
+                descendant = RecordId(descendant_id)
+                if (
+                    shard_of.get(descendant, self.number) != self.number
+                    and record_id in graph["nodes"][descendant]["advisors"]
+                ):
+                    edges.add((record_id, descendant))
+        return sorted(edges)
+
+    def node_strs(self) -> Generator[str, None, None]:
+        yield from super().node_strs()
+        nodes = self.sharded.graph["nodes"]
+        shard_nodes = self.graph["nodes"]
+        stubs = {
+            rid
+            for edge in self.crossing_edges
+            for rid in edge
+            if rid not in shard_nodes
+        }
+        for record_id in sorted(stubs):
+            yield make_stub_str(nodes[record_id], self.sharded.shard_of[record_id])
+
+    def edge_strs(self) -> Generator[str, None, None]:
+        yield from super().edge_strs()
+        for advisor, student in self.crossing_edges:
+            yield f"{advisor} -> {student} [style=dashed];"
+
+
+class ShardedDotOutput:
+    def __init__(self, graph: AnyGraph, strategy: ShardStrategy) -> None:
+        self.graph = graph
+        self.shards = partition(graph, strategy)
+        # Shards are numbered from 1.
+        self.shard_of: Dict[RecordId, int] = {
+            rid: i + 1 for i, shard in enumerate(self.shards) for rid in shard
+        }
+
+    def shard(self, number: int) -> ShardOutput:
+        return ShardOutput(self, number)
+
+    def index_chunks(self, paths: List[str]) -> Generator[str, None, None]:
+        """Generate the index DOT file, in which shard `n` is labeled
+        with `paths[n - 1]`.
+        """
+        yield """digraph {
+    node [shape=box];"""
+        if self.shards:
+            yield "\n"
+        for number, (shard, path) in enumerate(zip(self.shards, paths), 1):
+            yield f'\n    shard{number} [label="{os.path.basename(path)}\\n\
+{len(shard)} records"];'
+
+        links: Set[Tuple[int, int]] = set()
+        nodes = self.graph["nodes"]
+        for record_id, number in self.shard_of.items():
+            for advisor_id in nodes[record_id]["advisors"]:
+                advisor_number = self.shard_of.get(RecordId(advisor_id), number)
+                if advisor_number != number:
+                    links.add((advisor_number, number))
+        if links:
+            yield "\n"
+        for advisor_number, number in sorted(links):
+            yield f"\n    shard{advisor_number} -> shard{number};"
+        yield "\n}"
+
+    def write_files(self, index: TextIO) -> List[str]:
+        """Write each shard to a DOT file named after the file `index`
+        (e.g., "graph-001.dot" for "graph.dot"), and write the index DOT
+        file to `index`. Return the paths of the shard files.
+        """
+        stem = os.path.splitext(index.name)[0]
+        width = max(3, len(str(len(self.shards))))
+        paths = [
+            f"{stem}-{number:0{width}d}.dot"
+            for number in range(1, len(self.shards) + 1)
+        ]
+        for number, path in enumerate(paths, 1):
+            with open(path, "w") as f:
+                self.shard(number).write(f)
+
+        for chunk in self.index_chunks(paths):
+            index.write(chunk)
+        index.write("\n")
+        return paths
@@ -0,0 +1,268 @@
+"""This module implements `SnapshotOutput`, a class that outputs a
+graph as a binary snapshot, and `Snapshot`, which loads one.
+
+A snapshot is the column data of a `CompactGraph`, written as
+little-endian arrays of fixed-width integers, plus the name and
+institution string pools. `Snapshot` memory-maps the file and uses the
+arrays in place, so opening a snapshot takes constant time, and
+records (looked up by ID through the snapshot's sorted ID index) are
+only decoded when they are accessed.
+
+The file layout is a header (see `HEADER`) followed by these sections,
+each starting at a multiple of 8 bytes:
+
+| Section            | Type    | Length                  |
+| ------------------ | ------- | ----------------------- |
+| start nodes        | int64   | start node count        |
+| IDs                | int64   | record count            |
+| names              | int32   | record count            |
+| institutions       | int32   | record count            |
+| years              | int32   | record count            |
+| advisor offsets    | int64   | record count + 1        |
+| advisors           | int64   | advisor count           |
+| descendant offsets | int64   | record count + 1        |
+| descendants        | int64   | descendant count        |
+| index order        | int32   | record count            |
+| index IDs          | int64   | record count            |
+| name offsets       | int64   | name count + 1          |
+| name pool          | UTF-8   | name pool size          |
+| institution offsets| int64   | institution count + 1   |
+| institution pool   | UTF-8   | institution pool size   |
+"""
+
+from ..types import AnyGraph, CompactGraph, RecordId
+
+from array import array
+import mmap
+import struct
+import sys
+from types import TracebackType
+from typing import (
+    BinaryIO,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+    Type,
+    Union,
+    overload,
+)
+
+MAGIC = b"GGRSNAP\0"
+VERSION = 1
+# magic, version, status, record count, start node count, advisor count,
+# descendant count, name count, institution count, name pool size,
+# institution pool size
+HEADER = struct.Struct("<8sII8Q")
+STATUSES: Tuple[Literal["complete"], Literal["truncated"]] = ("complete", "truncated")
+
+
+def pad(size: int) -> int:
+    """Return `size` rounded up to a multiple of 8."""
+    return (size + 7) // 8 * 8
+
+
+def to_bytes(typecode: str, values: Sequence[int]) -> bytes:
+    column = array(typecode, values)
+    if sys.byteorder == "big":
+        column.byteswap()
+    data = column.tobytes()
+    return data + b"\0" * (pad(len(data)) - len(data))
+
+
+def pool_bytes(strings: Sequence[str]) -> List[bytes]:
+    """Return the offsets section and pool section for `strings`."""
+    encoded = [s.encode() for s in strings]
+    offsets = [0]
+    for e in encoded:
+        offsets.append(offsets[-1] + len(e))
+    pool = b"".join(encoded)
+    return [to_bytes("q", offsets), pool + b"\0" * (pad(len(pool)) - len(pool))]
+
+
+class SnapshotOutput:
+    def __init__(self, graph: AnyGraph) -> None:
+        self.graph = graph
+
+    def sections(self) -> List[bytes]:
+        graph = (
+            self.graph
+            if isinstance(self.graph, CompactGraph)
+            else CompactGraph(self.graph)
+        )
+        name_pool = pool_bytes(graph.name_table)
+        institution_pool = pool_bytes(graph.institution_table)
+        header = HEADER.pack(
+            MAGIC,
+            VERSION,
+            STATUSES.index(graph.status),
+            len(graph.ids),
+            len(graph.start_nodes),
+            len(graph.advisors),
+            len(graph.descendants),
+            len(graph.name_table),
+            len(graph.institution_table),
+            len(name_pool[1]),
+            len(institution_pool[1]),
+        )
+        return [
+            header + b"\0" * (pad(len(header)) - len(header)),
+            to_bytes("q", graph.start_nodes),
+            to_bytes("q", graph.ids),
+            to_bytes("i", graph.names),
+            to_bytes("i", graph.institutions),
+            to_bytes("i", graph.years),
+            to_bytes("q", graph.advisor_offsets),
+            to_bytes("q", graph.advisors),
+            to_bytes("q", graph.descendant_offsets),
+            to_bytes("q", graph.descendants),
+            to_bytes("i", graph.order),
+            to_bytes("q", graph.sorted_ids),
+            *name_pool,
+            *institution_pool,
+        ]
+
+    def write_binary(self, fp: BinaryIO) -> None:
+        for section in self.sections():
+            fp.write(section)
+
+    def write(self, fp: TextIO) -> None:
+        """Write the snapshot to the binary buffer underlying `fp`."""
+        fp.flush()
+        self.write_binary(fp.buffer)
+        fp.buffer.flush()
+
+
+class StringPool(Sequence[str]):
+    """A sequence of the strings in a snapshot's string pool, which are
+    decoded as they are accessed.
+    """
+
+    def __init__(self, offsets: Sequence[int], pool: memoryview) -> None:
+        self.offsets = offsets
+        self.pool = pool
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @overload
+    def __getitem__(self, i: int) -> str:
+        ...
+
+    @overload
+    def __getitem__(self, i: slice) -> Sequence[str]:
+        ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, Sequence[str]]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return bytes(self.pool[self.offsets[i] : self.offsets[i + 1]]).decode()
+
+
+class Snapshot(CompactGraph):
+    """A `CompactGraph` whose columns are read in place from a
+    memory-mapped snapshot file.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Open the snapshot at `path`. Raise `ValueError` if the file
+        is not a snapshot.
+        """
+        with open(path, "rb") as f:
+            try:
+                self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # the file is empty
+                raise ValueError("not a geneagrapher snapshot")
+        self.view = memoryview(self.mmap)
+        # Views of the file's sections, which must be released before
+        # the file can be closed.
+        self.views: List[memoryview] = []
+        try:
+            self.load()
+        except (IndexError, TypeError, ValueError, struct.error) as e:
+            self.close()
+            raise ValueError(f"not a geneagrapher snapshot ({e})")
+
+    def load(self) -> None:
+        (
+            magic,
+            version,
+            status,
+            record_count,
+            start_node_count,
+            advisor_count,
+            descendant_count,
+            name_count,
+            institution_count,
+            name_pool_size,
+            institution_pool_size,
+        ) = HEADER.unpack_from(self.view)
+        if magic != MAGIC:
+            raise ValueError("bad magic number")
+        if version != VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+
+        self.status = STATUSES[status]
+        offset = pad(HEADER.size)
+
+        def section(size: int) -> memoryview:
+            nonlocal offset
+            data = self.view[offset : offset + size]
+            self.views.append(data)
+            if len(data) != size:
+                raise ValueError("truncated snapshot")
+            offset += pad(size)
+            return data
+
+        def column(typecode: Literal["i", "q"], count: int) -> Sequence[int]:
+            data = section(count * array(typecode).itemsize)
+            if sys.byteorder == "big":
+                values = array(typecode, data.tobytes())
+                values.byteswap()
+                return values
+            self.views.append(data.cast(typecode))
+            return self.views[-1]
+
+        self.start_nodes = [RecordId(rid) for rid in column("q", start_node_count)]
+        self.ids = column("q", record_count)
+        self.names = column("i", record_count)
+        self.institutions = column("i", record_count)
+        self.years = column("i", record_count)
+        self.advisor_offsets = column("q", record_count + 1)
+        self.advisors = column("q", advisor_count)
+        self.descendant_offsets = column("q", record_count + 1)
+        self.descendants = column("q", descendant_count)
+        self.order = column("i", record_count)
+        self.sorted_ids = column("q", record_count)
+        self.name_table = StringPool(
+            column("q", name_count + 1), section(name_pool_size)
+        )
+        self.institution_table = StringPool(
+            column("q", institution_count + 1), section(institution_pool_size)
+        )
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the snapshot file. Records that were already accessed
+        remain usable, but the snapshot itself does not.
+        """
+        for view in reversed(self.views):
+            view.release()
+        self.view.release()
+        self.mmap.close()
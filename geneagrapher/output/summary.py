@@ -0,0 +1,111 @@
+"""This module implements `summarize`, which bounds the size of a graph
+for DOT output by replacing the records farthest from the start nodes
+with summary nodes.
+
+Records are ordered by a breadth-first search from the start nodes over
+advisor relationships in either direction. A record is kept if it is
+within the maximum depth of a start node and among the first maximum
+number of records in that order. Records that no start node reaches,
+which the search visits last, are beyond any maximum depth. Every other
+record is attributed to the kept record that the search reached it
+through, and each kept record gets at most two summary nodes: one for
+the pruned records that it leads to through its students ("+1,234
+descendants") and one for those it leads to through its advisors ("+12
+advisors"). Records that are not connected to a kept record are counted
+by one more summary node. The search and the attribution each visit
+every record and relationship once, so summarizing takes linear time.
+
+Summary nodes are records with negative IDs, which the DOT formatter
+draws as dashed boxes. A summarized graph therefore has at most the
+maximum number of records, plus at most two summary nodes per kept
+record that has pruned neighbors.
+"""
+
+from ..types import AnyGraph, Geneagraph, Record, RecordId
+from .shard import breadth_first, get_neighbors
+
+from typing import Dict, List, Literal, Optional, Set, Tuple
+
+# A kept record and the direction of the pruned records attributed to
+# it, or None for pruned records that are not connected to a kept
+# record.
+SummaryKey = Optional[Tuple[RecordId, Literal["advisors", "descendants"]]]
+
+
+def make_summary_record(record_id: RecordId, count: int, key: SummaryKey) -> Record:
+    advisors: List[int] = []
+    if key is None:
+        name = f"+{count:,} more record{'' if count == 1 else 's'}"
+    else:
+        direction = key[1] if count != 1 else key[1][:-1]
+        name = f"+{count:,} {direction}"
+        if key[1] == "descendants":
+            advisors.append(key[0])
+    return {
+        "id": record_id,
+        "name": name,
+        "institution": None,
+        "year": None,
+        "descendants": [],
+        "advisors": advisors,
+    }
+
+
+def summarize(
+    graph: AnyGraph,
+    *,
+    max_depth: Optional[int] = None,
+    max_nodes: Optional[int] = None,
+) -> Geneagraph:
+    """Return `graph` with the records more than `max_depth` advisor
+    relationships from the start nodes, and all but the `max_nodes`
+    records nearest to them, replaced by summary nodes.
+    """
+    nodes = graph["nodes"]
+    start_nodes = set(graph["start_nodes"])
+    visits = breadth_first(get_neighbors(graph), graph["start_nodes"])
+
+    kept: Dict[RecordId, Record] = {}
+    counts: Dict[SummaryKey, int] = {}
+    keys: Dict[RecordId, SummaryKey] = {}
+    # The records reached from a start node. The search restarts in each
+    # component that no start node reaches, measuring the distances in it
+    # from another record, so those distances are not depths.
+    reached: Set[RecordId] = set()
+    for record_id, (distance, parent) in visits.items():
+        if record_id in start_nodes if parent is None else parent in reached:
+            reached.add(record_id)
+        if (max_depth is None or (record_id in reached and distance <= max_depth)) and (
+            max_nodes is None or len(kept) < max_nodes
+        ):
+            kept[record_id] = nodes[record_id]
+            continue
+
+        # Records are visited after the record they were reached from,
+        # so the parent is either kept or already has a key.
+        key: SummaryKey
+        if parent is None:
+            key = None
+        elif parent in kept:
+            advised = parent in nodes[record_id]["advisors"]
+            key = (parent, "descendants" if advised else "advisors")
+        else:
+            key = keys[parent]
+        keys[record_id] = key
+        counts[key] = counts.get(key, 0) + 1
+
+    summarized: Geneagraph = {
+        "start_nodes": [rid for rid in graph["start_nodes"] if rid in kept],
+        "nodes": kept,
+        "status": graph["status"],
+    }
+    for i, (key, count) in enumerate(counts.items(), 1):
+        summary_id = RecordId(-i)
+        kept[summary_id] = make_summary_record(summary_id, count, key)
+        if key is not None and key[1] == "advisors":
+            # Link the summary node above the record, without modifying
+            # the input graph's record.
+            anchor = kept[key[0]].copy()
+            anchor["advisors"] = anchor["advisors"] + [summary_id]
+            kept[key[0]] = anchor
+    return summarized
@@ -0,0 +1,68 @@
+"""This module implements `SvgOutput`, a class that draws a graph as an
+SVG image with the built-in layout (see `geneagrapher.output.layout`),
+without running Graphviz. Records are drawn as labels, like those of
+DOT output, and advisor relationships as arrows from advisors down to
+their students.
+"""
+
+from ..types import AnyGraph
+from .layout import FONT_SIZE, LINE_HEIGHT, NODE_HEIGHT, Layout, get_label_lines
+
+from html import escape
+from typing import Generator, TextIO
+
+
+class SvgOutput:
+    def __init__(self, graph: AnyGraph) -> None:
+        self.graph = graph
+
+    def chunks(self) -> Generator[str, None, None]:
+        """Generate the image in pieces, with one piece per record and
+        advisor relationship.
+        """
+        layout = Layout(self.graph)
+        width, height = layout.width, layout.height
+        yield f"""<svg xmlns="http://www.w3.org/2000/svg" width="{width:.0f}pt" \
+height="{height:.0f}pt" viewBox="0 0 {width:.1f} {height:.1f}">
+<defs>
+  <marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="5" \
+markerHeight="5" orient="auto">
+    <path d="M 0 0 L 10 5 L 0 10 z"/>
+  </marker>
+</defs>
+<g fill="none" stroke="black" stroke-width="2" marker-end="url(#arrow)">
+"""
+        for _, _, points in layout.edge_points():
+            path = " L ".join(f"{x:.1f} {y:.1f}" for x, y in points)
+            yield f'  <path d="M {path}"/>\n'
+
+        yield f"""</g>
+<g font-family="Times,serif" font-size="{FONT_SIZE:g}" text-anchor="middle">
+"""
+        for record, (x, y), label_width in layout.nodes():
+            lines = get_label_lines(record)
+            if record["id"] < 0:
+                # A summary node is boxed, as it is in DOT output.
+                yield f'  <rect x="{x - label_width / 2:.1f}" \
+y="{y - NODE_HEIGHT / 2:.1f}" width="{label_width:.1f}" height="{NODE_HEIGHT:.1f}" \
+fill="none" stroke="black" stroke-dasharray="5,2"/>\n'
+            # Center the lines vertically, with `y` at the middle line's
+            # center and each baseline a third of a line below its center.
+            # Quotes in labels are not escaped (`escape`'s `quote`), as the
+            # labels are text, not attribute values.
+            top = y - (len(lines) - 1) * LINE_HEIGHT / 2 + LINE_HEIGHT / 3
+            yield f'  <text x="{x:.1f}" y="{top:.1f}">{escape(lines[0], False)}'
+            for line in lines[1:]:
+                yield f'<tspan x="{x:.1f}" dy="{LINE_HEIGHT:.1f}">{escape(line, False)}\
+</tspan>'
+            yield "</text>\n"
+        yield "</g>\n</svg>"
+
+    @property
+    def output(self) -> str:
+        return "".join(self.chunks())
+
+    def write(self, fp: TextIO) -> None:
+        for chunk in self.chunks():
+            fp.write(chunk)
+        fp.write("\n")
@@ -0,0 +1,163 @@
+"""This module implements `ProgressReporter`, which reports the progress
+messages of a graph request as a progress bar and as a stream of
+machine-readable events.
+
+Receiving a progress message only records it. The progress bar is
+redrawn by a separate task at a fixed rate, and only if the progress
+changed, so a backend that sends many progress messages does not cost a
+terminal write per message. When the bar's stream is not a terminal
+(e.g., a CI log), the bar degrades to a plain line of counts printed
+every `LOG_INTERVAL` seconds, rather than carriage-return redraws.
+
+Events are JSON lines, one per progress message, with the time (in
+seconds since the epoch), the time since the request started, and the
+numbers of queued, fetching, and done records:
+
+    {"event": "progress", "time": 1700000000.25, "elapsed": 1.5,
+     "queued": 40, "fetching": 8, "done": 120}
+
+A "start" event is written when reporting starts and an "end" event,
+with the last counts, when it stops. Events are flushed at the bar's
+refresh rate.
+"""
+
+from .types import ProgressCallback
+
+import asyncio
+import time
+from types import TracebackType
+from typing import Literal, Optional, TextIO, Type, TypedDict
+
+# Seconds between redraws of the progress bar on a terminal, and
+# between progress lines on other streams.
+REFRESH_INTERVAL = 0.1
+LOG_INTERVAL = 10.0
+
+BAR_WIDTH = 60
+
+
+class ProgressEvent(TypedDict):
+    event: Literal["start", "progress", "end"]
+    time: float
+    elapsed: float
+    queued: int
+    fetching: int
+    done: int
+
+
+def format_bar(queued: int, fetching: int, done: int) -> str:
+    count = queued + fetching + done
+    x = int(BAR_WIDTH * done / count) if count else 0
+    y = int(BAR_WIDTH * fetching / count) if count else 0
+    return f"Progress: [{'█' * x}{':' * y}{'.' * (BAR_WIDTH - x - y)}] {done}/{count}"
+
+
+class ProgressReporter:
+    def __init__(
+        self,
+        *,
+        bar: Optional[TextIO] = None,
+        events: Optional[TextIO] = None,
+        interactive: Optional[bool] = None,
+        interval: float = REFRESH_INTERVAL,
+        log_interval: float = LOG_INTERVAL,
+    ) -> None:
+        """Create a reporter that draws a progress bar on `bar` and
+        writes events to `events`, if they are given. The bar is
+        redrawn in place if `interactive` is True, which by default it
+        is if `bar` is a terminal.
+
+        The reporter reports while it is used as an asynchronous
+        context manager, and its `update` method is the
+        `ProgressHandler` to pass to requests.
+        """
+        self.bar = bar
+        self.events = events
+        self.interactive = (
+            interactive if interactive is not None else bar is not None and bar.isatty()
+        )
+        self.interval = interval
+        self.log_interval = log_interval
+
+        self.latest: ProgressCallback = {"queued": 0, "fetching": 0, "done": 0}
+        self.changed = False
+        self.drawn = False
+        self.last_line = float("-inf")
+        self.start = time.perf_counter()
+        self.ticker: Optional["asyncio.Task[None]"] = None
+
+    async def __aenter__(self) -> "ProgressReporter":
+        self.start = time.perf_counter()
+        self.write_event("start")
+        self.ticker = asyncio.ensure_future(self.tick())
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        if self.ticker is not None:
+            self.ticker.cancel()
+            try:
+                await self.ticker
+            except asyncio.CancelledError:
+                pass
+        self.render(final=True)
+        self.write_event("end")
+        if self.events is not None:
+            self.events.flush()
+
+    def update(self, progress: ProgressCallback) -> None:
+        """Record the progress message `progress`."""
+        self.latest = progress
+        self.changed = True
+        self.write_event("progress")
+
+    async def tick(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            self.render()
+            if self.events is not None:
+                self.events.flush()
+
+    def render(self, *, final: bool = False) -> None:
+        """Draw the latest progress, if it changed since it was last
+        drawn. At the end of reporting (`final`), end the bar's line.
+        """
+        if self.bar is None:
+            return
+        counts = (self.latest["queued"], self.latest["fetching"], self.latest["done"])
+        if self.interactive:
+            if self.changed:
+                print(format_bar(*counts), end="\r", file=self.bar, flush=True)
+                self.drawn = True
+                self.changed = False
+            if final and self.drawn:
+                print(file=self.bar, flush=True)
+            return
+
+        # Otherwise, a change is printed when the interval since the
+        # last line ends.
+        now = time.perf_counter()
+        if self.changed and (final or now - self.last_line >= self.log_interval):
+            print(
+                f"Progress: {counts[2]}/{sum(counts)} records",
+                file=self.bar,
+                flush=True,
+            )
+            self.last_line = now
+            self.changed = False
+
+    def write_event(self, event: Literal["start", "progress", "end"]) -> None:
+        if self.events is None:
+            return
+        # Events are formatted directly, which is several times faster
+        # than `json.dumps` of a `ProgressEvent`.
+        latest = self.latest
+        self.events.write(
+            f'{{"event": "{event}", "time": {time.time():.3f}, "elapsed": \
+{time.perf_counter() - self.start:.3f}, "queued": {latest["queued"]:d}, "fetching": \
+{latest["fetching"]:d}, "done": {latest["done"]:d}}}\n'
+        )
@@ -0,0 +1,231 @@
+"""This module implements the `proxy` command, a websocket server that
+speaks the backend's protocol to `ggrapher` clients and forwards their
+requests to the backend (`GGRAPHER_URI`), so that a team can share one
+record cache and one set of backend connections.
+
+Point `ggrapher` at a running proxy by setting the `GGRAPHER_URI`
+environment variable to the URI that it prints. The proxy:
+
+- answers requests from its record cache when the cache has every
+  record of the requested graph;
+- coalesces identical requests: a request for the same start nodes as
+  a request that is already in flight waits for that request's graph
+  instead of being forwarded again; and
+- forwards the backend's progress messages to every client waiting for
+  a request that asked for progress reports, starting with the latest
+  message for clients that join a request in flight.
+
+The proxy's upstream requests are made with a `GeneagrapherClient`,
+which limits how many of them are in flight and times out and retries
+them as the `--timeout`, `--retries`, and related options specify.
+"""
+
+from .cache import RecordCache
+from .client import DEFAULT_MAX_CONNECTIONS, GeneagrapherClient
+from .geneagrapher import (
+    GgrapherError,
+    add_cache_arguments,
+    add_retry_arguments,
+    get_retry_policy,
+    open_cache,
+)
+from .standin import get_uri
+from .types import Geneagraph, ProgressCallback, ProgressHandler, StartNodeRequest
+
+from argparse import ArgumentParser
+import asyncio
+import json
+from typing import Awaitable, Callable, Dict, List, Optional
+import websockets
+import websockets.server
+
+
+def parse_start_nodes(value: object) -> List[StartNodeRequest]:
+    """Return the `startNodes` value of a request, `value`, after
+    checking that it is a non-empty list of start node requests. Raise
+    `ValueError` if it is not.
+    """
+    if not isinstance(value, list) or not value:
+        raise ValueError("startNodes must be a non-empty list")
+    for start_node in value:
+        if (
+            not isinstance(start_node, dict)
+            or set(start_node) != {"recordId", "getAdvisors", "getDescendants"}
+            or isinstance(start_node["recordId"], bool)
+            or not isinstance(start_node["recordId"], int)
+            or not isinstance(start_node["getAdvisors"], bool)
+            or not isinstance(start_node["getDescendants"], bool)
+        ):
+            raise ValueError(f"invalid start node: {json.dumps(start_node)}")
+    return value
+
+
+class PendingRequest:
+    """An upstream request and the clients waiting for its graph."""
+
+    def __init__(
+        self, build: Callable[[ProgressHandler], Awaitable[Geneagraph]]
+    ) -> None:
+        """Start the request, which `build` makes, passing it the
+        handler of the request's progress messages.
+        """
+        self.listeners: List["asyncio.Queue[Optional[ProgressCallback]]"] = []
+        self.latest: Optional[ProgressCallback] = None
+        self.task = asyncio.ensure_future(build(self.on_progress))
+
+    def listen(self) -> "asyncio.Queue[Optional[ProgressCallback]]":
+        """Return a queue that receives the request's progress messages,
+        starting with the latest one, followed by None when the request
+        is done.
+        """
+        queue: "asyncio.Queue[Optional[ProgressCallback]]" = asyncio.Queue()
+        if self.latest is not None:
+            queue.put_nowait(self.latest)
+        if self.task.done():
+            queue.put_nowait(None)
+        self.listeners.append(queue)
+        return queue
+
+    def on_progress(self, progress: ProgressCallback) -> None:
+        self.latest = progress
+        for queue in self.listeners:
+            queue.put_nowait(progress)
+
+    def finish(self) -> None:
+        for queue in self.listeners:
+            queue.put_nowait(None)
+
+
+class ProxyServer:
+    def __init__(self, client: GeneagrapherClient) -> None:
+        """Create a server that forwards requests with `client`, which
+        must be open while the server is running.
+        """
+        self.client = client
+        self.pending: Dict[str, PendingRequest] = {}
+
+        # The number of requests that waited for a request in flight.
+        self.coalesced = 0
+
+    def get_request(self, start_nodes: List[StartNodeRequest]) -> PendingRequest:
+        """Return the in-flight request for `start_nodes`, starting it if
+        there is none.
+        """
+        key = json.dumps(start_nodes, sort_keys=True)
+        if key in self.pending:
+            self.coalesced += 1
+            return self.pending[key]
+
+        # Progress is always requested upstream, because clients that
+        # join the request later may ask for it.
+        request = PendingRequest(
+            lambda on_progress: self.client.build_graph(
+                start_nodes, on_progress=on_progress
+            )
+        )
+        self.pending[key] = request
+
+        def done(task: "asyncio.Future[Geneagraph]") -> None:
+            del self.pending[key]
+            request.finish()
+            if not task.cancelled():
+                task.exception()  # the error is reported to the clients
+
+        request.task.add_done_callback(done)
+        return request
+
+    async def respond(
+        self,
+        ws: websockets.server.WebSocketServerProtocol,
+        start_nodes: List[StartNodeRequest],
+        report_progress: bool,
+    ) -> None:
+        request = self.get_request(start_nodes)
+        if report_progress:
+            queue = request.listen()
+            while True:
+                progress = await queue.get()
+                if progress is None:
+                    break
+                await ws.send(json.dumps({"kind": "progress", "payload": progress}))
+
+        try:
+            # Shielded so that a client disconnecting does not cancel
+            # the request for the other clients that are waiting for it.
+            graph = await asyncio.shield(request.task)
+        except GgrapherError as e:
+            await ws.send(json.dumps({"kind": "error", "payload": e.msg}))
+            return
+        except Exception as e:
+            # Any other failure of the upstream request is reported to
+            # the client rather than closing its connection.
+            await ws.send(json.dumps({"kind": "error", "payload": repr(e)}))
+            return
+        await ws.send(json.dumps({"kind": "graph", "payload": graph}))
+
+    async def handler(self, ws: websockets.server.WebSocketServerProtocol) -> None:
+        async for message in ws:
+            try:
+                request = json.loads(message)
+                if request["kind"] != "build-graph":
+                    raise ValueError(f"unknown request kind: {request['kind']}")
+                start_nodes = parse_start_nodes(request["startNodes"])
+                report_progress = bool(request["options"]["reportingCallback"])
+            except (KeyError, TypeError, ValueError) as e:
+                await ws.send(json.dumps({"kind": "error", "payload": repr(e)}))
+                continue
+            await self.respond(ws, start_nodes, report_progress)
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> websockets.server.serve:
+        """Return the server, listening on `host` and `port` (or an
+        unused port, if `port` is 0). The returned object can be
+        awaited or used as an asynchronous context manager.
+        """
+        return websockets.server.serve(self.handler, host, port)
+
+
+def run_proxy(argv: List[str]) -> None:
+    parser = ArgumentParser(
+        prog="ggrapher proxy",
+        description="Run a caching, request-coalescing proxy for the Geneagrapher \
+backend at GGRAPHER_URI. The server prints its URI, which can be used as the value of \
+the GGRAPHER_URI environment variable of clients.",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="default: 127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="default: an unused port")
+    parser.add_argument(
+        "--upstream-connections",
+        type=int,
+        default=DEFAULT_MAX_CONNECTIONS,
+        help=f"maximum number of requests in flight to the backend \
+(default: {DEFAULT_MAX_CONNECTIONS})",
+        metavar="N",
+    )
+    add_cache_arguments(parser)
+    add_retry_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.upstream_connections < 1:
+        parser.error("--upstream-connections must be at least 1")
+    retry_policy = get_retry_policy(parser, args)
+
+    # Without a persistent cache, the proxy still shares records between
+    # clients in memory for as long as it runs.
+    cache = open_cache(args)
+    if cache is None:
+        cache = RecordCache(":memory:")
+
+    async def serve() -> None:
+        async with GeneagrapherClient(
+            max_connections=args.upstream_connections,
+            cache=cache,
+            retry_policy=retry_policy,
+        ) as client:
+            async with ProxyServer(client).serve(args.host, args.port) as server:
+                print(get_uri(server, args.host), flush=True)
+                await asyncio.Future()
+
+    with cache:
+        try:
+            asyncio.run(serve())
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,300 @@
+"""This module implements `AncestorIndex`, which answers questions
+about how the records in a graph are related, and the `query` command,
+which asks them of a saved graph.
+
+The index numbers the graph's records in topological order (every
+record after its advisors) and represents a record's set of ancestors
+as a bitset (a Python int) over those numbers. A record's ancestors
+are the union of its advisors' ancestors and the advisors themselves,
+so they are computed in a single pass in topological order. Ancestor
+sets are computed the first time they are needed and kept, so the
+memory used grows with the part of the graph that queries touch rather
+than with the square of the graph's size.
+
+Advisor relationships are taken from both the `advisors` and the
+`descendants` lists of the records, and only relationships between
+records in the graph are used. Mathematics Genealogy Project data has
+a few advisor cycles, which the index tolerates: the ancestors of
+records in (or downstream of) a cycle are found by searching rather
+than in the single pass, and their generation depths are approximate.
+"""
+
+from .geneagrapher import GgrapherError
+from .reader import load_graph
+from .types import AnyGraph, RecordId
+
+from argparse import ArgumentParser
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+
+def iter_bits(bits: int) -> Iterator[int]:
+    """Yield the positions of the set bits of `bits`."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class AncestorIndex:
+    def __init__(self, graph: AnyGraph) -> None:
+        """Build the index of the records in `graph`. This takes time
+        linear in the size of the graph.
+        """
+        nodes = graph["nodes"]
+        ids = sorted(nodes)
+        position = {rid: i for i, rid in enumerate(ids)}
+        advisor_sets: List[Set[int]] = [set() for _ in ids]
+        for i, rid in enumerate(ids):
+            record = nodes[rid]
+            for advisor_id in record["advisors"]:
+                j = position.get(RecordId(advisor_id))
+                if j is not None and j != i:
+                    advisor_sets[i].add(j)
+            for descendant_id in record["descendants"]:
+                j = position.get(RecordId(descendant_id))
+                if j is not None and j != i:
+                    advisor_sets[j].add(i)
+
+        students: List[List[int]] = [[] for _ in ids]
+        for i, advisor_set in enumerate(advisor_sets):
+            for j in advisor_set:
+                students[j].append(i)
+
+        # Kahn's algorithm. Records in or downstream of an advisor cycle
+        # are never ready; they are numbered after the other records.
+        pending = [len(advisor_set) for advisor_set in advisor_sets]
+        order = [i for i, count in enumerate(pending) if count == 0]
+        for i in order:
+            for j in students[i]:
+                pending[j] -= 1
+                if pending[j] == 0:
+                    order.append(j)
+        self.acyclic_count = len(order)
+        order.extend(i for i, count in enumerate(pending) if count > 0)
+
+        # Renumber the records by their positions in `order`.
+        rank = [0] * len(ids)
+        for r, i in enumerate(order):
+            rank[i] = r
+        self.ids: List[RecordId] = [ids[i] for i in order]
+        self.rank: Dict[RecordId, int] = {rid: r for r, rid in enumerate(self.ids)}
+        self.advisors: List[List[int]] = [
+            sorted(rank[j] for j in advisor_sets[i]) for i in order
+        ]
+        self.students: List[List[int]] = [
+            sorted(rank[j] for j in students[i]) for i in order
+        ]
+
+        # Generation depth: the length of the longest chain of advisors
+        # above a record.
+        self.depths = [0] * len(ids)
+        for r, advisor_ranks in enumerate(self.advisors):
+            self.depths[r] = max(
+                (self.depths[a] + 1 for a in advisor_ranks if a < r), default=0
+            )
+
+        self.ancestor_bits: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, record_id: object) -> bool:
+        return record_id in self.rank
+
+    def get_rank(self, record_id: int) -> int:
+        try:
+            return self.rank[RecordId(record_id)]
+        except KeyError:
+            raise KeyError(f"record {record_id} is not in the graph")
+
+    def bits(self, r: int) -> int:
+        """Return the ancestor bitset of the record numbered `r`."""
+        if r in self.ancestor_bits:
+            return self.ancestor_bits[r]
+
+        if r >= self.acyclic_count:
+            # Search the advisor relationships, stopping at records whose
+            # ancestors can be computed in topological order.
+            bits = 0
+            stack = list(self.advisors[r])
+            while stack:
+                a = stack.pop()
+                if bits >> a & 1:
+                    continue
+                bits |= 1 << a
+                if a < self.acyclic_count:
+                    bits |= self.bits(a)
+                else:
+                    stack.extend(self.advisors[a])
+            self.ancestor_bits[r] = bits
+            return bits
+
+        # Find the ancestors whose bitsets have not been computed, then
+        # compute them in topological order.
+        needed = {r}
+        stack = [r]
+        while stack:
+            for a in self.advisors[stack.pop()]:
+                if a not in needed and a not in self.ancestor_bits:
+                    needed.add(a)
+                    stack.append(a)
+        for i in sorted(needed):
+            bits = 0
+            for a in self.advisors[i]:
+                bits |= self.ancestor_bits[a] | 1 << a
+            self.ancestor_bits[i] = bits
+        return self.ancestor_bits[r]
+
+    def to_ids(self, bits: int) -> Set[RecordId]:
+        return {self.ids[r] for r in iter_bits(bits)}
+
+    def ancestors(self, record_id: int) -> Set[RecordId]:
+        """Return the IDs of the ancestors of the record with ID
+        `record_id`, not including the record itself.
+        """
+        return self.to_ids(self.bits(self.get_rank(record_id)))
+
+    def is_ancestor(self, ancestor_id: int, record_id: int) -> bool:
+        """Return True if the record with ID `ancestor_id` is an
+        ancestor of the record with ID `record_id`.
+        """
+        ancestor = self.get_rank(ancestor_id)
+        return bool(self.bits(self.get_rank(record_id)) >> ancestor & 1)
+
+    def depth(self, record_id: int) -> int:
+        """Return the generation depth of the record with ID
+        `record_id`: the length of the longest chain of advisors above
+        it in the graph.
+        """
+        return self.depths[self.get_rank(record_id)]
+
+    def common_bits(self, record_ids: Iterable[int]) -> int:
+        common = -1
+        for record_id in record_ids:
+            r = self.get_rank(record_id)
+            common &= self.bits(r) | 1 << r
+        return max(common, 0)
+
+    def common_ancestors(self, *record_ids: int) -> Set[RecordId]:
+        """Return the IDs of the common ancestors of the given records.
+        A record counts as its own ancestor here, so if one of the
+        records is an ancestor of the others, it is included.
+        """
+        return self.to_ids(self.common_bits(record_ids))
+
+    def lowest_common_ancestors(self, *record_ids: int) -> Set[RecordId]:
+        """Return the IDs of the lowest common ancestors of the given
+        records: the common ancestors that are not ancestors of other
+        common ancestors. There can be several.
+        """
+        common = self.common_bits(record_ids)
+        covered = 0
+        for r in iter_bits(common):
+            covered |= self.bits(r)
+        return self.to_ids(common & ~covered)
+
+    def shortest_path(self, source_id: int, target_id: int) -> Optional[List[RecordId]]:
+        """Return the IDs of the records on a shortest chain of advisor
+        relationships from the record with ID `source_id` to the record
+        with ID `target_id`, including both. The chain goes up through
+        advisors if the target is an ancestor of the source and down
+        through students if it is a descendant. Return None if neither
+        is an ancestor of the other.
+        """
+        source = self.get_rank(source_id)
+        target = self.get_rank(target_id)
+        if source == target:
+            return [self.ids[source]]
+        if self.bits(target) >> source & 1:
+            path = self.shortest_path(target_id, source_id)
+            return None if path is None else path[::-1]
+        if not self.bits(source) >> target & 1:
+            return None
+
+        # Breadth-first search up from the source, visiting only records
+        # that the target is an ancestor of.
+        previous = {source: source}
+        frontier = [source]
+        while target not in previous:
+            next_frontier = []
+            for r in frontier:
+                for a in self.advisors[r]:
+                    if a not in previous and (
+                        a == target or self.bits(a) >> target & 1
+                    ):
+                        previous[a] = r
+                        next_frontier.append(a)
+            frontier = next_frontier
+
+        chain = [target]
+        while chain[-1] != source:
+            chain.append(previous[chain[-1]])
+        return [self.ids[r] for r in reversed(chain)]
+
+
+def run_query(argv: List[str]) -> None:
+    parser = ArgumentParser(
+        prog="ggrapher query",
+        description="Answer questions about how the records in a saved graph \
+(written with '-f json', '-f ndjson', or '-f snapshot') are related.",
+    )
+    parser.add_argument("infile", metavar="FILE", help="saved graph")
+    queries = parser.add_subparsers(dest="query", metavar="QUERY", required=True)
+    lca = queries.add_parser(
+        "lca", help="print the lowest common ancestors of the records"
+    )
+    lca.add_argument("ids", metavar="ID", type=int, nargs="+")
+    common = queries.add_parser(
+        "common", help="print every common ancestor of the records"
+    )
+    common.add_argument("ids", metavar="ID", type=int, nargs="+")
+    depth = queries.add_parser(
+        "depth", help="print the generation depth of each record"
+    )
+    depth.add_argument("ids", metavar="ID", type=int, nargs="+")
+    path = queries.add_parser(
+        "path", help="print a shortest advisor chain between two records"
+    )
+    path.add_argument("ids", metavar="ID", type=int, nargs=2)
+    args = parser.parse_args(argv)
+
+    try:
+        graph = load_graph(args.infile)
+    except (OSError, ValueError) as e:
+        parser.error(f"{args.infile}: {e}")
+    index = AncestorIndex(graph)
+    for record_id in args.ids:
+        if record_id not in index:
+            parser.error(f"record {record_id} is not in {args.infile}")
+
+    def print_records(record_ids: Iterable[RecordId]) -> None:
+        nodes = graph["nodes"]
+        for record_id in record_ids:
+            print(f"{record_id}\t{nodes[record_id]['name']}")
+
+    try:
+        if args.query == "depth":
+            for record_id in args.ids:
+                print(f"{record_id}\t{index.depth(record_id)}")
+        elif args.query == "path":
+            chain = index.shortest_path(*args.ids)
+            if chain is None:
+                raise GgrapherError(
+                    "Neither record is an ancestor of the other.", report=False
+                )
+            print_records(chain)
+        else:
+            ancestors = (
+                index.lowest_common_ancestors(*args.ids)
+                if args.query == "lca"
+                else index.common_ancestors(*args.ids)
+            )
+            if not ancestors:
+                raise GgrapherError(
+                    "The records have no common ancestor.", report=False
+                )
+            print_records(sorted(ancestors, key=index.rank.__getitem__))
+    except GgrapherError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
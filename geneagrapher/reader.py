@@ -0,0 +1,61 @@
+"""This module reads saved geneagraphs, i.e., the output of `ggrapher
+-f json`, `-f ndjson`, or `-f snapshot`.
+"""
+
+from .output.ndjson import HEADER_PREFIX, NdjsonGraph
+from .output.snapshot import MAGIC, Snapshot
+from .types import AnyGraph, Geneagraph, RecordId
+
+import json
+from typing import Any, Dict, Union
+
+# A saved graph as `open_graph` returns it. The records of an
+# `NdjsonGraph` are read from its file as they are iterated.
+SavedGraph = Union[AnyGraph, NdjsonGraph]
+
+
+def parse_graph(graph: Dict[str, Any]) -> Geneagraph:
+    """Return the `Geneagraph` for the decoded JSON object `graph`,
+    converting the keys of its nodes object to ints.
+    """
+    return {
+        "start_nodes": graph["start_nodes"],
+        "status": graph["status"],
+        "nodes": {RecordId(int(k)): v for k, v in graph["nodes"].items()},
+    }
+
+
+def read_graph(path: str) -> Geneagraph:
+    """Return the graph saved in the file at `path`. Raise `ValueError`
+    if the file does not contain a saved graph.
+    """
+    with open(path) as f:
+        graph = json.load(f)
+    try:
+        return parse_graph(graph)
+    except (AttributeError, KeyError, TypeError, ValueError):
+        raise ValueError("not a saved geneagraph")
+
+
+def open_graph(path: str) -> SavedGraph:
+    """Return the graph saved in the file at `path`, which is a saved
+    geneagraph, an NDJSON graph (`ggrapher -f ndjson`), or a snapshot
+    (`ggrapher -f snapshot`). Snapshots are memory-mapped and NDJSON
+    graphs are streamed rather than read. Raise `ValueError` if the
+    file contains none of these.
+    """
+    with open(path, "rb") as f:
+        start = f.read(max(len(MAGIC), len(HEADER_PREFIX)))
+    if start.startswith(MAGIC):
+        return Snapshot(path)
+    if start.startswith(HEADER_PREFIX.encode()):
+        return NdjsonGraph(path)
+    return read_graph(path)
+
+
+def load_graph(path: str) -> AnyGraph:
+    """Return the graph saved in the file at `path`, like `open_graph`,
+    but with the records of an NDJSON graph read into memory.
+    """
+    graph = open_graph(path)
+    return graph.to_geneagraph() if isinstance(graph, NdjsonGraph) else graph
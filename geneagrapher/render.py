@@ -0,0 +1,152 @@
+"""This module renders DOT files with Graphviz, the `--render` stage of
+`ggrapher` and `ggrapher batch`.
+
+Graphviz's layout is the slow part of rendering, so each DOT file is
+laid out once, with `dot -Tdot`, and every requested format is then
+rendered from the laid-out graph with `neato -n2`, which uses the
+positions that the layout assigned instead of computing a new layout.
+DOT files whose positions were assigned by the built-in layout (`-f
+dot-pos`) are rendered with `neato -n2` directly.
+The layouts of all of the files in a run and all of their renders are
+run concurrently, each in its own Graphviz process.
+
+`subprocess` and `concurrent.futures` are imported only when a file is
+rendered, because this module is imported to parse the `--render`
+argument of every command.
+"""
+
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, TextIO, Tuple
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+
+class RenderError(Exception):
+    pass
+
+
+def render_formats(value: str) -> List[str]:
+    """Return the formats in the comma-separated list `value`, for use
+    as an argparse argument type.
+    """
+    formats = [f.strip() for f in value.split(",") if f.strip()]
+    if not formats or not all(re.fullmatch(r"[a-z0-9:]+", f) for f in formats):
+        raise ValueError()
+    return formats
+
+
+def render_path(dot_path: str, format: str) -> str:
+    """Return the path of the file that the DOT file at `dot_path` is
+    rendered to in `format`, which is the DOT file's path with the
+    format as its extension.
+    """
+    return f"{os.path.splitext(dot_path)[0]}.{format.split(':')[0]}"
+
+
+def run_graphviz(args: List[str], input: Optional[bytes] = None) -> bytes:
+    """Run the Graphviz command `args` and return its output. Raise
+    `RenderError` if it fails.
+    """
+    import subprocess
+
+    try:
+        process = subprocess.run(args, input=input, capture_output=True)
+    except FileNotFoundError:
+        raise RenderError(f"Graphviz's '{args[0]}' program was not found")
+    except OSError as e:
+        raise RenderError(f"Graphviz's '{args[0]}' program could not be run: {e}")
+    if process.returncode != 0:
+        raise RenderError(process.stderr.decode(errors="replace").strip())
+    return process.stdout
+
+
+class RenderJob:
+    def __init__(
+        self, dot_path: str, formats: List[str], *, positioned: bool = False
+    ) -> None:
+        """Create a job that renders the DOT file at `dot_path` in
+        `formats`. If `positioned` is True, the file's nodes already
+        have positions, and Graphviz's layout is skipped.
+        """
+        self.dot_path = dot_path
+        self.formats = formats
+        self.positioned = positioned
+
+        # These are set when the job has been run.
+        self.layout_time: Optional[float] = None
+        self.render_times: Dict[str, float] = {}
+        self.errors: List[str] = []
+
+    def output_path(self, format: str) -> str:
+        """Return the path of the file rendered in `format`."""
+        return render_path(self.dot_path, format)
+
+    def layout(self) -> bytes:
+        start = time.perf_counter()
+        if self.positioned:
+            try:
+                with open(self.dot_path, "rb") as f:
+                    layout = f.read()
+            except OSError as e:
+                raise RenderError(str(e))
+        else:
+            layout = run_graphviz(["dot", "-Tdot", self.dot_path])
+        self.layout_time = time.perf_counter() - start
+        return layout
+
+    def render(self, layout: bytes, format: str) -> None:
+        if self.output_path(format) == self.dot_path:
+            raise RenderError("it would overwrite the DOT file")
+        start = time.perf_counter()
+        run_graphviz(
+            ["neato", "-n2", f"-T{format}", "-o", self.output_path(format)], layout
+        )
+        self.render_times[format] = time.perf_counter() - start
+
+
+def render_jobs(jobs: List[RenderJob], *, workers: Optional[int] = None) -> None:
+    """Lay out and render `jobs`, with at most `workers` (by default,
+    the number of CPUs) Graphviz processes running at a time. Renders
+    of a job start as soon as its layout is done.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    with ThreadPoolExecutor(workers or os.cpu_count()) as executor:
+        layouts = {executor.submit(job.layout): job for job in jobs}
+        renders: Dict["Future[None]", Tuple[RenderJob, str]] = {}
+        for layout_future in as_completed(layouts):
+            job = layouts[layout_future]
+            try:
+                layout = layout_future.result()
+            except RenderError as e:
+                job.errors.append(f"layout failed: {e}")
+                continue
+            for format in job.formats:
+                renders[executor.submit(job.render, layout, format)] = (job, format)
+
+        for render_future in as_completed(renders):
+            job, format = renders[render_future]
+            try:
+                render_future.result()
+            except RenderError as e:
+                job.errors.append(f"{format} render failed: {e}")
+
+
+def print_render_report(jobs: List[RenderJob], file: TextIO) -> None:
+    """Print the time spent laying out and rendering each job, and any
+    errors, to `file`.
+    """
+    for job in jobs:
+        times = [
+            f"{format} {job.render_times[format]:.2f} s"
+            for format in job.formats
+            if format in job.render_times
+        ]
+        if job.layout_time is not None:
+            times.insert(0, f"layout {job.layout_time:.2f} s")
+            print(f"{job.dot_path}: {', '.join(times)}", file=file)
+        for error in job.errors:
+            print(f"{job.dot_path}: {error}", file=file)
@@ -0,0 +1,187 @@
+"""This module implements `RetryPolicy`, which bounds how long a request
+to the backend may take and retries requests that fail.
+
+A request is made by an attempt function, which sends the request on a
+connection (opening one if it needs to) and returns the graph. The
+policy bounds each part of an attempt: opening the connection
+(`connect_timeout`) and the wait for each message from the backend
+(`idle_timeout`), and it bounds the request as a whole, including its
+retries (`total_timeout`). An attempt that times out, or whose
+connection fails or is closed, is retried up to `retries` times. Before
+each retry, the policy waits for a random time of up to `backoff`
+seconds, doubled for each retry and capped at `max_backoff` ("full
+jitter"), so that clients that failed together do not retry together.
+Other errors, such as an error response from the backend, are not
+retried.
+
+With `hedge_after`, an attempt that has not finished after that many
+seconds is hedged: a second attempt is started on another connection,
+and the graph of whichever finishes first is used. This bounds the cost
+of a stalled connection, at the cost of an extra request to the backend
+for the attempts that are slow.
+"""
+
+from .geneagrapher import DEFAULT_BACKOFF, DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_BACKOFF
+from .timing import Timings
+from .types import Geneagraph, ProgressCallback, ProgressHandler
+
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional, Set
+import websockets.exceptions
+
+# The errors of an attempt that are retried. `asyncio.TimeoutError` is
+# raised when a connect or idle timeout expires.
+RETRYABLE_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    websockets.exceptions.WebSocketException,
+)
+
+# A function that makes one attempt at a request, passing its progress
+# messages to the given handler.
+Attempt = Callable[[Optional[ProgressHandler]], Awaitable[Geneagraph]]
+
+
+def latest_progress(handler: ProgressHandler) -> ProgressHandler:
+    """Return a progress handler that passes a message to `handler`
+    only if it reports at least as many records done as every message
+    before it, so that the progress of concurrent attempts at one
+    request does not move backwards.
+    """
+    done = -1
+
+    def on_progress(progress: ProgressCallback) -> None:
+        nonlocal done
+        if progress["done"] >= done:
+            done = progress["done"]
+            handler(progress)
+
+    return on_progress
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        *,
+        connect_timeout: Optional[float] = DEFAULT_CONNECT_TIMEOUT,
+        idle_timeout: Optional[float] = None,
+        total_timeout: Optional[float] = None,
+        retries: int = 0,
+        backoff: float = DEFAULT_BACKOFF,
+        max_backoff: float = DEFAULT_MAX_BACKOFF,
+        hedge_after: Optional[float] = None,
+    ) -> None:
+        """Create a policy with the given timeouts, in seconds, each of
+        which is unbounded if it is None. Raise `ValueError` if an
+        option is out of range.
+
+        An idle timeout also applies while the backend is traversing the
+        graph, when it sends only progress messages, so requests made
+        with an idle timeout should ask for progress reports.
+        """
+        for name, timeout in [
+            ("connect_timeout", connect_timeout),
+            ("idle_timeout", idle_timeout),
+            ("total_timeout", total_timeout),
+            ("hedge_after", hedge_after),
+        ]:
+            if timeout is not None and timeout <= 0:
+                raise ValueError(f"{name} must be positive")
+        if retries < 0:
+            raise ValueError("retries must not be negative")
+        if backoff < 0 or max_backoff < 0:
+            raise ValueError("backoff must not be negative")
+        self.connect_timeout = connect_timeout
+        self.idle_timeout = idle_timeout
+        self.total_timeout = total_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.rng = random.Random()
+
+    def delay(self, retry: int) -> float:
+        """Return the number of seconds to wait before retry number
+        `retry` (counting from 0).
+        """
+        return self.rng.uniform(0, min(self.max_backoff, self.backoff * 2**retry))
+
+    async def run(
+        self,
+        attempt: Attempt,
+        on_progress: Optional[ProgressHandler] = None,
+        *,
+        timings: Optional[Timings] = None,
+    ) -> Geneagraph:
+        """Return the graph from the first attempt that succeeds,
+        passing `on_progress` to each attempt. Raise the last attempt's
+        error if every attempt fails, and `asyncio.TimeoutError` if the
+        total timeout expires. If `timings` is given, the numbers of
+        retries and hedged attempts are counted in it.
+        """
+        if self.total_timeout is None:
+            return await self.run_attempts(attempt, on_progress, timings)
+        return await asyncio.wait_for(
+            self.run_attempts(attempt, on_progress, timings), self.total_timeout
+        )
+
+    async def run_attempts(
+        self,
+        attempt: Attempt,
+        on_progress: Optional[ProgressHandler],
+        timings: Optional[Timings],
+    ) -> Geneagraph:
+        for retry in range(self.retries + 1):
+            if retry:
+                await asyncio.sleep(self.delay(retry - 1))
+                if timings is not None:
+                    timings.count("retries")
+            try:
+                return await self.hedge(attempt, on_progress, timings)
+            except RETRYABLE_ERRORS:
+                if retry == self.retries:
+                    raise
+        raise AssertionError("unreachable")
+
+    async def hedge(
+        self,
+        attempt: Attempt,
+        on_progress: Optional[ProgressHandler],
+        timings: Optional[Timings],
+    ) -> Geneagraph:
+        """Make `attempt`, and if it has not finished after
+        `hedge_after` seconds, make a second one. Return the graph of
+        the first to succeed, or raise the error of the last to fail.
+        """
+        if self.hedge_after is None:
+            return await attempt(on_progress)
+
+        handler = None if on_progress is None else latest_progress(on_progress)
+        pending: Set["asyncio.Future[Geneagraph]"] = {
+            asyncio.ensure_future(attempt(handler))
+        }
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.hedge_after)
+            if not done:
+                pending.add(asyncio.ensure_future(attempt(handler)))
+                if timings is not None:
+                    timings.count("hedged attempts")
+
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+            assert error is not None
+            raise error
+        finally:
+            # The slower attempt is cancelled, which closes its
+            # connection.
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,541 @@
+"""This module implements `SearchIndex`, an on-disk index of the names
+and institutions of records, and the `search` command, which finds
+record IDs by name without visiting mathgenealogy.org.
+
+The index is a SQLite database that is filled from record caches
+(`--cache FILE`) and saved graphs (`-f json`, `-f ndjson`, or `-f
+snapshot`). Adding records is incremental: records whose name and
+institution are already indexed are skipped, and changed ones replace
+their previous entries.
+
+Names and institutions are indexed by their trigrams. Text is
+normalized by case-folding it, removing accents, and replacing
+punctuation with spaces, and each word contributes the trigrams of the
+word padded with two spaces in front and one behind (so "Gauß" gives
+"  g", " ga", "gau", "aus", "uss", and "ss "). The trigrams of each
+field are stored as posting lists, clustered by trigram, so a search
+reads only the lists of the query's trigrams. Candidates are ranked by
+the fraction of the query's trigrams that they contain, which makes
+prefixes and misspellings match, and then by the fraction of all of
+their trigrams that the query shares, which prefers shorter names.
+"""
+
+from .cache import QUERY_CHUNK_SIZE, RecordCache
+from .output.ndjson import NdjsonGraph
+from .reader import open_graph
+from .types import Record, RecordId
+
+from argparse import ArgumentParser
+import heapq
+import os
+import sqlite3
+import sys
+from types import TracebackType
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypedDict,
+)
+import unicodedata
+
+# The search index used by the `name:QUERY` form of start nodes and,
+# by default, by the `search` command.
+INDEX_PATH = os.environ.get(
+    "GGRAPHER_INDEX",
+    os.path.join(os.path.expanduser("~"), ".cache", "geneagrapher", "search.db"),
+)
+
+DEFAULT_LIMIT = 10
+
+# Matches that contain less than this fraction of the query's trigrams,
+# or that score less than this fraction of the best match's score, are
+# not returned.
+MIN_SCORE = 0.4
+RELATIVE_SCORE = 0.75
+
+# A name resolves to its best match only if the match scores at least
+# `RESOLVE_SCORE` (i.e., it contains nearly all of the query's trigrams)
+# and no other match does, or if it scores at least `RESOLVE_MARGIN`
+# more than the next best match. Otherwise, the name is ambiguous, and
+# up to `RESOLVE_CANDIDATES` matches are listed.
+RESOLVE_SCORE = 0.9
+RESOLVE_MARGIN = 0.15
+RESOLVE_CANDIDATES = 5
+
+# Scoring a record from its stored trigrams takes about as long as
+# reading this many entries of a posting list.
+SCORE_COST = 8
+
+# Records are added in batches of this many, each in one transaction.
+ADD_CHUNK_SIZE = 500
+
+# The posting lists of a batch of records are spread across the index,
+# so a larger page cache than SQLite's default (2 MiB) speeds up adding
+# them.
+CACHE_KIB = 64 * 1024
+
+SQLITE_MAGIC = b"SQLite format 3\x00"
+
+
+class Match(TypedDict):
+    id: RecordId
+    name: str
+    institution: Optional[str]
+    year: Optional[int]
+    score: float
+
+
+def normalize(text: str) -> str:
+    """Return `text` case-folded, without accents, and with runs of
+    characters other than letters and digits replaced by one space.
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return " ".join(
+        "".join(
+            c if c.isalnum() else " "
+            for c in decomposed
+            if not unicodedata.combining(c)
+        ).split()
+    )
+
+
+def get_trigrams(text: str) -> Set[str]:
+    trigrams = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            trigrams.add(padded[i : i + 3])
+    return trigrams
+
+
+class SearchIndex:
+    def __init__(self, path: str, *, create: bool = True) -> None:
+        """Open the index at `path`, creating it if it does not exist
+        and `create` is True. Raise `FileNotFoundError` if it does not
+        exist and `create` is False.
+        """
+        if not create and not os.path.exists(path):
+            raise FileNotFoundError(f"no search index at {path}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(f"PRAGMA cache_size = -{CACHE_KIB}")
+        with self.conn:
+            # Each record's trigrams are stored with it, one per line,
+            # so that candidates can be scored without reading the
+            # posting lists of common trigrams.
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    institution TEXT,
+    year INTEGER,
+    name_trigrams TEXT NOT NULL,
+    institution_trigrams TEXT NOT NULL
+)"""
+            )
+            # The posting lists, for each trigram and field (0 for
+            # names, 1 for institutions), and their lengths.
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS trigrams (
+    trigram TEXT NOT NULL,
+    field INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    PRIMARY KEY (trigram, field, id)
+) WITHOUT ROWID"""
+            )
+            self.conn.execute(
+                """CREATE TABLE IF NOT EXISTS frequencies (
+    trigram TEXT NOT NULL,
+    field INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (trigram, field)
+) WITHOUT ROWID"""
+            )
+
+    def __enter__(self) -> "SearchIndex":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM records").fetchone()
+        return int(count)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def add_many(self, records: Iterable[Record]) -> int:
+        """Index `records`, replacing the entries of records with the
+        same IDs whose name, institution, or year changed. Return the
+        number of records that were added or replaced.
+        """
+        changed = 0
+        chunk: List[Record] = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) == ADD_CHUNK_SIZE:
+                changed += self.add_chunk(chunk)
+                chunk = []
+        return changed + self.add_chunk(chunk)
+
+    def add_chunk(self, records: List[Record]) -> int:
+        latest = {record["id"]: record for record in records}
+        placeholders = ",".join("?" * len(latest))
+        with self.conn:
+            indexed = {
+                row[0]: row[1:]
+                for row in self.conn.execute(
+                    f"SELECT id, name, institution, year, name_trigrams, \
+institution_trigrams FROM records WHERE id IN ({placeholders})",
+                    tuple(latest),
+                )
+            }
+            removed: List[Tuple[str, int, int]] = []
+            added: List[Tuple[str, int, int]] = []
+            changed = 0
+            for record in latest.values():
+                old = indexed.get(record["id"])
+                if old is not None:
+                    if old[:3] == (
+                        record["name"],
+                        record["institution"],
+                        record["year"],
+                    ):
+                        continue
+                    removed.extend(
+                        (trigram, field, record["id"])
+                        for field, trigrams in enumerate(old[3:])
+                        for trigram in trigrams.split("\n")
+                        if trigram
+                    )
+                fields = [
+                    sorted(get_trigrams(record["name"])),
+                    sorted(get_trigrams(record["institution"] or "")),
+                ]
+                added.extend(
+                    (trigram, field, record["id"])
+                    for field, trigrams in enumerate(fields)
+                    for trigram in trigrams
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        record["id"],
+                        record["name"],
+                        record["institution"],
+                        record["year"],
+                        *("\n".join(trigrams) for trigrams in fields),
+                    ),
+                )
+                changed += 1
+
+            self.conn.executemany(
+                "DELETE FROM trigrams WHERE trigram = ? AND field = ? AND id = ?",
+                removed,
+            )
+            self.conn.executemany(
+                "INSERT INTO trigrams VALUES (?, ?, ?)", sorted(added)
+            )
+            deltas: Dict[Tuple[str, int], int] = {}
+            for entries, delta in [(removed, -1), (added, 1)]:
+                for trigram, field, _ in entries:
+                    key = (trigram, field)
+                    deltas[key] = deltas.get(key, 0) + delta
+            self.conn.executemany(
+                "INSERT INTO frequencies VALUES (?, ?, ?) \
+ON CONFLICT (trigram, field) DO UPDATE SET count = count + excluded.count",
+                ((trigram, field, d) for (trigram, field), d in deltas.items() if d),
+            )
+        return changed
+
+    def get_frequencies(self, field: int, trigrams: Set[str]) -> Dict[str, int]:
+        placeholders = ",".join("?" * len(trigrams))
+        return dict(
+            self.conn.execute(
+                f"SELECT trigram, count FROM frequencies \
+WHERE field = ? AND trigram IN ({placeholders})",
+                (field, *trigrams),
+            ).fetchall()
+        )
+
+    def search(
+        self,
+        name: Optional[str] = None,
+        institution: Optional[str] = None,
+        *,
+        limit: int = DEFAULT_LIMIT,
+    ) -> List[Match]:
+        """Return the best matches, at most `limit` of them, for `name`
+        and `institution` (either of which may be omitted), best first.
+        A match's score is the fraction of the query's trigrams that the
+        record contains, averaged over the fields that were queried, and
+        matches that score much less than the best match are omitted
+        (see `MIN_SCORE` and `RELATIVE_SCORE`).
+
+        The posting lists of the query's trigrams are read from the
+        rarest to the most common. A record that is in none of the
+        lists read so far contains at most the remaining trigrams, so
+        reading stops once those cannot score as well as the `limit`th
+        best match, and the lists of common trigrams are rarely read.
+        The records that can still be among the best matches are then
+        scored from their stored trigrams.
+        """
+        queries: List[Tuple[int, Set[str]]] = [
+            (field, get_trigrams(text))
+            for field, text in enumerate([name, institution])
+            if text is not None
+        ]
+        queries = [(field, trigrams) for field, trigrams in queries if trigrams]
+        if not queries:
+            return []
+
+        # Each trigram contributes its weight to the score of the
+        # records that contain it.
+        postings: List[Tuple[int, int, str, float]] = []
+        for field, trigrams in queries:
+            frequencies = self.get_frequencies(field, trigrams)
+            weight = 1 / (len(trigrams) * len(queries))
+            postings.extend(
+                (frequencies.get(trigram, 0), field, trigram, weight)
+                for trigram in trigrams
+            )
+        postings.sort()
+
+        # Each record's score from the lists read so far, which is at
+        # most its score, and the total weight of the unread lists.
+        partial: Dict[int, float] = {}
+        remaining = 1.0
+        scored: Dict[int, Tuple[float, float]] = {}
+        best: List[float] = []  # a heap of the `limit` best scores
+
+        def add_scores(record_ids: List[int]) -> None:
+            for record_id, score, overlap in self.score(queries, record_ids):
+                scored[record_id] = (score, overlap)
+                if len(best) < limit:
+                    heapq.heappush(best, score)
+                elif score > best[0]:
+                    heapq.heapreplace(best, score)
+
+        def get_threshold() -> float:
+            # Allow for rounding in `remaining`.
+            kth = best[0] if len(best) == limit else 0.0
+            top = max(best) if best else 0.0
+            return max(MIN_SCORE, RELATIVE_SCORE * top, kth) - 1e-9
+
+        for frequency, field, trigram, weight in postings:
+            # Score the records that are likeliest to be the best
+            # matches, which raises the threshold that the remaining
+            # lists must reach.
+            if remaining >= get_threshold():
+                add_scores(
+                    heapq.nlargest(
+                        limit,
+                        (r for r in partial if r not in scored),
+                        key=partial.__getitem__,
+                    )
+                )
+            threshold = get_threshold()
+            growing = remaining >= threshold
+            if not growing:
+                # Only the records in `partial` can still be among the
+                # best matches, and reading a list narrows them down,
+                # which is worth it while the list is cheaper to read
+                # than the records are to score.
+                partial = {
+                    record_id: score
+                    for record_id, score in partial.items()
+                    if score + remaining >= threshold and record_id not in scored
+                }
+                if frequency > SCORE_COST * len(partial):
+                    break
+
+            remaining -= weight
+            if frequency == 0:
+                continue
+            rows = self.conn.execute(
+                "SELECT id FROM trigrams WHERE trigram = ? AND field = ?",
+                (trigram, field),
+            )
+            get = partial.get
+            if growing:
+                partial.update((r, get(r, 0.0) + weight) for (r,) in rows)
+            else:
+                partial.update(
+                    (r, partial[r] + weight) for (r,) in rows if r in partial
+                )
+
+        threshold = get_threshold()
+        add_scores(
+            [
+                record_id
+                for record_id, score in partial.items()
+                if score + remaining >= threshold and record_id not in scored
+            ]
+        )
+        threshold = get_threshold()
+        ranked = sorted(
+            (-score, -overlap, record_id)
+            for record_id, (score, overlap) in scored.items()
+            if score >= threshold
+        )[:limit]
+        matches = []
+        for score, _, record_id in ranked:
+            row = self.conn.execute(
+                "SELECT name, institution, year FROM records WHERE id = ?",
+                (record_id,),
+            ).fetchone()
+            match: Match = {
+                "id": RecordId(record_id),
+                "name": row[0],
+                "institution": row[1],
+                "year": row[2],
+                "score": -score,
+            }
+            matches.append(match)
+        return matches
+
+    def score(
+        self, queries: List[Tuple[int, Set[str]]], record_ids: List[int]
+    ) -> Iterator[Tuple[int, float, float]]:
+        """Generate the ID, score, and mean Jaccard similarity of the
+        trigrams of each of `record_ids` for `queries`.
+        """
+        for start in range(0, len(record_ids), QUERY_CHUNK_SIZE):
+            chunk = record_ids[start : start + QUERY_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            for record_id, *fields in self.conn.execute(
+                f"SELECT id, name_trigrams, institution_trigrams FROM records \
+WHERE id IN ({placeholders})",
+                chunk,
+            ):
+                score = overlap = 0.0
+                for field, trigrams in queries:
+                    stored = fields[field].split("\n") if fields[field] else []
+                    shared = len(trigrams.intersection(stored))
+                    score += shared / len(trigrams)
+                    overlap += shared / (len(trigrams) + len(stored) - shared)
+                yield record_id, score / len(queries), overlap / len(queries)
+
+
+def resolve_name(query: str, path: Optional[str] = None) -> RecordId:
+    """Return the ID of the record that best matches the name `query`
+    in the index at `path` (by default, `INDEX_PATH`). Raise
+    `ValueError` if no record matches, or if the best match is neither
+    a near-exact match that no other record matches as well nor clearly
+    better than the next best (see `RESOLVE_SCORE` and
+    `RESOLVE_MARGIN`).
+    """
+    try:
+        index = SearchIndex(INDEX_PATH if path is None else path, create=False)
+    except FileNotFoundError as e:
+        raise ValueError(f"{e}; add records to it with 'ggrapher search --add'")
+    with index:
+        matches = index.search(query, limit=RESOLVE_CANDIDATES)
+    if not matches:
+        raise ValueError(f"no record matches the name '{query}'")
+
+    best = matches[0]["score"]
+    runner_up = matches[1]["score"] if len(matches) > 1 else 0.0
+    if (best >= RESOLVE_SCORE > runner_up) or best - runner_up >= RESOLVE_MARGIN:
+        return matches[0]["id"]
+    candidates = ", ".join(f"{m['name']} ({m['id']})" for m in matches)
+    raise ValueError(f"the name '{query}' is ambiguous: {candidates}")
+
+
+def read_records(path: str) -> Iterator[Record]:
+    """Generate the records in the record cache or saved graph at
+    `path`.
+    """
+    with open(path, "rb") as f:
+        is_cache = f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+    if is_cache:
+        with RecordCache(path) as cache:
+            yield from cache.iter_records()
+        return
+
+    graph = open_graph(path)
+    if isinstance(graph, NdjsonGraph):
+        yield from graph.records()
+    else:
+        yield from graph["nodes"].values()
+
+
+def format_match(match: Match) -> str:
+    line = f"{match['id']:>7}  {match['name']}"
+    if match["institution"] is not None:
+        line += f", {match['institution']}"
+    if match["year"] is not None:
+        line += f" ({match['year']})"
+    return line
+
+
+def run_search(argv: List[str]) -> None:
+    parser = ArgumentParser(
+        prog="ggrapher search",
+        description="Find the IDs of records by name and institution in a local \
+search index, which is filled with --add from record caches and saved graphs. A \
+start node can also be given as 'name:QUERY:DIRECTIONS' (e.g., 'name:Gauss:a'), \
+which is resolved through the index at GGRAPHER_INDEX.",
+    )
+    parser.add_argument(
+        "--index",
+        default=INDEX_PATH,
+        help=f"search index file (default: GGRAPHER_INDEX or {INDEX_PATH})",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--add",
+        action="append",
+        default=[],
+        help="index the records in the record cache or saved graph FILE before \
+searching (can be repeated)",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--institution", help="match institutions against TEXT", metavar="TEXT"
+    )
+    parser.add_argument(
+        "-n",
+        "--limit",
+        type=int,
+        default=DEFAULT_LIMIT,
+        help=f"maximum number of matches (default: {DEFAULT_LIMIT})",
+        metavar="N",
+    )
+    parser.add_argument("query", metavar="NAME", nargs="?", help="name to search for")
+    args = parser.parse_args(argv)
+    if args.query is None and args.institution is None and not args.add:
+        parser.error("a NAME, --institution, or --add is required")
+    if args.limit < 1:
+        parser.error("--limit must be at least 1")
+
+    with SearchIndex(args.index) as index:
+        for path in args.add:
+            try:
+                changed = index.add_many(read_records(path))
+            except (OSError, ValueError, sqlite3.DatabaseError) as e:
+                parser.error(f"{path}: {e}")
+            print(f"{path}: {changed:,} records indexed", file=sys.stderr)
+
+        if args.query is None and args.institution is None:
+            return
+        matches = index.search(args.query, args.institution, limit=args.limit)
+    for match in matches:
+        print(format_match(match))
+    if not matches:
+        sys.exit(1)
@@ -0,0 +1,338 @@
+"""This module implements a stand-in for the Geneagrapher backend: a
+local websocket server that speaks the backend's protocol and serves
+graphs built from a fixed set of records.
+
+The records are either a synthetic genealogy of a chosen size or the
+records of a saved graph (`ggrapher -f json` output). The server's
+latency and the number of progress messages it sends are configurable,
+which makes it suitable for testing and benchmarking the client
+without making requests to the real backend. Point `ggrapher` at a
+running stand-in by setting the `GGRAPHER_URI` environment variable to
+the URI that it prints.
+
+Each connection may send any number of `build-graph` requests, one at
+a time.
+
+For testing how clients handle an unreliable backend, the server can
+inject faults into requests: it can drop the connection instead of
+responding ("drop") or never respond ("stall"), either for a schedule
+of requests in the order that they are received or at random, and it
+can delay the opening handshake of each connection.
+"""
+
+from .traverse import build_graph
+from .types import Geneagraph, Record, RecordId, StartNodeRequest
+
+from argparse import ArgumentParser
+import asyncio
+import json
+import random
+from typing import (
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    get_args,
+)
+import websockets
+import websockets.datastructures
+import websockets.server
+
+INSTITUTIONS = [f"University {i}" for i in range(200)]
+
+Fault = Literal["drop", "stall"]
+FAULTS: Tuple[Fault, ...] = get_args(Fault)
+
+
+def synthetic_records(size: int, *, seed: int = 0) -> Dict[RecordId, Record]:
+    """Return `size` records, with IDs 1 through `size`, in which each
+    record other than the first has one or two advisors among the
+    records before it. Every record is a descendant of record 1.
+    """
+    rng = random.Random(seed)
+    records: Dict[RecordId, Record] = {}
+    for i in range(size):
+        rid = RecordId(i + 1)
+        advisors = (
+            sorted({rng.randrange(1, rid) for _ in range(rng.randint(1, 2))})
+            if i
+            else []
+        )
+        records[rid] = {
+            "id": rid,
+            "name": f"Mathematician {rid}",
+            "institution": rng.choice(INSTITUTIONS),
+            "year": 1500 + i * 500 // size,
+            "descendants": [],
+            "advisors": advisors,
+        }
+        for advisor_id in advisors:
+            records[RecordId(advisor_id)]["descendants"].append(rid)
+
+    return records
+
+
+class StandinServer:
+    def __init__(
+        self,
+        records: Mapping[RecordId, Record],
+        *,
+        latency: float = 0.0,
+        record_latency: float = 0.0,
+        progress_messages: int = 10,
+        max_records: Optional[int] = None,
+        faults: Sequence[Optional[Fault]] = (),
+        drop_rate: float = 0.0,
+        stall_rate: float = 0.0,
+        handshake_latency: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """Create a server that builds graphs from `records`.
+
+        Each response is delayed by `latency` seconds plus
+        `record_latency` seconds per record in the graph, which models
+        the backend fetching the records one at a time. If the request
+        asks for progress reports, `progress_messages` of them are
+        sent, evenly spread over the delay. Graphs with more than
+        `max_records` records are truncated, as the backend does.
+
+        The first requests that the server receives get the `faults`
+        (None for no fault) in order. Each later request is dropped with
+        probability `drop_rate` and stalled with probability
+        `stall_rate`, from a random sequence seeded by `seed`. The
+        opening handshake of each connection is delayed by
+        `handshake_latency` seconds.
+        """
+        self.records = records
+        self.latency = latency
+        self.record_latency = record_latency
+        self.progress_messages = progress_messages
+        self.max_records = max_records
+        self.faults = faults
+        self.drop_rate = drop_rate
+        self.stall_rate = stall_rate
+        self.handshake_latency = handshake_latency
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.faulted = 0
+        self.received = 0
+
+    def next_fault(self) -> Optional[Fault]:
+        """Return the fault to inject into the next request, if any."""
+        i = self.received
+        self.received += 1
+        if i < len(self.faults):
+            return self.faults[i]
+        x = self.rng.random()
+        if x < self.drop_rate:
+            return "drop"
+        if x < self.drop_rate + self.stall_rate:
+            return "stall"
+        return None
+
+    def lookup(self, record_ids: Iterable[RecordId]) -> Dict[RecordId, Record]:
+        return {rid: self.records[rid] for rid in record_ids if rid in self.records}
+
+    async def respond(
+        self,
+        ws: websockets.server.WebSocketServerProtocol,
+        start_nodes: List[StartNodeRequest],
+        report_progress: bool,
+    ) -> None:
+        graph: Geneagraph
+        graph, _ = build_graph(start_nodes, self.lookup, max_records=self.max_records)
+        self.requests += 1
+
+        total = len(graph["nodes"])
+        latency = self.latency + self.record_latency * total
+        reports = self.progress_messages if report_progress else 0
+        for i in range(reports):
+            await asyncio.sleep(latency / (reports + 1))
+            done = total * i // reports
+            fetching = min(total - done, max(1, total // 10))
+            progress = {
+                "queued": total - done - fetching,
+                "fetching": fetching,
+                "done": done,
+            }
+            await ws.send(json.dumps({"kind": "progress", "payload": progress}))
+        await asyncio.sleep(latency / (reports + 1))
+
+        await ws.send(json.dumps({"kind": "graph", "payload": graph}))
+
+    async def handler(self, ws: websockets.server.WebSocketServerProtocol) -> None:
+        async for message in ws:
+            try:
+                request = json.loads(message)
+                if request["kind"] != "build-graph":
+                    raise ValueError(f"unknown request kind: {request['kind']}")
+                start_nodes = request["startNodes"]
+                report_progress = bool(request["options"]["reportingCallback"])
+            except (KeyError, TypeError, ValueError) as e:
+                await ws.send(json.dumps({"kind": "error", "payload": repr(e)}))
+                continue
+
+            fault = self.next_fault()
+            if fault is not None:
+                self.faulted += 1
+                if fault == "drop":
+                    # Without a closing handshake, as if the network
+                    # failed.
+                    ws.transport.abort()
+                else:
+                    await ws.wait_closed()
+                return
+            await self.respond(ws, start_nodes, report_progress)
+
+    async def process_request(
+        self, path: str, headers: websockets.datastructures.Headers
+    ) -> None:
+        await asyncio.sleep(self.handshake_latency)
+
+    def serve(self, host: str = "127.0.0.1", port: int = 0) -> websockets.server.serve:
+        """Return the server, listening on `host` and `port` (or an
+        unused port, if `port` is 0). The returned object can be
+        awaited or used as an asynchronous context manager.
+        """
+        return websockets.server.serve(
+            self.handler, host, port, process_request=self.process_request
+        )
+
+
+def get_uri(server: websockets.server.WebSocketServer, host: str) -> str:
+    """Return the URI of `server`, which is listening on `host`."""
+    port = list(server.sockets)[0].getsockname()[1]
+    return f"ws://{host}:{port}"
+
+
+def run_standin(argv: List[str]) -> None:
+    parser = ArgumentParser(
+        prog="ggrapher standin",
+        description="Run a local stand-in for the Geneagrapher backend. The server \
+prints its URI, which can be used as the value of the GGRAPHER_URI environment \
+variable.",
+    )
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--size",
+        type=int,
+        default=1000,
+        help="serve a synthetic genealogy of N records, with IDs 1 through N, all \
+of which are descendants of record 1 (default: 1000)",
+        metavar="N",
+    )
+    source.add_argument(
+        "--graph",
+        help="serve the records of the saved graph FILE (from 'ggrapher -f json')",
+        metavar="FILE",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="default: 127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="default: an unused port")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="seconds to wait before each response (default: 0)",
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--record-latency",
+        type=float,
+        default=0.0,
+        help="additional seconds to wait per record in the graph (default: 0)",
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--progress-messages",
+        type=int,
+        default=10,
+        help="number of progress messages per response (default: 10)",
+        metavar="N",
+    )
+    parser.add_argument(
+        "--max-records",
+        type=int,
+        help="truncate graphs at N records [default: unbounded]",
+        metavar="N",
+    )
+    parser.add_argument(
+        "--fault",
+        action="append",
+        choices=FAULTS + ("none",),
+        default=[],
+        help="inject KIND into the next request: 'drop' closes the connection \
+without responding and 'stall' never responds; repeat for the requests in the order \
+that they are received",
+        metavar="KIND",
+    )
+    parser.add_argument(
+        "--drop-rate",
+        type=float,
+        default=0.0,
+        help="probability of dropping each request after the --fault requests \
+(default: 0)",
+        metavar="P",
+    )
+    parser.add_argument(
+        "--stall-rate",
+        type=float,
+        default=0.0,
+        help="probability of stalling each request after the --fault requests \
+(default: 0)",
+        metavar="P",
+    )
+    parser.add_argument(
+        "--handshake-latency",
+        type=float,
+        default=0.0,
+        help="seconds to delay the opening handshake of each connection \
+(default: 0)",
+        metavar="SECONDS",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+        help="seed of the synthetic genealogy and the random faults (default: 0)",
+        metavar="N",
+    )
+    args = parser.parse_args(argv)
+    if not (0 <= args.drop_rate and 0 <= args.stall_rate) or (
+        args.drop_rate + args.stall_rate > 1
+    ):
+        parser.error(
+            "--drop-rate and --stall-rate must be probabilities that sum \
+to at most 1"
+        )
+
+    if args.graph is not None:
+        with open(args.graph) as f:
+            records = {RecordId(int(k)): v for k, v in json.load(f)["nodes"].items()}
+    else:
+        records = synthetic_records(args.size, seed=args.seed)
+    standin = StandinServer(
+        records,
+        latency=args.latency,
+        record_latency=args.record_latency,
+        progress_messages=args.progress_messages,
+        max_records=args.max_records,
+        faults=[None if f == "none" else f for f in args.fault],
+        drop_rate=args.drop_rate,
+        stall_rate=args.stall_rate,
+        handshake_latency=args.handshake_latency,
+        seed=args.seed,
+    )
+
+    async def serve() -> None:
+        async with standin.serve(args.host, args.port) as server:
+            print(get_uri(server, args.host), flush=True)
+            await asyncio.Future()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
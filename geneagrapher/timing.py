@@ -0,0 +1,218 @@
+"""This module implements `Timings`, which records the wall-clock and CPU
+time of the phases of a `ggrapher` run (e.g., connecting to the
+backend, waiting for it, decoding its messages, and formatting and
+writing output), along with counts such as the number of records and
+bytes received.
+
+A summary of the timings can be printed, and the individual phases can
+be written to a trace file, either in the Chrome trace event format
+(viewable at chrome://tracing or https://ui.perfetto.dev) or, for files
+whose names end in ".jsonl", as JSON lines that are easy to aggregate
+across many runs.
+
+Phases can be nested. Each asyncio task has its own stack of current
+phases, so the phases of concurrent batch jobs do not nest in each
+other.
+"""
+
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+import json
+import os
+import sys
+import time
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    TextIO,
+    Tuple,
+    TypedDict,
+)
+
+# The names of the phases that the current task is in.
+current_phases: "ContextVar[Tuple[str, ...]]" = ContextVar("current_phases", default=())
+
+
+class Span(TypedDict):
+    name: str
+    parent: Optional[str]
+    start: float  # seconds since the start of the run
+    wall: float
+    cpu: float
+
+
+class Timings:
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.counts: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Record the time spent in the body of the `with` statement as
+        a span of the phase `name`.
+        """
+        token = current_phases.set(current_phases.get() + (name,))
+        start = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield
+        finally:
+            current_phases.reset(token)
+            self.add_span(
+                name,
+                start,
+                time.perf_counter() - start,
+                time.process_time() - start_cpu,
+            )
+
+    def add_span(self, name: str, start: float, wall: float, cpu: float) -> None:
+        """Record a span of the phase `name`, in the current phase, that
+        started at the `time.perf_counter()` value `start`.
+        """
+        phases = current_phases.get()
+        self.spans.append(
+            {
+                "name": name,
+                "parent": phases[-1] if phases else None,
+                "start": start - self.start,
+                "wall": wall,
+                "cpu": cpu,
+            }
+        )
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def totals(self) -> List[Tuple[str, int, int, float, float]]:
+        """Return the name, nesting depth, number of spans, total wall
+        time, and total CPU time of each phase, in the order that the
+        phases were first entered.
+        """
+        totals: Dict[str, List[Any]] = {}
+        parents: Dict[str, Optional[str]] = {}
+        # A span that starts at the same time as another one and ends
+        # later encloses it, so it sorts first.
+        for span in sorted(self.spans, key=lambda s: (s["start"], -s["wall"])):
+            parents.setdefault(span["name"], span["parent"])
+            total = totals.setdefault(span["name"], [0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += span["wall"]
+            total[2] += span["cpu"]
+
+        # Depths are computed once every phase's parent is known, in case
+        # a child still sorts before its parent (e.g., if both took no
+        # measurable time).
+        def depth(name: str) -> int:
+            parent = parents.get(name)
+            return 0 if parent is None else depth(parent) + 1
+
+        return [
+            (name, depth(name), calls, wall, cpu)
+            for name, (calls, wall, cpu) in totals.items()
+        ]
+
+    def print_summary(self, file: TextIO) -> None:
+        name_width = max(
+            [len("Phase")]
+            + [2 * depth + len(name) for name, depth, *_ in self.totals()]
+        )
+        print(
+            f"{'Phase':{name_width}}  {'Count':>6}  {'Wall (s)':>9}  {'CPU (s)':>9}",
+            file=file,
+        )
+        for name, depth, calls, wall, cpu in self.totals():
+            label = "  " * depth + name
+            print(
+                f"{label:{name_width}}  {calls:>6}  {wall:>9.3f}  {cpu:>9.3f}",
+                file=file,
+            )
+        print(
+            f"Total wall-clock time: {time.perf_counter() - self.start:.3f} s",
+            file=file,
+        )
+        for name, n in self.counts.items():
+            print(f"{name}: {n:,}", file=file)
+
+    def write_trace(self, path: str) -> None:
+        """Write the spans and counts to the trace file at `path`."""
+        pid = os.getpid()
+        wall = time.perf_counter() - self.start
+        run = {"argv": sys.argv, "pid": pid, "started": self.started, "wall": wall}
+        with open(path, "w") as f:
+            if path.endswith(".jsonl"):
+                f.write(json.dumps({"kind": "run", **run}) + "\n")
+                for span in self.spans:
+                    f.write(json.dumps({"kind": "span", **span}) + "\n")
+                f.write(json.dumps({"kind": "counts", **self.counts}) + "\n")
+                return
+
+            events: List[Dict[str, Any]] = [
+                {
+                    "name": span["name"],
+                    "ph": "X",
+                    "ts": span["start"] * 1e6,
+                    "dur": span["wall"] * 1e6,
+                    "pid": pid,
+                    "tid": 0,
+                    "args": {"cpu_ms": span["cpu"] * 1e3},
+                }
+                for span in self.spans
+            ]
+            events.append(
+                {
+                    "name": "counts",
+                    "ph": "C",
+                    "ts": wall * 1e6,
+                    "pid": pid,
+                    "args": self.counts,
+                }
+            )
+            json.dump({"traceEvents": events, "otherData": run}, f)
+
+
+def timed(timings: Optional[Timings], name: str) -> ContextManager[None]:
+    """Return `timings.phase(name)`, or a context manager that does
+    nothing if `timings` is None.
+    """
+    return nullcontext() if timings is None else timings.phase(name)
+
+
+class TimedWriter:
+    """A text file wrapper that records the time spent writing to the
+    file, and the number of characters written, in `timings`. Writes
+    are accumulated into one "write" span, which is recorded by
+    `finish`, because formatters write many small pieces.
+    """
+
+    def __init__(self, fp: TextIO, timings: Timings) -> None:
+        self.fp = fp
+        self.timings = timings
+        self.start: Optional[float] = None
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.characters = 0
+
+    def write(self, s: str) -> int:
+        start = time.perf_counter()
+        start_cpu = time.process_time()
+        n = self.fp.write(s)
+        self.wall += time.perf_counter() - start
+        self.cpu += time.process_time() - start_cpu
+        self.characters += n
+        if self.start is None:
+            self.start = start
+        return n
+
+    def finish(self) -> None:
+        if self.start is not None:
+            self.timings.add_span("write", self.start, self.wall, self.cpu)
+            self.timings.count("characters written", self.characters)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.fp, name)
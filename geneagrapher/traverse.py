@@ -0,0 +1,87 @@
+"""This module implements a breadth-first traversal that builds a
+`Geneagraph` from records that are available locally (e.g., in a
+`RecordCache`), rather than by making a request to the Geneagrapher
+backend.
+
+The traversal follows the same rules as the backend: advisor
+traversal from a node follows the `advisors` of each record reached,
+descendant traversal follows the `descendants`, and each record
+appears in the graph once regardless of how many paths lead to it.
+If the traversal is limited to a maximum number of records and
+reaches more, the graph holds the records reached first (in
+breadth-first order) and has the status "truncated".
+"""
+
+from .types import Geneagraph, Record, RecordId, StartNodeRequest
+
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+# A function that returns the records it has for the given record
+# IDs. IDs that it does not have are absent from the result.
+RecordLookup = Callable[[Iterable[RecordId]], Mapping[RecordId, Record]]
+
+ADVISORS = 1
+DESCENDANTS = 2
+
+
+def build_graph(
+    start_nodes: List[StartNodeRequest],
+    lookup: RecordLookup,
+    *,
+    max_records: Optional[int] = None,
+) -> Tuple[Geneagraph, Set[RecordId]]:
+    """Build the graph described by `start_nodes` using the records
+    returned by `lookup`, with at most `max_records` records if it is
+    given. Return the graph and the set of record IDs that were
+    reached by the traversal but that `lookup` did not have.
+
+    Records are looked up one breadth-first level at a time, so
+    `lookup` is called once per level rather than once per record.
+    """
+    graph: Geneagraph = {
+        "start_nodes": [RecordId(sn["recordId"]) for sn in start_nodes],
+        "status": "complete",
+        "nodes": {},
+    }
+    missing: Set[RecordId] = set()
+
+    # Traversal directions that have been queued for each record ID.
+    queued: Dict[RecordId, int] = {}
+    frontier: Dict[RecordId, int] = {}
+
+    def enqueue(record_id: RecordId, directions: int) -> None:
+        new_directions = directions & ~queued.get(record_id, 0)
+        if record_id not in queued or new_directions:
+            queued[record_id] = queued.get(record_id, 0) | new_directions
+            frontier[record_id] = frontier.get(record_id, 0) | new_directions
+
+    for sn in start_nodes:
+        enqueue(
+            RecordId(sn["recordId"]),
+            (ADVISORS if sn["getAdvisors"] else 0)
+            | (DESCENDANTS if sn["getDescendants"] else 0),
+        )
+
+    while frontier:
+        level, frontier = frontier, {}
+        found = lookup([rid for rid in level if rid not in graph["nodes"]])
+
+        for record_id, directions in level.items():
+            record = graph["nodes"].get(record_id) or found.get(record_id)
+            if record is None:
+                missing.add(record_id)
+                continue
+            if record_id not in graph["nodes"]:
+                if max_records is not None and len(graph["nodes"]) >= max_records:
+                    graph["status"] = "truncated"
+                    return graph, missing
+                graph["nodes"][record_id] = record
+
+            if directions & ADVISORS:
+                for advisor_id in record["advisors"]:
+                    enqueue(RecordId(advisor_id), ADVISORS)
+            if directions & DESCENDANTS:
+                for descendant_id in record["descendants"]:
+                    enqueue(RecordId(descendant_id), DESCENDANTS)
+
+    return graph, missing
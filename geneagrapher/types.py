@@ -1,10 +1,20 @@
+from array import array
+from bisect import bisect_left
 from typing import (
+    Callable,
     Dict,
+    Iterable,
+    Iterator,
     List,
     Literal,
+    Mapping,
     NewType,
     Optional,
+    Sequence,
+    Tuple,
     TypedDict,
+    Union,
+    overload,
 )
 
 # RecordId, Record, and Geneagraph mirror types of the same name in
@@ -25,3 +35,213 @@ class Geneagraph(TypedDict):
     start_nodes: List[RecordId]
     nodes: Dict[RecordId, Record]
     status: Literal["complete", "truncated"]
+
+
+# StartNodeRequest is the form of a start node in a `build-graph`
+# request to the Geneagrapher backend.
+class StartNodeRequest(TypedDict):
+    recordId: int
+    getAdvisors: bool
+    getDescendants: bool
+
+
+# ProgressCallback is the payload of a `progress` message from the
+# Geneagrapher backend: the numbers of records that are waiting to be
+# fetched, being fetched, and fetched.
+class ProgressCallback(TypedDict):
+    queued: int
+    fetching: int
+    done: int
+
+
+# A function that is called with each progress message from the backend.
+ProgressHandler = Callable[[ProgressCallback], None]
+
+
+# Year column value for records that have no year.
+NO_YEAR = -(2**31)
+
+
+class CompactGraph:
+    """A read-only alternative to `Geneagraph` that uses much less
+    memory for large graphs.
+
+    Record fields are stored in integer-indexed columns, advisor and
+    descendant lists are stored in compressed sparse row form (one
+    array holding every list's IDs and one array of offsets into it),
+    and names and institutions are indices into interned string
+    tables.
+
+    Indexing with "start_nodes", "nodes", or "status" works as it does
+    for a `Geneagraph`, so the output formatters accept either. The
+    "nodes" value is a mapping that builds `Record` dictionaries as
+    they are accessed.
+    """
+
+    def __init__(self, graph: Geneagraph) -> None:
+        self.build(graph["start_nodes"], graph["nodes"].values(), graph["status"])
+
+    @classmethod
+    def from_records(
+        cls,
+        start_nodes: Iterable[RecordId],
+        records: Iterable[Record],
+        status: Literal["complete", "truncated"],
+    ) -> "CompactGraph":
+        """Return the graph of `records`, which are read one at a time,
+        so that a graph that is read as a stream (e.g., an `NdjsonGraph`)
+        is never held in memory as a `Geneagraph`.
+        """
+        graph = cls.__new__(cls)
+        graph.build(start_nodes, records, status)
+        return graph
+
+    def build(
+        self,
+        start_nodes: Iterable[RecordId],
+        records: Iterable[Record],
+        status: Literal["complete", "truncated"],
+    ) -> None:
+        """Store the graph of `records` in columns."""
+        self.start_nodes = list(start_nodes)
+        self.status = status
+
+        ids = array("q")
+        names = array("i")
+        institutions = array("i")
+        years = array("i")
+        advisor_offsets = array("q", [0])
+        advisors = array("q")
+        descendant_offsets = array("q", [0])
+        descendants = array("q")
+
+        name_index: Dict[str, int] = {}
+        institution_index: Dict[str, int] = {}
+        for record in records:
+            ids.append(record["id"])
+            names.append(name_index.setdefault(record["name"], len(name_index)))
+            institution = record["institution"]
+            institutions.append(
+                -1
+                if institution is None
+                else institution_index.setdefault(institution, len(institution_index))
+            )
+            years.append(NO_YEAR if record["year"] is None else record["year"])
+            advisors.extend(record["advisors"])
+            advisor_offsets.append(len(advisors))
+            descendants.extend(record["descendants"])
+            descendant_offsets.append(len(descendants))
+
+        # The columns are typed as sequences so that other sequence
+        # types (e.g., memoryviews of a snapshot file) can be used.
+        self.ids: Sequence[int] = ids
+        self.names: Sequence[int] = names
+        self.institutions: Sequence[int] = institutions  # -1 for none
+        self.years: Sequence[int] = years
+        self.advisor_offsets: Sequence[int] = advisor_offsets
+        self.advisors: Sequence[int] = advisors
+        self.descendant_offsets: Sequence[int] = descendant_offsets
+        self.descendants: Sequence[int] = descendants
+        self.name_table: Sequence[str] = list(name_index)
+        self.institution_table: Sequence[str] = list(institution_index)
+
+        # Column indices ordered by record ID, for lookups by ID.
+        self.order: Sequence[int] = array(
+            "i", sorted(range(len(ids)), key=ids.__getitem__)
+        )
+        self.sorted_ids: Sequence[int] = array("q", (ids[i] for i in self.order))
+
+    @overload
+    def __getitem__(self, key: Literal["start_nodes"]) -> List[RecordId]:
+        ...
+
+    @overload
+    def __getitem__(self, key: Literal["nodes"]) -> "CompactNodes":
+        ...
+
+    @overload
+    def __getitem__(self, key: Literal["status"]) -> Literal["complete", "truncated"]:
+        ...
+
+    def __getitem__(self, key: str) -> object:
+        if key == "start_nodes":
+            return self.start_nodes
+        elif key == "nodes":
+            return CompactNodes(self)
+        elif key == "status":
+            return self.status
+        raise KeyError(key)
+
+    def items(self) -> List[Tuple[str, object]]:
+        return [
+            ("start_nodes", self.start_nodes),
+            ("status", self.status),
+            ("nodes", CompactNodes(self)),
+        ]
+
+    def index(self, record_id: int) -> Optional[int]:
+        """Return the column index of the record with ID `record_id`,
+        or None if the graph does not contain that record.
+        """
+        i = bisect_left(self.sorted_ids, record_id)
+        if i < len(self.sorted_ids) and self.sorted_ids[i] == record_id:
+            return self.order[i]
+        return None
+
+    def record(self, index: int) -> Record:
+        """Return the record in column `index`."""
+        institution = self.institutions[index]
+        year = self.years[index]
+        return {
+            "id": RecordId(self.ids[index]),
+            "name": self.name_table[self.names[index]],
+            "institution": (
+                None if institution == -1 else self.institution_table[institution]
+            ),
+            "year": None if year == NO_YEAR else year,
+            "descendants": list(
+                self.descendants[
+                    self.descendant_offsets[index] : self.descendant_offsets[index + 1]
+                ]
+            ),
+            "advisors": list(
+                self.advisors[
+                    self.advisor_offsets[index] : self.advisor_offsets[index + 1]
+                ]
+            ),
+        }
+
+    def to_geneagraph(self) -> Geneagraph:
+        return {
+            "start_nodes": list(self.start_nodes),
+            "status": self.status,
+            "nodes": {
+                RecordId(self.ids[i]): self.record(i) for i in range(len(self.ids))
+            },
+        }
+
+
+class CompactNodes(Mapping[RecordId, Record]):
+    """The read-only "nodes" mapping of a `CompactGraph`."""
+
+    def __init__(self, graph: CompactGraph) -> None:
+        self.graph = graph
+
+    def __len__(self) -> int:
+        return len(self.graph.ids)
+
+    def __iter__(self) -> Iterator[RecordId]:
+        return (RecordId(rid) for rid in self.graph.ids)
+
+    def __contains__(self, record_id: object) -> bool:
+        return isinstance(record_id, int) and self.graph.index(record_id) is not None
+
+    def __getitem__(self, record_id: RecordId) -> Record:
+        index = self.graph.index(record_id)
+        if index is None:
+            raise KeyError(record_id)
+        return self.graph.record(index)
+
+
+# Any graph form that the output formatters accept.
+AnyGraph = Union[Geneagraph, CompactGraph]
@@ -2,7 +2,7 @@
 echo 'Building my graphs...'
 rm -rf output
 mkdir output
-ggrapher 162833:ad -o me.dot && dot -Tpdf me.dot > me.pdf && dot -Tpng me.dot > me.png && ggrapher 6871:ad -o all.dot && dot -Tpdf all.dot > all_ksu.pdf && dot -Tpng all.dot > all_ksu.png
+ggrapher 162833:ad -o me.dot --render pdf,png && ggrapher 6871:ad -o all_ksu.dot --render pdf,png
 mv *.png output/
 mv *.pdf output/
-rm *.dot
\ No newline at end of file
+rm *.dot
@@ -0,0 +1,44 @@
+"""Factories for the records and graphs that the tests build."""
+
+from geneagrapher.types import Geneagraph, Record, RecordId
+
+from typing import Iterable, Literal, Optional
+
+
+def make_record(
+    rid: int,
+    advisors: Iterable[int] = (),
+    descendants: Iterable[int] = (),
+    *,
+    name: Optional[str] = None,
+    institution: Optional[str] = None,
+    year: Optional[int] = None,
+) -> Record:
+    """Return the record with ID `rid`, named "Name `rid`" unless
+    `name` is given.
+    """
+    return {
+        "id": RecordId(rid),
+        "name": f"Name {rid}" if name is None else name,
+        "institution": institution,
+        "year": year,
+        "descendants": list(descendants),
+        "advisors": list(advisors),
+    }
+
+
+def make_graph(
+    *records: Record,
+    start_nodes: Optional[Iterable[int]] = None,
+    status: Literal["complete", "truncated"] = "complete",
+) -> Geneagraph:
+    """Return the graph of `records`, whose start node is the first
+    record unless `start_nodes` is given.
+    """
+    if start_nodes is None:
+        start_nodes = [records[0]["id"]] if records else []
+    return {
+        "start_nodes": [RecordId(sn) for sn in start_nodes],
+        "status": status,
+        "nodes": {record["id"]: record for record in records},
+    }
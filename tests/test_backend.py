@@ -0,0 +1,286 @@
+from geneagrapher.backend import decode_response, get_graph
+from geneagrapher.geneagrapher import (
+    DEFAULT_CONNECT_TIMEOUT,
+    GgrapherError,
+    RequestPayload,
+    StartNodeArg,
+    make_payload,
+)
+from geneagrapher.retry import RetryPolicy
+from geneagrapher.standin import StandinServer, get_uri, synthetic_records
+from geneagrapher.timing import Timings
+from geneagrapher.types import Geneagraph, RecordId
+
+import json
+import pytest
+import socket
+from typing import Dict
+from unittest.mock import AsyncMock, MagicMock, patch, sentinel as s
+from websockets.exceptions import WebSocketException
+
+
+@pytest.mark.parametrize(
+    "message,expected",
+    (
+        [
+            '{"kind": "progress", "payload": {"queued": 1, "fetching": 2, "done": 3}}',
+            {"kind": "progress", "payload": {"queued": 1, "fetching": 2, "done": 3}},
+        ],
+        [
+            '{"kind": "graph", "payload": {"start_nodes": [6], "nodes": {"6": \
+{"id": 6, "nodes": {"1": 2}}, "7": {"id": 7}}, "status": "complete"}}',
+            {
+                "kind": "graph",
+                "payload": {
+                    "start_nodes": [6],
+                    "nodes": {6: {"id": 6, "nodes": {"1": 2}}, 7: {"id": 7}},
+                    "status": "complete",
+                },
+            },
+        ],
+        ['{"kind": "error"}', {"kind": "error"}],
+    ),
+)
+def test_decode_response(message: str, expected: Dict[str, object]) -> None:
+    assert decode_response(message) == expected
+
+
+def test_decode_response_key_order() -> None:
+    message = '{"kind": "graph", "payload": {"start_nodes": [6], "nodes": {"6": \
+{"id": 6}}, "status": "complete"}}'
+    graph = decode_response(message)["payload"]
+    assert (
+        json.dumps(graph)
+        == '{"start_nodes": [6], "status": "complete", "nodes": {"6": {"id": 6}}}'
+    )
+
+
+class TestGetGraph:
+    @pytest.mark.asyncio
+    @patch("geneagrapher.backend.get_version", return_value="test")
+    @patch("geneagrapher.backend.platform.python_version", return_value="python-test")
+    @patch("geneagrapher.backend.websockets.client.connect")
+    async def test_good(
+        self,
+        m_ws_connect: AsyncMock,
+        m_python_version: MagicMock,
+        m_get_version: MagicMock,
+    ) -> None:
+        request_payload: RequestPayload = {
+            "kind": "build-graph",
+            "options": {"reportingCallback": True},
+            "startNodes": [
+                {"recordId": 6, "getAdvisors": True, "getDescendants": False}
+            ],
+        }
+        graph: Geneagraph = {
+            "start_nodes": [RecordId(6)],
+            "nodes": {
+                RecordId(6): {
+                    "id": RecordId(6),
+                    "name": "Name",
+                    "institution": None,
+                    "year": None,
+                    "descendants": [],
+                    "advisors": [],
+                }
+            },
+            "status": "complete",
+        }
+        response_payload = {"kind": "graph", "payload": graph}
+
+        ws_conn = AsyncMock()
+        ws_conn.recv.return_value = json.dumps(response_payload)
+        m_ws_connect.return_value.__aenter__.return_value = ws_conn
+
+        with patch("geneagrapher.backend.GGRAPHER_URI", s.uri):
+            assert await get_graph(request_payload) == response_payload["payload"]
+
+        m_ws_connect.assert_called_once_with(
+            s.uri,
+            max_size=None,
+            open_timeout=DEFAULT_CONNECT_TIMEOUT,
+            user_agent_header="Python/python-test Geneagrapher/test",
+        )
+        m_python_version.assert_called_once_with()
+        m_get_version.assert_called_once_with()
+        ws_conn.send.assert_called_once_with(json.dumps(request_payload))
+        ws_conn.recv.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    @patch("geneagrapher.backend.get_version", return_value="test")
+    @patch("geneagrapher.backend.platform.python_version", return_value="python-test")
+    @patch("geneagrapher.backend.websockets.client.connect")
+    async def test_bad_request(
+        self,
+        m_ws_connect: AsyncMock,
+        m_python_version: MagicMock,
+        m_get_version: MagicMock,
+    ) -> None:
+        request_payload: RequestPayload = {
+            "kind": "build-graph",
+            "options": {"reportingCallback": True},
+            "startNodes": [
+                {"recordId": 6, "getAdvisors": True, "getDescendants": False}
+            ],
+        }
+        response_payload_json = json.dumps({"kind": "something"})
+
+        ws_conn = AsyncMock()
+        ws_conn.recv.return_value = response_payload_json
+        m_ws_connect.return_value.__aenter__.return_value = ws_conn
+
+        with patch("geneagrapher.backend.GGRAPHER_URI", s.uri):
+            with pytest.raises(GgrapherError) as exc_info:
+                await get_graph(request_payload)
+
+        assert exc_info.value.msg == "Request to Geneagrapher backend failed."
+        assert exc_info.value.extra == {"Response": response_payload_json}
+
+        m_ws_connect.assert_called_once_with(
+            s.uri,
+            max_size=None,
+            open_timeout=DEFAULT_CONNECT_TIMEOUT,
+            user_agent_header="Python/python-test Geneagrapher/test",
+        )
+        m_python_version.assert_called_once_with()
+        m_get_version.assert_called_once_with()
+        ws_conn.send.assert_called_once_with(json.dumps(request_payload))
+        ws_conn.recv.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    @patch("geneagrapher.backend.get_version", return_value="test")
+    @patch("geneagrapher.backend.platform.python_version", return_value="python-test")
+    @patch("geneagrapher.backend.websockets.client.connect")
+    async def test_bad_socket(
+        self,
+        m_ws_connect: AsyncMock,
+        m_python_version: MagicMock,
+        m_get_version: MagicMock,
+    ) -> None:
+        request_payload: RequestPayload = {
+            "kind": "build-graph",
+            "options": {"reportingCallback": True},
+            "startNodes": [
+                {"recordId": 6, "getAdvisors": True, "getDescendants": False}
+            ],
+        }
+
+        m_ws_connect.return_value.__aenter__.side_effect = WebSocketException()
+
+        with patch("geneagrapher.backend.GGRAPHER_URI", s.uri):
+            with pytest.raises(GgrapherError) as exc_info:
+                await get_graph(request_payload)
+
+        assert exc_info.value.msg == "Geneagrapher backend is currently unavailable."
+
+        m_ws_connect.assert_called_once_with(
+            s.uri,
+            max_size=None,
+            open_timeout=DEFAULT_CONNECT_TIMEOUT,
+            user_agent_header="Python/python-test Geneagrapher/test",
+        )
+
+        m_python_version.assert_called_once_with()
+        m_get_version.assert_called_once_with()
+
+    @pytest.mark.asyncio
+    @patch("geneagrapher.backend.websockets.client.connect")
+    async def test_cache_hit(self, m_ws_connect: AsyncMock) -> None:
+        request_payload: RequestPayload = {
+            "kind": "build-graph",
+            "options": {"reportingCallback": True},
+            "startNodes": [
+                {"recordId": 6, "getAdvisors": True, "getDescendants": False}
+            ],
+        }
+        cache = MagicMock()
+        cache.get_graph.return_value = s.graph
+
+        assert await get_graph(request_payload, cache=cache) == s.graph
+
+        cache.get_graph.assert_called_once_with(request_payload["startNodes"])
+        cache.put_graph.assert_not_called()
+        m_ws_connect.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch("geneagrapher.backend.get_version", return_value="test")
+    @patch("geneagrapher.backend.websockets.client.connect")
+    async def test_cache_miss(
+        self, m_ws_connect: AsyncMock, m_get_version: MagicMock
+    ) -> None:
+        request_payload: RequestPayload = {
+            "kind": "build-graph",
+            "options": {"reportingCallback": True},
+            "startNodes": [
+                {"recordId": 6, "getAdvisors": True, "getDescendants": False}
+            ],
+        }
+        graph: Geneagraph = {
+            "start_nodes": [RecordId(6)],
+            "nodes": {
+                RecordId(6): {
+                    "id": RecordId(6),
+                    "name": "Name",
+                    "institution": None,
+                    "year": None,
+                    "descendants": [],
+                    "advisors": [],
+                }
+            },
+            "status": "complete",
+        }
+        cache = MagicMock()
+        cache.get_graph.return_value = None
+
+        ws_conn = AsyncMock()
+        ws_conn.recv.return_value = json.dumps({"kind": "graph", "payload": graph})
+        m_ws_connect.return_value.__aenter__.return_value = ws_conn
+
+        assert await get_graph(request_payload, cache=cache) == graph
+
+        cache.get_graph.assert_called_once_with(request_payload["startNodes"])
+        cache.put_graph.assert_called_once_with(graph)
+
+    @pytest.mark.asyncio
+    async def test_retries(self) -> None:
+        standin = StandinServer(synthetic_records(10), faults=["drop"])
+        policy = RetryPolicy(retries=1, backoff=0.01)
+        timings = Timings()
+        async with standin.serve() as server:
+            with patch(
+                "geneagrapher.backend.GGRAPHER_URI", get_uri(server, "127.0.0.1")
+            ):
+                graph = await get_graph(
+                    make_payload([StartNodeArg("1:d")], True),
+                    on_progress=None,
+                    retry_policy=policy,
+                    timings=timings,
+                )
+        assert len(graph["nodes"]) == 10
+        assert timings.counts["retries"] == 1
+        assert [span["name"] for span in timings.spans].count("connect") == 2
+
+    @pytest.mark.asyncio
+    async def test_connect_timeout(self) -> None:
+        standin = StandinServer(synthetic_records(10), handshake_latency=0.2)
+        async with standin.serve() as server:
+            with patch(
+                "geneagrapher.backend.GGRAPHER_URI", get_uri(server, "127.0.0.1")
+            ):
+                with pytest.raises(GgrapherError) as exc_info:
+                    await get_graph(
+                        make_payload([StartNodeArg("1:d")], True),
+                        retry_policy=RetryPolicy(connect_timeout=0.05),
+                    )
+        assert exc_info.value.msg == "Geneagrapher backend did not respond in time."
+
+    @pytest.mark.asyncio
+    async def test_connection_refused(self) -> None:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        with patch("geneagrapher.backend.GGRAPHER_URI", f"ws://127.0.0.1:{port}"):
+            with pytest.raises(GgrapherError) as exc_info:
+                await get_graph(make_payload([StartNodeArg("1:d")], True))
+        assert exc_info.value.msg == "Geneagrapher backend is currently unavailable."
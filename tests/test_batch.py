@@ -0,0 +1,311 @@
+from geneagrapher.batch import BatchJob, load_manifest, run_batch, run_jobs
+from geneagrapher.cache import RecordCache
+from geneagrapher.geneagrapher import (
+    DEFAULT_CONNECT_TIMEOUT,
+    RequestPayload,
+    StartNodeArg,
+    make_payload,
+)
+from geneagrapher.incremental import record_build
+from geneagrapher.retry import RetryPolicy
+from geneagrapher.standin import StandinServer, get_uri, synthetic_records
+from geneagrapher.types import Geneagraph, RecordId
+
+import json
+from pathlib import Path
+import pytest
+from typing import Iterator, List
+from unittest.mock import AsyncMock, patch
+from websockets.exceptions import ConnectionClosedOK
+
+
+def make_graph(payload: RequestPayload) -> Geneagraph:
+    rids = [RecordId(sn["recordId"]) for sn in payload["startNodes"]]
+    return {
+        "start_nodes": rids,
+        "nodes": {
+            rid: {
+                "id": rid,
+                "name": f"Name {rid}",
+                "institution": None,
+                "year": None,
+                "descendants": [],
+                "advisors": [],
+            }
+            for rid in rids
+        },
+        "status": "complete",
+    }
+
+
+@pytest.fixture
+def cache() -> Iterator[RecordCache]:
+    with RecordCache(":memory:") as cache:
+        yield cache
+
+
+class TestLoadManifest:
+    def test_json(self, tmp_path: Path) -> None:
+        manifest = tmp_path / "manifest.json"
+        manifest.write_text(
+            json.dumps(
+                {
+                    "concurrency": 2,
+                    "jobs": [
+                        {"name": "me", "ids": ["162833:ad"], "out": "me.dot"},
+                        {"ids": ["6871:a", "7:d"], "out": "all.json", "format": "json"},
+                    ],
+                }
+            )
+        )
+
+        jobs, concurrency = load_manifest(str(manifest))
+        assert concurrency == 2
+        assert [(j.name, j.format, j.outfile) for j in jobs] == [
+            ("me", "dot", str(tmp_path / "me.dot")),
+            ("job-2", "json", str(tmp_path / "all.json")),
+        ]
+        assert [[sn.start_node for sn in j.ids] for j in jobs] == [
+            [StartNodeArg("162833:ad").start_node],
+            [StartNodeArg("6871:a").start_node, StartNodeArg("7:d").start_node],
+        ]
+
+    @pytest.mark.parametrize(
+        "job,message",
+        (
+            [{"ids": ["1:a"]}, "job-1: missing 'out'"],
+            [{"ids": [], "out": "a.dot"}, "job-1: no IDs"],
+            [{"ids": ["1"], "out": "a.dot"}, "job-1: invalid ID '1'"],
+            [{"ids": ["1:a"], "out": "a", "format": "png"}, "invalid format 'png'"],
+            [{"ids": "1:a", "out": "a.dot"}, "job-1: 'ids' must be a list of strings"],
+            [{"ids": [1], "out": "a.dot"}, "job-1: 'ids' must be a list of strings"],
+        ),
+    )
+    def test_invalid(self, tmp_path: Path, job: object, message: str) -> None:
+        manifest = tmp_path / "manifest.json"
+        manifest.write_text(json.dumps({"jobs": [job]}))
+
+        with pytest.raises(ValueError, match=message):
+            load_manifest(str(manifest))
+
+    @pytest.mark.parametrize(
+        "concurrency,message",
+        (
+            [0, "'concurrency' must be at least 1"],
+            [-1, "'concurrency' must be at least 1"],
+            ["2", "invalid 'concurrency' value '2'"],
+        ),
+    )
+    def test_invalid_concurrency(
+        self, tmp_path: Path, concurrency: object, message: str
+    ) -> None:
+        manifest = tmp_path / "manifest.json"
+        manifest.write_text(
+            json.dumps(
+                {
+                    "concurrency": concurrency,
+                    "jobs": [{"ids": ["1:a"], "out": "a.dot"}],
+                }
+            )
+        )
+
+        with pytest.raises(ValueError, match=message):
+            load_manifest(str(manifest))
+
+    def test_unresolved_name(self, tmp_path: Path) -> None:
+        manifest = tmp_path / "manifest.json"
+        manifest.write_text(
+            json.dumps({"jobs": [{"ids": ["name:Gauss:a"], "out": "a.dot"}]})
+        )
+
+        with patch("geneagrapher.search.INDEX_PATH", str(tmp_path / "search.db")):
+            with pytest.raises(ValueError, match="job-1: no search index at"):
+                load_manifest(str(manifest))
+
+
+class TestRunJobs:
+    @pytest.mark.asyncio
+    @patch("geneagrapher.batch.request_graph")
+    @patch("geneagrapher.batch.connect")
+    async def test_connection_reuse(
+        self,
+        m_connect: AsyncMock,
+        m_request_graph: AsyncMock,
+        tmp_path: Path,
+        cache: RecordCache,
+    ) -> None:
+        ws = AsyncMock(closed=False)
+        m_connect.side_effect = AsyncMock(return_value=ws)
+        m_request_graph.side_effect = lambda ws, payload, **kwargs: make_graph(payload)
+        jobs = [
+            BatchJob(
+                f"job{i}", [StartNodeArg(f"{i}:a")], "json", str(tmp_path / f"{i}")
+            )
+            for i in range(3)
+        ]
+
+        await run_jobs(jobs, concurrency=1, cache=cache)
+
+        m_connect.assert_called_once_with(timeout=DEFAULT_CONNECT_TIMEOUT)
+        assert m_request_graph.call_count == 3
+        ws.close.assert_called_once_with()
+        for i, job in enumerate(jobs):
+            assert job.error is None
+            assert job.records == 1
+            assert json.loads((tmp_path / f"{i}").read_text())["start_nodes"] == [i]
+
+    @pytest.mark.asyncio
+    @patch("geneagrapher.batch.request_graph")
+    @patch("geneagrapher.batch.connect")
+    async def test_reconnect(
+        self,
+        m_connect: AsyncMock,
+        m_request_graph: AsyncMock,
+        tmp_path: Path,
+        cache: RecordCache,
+    ) -> None:
+        ws1 = AsyncMock(closed=False)
+        ws2 = AsyncMock(closed=False)
+        m_connect.side_effect = AsyncMock(side_effect=[ws1, ws2])
+
+        def request_graph(
+            ws: AsyncMock, payload: RequestPayload, **kwargs: object
+        ) -> Geneagraph:
+            if ws is ws1 and m_request_graph.call_count > 1:
+                raise ConnectionClosedOK(None, None)
+            return make_graph(payload)
+
+        m_request_graph.side_effect = request_graph
+        jobs = [
+            BatchJob(f"job{i}", [StartNodeArg(f"{i}:a")], "dot", str(tmp_path / f"{i}"))
+            for i in range(2)
+        ]
+
+        await run_jobs(jobs, concurrency=1, cache=cache)
+
+        assert m_connect.call_count == 2
+        assert [c.args[0] for c in m_request_graph.call_args_list] == [ws1, ws1, ws2]
+        assert all(job.error is None for job in jobs)
+
+    @pytest.mark.asyncio
+    @patch("geneagrapher.batch.request_graph")
+    @patch("geneagrapher.batch.connect")
+    async def test_shared_records(
+        self,
+        m_connect: AsyncMock,
+        m_request_graph: AsyncMock,
+        tmp_path: Path,
+        cache: RecordCache,
+    ) -> None:
+        m_connect.side_effect = AsyncMock(return_value=AsyncMock(closed=False))
+        m_request_graph.side_effect = lambda ws, payload, **kwargs: make_graph(payload)
+        jobs = [
+            BatchJob(
+                "both",
+                [StartNodeArg("1:a"), StartNodeArg("2:a")],
+                "json",
+                str(tmp_path / "a"),
+            ),
+            BatchJob("one", [StartNodeArg("2:a")], "json", str(tmp_path / "b")),
+        ]
+
+        await run_jobs(jobs, concurrency=1, cache=cache)
+
+        # The second job's records were received by the first job.
+        assert m_request_graph.call_count == 1
+        assert json.loads((tmp_path / "b").read_text()) == {
+            "start_nodes": [2],
+            "nodes": {
+                "2": make_graph(m_request_graph.call_args.args[1])["nodes"][RecordId(2)]
+            },
+            "status": "complete",
+        }
+
+    @pytest.mark.asyncio
+    @patch("geneagrapher.batch.connect", side_effect=ConnectionClosedOK(None, None))
+    async def test_unavailable(
+        self, m_connect: AsyncMock, tmp_path: Path, cache: RecordCache
+    ) -> None:
+        jobs = [BatchJob("job", [StartNodeArg("1:a")], "dot", str(tmp_path / "a"))]
+
+        await run_jobs(jobs, concurrency=4, cache=cache)
+
+        assert jobs[0].error is not None
+        assert "unavailable" in str(jobs[0].error)
+        assert not (tmp_path / "a").exists()
+
+    @pytest.mark.asyncio
+    async def test_retries_and_hedging(
+        self, tmp_path: Path, cache: RecordCache
+    ) -> None:
+        # The first job's request is dropped and retried; the second job's
+        # request stalls on the reused connection and is hedged.
+        standin = StandinServer(synthetic_records(20), faults=["drop", None, "stall"])
+        policy = RetryPolicy(retries=1, backoff=0.01, hedge_after=0.05)
+        jobs = [
+            BatchJob(
+                f"job{i}", [StartNodeArg(f"{i}:a")], "json", str(tmp_path / f"{i}")
+            )
+            for i in (10, 20)
+        ]
+
+        async with standin.serve() as server:
+            with patch(
+                "geneagrapher.backend.GGRAPHER_URI", get_uri(server, "127.0.0.1")
+            ):
+                await run_jobs(jobs, concurrency=1, cache=cache, retry_policy=policy)
+
+        assert [job.error for job in jobs] == [None, None]
+        assert standin.received == 4
+        assert standin.faulted == 2
+
+    @pytest.mark.asyncio
+    async def test_incremental(self, tmp_path: Path, cache: RecordCache) -> None:
+        cache.put_many(
+            make_graph(make_payload([StartNodeArg("1:a")], True))["nodes"].values()
+        )
+
+        def make_jobs() -> List[BatchJob]:
+            return [BatchJob("job", [StartNodeArg("1:a")], "dot", str(tmp_path / "a"))]
+
+        jobs = make_jobs()
+        await run_jobs(jobs, concurrency=1, cache=cache, incremental=True)
+        manifest = jobs[0].manifest
+        assert manifest is not None
+        assert not jobs[0].skipped
+        record_build(jobs[0].outfile, manifest, jobs[0].dot_paths)
+
+        (tmp_path / "a").write_text("unchanged")
+        jobs = make_jobs()
+        await run_jobs(jobs, concurrency=1, cache=cache, incremental=True)
+        assert jobs[0].manifest is None
+        assert jobs[0].skipped
+        assert jobs[0].records == 1
+        assert (tmp_path / "a").read_text() == "unchanged"
+
+
+class TestRunBatch:
+    @pytest.mark.parametrize("concurrency", ["0", "-1"])
+    def test_invalid_concurrency(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str], concurrency: str
+    ) -> None:
+        manifest = tmp_path / "manifest.json"
+        manifest.write_text(json.dumps({"jobs": [{"ids": ["1:a"], "out": "a.dot"}]}))
+
+        with pytest.raises(SystemExit):
+            run_batch(["-c", concurrency, str(manifest)])
+        assert "--concurrency must be at least 1" in capsys.readouterr().err
+        assert not (tmp_path / "a.dot").exists()
+
+    def test_render_overwrite(
+        self, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+    ) -> None:
+        manifest = tmp_path / "manifest.json"
+        manifest.write_text(json.dumps({"jobs": [{"ids": ["1:a"], "out": "a.pdf"}]}))
+
+        with pytest.raises(SystemExit):
+            run_batch(["--render", "pdf", str(manifest)])
+        assert "--render pdf would overwrite the DOT output file" in (
+            capsys.readouterr().err
+        )
+        assert not (tmp_path / "a.pdf").exists()
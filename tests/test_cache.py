@@ -0,0 +1,156 @@
+from geneagrapher.cache import RecordCache
+from geneagrapher.types import RecordId, StartNodeRequest
+
+from .helpers import make_record
+
+from pathlib import Path
+import pytest
+from typing import List
+from unittest.mock import MagicMock, patch
+
+
+@pytest.fixture
+def cache_path(tmp_path: Path) -> str:
+    return str(tmp_path / "cache" / "records.sqlite3")
+
+
+def test_put_get(cache_path: str) -> None:
+    with RecordCache(cache_path) as cache:
+        cache.put_many([make_record(1, []), make_record(2, [1])])
+        assert len(cache) == 2
+        assert cache.get_many([RecordId(2), RecordId(3)]) == {
+            RecordId(2): make_record(2, [1])
+        }
+
+    # Records persist across instances.
+    with RecordCache(cache_path) as cache:
+        assert cache.get_many([RecordId(1)]) == {RecordId(1): make_record(1, [])}
+
+
+@patch("geneagrapher.cache.time.time")
+def test_ttl(m_time: MagicMock, cache_path: str) -> None:
+    m_time.return_value = 1000.0
+    with RecordCache(cache_path, ttl=10) as cache:
+        cache.put_many([make_record(1, [])])
+        cache.put_many([make_record(2, [])], ttl=100)
+
+        m_time.return_value = 1010.0
+        assert cache.get_many([RecordId(1), RecordId(2)]) == {
+            RecordId(2): make_record(2, [])
+        }
+        assert len(cache) == 1
+        assert cache.get_many([RecordId(1)], include_expired=True) == {
+            RecordId(1): make_record(1, [])
+        }
+
+
+@patch("geneagrapher.cache.time.time")
+def test_eviction(m_time: MagicMock, cache_path: str) -> None:
+    with RecordCache(cache_path, max_records=2) as cache:
+        m_time.return_value = 1000.0
+        cache.put_many([make_record(1, []), make_record(2, [])])
+
+        # Access record 1 so that record 2 is the least recently used.
+        m_time.return_value = 1001.0
+        cache.get_many([RecordId(1)])
+
+        m_time.return_value = 1002.0
+        cache.put_many([make_record(3, [])])
+
+        assert len(cache) == 2
+        assert set(cache.get_many([RecordId(1), RecordId(2), RecordId(3)])) == {1, 3}
+
+
+@patch("geneagrapher.cache.time.time")
+def test_expired_kept(m_time: MagicMock, cache_path: str) -> None:
+    m_time.return_value = 1000.0
+    with RecordCache(cache_path, ttl=10, max_records=2) as cache:
+        cache.put_many([make_record(1, [])])
+
+        # Storing other records does not remove an expired record...
+        m_time.return_value = 1010.0
+        cache.put_many([make_record(2, [])])
+        assert set(cache.get_many([RecordId(1)], include_expired=True)) == {1}
+
+        # ...until the size bound evicts it.
+        cache.put_many([make_record(3, [])])
+        assert set(cache.get_many([RecordId(1), RecordId(2), RecordId(3)])) == {2, 3}
+        assert cache.get_many([RecordId(1)], include_expired=True) == {}
+
+
+def test_get_many_chunked(cache_path: str) -> None:
+    with RecordCache(cache_path) as cache:
+        cache.put_many(make_record(rid, []) for rid in range(1200))
+        assert len(cache.get_many(RecordId(rid) for rid in range(0, 1300, 2))) == 600
+
+
+@patch("geneagrapher.cache.time.time")
+def test_iter_records(m_time: MagicMock, cache_path: str) -> None:
+    m_time.return_value = 1000.0
+    with RecordCache(cache_path, ttl=10) as cache:
+        cache.put_many(make_record(rid, []) for rid in range(1200, 0, -1))
+        # Expired records are included, in ID order.
+        m_time.return_value = 1010.0
+        assert [r["id"] for r in cache.iter_records()] == list(range(1, 1201))
+
+
+def test_get_graph(cache_path: str) -> None:
+    with RecordCache(cache_path) as cache:
+        cache.put_many([make_record(1, []), make_record(2, [1]), make_record(3, [2])])
+
+        assert cache.get_graph(
+            [{"recordId": 3, "getAdvisors": True, "getDescendants": False}]
+        ) == {
+            "start_nodes": [3],
+            "nodes": {
+                3: make_record(3, [2]),
+                2: make_record(2, [1]),
+                1: make_record(1, []),
+            },
+            "status": "complete",
+        }
+
+        # Record 4's advisor is not stored, so the graph is incomplete.
+        cache.put_many([make_record(4, [5])])
+        assert (
+            cache.get_graph(
+                [{"recordId": 4, "getAdvisors": True, "getDescendants": False}]
+            )
+            is None
+        )
+
+
+def test_get_graph_truncated(cache_path: str) -> None:
+    request: List[StartNodeRequest] = [
+        {"recordId": 2, "getAdvisors": True, "getDescendants": False}
+    ]
+    with RecordCache(cache_path) as cache:
+        cache.put_graph(
+            {
+                "start_nodes": [RecordId(3)],
+                "nodes": {
+                    RecordId(1): make_record(1, []),
+                    RecordId(2): make_record(2, [1]),
+                    RecordId(3): make_record(3, [2, 4]),
+                },
+                "status": "truncated",
+            }
+        )
+        assert cache.any_truncated([RecordId(1)])
+
+        # The records from a truncated graph that reach every record
+        # they need make a complete graph...
+        graph = cache.get_graph(request)
+        assert graph is not None and graph["status"] == "complete"
+
+        # ...and those that do not make none.
+        assert (
+            cache.get_graph(
+                [{"recordId": 3, "getAdvisors": True, "getDescendants": False}]
+            )
+            is None
+        )
+
+        # Storing the records from a complete graph clears the mark.
+        cache.put_many([make_record(1, [])])
+        assert not cache.any_truncated([RecordId(1)])
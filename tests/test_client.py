@@ -0,0 +1,248 @@
+from geneagrapher import GeneagrapherClient
+from geneagrapher.client import combine_progress, split_start_nodes
+from geneagrapher.cache import RecordCache
+from geneagrapher.geneagrapher import GgrapherError, StartNodeArg
+from geneagrapher.retry import RetryPolicy
+from geneagrapher.standin import Fault, StandinServer, get_uri, synthetic_records
+from geneagrapher.timing import Timings
+from geneagrapher.traverse import build_graph
+from geneagrapher.types import ProgressCallback, StartNodeRequest
+
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+import pytest
+import socket
+from typing import AsyncIterator, List, Optional, Sequence, Tuple
+from unittest.mock import patch
+
+RECORDS = synthetic_records(100)
+
+
+@asynccontextmanager
+async def serve(
+    max_records: Optional[int] = None, faults: Sequence[Optional[Fault]] = ()
+) -> AsyncIterator[Tuple[StandinServer, str]]:
+    standin = StandinServer(
+        RECORDS,
+        latency=0.02,
+        progress_messages=2,
+        max_records=max_records,
+        faults=faults,
+    )
+    async with standin.serve() as server:
+        yield standin, get_uri(server, "127.0.0.1")
+
+
+def expected_graph(*args: str) -> object:
+    graph, _ = build_graph(
+        [StartNodeArg(arg).start_node for arg in args], lambda ids: RECORDS
+    )
+    return graph
+
+
+def make_start_nodes(count: int) -> List[StartNodeRequest]:
+    return [StartNodeArg(f"{rid}:a").start_node for rid in range(1, count + 1)]
+
+
+@pytest.mark.parametrize("max_connections,fan_out", [(0, 1), (1, 0)])
+def test_invalid_arguments(max_connections: int, fan_out: int) -> None:
+    with pytest.raises(ValueError):
+        GeneagrapherClient(max_connections=max_connections, fan_out=fan_out)
+
+
+@pytest.mark.parametrize(
+    "count,fan_out,expected_sizes",
+    [
+        (20, 1, [20]),
+        (15, 4, [15]),  # too few to split
+        (20, 4, [10, 10]),
+        (40, 4, [10, 10, 10, 10]),
+        (41, 4, [11, 10, 10, 10]),
+    ],
+)
+def test_split_start_nodes(count: int, fan_out: int, expected_sizes: List[int]) -> None:
+    start_nodes = make_start_nodes(count)
+    chunks = split_start_nodes(start_nodes, fan_out)
+    assert [len(chunk) for chunk in chunks] == expected_sizes
+    assert chunks[0][:2] == [start_nodes[0], start_nodes[len(chunks)]]
+    assert sorted(sn["recordId"] for chunk in chunks for sn in chunk) == list(
+        range(1, count + 1)
+    )
+
+
+def test_combine_progress() -> None:
+    reports: List[ProgressCallback] = []
+    first, second = combine_progress(reports.append, 2)
+    first({"queued": 5, "fetching": 1, "done": 0})
+    second({"queued": 3, "fetching": 2, "done": 1})
+    first({"queued": 0, "fetching": 1, "done": 5})
+    assert reports == [
+        {"queued": 5, "fetching": 1, "done": 0},
+        {"queued": 8, "fetching": 3, "done": 1},
+        {"queued": 3, "fetching": 3, "done": 6},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_not_open() -> None:
+    with pytest.raises(RuntimeError):
+        await GeneagrapherClient().build_graph(["1:d"])
+
+
+@pytest.mark.asyncio
+async def test_invalid_start_node() -> None:
+    async with GeneagrapherClient() as client:
+        with pytest.raises(ValueError):
+            await client.build_graph(["1:x"])
+
+
+@pytest.mark.asyncio
+async def test_unknown_name(tmp_path: Path) -> None:
+    with patch("geneagrapher.search.INDEX_PATH", str(tmp_path / "search.db")):
+        async with GeneagrapherClient() as client:
+            with pytest.raises(ValueError):
+                await client.build_graph(["name:Nobody:a"])
+
+
+@pytest.mark.asyncio
+async def test_connection_reuse() -> None:
+    async with serve() as (server, uri):
+        async with GeneagrapherClient(uri=uri) as client:
+            assert await client.build_graph(["40:a"]) == expected_graph("40:a")
+            assert await client.build_graph(
+                [StartNodeArg("90:d").start_node]
+            ) == expected_graph("90:d")
+            assert len(client.connections) == 1
+            (ws,) = client.connections
+        assert server.requests == 2
+        assert ws.closed
+        assert client.connections == set()
+
+
+@pytest.mark.asyncio
+async def test_max_connections() -> None:
+    async with serve() as (server, uri):
+        async with GeneagrapherClient(uri=uri, max_connections=2) as client:
+            args = [f"{rid}:a" for rid in range(10, 16)]
+            graphs = await asyncio.gather(*(client.build_graph([arg]) for arg in args))
+            assert graphs == [expected_graph(arg) for arg in args]
+            assert len(client.connections) == 2
+        assert server.requests == 6
+
+
+@pytest.mark.asyncio
+async def test_reconnect() -> None:
+    async with serve() as (server, uri):
+        async with GeneagrapherClient(uri=uri) as client:
+            await client.build_graph(["40:a"])
+            (ws,) = client.connections
+            await ws.close()  # as if the backend closed the idle connection
+            assert await client.build_graph(["50:a"]) == expected_graph("50:a")
+            assert len(client.connections) == 1
+            assert ws not in client.connections
+        assert server.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_progress() -> None:
+    async with serve() as (_, uri):
+        client_progress: List[ProgressCallback] = []
+        request_progress: List[ProgressCallback] = []
+        async with GeneagrapherClient(uri=uri, on_progress=client_progress.append) as c:
+            await c.build_graph(["40:a"])
+            await c.build_graph(["40:a"], on_progress=request_progress.append)
+        assert len(client_progress) == 2
+        assert len(request_progress) == 2
+        assert set(client_progress[0]) == {"queued", "fetching", "done"}
+
+
+@pytest.mark.asyncio
+async def test_cache() -> None:
+    async with serve() as (server, uri):
+        timings = Timings()
+        with RecordCache(":memory:") as cache:
+            async with GeneagrapherClient(uri=uri, cache=cache, timings=timings) as c:
+                first = await c.build_graph(["40:a"])
+                assert await c.build_graph(["40:a"]) == first
+        assert server.requests == 1
+        names = [span["name"] for span in timings.spans]
+        assert names.count("cache lookup") == 2
+        assert names.count("connect") == 1
+        assert names.count("request") == 1
+
+
+@pytest.mark.asyncio
+async def test_unavailable() -> None:
+    # Find a port that nothing is listening on.
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    async with GeneagrapherClient(uri=f"ws://127.0.0.1:{port}") as client:
+        with pytest.raises(GgrapherError) as exc_info:
+            await client.build_graph(["40:a"])
+    assert exc_info.value.msg == "Geneagrapher backend is currently unavailable."
+
+
+@pytest.mark.asyncio
+async def test_retries() -> None:
+    async with serve(faults=["drop", "stall"]) as (server, uri):
+        policy = RetryPolicy(idle_timeout=0.1, retries=2, backoff=0.01)
+        async with GeneagrapherClient(uri=uri, retry_policy=policy) as client:
+            assert await client.build_graph(["40:a"]) == expected_graph("40:a")
+            # The connection of the successful attempt is kept.
+            assert len(client.connections) == 1
+    assert server.requests == 1
+    assert server.faulted == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_exhausted() -> None:
+    async with serve(faults=["stall", "stall"]) as (server, uri):
+        policy = RetryPolicy(idle_timeout=0.05, retries=1, backoff=0.01)
+        async with GeneagrapherClient(uri=uri, retry_policy=policy) as client:
+            with pytest.raises(GgrapherError) as exc_info:
+                await client.build_graph(["40:a"])
+            assert client.connections == set()
+    assert exc_info.value.msg == "Geneagrapher backend did not respond in time."
+
+
+@pytest.mark.asyncio
+async def test_hedge() -> None:
+    progress: List[ProgressCallback] = []
+    async with serve(faults=["stall"]) as (server, uri):
+        policy = RetryPolicy(hedge_after=0.05)
+        async with GeneagrapherClient(
+            uri=uri, on_progress=progress.append, retry_policy=policy
+        ) as client:
+            assert await client.build_graph(["40:a"]) == expected_graph("40:a")
+            assert len(client.connections) == 1
+    assert server.requests == 1
+    assert server.faulted == 1
+    assert len(progress) == 2
+
+
+@pytest.mark.asyncio
+async def test_fan_out() -> None:
+    args = [f"{rid}:a" for rid in range(90, 50, -1)]
+    progress: List[ProgressCallback] = []
+    async with serve() as (server, uri):
+        async with GeneagrapherClient(
+            uri=uri, fan_out=4, on_progress=progress.append
+        ) as client:
+            graph = await client.build_graph(args)
+            assert len(client.connections) == 4
+    assert server.requests == 4
+    assert graph == expected_graph(*args)
+    assert graph["start_nodes"] == list(range(90, 50, -1))
+    assert len(progress) == 8
+
+
+@pytest.mark.asyncio
+async def test_fan_out_truncated() -> None:
+    args = [f"{rid}:a" for rid in range(50, 66)]
+    async with serve(max_records=20) as (server, uri):
+        async with GeneagrapherClient(uri=uri, fan_out=2) as client:
+            graph = await client.build_graph(args)
+    assert server.requests == 2
+    assert graph["status"] == "truncated"
@@ -0,0 +1,172 @@
+from geneagrapher.backend import decode_response
+from geneagrapher.convert import run_convert
+from geneagrapher.geneagrapher import OutputFormatter
+from geneagrapher.output.dot import DotOutput
+from geneagrapher.output.identity import IdentityOutput
+from geneagrapher.output.ndjson import NdjsonOutput
+from geneagrapher.output.snapshot import SnapshotOutput
+from geneagrapher.types import CompactGraph, Geneagraph, RecordId
+
+import json
+from pathlib import Path
+import pytest
+import subprocess
+import sys
+from typing import Callable, List
+from unittest.mock import patch
+
+GRAPH: Geneagraph = {
+    "start_nodes": [RecordId(1)],
+    "status": "complete",
+    "nodes": {
+        RecordId(1): {
+            "id": RecordId(1),
+            "name": "Name",
+            "institution": None,
+            "year": None,
+            "descendants": [2],
+            "advisors": [],
+        },
+        RecordId(2): {
+            "id": RecordId(2),
+            "name": "Other Name",
+            "institution": "The Institution",
+            "year": 1900,
+            "descendants": [],
+            "advisors": [1],
+        },
+    },
+}
+
+# Modules that commands that make no requests must not import.
+NETWORK_MODULES = ["asyncio", "websockets", "geneagrapher.backend"]
+# Modules that only some output formats use.
+FORMAT_MODULES = ["geneagrapher.output.layout", "geneagrapher.output.svg"]
+
+
+def test_run_convert(tmp_path: Path) -> None:
+    infile = tmp_path / "graph.json"
+    infile.write_text(json.dumps(GRAPH))
+
+    out = tmp_path / "graph.dot"
+    run_convert(["-o", str(out), str(infile)])
+
+    assert out.read_text() == f"{DotOutput(GRAPH).output}\n"
+
+
+@pytest.mark.parametrize(
+    "format,expected",
+    [
+        ("ndjson", NdjsonOutput(GRAPH).output + "\n"),
+        ("json", IdentityOutput(GRAPH).output + "\n"),
+        ("dot", DotOutput(GRAPH).output + "\n"),
+    ],
+)
+def test_run_convert_ndjson(tmp_path: Path, format: str, expected: str) -> None:
+    infile = tmp_path / "graph.ndjson"
+    with open(infile, "w") as f:
+        NdjsonOutput(GRAPH).write(f)
+
+    # NDJSON input is streamed, never read into a `Geneagraph`.
+    out = tmp_path / "out"
+    with patch(
+        "geneagrapher.output.ndjson.NdjsonGraph.to_geneagraph",
+        side_effect=AssertionError,
+    ):
+        run_convert(["-f", format, "-o", str(out), str(infile)])
+
+    assert out.read_text() == expected
+
+
+@pytest.mark.parametrize(
+    "name,formatter",
+    [
+        ("graph.json", IdentityOutput),
+        ("graph.ndjson", NdjsonOutput),
+        ("graph.snap", SnapshotOutput),
+    ],
+)
+def test_run_convert_json_key_order(
+    tmp_path: Path, name: str, formatter: Callable[[CompactGraph], OutputFormatter]
+) -> None:
+    # The backend sends the nodes before the status.
+    message = json.dumps(
+        {
+            "kind": "graph",
+            "payload": {
+                "start_nodes": GRAPH["start_nodes"],
+                "nodes": GRAPH["nodes"],
+                "status": GRAPH["status"],
+            },
+        }
+    )
+    expected = IdentityOutput(decode_response(message)["payload"]).output + "\n"
+
+    infile = tmp_path / name
+    with open(infile, "w") as f:
+        formatter(CompactGraph(GRAPH)).write(f)
+    out = tmp_path / "out.json"
+    run_convert(["-f", "json", "-o", str(out), str(infile)])
+
+    assert out.read_text() == expected
+
+
+def test_run_convert_invalid_ndjson(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    path = tmp_path / "bad.ndjson"
+    path.write_text(NdjsonOutput(GRAPH).output + "\n[]\n")
+    out = tmp_path / "out.json"
+    out.write_text("old")
+
+    with pytest.raises(SystemExit):
+        run_convert(["-f", "json", "-o", str(out), str(path)])
+    assert f"{path}, line 4: not a record" in capsys.readouterr().err
+
+    # The existing output is left as it was, and no temporary file is.
+    assert out.read_text() == "old"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["bad.ndjson", "out.json"]
+
+
+def test_run_convert_invalid(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    path = tmp_path / "bad.json"
+    path.write_text("[]")
+
+    with pytest.raises(SystemExit):
+        run_convert([str(path)])
+    assert f"{path}: not a saved geneagraph" in capsys.readouterr().err
+
+
+def test_run_convert_max_depth(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    with pytest.raises(SystemExit):
+        run_convert(["-f", "json", "--max-depth", "2", str(tmp_path / "g.json")])
+    assert "--max-depth requires DOT or SVG output" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("argv", [["--version"], ["convert", "-f", "dot", "{infile}"]])
+def test_lazy_imports(tmp_path: Path, argv: List[str]) -> None:
+    infile = tmp_path / "graph.json"
+    infile.write_text(json.dumps(GRAPH))
+
+    # Each command is run in a fresh interpreter, whose modules are
+    # those that the command imported.
+    script = f"""\
+import sys
+from geneagrapher.geneagrapher import run
+sys.argv = ["ggrapher"] + {[arg.format(infile=infile) for arg in argv]!r}
+try:
+    run()
+except SystemExit:
+    pass
+unused = {NETWORK_MODULES + FORMAT_MODULES!r}
+print(sorted(m for m in unused if m in sys.modules), file=sys.stderr)
+"""
+    process = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    assert process.stderr.splitlines()[-1] == "[]"
+    assert process.stdout
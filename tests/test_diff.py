@@ -0,0 +1,149 @@
+from geneagrapher.diff import (
+    DiffDotOutput,
+    RecordChange,
+    change_lines,
+    diff_graphs,
+    run_diff,
+    sorted_records,
+    write_text_diff,
+)
+from geneagrapher.output.ndjson import NdjsonGraph, NdjsonOutput
+from geneagrapher.output.snapshot import SnapshotOutput
+from geneagrapher.types import CompactGraph
+
+from .helpers import make_graph, make_record
+
+import io
+import json
+from pathlib import Path
+import pytest
+
+
+OLD = make_graph(make_record(3, [1]), make_record(1), make_record(2, [1]))
+NEW = make_graph(
+    make_record(1),
+    make_record(2, [4], year=1900),
+    make_record(4),
+    make_record(5, [2]),
+)
+
+
+def test_sorted_records() -> None:
+    assert [r["id"] for r in sorted_records(OLD)] == [1, 2, 3]
+    assert [r["id"] for r in sorted_records(CompactGraph(NEW))] == [1, 2, 4, 5]
+
+
+def test_sorted_records_ndjson(tmp_path: Path) -> None:
+    path = tmp_path / "graph.ndjson"
+    path.write_text(NdjsonOutput(NEW).output + "\n")
+    graph = NdjsonGraph(str(path))
+    assert [r["id"] for r in sorted_records(graph)] == [1, 2, 4, 5]
+
+    # Records that are not in ID order are not sorted.
+    path.write_text(NdjsonOutput(NEW).output + "\n" + json.dumps(make_record(3)))
+    with pytest.raises(ValueError, match="not in ID order \\(3 follows 5\\)"):
+        list(sorted_records(graph))
+
+
+def test_diff_graphs() -> None:
+    changes = list(diff_graphs(OLD, CompactGraph(NEW)))
+    assert [(c.record["id"], c.kind) for c in changes] == [
+        (1, None),
+        (2, "modified"),
+        (3, "removed"),
+        (4, "added"),
+        (5, "added"),
+    ]
+    modified = changes[1]
+    assert modified.fields == {"year": (None, 1900)}
+    assert modified.added_advisors == [4]
+    assert modified.removed_advisors == [1]
+    assert changes[2].removed_advisors == [1]
+    assert changes[4].added_advisors == [2]
+
+
+def test_change_lines() -> None:
+    change = RecordChange(
+        make_record(2, [1], name="A"), make_record(2, [1], name="B", year=1900)
+    )
+    assert list(change_lines(change)) == ["~ 2 B: name: 'A' -> 'B'; year: none -> 1900"]
+
+
+def test_write_text_diff() -> None:
+    out = io.StringIO()
+    summary = write_text_diff(OLD, NEW, out)
+    assert summary.changed
+    assert out.getvalue().splitlines() == [
+        "~ 2 Name 2: year: none -> 1900",
+        "+ 4 -> 2",
+        "- 1 -> 2",
+        "- 3 Name 3",
+        "- 1 -> 3",
+        "+ 4 Name 4",
+        "+ 5 Name 5",
+        "+ 2 -> 5",
+        "records: 2 added, 1 removed, 1 modified; \
+advisor relationships: 2 added, 2 removed",
+    ]
+
+    out = io.StringIO()
+    assert not write_text_diff(NEW, CompactGraph(NEW), out, stat=True).changed
+    assert (
+        out.getvalue()
+        == "records: 0 added, 0 removed, 0 modified; \
+advisor relationships: 0 added, 0 removed\n"
+    )
+
+
+def test_dot_output() -> None:
+    output = DiffDotOutput(OLD, NEW)
+    assert output.output.splitlines()[5:] == [
+        '    1 [label="Name 1"];',
+        '    2 [label="Name 2\\n(1900)", fontcolor=darkorange3];',
+        '    3 [label="Name 3", fontcolor=red3, shape=box, style=dashed];',
+        '    4 [label="Name 4", fontcolor=green4];',
+        '    5 [label="Name 5", fontcolor=green4];',
+        "",
+        "    4 -> 2 [color=green4];",
+        "    1 -> 2 [color=red3, style=dashed];",
+        "    1 -> 3 [color=red3, style=dashed];",
+        "    2 -> 5 [color=green4];",
+        "}",
+    ]
+    assert output.summary.records == {"added": 2, "removed": 1, "modified": 1}
+
+
+def test_run_diff(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    old = tmp_path / "old.json"
+    old.write_text(json.dumps(OLD))
+    new = tmp_path / "new.snapshot"
+    with open(new, "wb") as f:
+        SnapshotOutput(NEW).write_binary(f)
+    new_ndjson = tmp_path / "new.ndjson"
+    new_ndjson.write_text(NdjsonOutput(NEW).output)
+
+    with pytest.raises(SystemExit) as exc_info:
+        run_diff([str(old), str(new)])
+    assert exc_info.value.code == 1
+    assert capsys.readouterr().out.startswith("~ 2 Name 2")
+
+    # Identical graphs.
+    run_diff(["--stat", str(old), str(old)])
+    assert capsys.readouterr().out.startswith("records: 0 added")
+    run_diff(["--stat", str(new), str(new_ndjson)])
+    assert capsys.readouterr().out.startswith("records: 0 added")
+
+    out = tmp_path / "diff.dot"
+    with pytest.raises(SystemExit):
+        run_diff(["-f", "dot", "-o", str(out), str(old), str(new)])
+    assert out.read_text().startswith("digraph {")
+    assert capsys.readouterr().err.startswith("records: 2 added")
+
+
+def test_run_diff_invalid(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    path = tmp_path / "bad.json"
+    path.write_text("[]")
+    with pytest.raises(SystemExit) as exc_info:
+        run_diff([str(path), str(path)])
+    assert exc_info.value.code == 2
+    assert f"{path}: not a saved geneagraph" in capsys.readouterr().err
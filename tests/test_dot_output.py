@@ -1,8 +1,15 @@
-from geneagrapher.output.dot import DotOutput, make_edge_str, make_node_str
+from geneagrapher.output.dot import (
+    DotOutput,
+    PositionedDotOutput,
+    make_edge_str,
+    make_node_str,
+)
 from geneagrapher.types import Geneagraph, Record, RecordId
 
+from io import StringIO
 from itertools import zip_longest
 import pytest
+import re
 from typing import List
 from unittest.mock import MagicMock, call, patch, sentinel as s
 
@@ -204,3 +211,59 @@ class TestDotOutput:
             call(graph["nodes"][RecordId(1002)], graph),
             call(graph["nodes"][RecordId(1000)], graph),
         ]
+
+    @pytest.mark.parametrize("node_count", [0, 1, 5])
+    def test_write(self, node_count: int) -> None:
+        graph: Geneagraph = {
+            "start_nodes": [RecordId(0)],
+            "nodes": {
+                RecordId(i): {
+                    "id": RecordId(i),
+                    "name": f"Name {i}",
+                    "institution": "The Institution" if i % 2 else None,
+                    "year": 1900 + i if i % 3 else None,
+                    "descendants": [],
+                    "advisors": [i + 1, i + 2],
+                }
+                for i in range(node_count)
+            },
+            "status": "complete",
+        }
+
+        do = DotOutput(graph)
+        fp = StringIO()
+        do.write(fp)
+        assert fp.getvalue() == do.output + "\n"
+
+
+def test_positioned_dot_output() -> None:
+    graph: Geneagraph = {
+        "start_nodes": [RecordId(2)],
+        "nodes": {
+            RecordId(i): {
+                "id": RecordId(i),
+                "name": f"Name {i}",
+                "institution": None,
+                "year": None,
+                "descendants": [],
+                "advisors": [] if i == 1 else [1],
+            }
+            for i in [1, 2]
+        },
+        "status": "complete",
+    }
+
+    output = PositionedDotOutput(graph).output
+    positions = {}
+    for line in output.splitlines():
+        match = re.fullmatch(
+            r'    (\d+) \[label="Name \d+", pos="([\d.]+),([\d.]+)"\];', line
+        )
+        if match:
+            positions[int(match.group(1))] = (
+                float(match.group(2)),
+                float(match.group(3)),
+            )
+    # The advisor is above the student, and Graphviz's y axis points up.
+    assert positions[1][1] > positions[2][1]
+    assert "    1 -> 2;" in output.splitlines()
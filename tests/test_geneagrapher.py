@@ -1,24 +1,39 @@
 from geneagrapher.geneagrapher import (
+    DEFAULT_CONNECT_TIMEOUT,
     GgrapherError,
+    OutputFormat,
     OutputFormatter,
     RequestPayload,
     StartNodeArg,
-    StartNodeRequest,
     get_formatter,
-    get_graph,
+    get_offline_graph,
     get_version,
     make_payload,
+    run,
+    write_output,
 )
 from geneagrapher.output.dot import DotOutput
 from geneagrapher.output.identity import IdentityOutput
-from geneagrapher.types import Geneagraph, RecordId
+from geneagrapher.output.shard import ShardStrategy
+from geneagrapher.output.snapshot import SnapshotOutput
+from geneagrapher.timing import Timings
+from geneagrapher.types import (
+    Geneagraph,
+    ProgressHandler,
+    Record,
+    RecordId,
+    StartNodeRequest,
+)
 
+from argparse import ArgumentTypeError
 from importlib.metadata import PackageNotFoundError
 import json
+import os
+from pathlib import Path
 import pytest
-from typing import Dict, List, Literal, Type
+import textwrap
+from typing import Dict, List, Optional, Type
 from unittest.mock import AsyncMock, MagicMock, patch, sentinel as s
-from websockets.exceptions import WebSocketException
 
 
 class TestStartNodeArg:
@@ -80,6 +95,16 @@ class TestStartNodeArg:
         sna = StartNodeArg(arg)
         assert sna.start_node == expected
 
+    @pytest.mark.parametrize("arg", ["name:", "name::a", "name: :a", "name:Gauss"])
+    def test_invalid_name(self, arg: str) -> None:
+        with pytest.raises(ValueError):
+            StartNodeArg(arg)
+
+    def test_unresolved_name(self, tmp_path: Path) -> None:
+        with patch("geneagrapher.search.INDEX_PATH", str(tmp_path / "search.db")):
+            with pytest.raises(ArgumentTypeError, match="no search index at"):
+                StartNodeArg("name:Gauss:a")
+
 
 class TestGgrapherError:
     @pytest.mark.parametrize(
@@ -119,6 +144,11 @@ following in the issue body:
             e = GgrapherError(msg, extra=extra)
             assert str(e) == expected_str.format(command=" ".join(command))
 
+    def test_str_no_report(self) -> None:
+        msg = "The message " * 10
+        e = GgrapherError(msg, extra={"Foo": "Blah"}, report=False)
+        assert str(e) == textwrap.fill(msg, width=79)
+
 
 @pytest.mark.parametrize("start_nodes", ([], ["32:a"], ["32:d", "14:a"]))
 @pytest.mark.parametrize("quiet", [True, False])
@@ -131,148 +161,361 @@ def test_make_payload(start_nodes: List[str], quiet: bool) -> None:
     }
 
 
-class TestGetGraph:
-    @pytest.mark.asyncio
-    @patch("geneagrapher.geneagrapher.get_version", return_value="test")
-    @patch(
-        "geneagrapher.geneagrapher.platform.python_version", return_value="python-test"
-    )
-    @patch("geneagrapher.geneagrapher.websockets.client.connect")
-    async def test_good(
-        self,
-        m_ws_connect: AsyncMock,
-        m_python_version: MagicMock,
-        m_get_version: MagicMock,
-    ) -> None:
-        request_payload: RequestPayload = {
-            "kind": "build-graph",
-            "options": {"reportingCallback": True},
-            "startNodes": [
-                {"recordId": 6, "getAdvisors": True, "getDescendants": False}
-            ],
+class TestGetOfflineGraph:
+    def test_complete(self) -> None:
+        payload = make_payload([StartNodeArg("6:a")], True)
+        cache = MagicMock()
+        cache.get_many.side_effect = lambda ids, include_expired: {
+            rid: {
+                "id": rid,
+                "name": "Name",
+                "institution": None,
+                "year": None,
+                "descendants": [],
+                "advisors": [],
+            }
+            for rid in ids
         }
-        graph: Geneagraph = {
-            "start_nodes": [RecordId(6)],
-            "nodes": {
-                RecordId(6): {
-                    "id": RecordId(6),
-                    "name": "Name",
-                    "institution": None,
-                    "year": None,
-                    "descendants": [],
-                    "advisors": [],
-                }
-            },
-            "status": "complete",
-        }
-        response_payload = {"kind": "graph", "payload": graph}
 
-        ws_conn = AsyncMock()
-        ws_conn.recv.return_value = json.dumps(response_payload)
-        m_ws_connect.return_value.__aenter__.return_value = ws_conn
+        graph = get_offline_graph(payload, cache, max_records=5)
+        assert graph["start_nodes"] == [6]
+        assert list(graph["nodes"]) == [6]
+        assert graph["status"] == "complete"
+        assert cache.get_many.call_args.kwargs == {"include_expired": True}
+
+    def test_missing(self) -> None:
+        payload = make_payload([StartNodeArg("6:a"), StartNodeArg("7:d")], True)
+        cache = MagicMock()
+        cache.get_many.return_value = {}
 
-        with patch("geneagrapher.geneagrapher.GGRAPHER_URI", s.uri):
-            assert await get_graph(request_payload) == response_payload["payload"]
+        with pytest.raises(GgrapherError) as exc_info:
+            get_offline_graph(payload, cache)
 
-        m_ws_connect.assert_called_once_with(
-            s.uri, user_agent_header="Python/python-test Geneagrapher/test"
+        assert exc_info.value.report is False
+        assert exc_info.value.msg.startswith(
+            "The record cache does not have 2 of the records in this graph (e.g., 6, \
+7)."
         )
-        m_python_version.assert_called_once_with()
-        m_get_version.assert_called_once_with()
-        ws_conn.send.assert_called_once_with(json.dumps(request_payload))
-        ws_conn.recv.assert_called_once_with()
-
-    @pytest.mark.asyncio
-    @patch("geneagrapher.geneagrapher.get_version", return_value="test")
-    @patch(
-        "geneagrapher.geneagrapher.platform.python_version", return_value="python-test"
-    )
-    @patch("geneagrapher.geneagrapher.websockets.client.connect")
-    async def test_bad_request(
-        self,
-        m_ws_connect: AsyncMock,
-        m_python_version: MagicMock,
-        m_get_version: MagicMock,
-    ) -> None:
-        request_payload: RequestPayload = {
-            "kind": "build-graph",
-            "options": {"reportingCallback": True},
-            "startNodes": [
-                {"recordId": 6, "getAdvisors": True, "getDescendants": False}
-            ],
-        }
-        response_payload_json = json.dumps({"kind": "something"})
 
-        ws_conn = AsyncMock()
-        ws_conn.recv.return_value = response_payload_json
-        m_ws_connect.return_value.__aenter__.return_value = ws_conn
 
-        with patch("geneagrapher.geneagrapher.GGRAPHER_URI", s.uri):
-            with pytest.raises(GgrapherError) as exc_info:
-                await get_graph(request_payload)
+@pytest.mark.parametrize(
+    "format,formatter_type",
+    [("dot", DotOutput), ("json", IdentityOutput), ("snapshot", SnapshotOutput)],
+)
+def test_get_formatter(
+    format: OutputFormat, formatter_type: Type[OutputFormatter]
+) -> None:
+    formatter = get_formatter(format, s.graph)
+    assert isinstance(formatter, formatter_type)
 
-        assert exc_info.value.msg == "Request to Geneagrapher backend failed."
-        assert exc_info.value.extra == {"Response": response_payload_json}
 
-        m_ws_connect.assert_called_once_with(
-            s.uri, user_agent_header="Python/python-test Geneagrapher/test"
-        )
-        m_python_version.assert_called_once_with()
-        m_get_version.assert_called_once_with()
-        ws_conn.send.assert_called_once_with(json.dumps(request_payload))
-        ws_conn.recv.assert_called_once_with()
-
-    @pytest.mark.asyncio
-    @patch("geneagrapher.geneagrapher.get_version", return_value="test")
-    @patch(
-        "geneagrapher.geneagrapher.platform.python_version", return_value="python-test"
-    )
-    @patch("geneagrapher.geneagrapher.websockets.client.connect")
-    async def test_bad_socket(
-        self,
-        m_ws_connect: AsyncMock,
-        m_python_version: MagicMock,
-        m_get_version: MagicMock,
-    ) -> None:
-        request_payload: RequestPayload = {
-            "kind": "build-graph",
-            "options": {"reportingCallback": True},
-            "startNodes": [
-                {"recordId": 6, "getAdvisors": True, "getDescendants": False}
-            ],
-        }
+@patch("importlib.metadata.version", return_value="the-version")
+def test_get_version(m_version: MagicMock) -> None:
+    assert get_version() == "the-version"
 
-        m_ws_connect.return_value.__aenter__.side_effect = WebSocketException()
 
-        with patch("geneagrapher.geneagrapher.GGRAPHER_URI", s.uri):
-            with pytest.raises(GgrapherError) as exc_info:
-                await get_graph(request_payload)
+@patch("importlib.metadata.version", side_effect=PackageNotFoundError)
+def test_get_version_dev(m_version: MagicMock) -> None:
+    assert get_version() == "dev"
 
-        assert exc_info.value.msg == "Geneagrapher backend is currently unavailable."
 
-        m_ws_connect.assert_called_once_with(
-            s.uri, user_agent_header="Python/python-test Geneagrapher/test"
-        )
+@patch("geneagrapher.geneagrapher.get_version", return_value="the-version")
+def test_version_option(
+    m_get_version: MagicMock, capsys: pytest.CaptureFixture[str]
+) -> None:
+    with patch("geneagrapher.geneagrapher.sys.argv", ["ggrapher", "--version"]):
+        with pytest.raises(SystemExit):
+            run()
+    assert capsys.readouterr().out == "ggrapher the-version\n"
+
+
+@patch("geneagrapher.geneagrapher.import_module")
+def test_run_subcommand(m_import_module: MagicMock) -> None:
+    with patch("geneagrapher.geneagrapher.sys.argv", ["ggrapher", "batch", "m.json"]):
+        run()
 
-        m_python_version.assert_called_once_with()
-        m_get_version.assert_called_once_with()
+    m_import_module.assert_called_once_with(".batch", "geneagrapher")
+    m_import_module.return_value.run_batch.assert_called_once_with(["m.json"])
 
 
 @pytest.mark.parametrize(
-    "format,formatter_type", [("dot", DotOutput), ("json", IdentityOutput)]
+    "argv",
+    [
+        ["--render", "pdf", "6:a"],
+        ["-f", "json", "-o", "g.json", "--render", "pdf", "6:a"],
+        ["-f", "svg", "-o", "g.svg", "--render", "pdf", "6:a"],
+    ],
 )
-def test_get_formatter(
-    format: Literal["dot", "json"], formatter_type: Type[OutputFormatter]
+def test_run_render_requires_dot_file(
+    capsys: pytest.CaptureFixture[str],
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    argv: List[str],
 ) -> None:
-    formatter = get_formatter(format, s.graph)
-    assert isinstance(formatter, formatter_type)
+    monkeypatch.chdir(tmp_path)
+    with patch("geneagrapher.geneagrapher.sys.argv", ["ggrapher"] + argv):
+        with pytest.raises(SystemExit):
+            run()
+    assert "--render requires DOT output to a file" in capsys.readouterr().err
 
 
-@patch("geneagrapher.geneagrapher.version", return_value="the-version")
-def test_get_version(m_version: MagicMock) -> None:
-    assert get_version() == "the-version"
+@pytest.mark.parametrize(
+    "argv,message",
+    [
+        (["-o", "g.dot", "--render", "pdf,dot"], "--render dot would overwrite"),
+        (["-o", "x.png", "--render", "png:cairo"], "--render png:cairo would"),
+    ],
+)
+def test_run_render_overwrite(
+    capsys: pytest.CaptureFixture[str],
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+    argv: List[str],
+    message: str,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    with patch("geneagrapher.geneagrapher.sys.argv", ["ggrapher"] + argv + ["6:a"]):
+        with pytest.raises(SystemExit):
+            run()
+    assert message in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == []
 
 
-@patch("geneagrapher.geneagrapher.version", side_effect=PackageNotFoundError)
-def test_get_version_dev(m_version: MagicMock) -> None:
-    assert get_version() == "dev"
+@pytest.mark.parametrize(
+    "format,shard,expected_files",
+    [
+        ("dot", None, ["graph.out"]),
+        ("json", None, []),
+        ("dot", "components", ["graph.out", "graph-001.dot", "graph-002.dot"]),
+    ],
+)
+def test_write_output(
+    tmp_path: Path,
+    format: OutputFormat,
+    shard: Optional[str],
+    expected_files: List[str],
+) -> None:
+    records: Dict[RecordId, Record] = {
+        RecordId(rid): {
+            "id": RecordId(rid),
+            "name": f"Name {rid}",
+            "institution": None,
+            "year": None,
+            "descendants": [],
+            "advisors": [],
+        }
+        for rid in [1, 2]
+    }
+    graph: Geneagraph = {"start_nodes": [], "nodes": records, "status": "complete"}
+    with open(tmp_path / "graph.out", "w") as f:
+        paths = write_output(
+            format, graph, f, None if shard is None else ShardStrategy(shard)
+        )
+    assert paths == [str(tmp_path / name) for name in expected_files]
+    assert all(Path(path).exists() for path in paths)
+
+
+def test_write_output_timings(tmp_path: Path) -> None:
+    record: Record = {
+        "id": RecordId(1),
+        "name": "Name 1",
+        "institution": None,
+        "year": None,
+        "descendants": [],
+        "advisors": [],
+    }
+    graph: Geneagraph = {
+        "start_nodes": [RecordId(1)],
+        "nodes": {RecordId(1): record},
+        "status": "complete",
+    }
+    timings = Timings()
+    with open(tmp_path / "graph.dot", "w") as f:
+        write_output("dot", graph, f, max_depth=1, timings=timings)
+    assert [(s["name"], s["parent"]) for s in timings.spans] == [
+        ("summarize", None),
+        ("write", "output"),
+        ("output", None),
+    ]
+    assert timings.counts == {
+        "records": 1,
+        "edges": 0,
+        "characters written": len((tmp_path / "graph.dot").read_text()),
+    }
+
+
+def test_run_incremental(
+    capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    """An incremental build that has not changed leaves its output as
+    it was.
+    """
+    monkeypatch.chdir(tmp_path)
+    graph: Geneagraph = {
+        "start_nodes": [RecordId(6)],
+        "nodes": {
+            RecordId(6): {
+                "id": RecordId(6),
+                "name": "Name",
+                "institution": None,
+                "year": None,
+                "descendants": [],
+                "advisors": [],
+            }
+        },
+        "status": "complete",
+    }
+    argv = ["ggrapher", "-q", "--incremental", "-o", "g.dot", "6:a"]
+    with patch("geneagrapher.geneagrapher.sys.argv", argv), patch(
+        "geneagrapher.backend.get_graph", AsyncMock(return_value=graph)
+    ):
+        run()
+        assert capsys.readouterr().err == "g.dot: no previous build\n"
+        assert (tmp_path / "g.dot").read_text().startswith("digraph")
+        assert (tmp_path / "g.dot.manifest.json").exists()
+
+        (tmp_path / "g.dot").write_text("unchanged")
+        run()
+        assert capsys.readouterr().err == "g.dot: unchanged; skipped\n"
+        assert (tmp_path / "g.dot").read_text() == "unchanged"
+
+        graph["nodes"][RecordId(6)]["name"] = "New Name"
+        run()
+        assert capsys.readouterr().err.splitlines() == [
+            "g.dot: 0 added, 0 removed, 1 modified records",
+            "  modified: 6",
+        ]
+        assert "New Name" in (tmp_path / "g.dot").read_text()
+
+
+def test_run_progress_fd(
+    capsys: pytest.CaptureFixture[str], monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    graph: Geneagraph = {"start_nodes": [], "nodes": {}, "status": "complete"}
+    payloads: List[RequestPayload] = []
+
+    async def get_graph(
+        payload: RequestPayload, *, on_progress: ProgressHandler, **kwargs: object
+    ) -> Geneagraph:
+        payloads.append(payload)
+        on_progress({"queued": 1, "fetching": 1, "done": 2})
+        return graph
+
+    read_fd, write_fd = os.pipe()
+    argv = ["ggrapher", "-q", "--progress-fd", str(write_fd), "-o", "g.dot", "6:a"]
+    with patch("geneagrapher.geneagrapher.sys.argv", argv), patch(
+        "geneagrapher.backend.get_graph", get_graph
+    ):
+        run()
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        events = [json.loads(line) for line in f]
+
+    # Progress messages are requested for the events, but no bar is drawn.
+    assert payloads[0]["options"] == {"reportingCallback": True}
+    assert capsys.readouterr().err == ""
+    assert [(e["event"], e["done"]) for e in events] == [
+        ("start", 0),
+        ("progress", 2),
+        ("end", 2),
+    ]
+
+
+def test_run_progress_fd_invalid(capsys: pytest.CaptureFixture[str]) -> None:
+    read_fd, write_fd = os.pipe()
+    os.close(read_fd)
+    os.close(write_fd)
+    argv = ["ggrapher", "--progress-fd", str(write_fd), "6:a"]
+    with patch("geneagrapher.geneagrapher.sys.argv", argv):
+        with pytest.raises(SystemExit):
+            run()
+    assert "--progress-fd: Bad file descriptor" in capsys.readouterr().err
+
+
+def test_run_incremental_requires_file(capsys: pytest.CaptureFixture[str]) -> None:
+    with patch(
+        "geneagrapher.geneagrapher.sys.argv", ["ggrapher", "--incremental", "6:a"]
+    ):
+        with pytest.raises(SystemExit):
+            run()
+    assert "--incremental requires output to a file" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    "option,message",
+    [
+        (["--retries", "-1"], "--retries must not be negative"),
+        (["--timeout", "0"], "--timeout must be positive"),
+        (["--hedge-after", "-2"], "--hedge-after must be positive"),
+    ],
+)
+def test_run_invalid_retry_policy(
+    option: List[str], message: str, capsys: pytest.CaptureFixture[str]
+) -> None:
+    with patch("geneagrapher.geneagrapher.sys.argv", ["ggrapher"] + option + ["6:a"]):
+        with pytest.raises(SystemExit):
+            run()
+    assert message in capsys.readouterr().err
+
+
+def test_run_retry_policy(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.chdir(tmp_path)
+    graph: Geneagraph = {"start_nodes": [], "nodes": {}, "status": "complete"}
+    get_graph = AsyncMock(return_value=graph)
+
+    argv = ["ggrapher", "-q", "--idle-timeout", "5", "--retries", "3"]
+    argv += ["--hedge-after", "2", "-o", "g.dot", "6:a"]
+    with patch("geneagrapher.geneagrapher.sys.argv", argv), patch(
+        "geneagrapher.backend.get_graph", get_graph
+    ):
+        run()
+
+    (payload,) = get_graph.call_args.args
+    policy = get_graph.call_args.kwargs["retry_policy"]
+    # Progress messages are requested, so that the idle timeout does not
+    # expire during a long traversal.
+    assert payload["options"] == {"reportingCallback": True}
+    assert (policy.idle_timeout, policy.retries, policy.hedge_after) == (5, 3, 2)
+    assert policy.connect_timeout == DEFAULT_CONNECT_TIMEOUT
+    assert policy.total_timeout is None
+
+
+def test_run_fan_out(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.chdir(tmp_path)
+    graph: Geneagraph = {"start_nodes": [], "nodes": {}, "status": "complete"}
+    client = MagicMock()
+    client.__aenter__.return_value.build_graph = AsyncMock(return_value=graph)
+
+    argv = ["ggrapher", "-q", "--fan-out", "3", "-o", "g.dot", "6:a", "7:d"]
+    with patch("geneagrapher.geneagrapher.sys.argv", argv), patch(
+        "geneagrapher.client.GeneagrapherClient", return_value=client
+    ) as m_client:
+        run()
+
+    assert m_client.call_args.kwargs["fan_out"] == 3
+    assert m_client.call_args.kwargs["max_connections"] == 3
+    build_graph = client.__aenter__.return_value.build_graph
+    build_graph.assert_called_once_with(
+        [StartNodeArg("6:a").start_node, StartNodeArg("7:d").start_node],
+        on_progress=None,
+    )
+
+
+@pytest.mark.parametrize(
+    "option,message",
+    [
+        (["--fan-out", "0"], "--fan-out must be at least 1"),
+        (
+            ["--fan-out", "2", "--offline", "--cache", "c.db"],
+            "--fan-out cannot be used with --offline",
+        ),
+    ],
+)
+def test_run_invalid_fan_out(
+    option: List[str], message: str, capsys: pytest.CaptureFixture[str]
+) -> None:
+    with patch("geneagrapher.geneagrapher.sys.argv", ["ggrapher"] + option + ["6:a"]):
+        with pytest.raises(SystemExit):
+            run()
+    assert message in capsys.readouterr().err
@@ -1,5 +1,9 @@
 from geneagrapher.output.identity import IdentityOutput
+from geneagrapher.types import Geneagraph, RecordId
 
+from io import StringIO
+import json
+import pytest
 from unittest.mock import MagicMock, patch, sentinel as s
 
 
@@ -16,3 +20,25 @@ class TestIdentityOutput:
         assert do.output == s.the_json
 
         m_json.dumps.assert_called_once_with(s.graph)
+
+    @pytest.mark.parametrize("node_count", [0, 1, 3])
+    def test_write(self, node_count: int) -> None:
+        graph: Geneagraph = {
+            "start_nodes": [RecordId(0)],
+            "nodes": {
+                RecordId(i): {
+                    "id": RecordId(i),
+                    "name": f"Name {i} \u00df",
+                    "institution": None,
+                    "year": 1900,
+                    "descendants": [i + 1],
+                    "advisors": [],
+                }
+                for i in range(node_count)
+            },
+            "status": "truncated",
+        }
+
+        fp = StringIO()
+        IdentityOutput(graph).write(fp)
+        assert fp.getvalue() == json.dumps(graph) + "\n"
@@ -0,0 +1,119 @@
+from geneagrapher.incremental import (
+    MANIFEST_VERSION,
+    check_build,
+    get_changes,
+    get_manifest_path,
+    load_manifest,
+    make_manifest,
+    record_build,
+    record_digest,
+)
+
+from .helpers import make_graph, make_record
+
+import io
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+OPTIONS: Dict[str, Any] = {"format": "dot", "render": None}
+
+
+def test_record_digest() -> None:
+    assert record_digest(make_record(1, [3, 2])) == record_digest(
+        make_record(1, [2, 3])
+    )
+    assert record_digest(make_record(1, [2])) != record_digest(make_record(1, [3]))
+    assert record_digest(make_record(1)) != record_digest(make_record(1, name="X"))
+
+
+def test_make_manifest() -> None:
+    graph = make_graph(make_record(1, [2]), make_record(2))
+    reordered = make_graph(make_record(1, [2]), make_record(2))
+    reordered["nodes"] = dict(reversed(list(reordered["nodes"].items())))
+    manifest = make_manifest(graph, OPTIONS)
+    assert manifest["version"] == MANIFEST_VERSION
+    assert list(manifest["records"]) == ["1", "2"]
+    assert manifest["digest"] == make_manifest(reordered, OPTIONS)["digest"]
+
+    truncated = make_graph(make_record(1, [2]), make_record(2))
+    truncated["status"] = "truncated"
+    assert manifest["digest"] != make_manifest(truncated, OPTIONS)["digest"]
+
+
+def test_get_changes() -> None:
+    previous = make_manifest(
+        make_graph(make_record(1, [2, 3]), make_record(2), make_record(3)), OPTIONS
+    )
+    current = make_manifest(
+        make_graph(make_record(1, [2, 4]), make_record(2), make_record(4)), OPTIONS
+    )
+    assert get_changes(previous, current) == ([4], [3], [1])
+
+
+def test_check_build(tmp_path: Path) -> None:
+    outfile = str(tmp_path / "graph.dot")
+    graph = make_graph(make_record(1, [2]), make_record(2))
+
+    report = io.StringIO()
+    manifest = check_build(outfile, graph, OPTIONS, report)
+    assert manifest is not None
+    assert report.getvalue() == f"{outfile}: no previous build\n"
+
+    Path(outfile).write_text("digraph {}\n")
+    record_build(outfile, manifest, [outfile])
+    assert load_manifest(get_manifest_path(outfile)) == {
+        **manifest,
+        "outputs": [outfile],
+    }
+
+    # Nothing changed.
+    report = io.StringIO()
+    assert check_build(outfile, graph, OPTIONS, report) is None
+    assert report.getvalue() == f"{outfile}: unchanged; skipped\n"
+
+    # A record was modified and another was added.
+    changed = make_graph(make_record(1, [2, 3]), make_record(2), make_record(3))
+    report = io.StringIO()
+    assert check_build(outfile, changed, OPTIONS, report) is not None
+    assert report.getvalue().splitlines() == [
+        f"{outfile}: 1 added, 0 removed, 1 modified records",
+        "  added: 3",
+        "  modified: 1",
+    ]
+
+    # The options changed.
+    report = io.StringIO()
+    assert check_build(outfile, graph, {**OPTIONS, "format": "json"}, report)
+    assert report.getvalue() == (
+        f"{outfile}: 0 added, 0 removed, 0 modified records; options changed\n"
+    )
+
+    # An output is missing.
+    Path(outfile).unlink()
+    report = io.StringIO()
+    assert check_build(outfile, graph, OPTIONS, report) is not None
+    assert report.getvalue().endswith("; outputs missing\n")
+
+
+def test_check_build_many_changes(tmp_path: Path) -> None:
+    outfile = str(tmp_path / "graph.dot")
+    graph = make_graph(make_record(1))
+    manifest = make_manifest(graph, OPTIONS)
+    record_build(outfile, manifest, [])
+
+    changed = make_graph(*(make_record(rid) for rid in range(1, 16)))
+    report = io.StringIO()
+    check_build(outfile, changed, OPTIONS, report)
+    assert report.getvalue().splitlines()[1] == (
+        "  added: 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, and 4 more"
+    )
+
+
+def test_load_manifest_invalid(tmp_path: Path) -> None:
+    path = tmp_path / "graph.dot.manifest.json"
+    assert load_manifest(str(path)) is None
+    path.write_text("not json")
+    assert load_manifest(str(path)) is None
+    path.write_text(json.dumps({"version": MANIFEST_VERSION + 1}))
+    assert load_manifest(str(path)) is None
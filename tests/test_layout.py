@@ -0,0 +1,125 @@
+from geneagrapher.output.layout import (
+    Layout,
+    NODE_HEIGHT,
+    NODE_SEP,
+    Point,
+    assign_ranks,
+    count_crossings,
+    get_label_lines,
+)
+from geneagrapher.standin import synthetic_records
+from geneagrapher.types import Geneagraph, Record, RecordId
+
+from .helpers import make_graph, make_record
+
+import pytest
+from typing import Dict, List, Tuple
+
+
+@pytest.mark.parametrize(
+    "record,expected",
+    [
+        (make_record(1), ["Name 1"]),
+        (
+            {**make_record(1, year=1900), "institution": "Universität"},
+            ["Name 1", "Universität (1900)"],
+        ),
+        (make_record(-1, year=1900), ["Name -1"]),
+    ],
+)
+def test_get_label_lines(record: Record, expected: List[str]) -> None:
+    assert get_label_lines(record) == expected
+
+
+@pytest.mark.parametrize(
+    "edges,expected",
+    [
+        # A chain, and a vertex without edges.
+        ([(0, 1), (1, 2)], [0, 1, 2, 0]),
+        # The longest chain of advisors sets the rank.
+        ([(0, 1), (1, 2), (0, 2), (2, 3)], [0, 1, 2, 3]),
+        # A vertex without advisors is placed just above its student.
+        ([(0, 1), (1, 2), (3, 2)], [0, 1, 2, 1]),
+        # A cycle is broken at its lowest vertex.
+        ([(0, 1), (1, 2), (2, 1), (2, 3)], [0, 1, 2, 3]),
+        ([(1, 2), (2, 1)], [0, 0, 1, 0]),
+    ],
+)
+def test_assign_ranks(edges: List[Tuple[int, int]], expected: List[int]) -> None:
+    assert assign_ranks(len(expected), edges) == expected
+
+
+def test_count_crossings() -> None:
+    rows = [[0, 1, 2], [3, 4, 5]]
+    down = [[5], [4], [3, 4], [], [], []]
+    position = [0, 1, 2, 0, 1, 2]
+    # 0-5 crosses 1-4, 2-3, and 2-4, and 1-4 crosses 2-3.
+    assert count_crossings(rows, down, position) == 4
+
+
+class TestLayout:
+    def test_rows(self) -> None:
+        # 1 advised 2 and 3, 2 advised 4, and 4 and 1 advised 5, so the
+        # relationship from 1 to 5 passes through a bend point in the
+        # rows of 2 and 4.
+        layout = Layout(
+            make_graph(
+                make_record(1),
+                make_record(2, [1]),
+                make_record(3, [1]),
+                make_record(4, [2]),
+                make_record(5, [4, 1, 99]),
+            )
+        )
+        assert layout.ranks[:5] == [0, 1, 1, 2, 3]
+        assert len(layout.ranks) == 7
+        assert layout.crossings == 0
+        edges: Dict[Tuple[int, int], List[Point]] = {
+            (a, s): points for a, s, points in layout.edge_points()
+        }
+        assert sorted(edges) == [(1, 2), (1, 3), (1, 5), (2, 4), (4, 5)]
+        assert len(edges[(1, 5)]) == 4
+        assert len(edges[(1, 2)]) == 2
+
+        # Each line goes from the bottom of the advisor's label to the
+        # top of the student's.
+        centers = {record["id"]: center for record, center, _ in layout.nodes()}
+        assert edges[(1, 2)][0][1] == centers[RecordId(1)][1] + NODE_HEIGHT / 2
+        assert edges[(1, 2)][-1][1] == centers[RecordId(2)][1] - NODE_HEIGHT / 2
+
+    def test_crossings_reduced(self) -> None:
+        # Initially ordered by year, the students of 1 and 2 cross.
+        layout = Layout(
+            make_graph(
+                make_record(1, year=1800),
+                make_record(2, year=1801),
+                make_record(3, [2], year=1850),
+                make_record(4, [1], year=1851),
+            )
+        )
+        assert layout.crossings == 0
+
+    def test_no_overlap(self) -> None:
+        graph: Geneagraph = {
+            "start_nodes": [RecordId(1)],
+            "nodes": synthetic_records(300),
+            "status": "complete",
+        }
+        layout = Layout(graph)
+        for row in layout.rows:
+            for left, right in zip(row, row[1:]):
+                gap = layout.x[right] - layout.x[left]
+                assert (
+                    gap
+                    >= (layout.widths[left] + layout.widths[right]) / 2
+                    + NODE_SEP
+                    - 1e-6
+                )
+        for record, (x, y), width in layout.nodes():
+            assert x - width / 2 >= 0 and x + width / 2 <= layout.width
+            assert y - NODE_HEIGHT / 2 >= 0 and y + NODE_HEIGHT / 2 <= layout.height
+
+    def test_empty(self) -> None:
+        layout = Layout({"start_nodes": [], "nodes": {}, "status": "complete"})
+        assert list(layout.nodes()) == []
+        assert layout.height > 0
@@ -0,0 +1,125 @@
+from geneagrapher.merge import merge_graphs, run_merge
+from geneagrapher.output.ndjson import NdjsonOutput
+from geneagrapher.types import Geneagraph
+
+from .helpers import make_graph, make_record
+
+import json
+from pathlib import Path
+import pytest
+from typing import Iterator, List, Literal
+
+
+class TestMergeGraphs:
+    def test_merge(self) -> None:
+        merged = merge_graphs(
+            [
+                make_graph(make_record(1), make_record(2)),
+                make_graph(
+                    make_record(3), make_record(2, name="New Name"), start_nodes=[3, 1]
+                ),
+            ]
+        )
+        assert merged == make_graph(
+            make_record(1),
+            make_record(2, name="New Name"),
+            make_record(3),
+            start_nodes=[1, 3],
+        )
+
+    @pytest.mark.parametrize(
+        "statuses,expected",
+        (
+            [["complete", "complete"], "complete"],
+            [["complete", "truncated"], "truncated"],
+            [["truncated", "complete"], "truncated"],
+        ),
+    )
+    def test_status(
+        self,
+        statuses: List[Literal["complete", "truncated"]],
+        expected: Literal["complete", "truncated"],
+    ) -> None:
+        merged = merge_graphs(
+            make_graph(start_nodes=[], status=status) for status in statuses
+        )
+        assert merged["status"] == expected
+
+    def test_empty(self) -> None:
+        assert merge_graphs([]) == make_graph()
+
+    def test_streaming(self) -> None:
+        produced: List[int] = []
+
+        def graphs() -> Iterator[Geneagraph]:
+            for rid in range(3):
+                # Each graph is produced only after the previous one has
+                # been merged.
+                assert len(produced) == rid
+                produced.append(rid)
+                yield make_graph(make_record(rid))
+
+        assert len(merge_graphs(graphs())["nodes"]) == 3
+
+
+def test_run_merge(tmp_path: Path) -> None:
+    paths = []
+    for i, graph in enumerate([make_graph(make_record(1)), make_graph(make_record(2))]):
+        paths.append(str(tmp_path / f"{i}.json"))
+        with open(paths[-1], "w") as f:
+            json.dump(graph, f)
+
+    out = tmp_path / "merged.json"
+    run_merge(["-f", "json", "-o", str(out)] + paths)
+
+    assert json.loads(out.read_text()) == {
+        "start_nodes": [1, 2],
+        "nodes": {"1": make_record(1), "2": make_record(2)},
+        "status": "complete",
+    }
+
+
+def test_run_merge_ndjson(tmp_path: Path) -> None:
+    paths = []
+    for i, graph in enumerate(
+        [make_graph(make_record(1), make_record(2)), make_graph(start_nodes=[2])]
+    ):
+        paths.append(str(tmp_path / f"{i}.ndjson"))
+        with open(paths[-1], "w") as f:
+            NdjsonOutput(graph).write(f)
+
+    out = tmp_path / "merged.ndjson"
+    run_merge(["-f", "ndjson", "-o", str(out)] + paths)
+
+    assert out.read_text().splitlines() == [
+        json.dumps(
+            {
+                "kind": "geneagraph",
+                "version": 1,
+                "start_nodes": [1, 2],
+                "status": "complete",
+            }
+        ),
+        json.dumps(make_record(1)),
+        json.dumps(make_record(2)),
+    ]
+
+
+def test_run_merge_invalid(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    path = tmp_path / "bad.json"
+    path.write_text("[]")
+
+    with pytest.raises(SystemExit):
+        run_merge([str(path)])
+    assert f"{path}: not a saved geneagraph" in capsys.readouterr().err
+
+
+def test_run_merge_invalid_ndjson(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    path = tmp_path / "bad.ndjson"
+    path.write_text(NdjsonOutput(make_graph(start_nodes=[1])).output + "\n[]\n")
+
+    with pytest.raises(SystemExit):
+        run_merge([str(path)])
+    assert f"{path}, line 2: not a record" in capsys.readouterr().err
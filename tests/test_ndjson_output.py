@@ -0,0 +1,97 @@
+from geneagrapher.output.ndjson import NdjsonGraph, NdjsonOutput
+from geneagrapher.types import CompactGraph, Geneagraph, RecordId
+
+from io import StringIO
+import json
+from pathlib import Path
+import pytest
+
+
+@pytest.fixture
+def graph() -> Geneagraph:
+    return {
+        "start_nodes": [RecordId(30)],
+        "nodes": {
+            RecordId(30): {
+                "id": RecordId(30),
+                "name": "Carl Friedrich Gauß",
+                "institution": "Universität Helmstedt",
+                "year": 1799,
+                "descendants": [],
+                "advisors": [10],
+            },
+            RecordId(10): {
+                "id": RecordId(10),
+                "name": "Johann Friedrich Pfaff",
+                "institution": None,
+                "year": None,
+                "descendants": [30],
+                "advisors": [],
+            },
+        },
+        "status": "truncated",
+    }
+
+
+class TestNdjsonOutput:
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_write(self, graph: Geneagraph, compact: bool) -> None:
+        fp = StringIO()
+        NdjsonOutput(CompactGraph(graph) if compact else graph).write(fp)
+        lines = fp.getvalue().splitlines()
+        assert json.loads(lines[0]) == {
+            "kind": "geneagraph",
+            "version": 1,
+            "start_nodes": [30],
+            "status": "truncated",
+        }
+        # Records are in ID order.
+        assert [json.loads(line) for line in lines[1:]] == [
+            graph["nodes"][RecordId(10)],
+            graph["nodes"][RecordId(30)],
+        ]
+        assert fp.getvalue() == NdjsonOutput(graph).output + "\n"
+
+
+class TestNdjsonGraph:
+    def test_read(self, graph: Geneagraph, tmp_path: Path) -> None:
+        path = tmp_path / "graph.ndjson"
+        with open(path, "w") as f:
+            NdjsonOutput(graph).write(f)
+
+        saved = NdjsonGraph(str(path))
+        assert saved.start_nodes == [30]
+        assert saved.status == "truncated"
+        assert [r["id"] for r in saved.records()] == [10, 30]
+        assert saved.to_geneagraph() == graph
+
+    @pytest.mark.parametrize(
+        "header",
+        [
+            "",
+            "[]",
+            '{"kind": "other"}',
+            '{"kind": "geneagraph", "version": 2}',
+            '{"kind": "geneagraph", "version": 1, "start_nodes": [], "status": "x"}',
+        ],
+    )
+    def test_invalid_header(self, tmp_path: Path, header: str) -> None:
+        path = tmp_path / "graph.ndjson"
+        path.write_text(header + "\n")
+        with pytest.raises(ValueError, match="not a geneagraph NDJSON file"):
+            NdjsonGraph(str(path))
+
+    @pytest.mark.parametrize(
+        "line,message", [("{", "invalid JSON"), ('{"name": "X"}', "not a record")]
+    )
+    def test_invalid_record(
+        self, graph: Geneagraph, tmp_path: Path, line: str, message: str
+    ) -> None:
+        path = tmp_path / "graph.ndjson"
+        path.write_text(NdjsonOutput(graph).output + f"\n\n{line}\n")
+
+        records = NdjsonGraph(str(path)).records()
+        assert next(records)["id"] == 10
+        assert next(records)["id"] == 30
+        with pytest.raises(ValueError, match=f"{path}, line 5: {message}"):
+            next(records)
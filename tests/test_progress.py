@@ -0,0 +1,88 @@
+from geneagrapher.progress import ProgressEvent, ProgressReporter, format_bar
+from geneagrapher.types import ProgressCallback
+
+import asyncio
+from io import StringIO
+import json
+import pytest
+from typing import List
+
+
+def progress(done: int, total: int = 10) -> ProgressCallback:
+    return {"queued": total - done - 1, "fetching": 1, "done": done}
+
+
+def test_format_bar() -> None:
+    assert format_bar(1, 1, 2) == f"Progress: [{'█' * 30}{':' * 15}{'.' * 15}] 2/4"
+    assert format_bar(0, 0, 0) == f"Progress: [{'.' * 60}] 0/0"
+
+
+@pytest.mark.asyncio
+async def test_throttled() -> None:
+    bar = StringIO()
+    # Updates between redraws are only recorded.
+    async with ProgressReporter(bar=bar, interactive=True, interval=60) as reporter:
+        for done in range(9):
+            reporter.update(progress(done))
+    assert bar.getvalue() == format_bar(1, 1, 8) + "\r\n"
+
+
+@pytest.mark.asyncio
+async def test_redraw() -> None:
+    bar = StringIO()
+    async with ProgressReporter(bar=bar, interactive=True, interval=0.01) as reporter:
+        reporter.update(progress(3))
+        await asyncio.sleep(0.05)
+        assert bar.getvalue() == format_bar(6, 1, 3) + "\r"
+        # The bar is not redrawn if the progress did not change.
+        await asyncio.sleep(0.05)
+        assert bar.getvalue() == format_bar(6, 1, 3) + "\r"
+        reporter.update(progress(4))
+    assert bar.getvalue() == format_bar(6, 1, 3) + "\r" + format_bar(5, 1, 4) + "\r\n"
+
+
+@pytest.mark.asyncio
+async def test_not_a_terminal() -> None:
+    bar = StringIO()
+    async with ProgressReporter(bar=bar, interval=0.01) as reporter:
+        reporter.update(progress(3))
+        await asyncio.sleep(0.05)
+        # Later changes are printed at the log interval or at the end.
+        reporter.update(progress(4))
+        await asyncio.sleep(0.05)
+        reporter.update(progress(5))
+    assert bar.getvalue().splitlines() == [
+        "Progress: 3/10 records",
+        "Progress: 5/10 records",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_no_progress() -> None:
+    bar = StringIO()
+    async with ProgressReporter(bar=bar, interactive=True):
+        pass
+    assert bar.getvalue() == ""
+
+
+@pytest.mark.asyncio
+async def test_events() -> None:
+    events = StringIO()
+    async with ProgressReporter(events=events, interval=60) as reporter:
+        for done in range(3):
+            reporter.update(progress(done))
+
+    lines: List[ProgressEvent] = [
+        json.loads(line) for line in events.getvalue().splitlines()
+    ]
+    assert [line["event"] for line in lines] == [
+        "start",
+        "progress",
+        "progress",
+        "progress",
+        "end",
+    ]
+    assert [line["done"] for line in lines] == [0, 0, 1, 2, 2]
+    assert lines[-1]["queued"] == 7 and lines[-1]["fetching"] == 1
+    assert all(line["time"] > 1e9 for line in lines)
+    assert lines[0]["elapsed"] <= lines[-1]["elapsed"]
@@ -0,0 +1,170 @@
+from geneagrapher.backend import connect, request_graph
+from geneagrapher.cache import RecordCache
+from geneagrapher.client import GeneagrapherClient
+from geneagrapher.geneagrapher import GgrapherError, StartNodeArg, make_payload
+from geneagrapher.proxy import ProxyServer
+from geneagrapher.standin import StandinServer, get_uri, synthetic_records
+from geneagrapher.types import Geneagraph, ProgressCallback
+
+import asyncio
+from contextlib import asynccontextmanager
+import json
+import pytest
+import socket
+from typing import AsyncIterator, List, Optional, Tuple
+from unittest.mock import patch
+
+RECORDS = synthetic_records(100)
+
+
+@asynccontextmanager
+async def serve(
+    upstream_uri: Optional[str] = None,
+) -> AsyncIterator[Tuple[StandinServer, ProxyServer, str]]:
+    """Run a proxy of a stand-in, or of `upstream_uri` if it is given,
+    and yield the stand-in, the proxy, and the proxy's URI.
+    """
+    standin = StandinServer(RECORDS, latency=0.05, progress_messages=3)
+    async with standin.serve() as upstream:
+        uri = upstream_uri or get_uri(upstream, "127.0.0.1")
+        with RecordCache(":memory:") as cache:
+            async with GeneagrapherClient(uri=uri, cache=cache) as client:
+                proxy = ProxyServer(client)
+                async with proxy.serve() as server:
+                    yield standin, proxy, get_uri(server, "127.0.0.1")
+
+
+async def fetch(
+    uri: str, arg: str, progress: Optional[List[ProgressCallback]] = None
+) -> Geneagraph:
+    async with connect(uri) as ws:
+        return await request_graph(
+            ws,
+            make_payload([StartNodeArg(arg)], progress is None),
+            on_progress=None if progress is None else progress.append,
+        )
+
+
+@pytest.mark.asyncio
+async def test_coalesce() -> None:
+    async with serve() as (standin, proxy, uri):
+        progress: List[List[ProgressCallback]] = [[], []]
+        graphs = await asyncio.gather(
+            fetch(uri, "40:a", progress[0]),
+            fetch(uri, "40:a", progress[1]),
+            fetch(uri, "40:a"),
+        )
+    assert standin.requests == 1
+    assert proxy.coalesced == 2
+    assert graphs[0]["start_nodes"] == [40]
+    assert graphs[1] == graphs[0] and graphs[2] == graphs[0]
+    assert [len(p) for p in progress] == [3, 3]
+
+
+@pytest.mark.asyncio
+async def test_different_requests() -> None:
+    async with serve() as (standin, proxy, uri):
+        first, second = await asyncio.gather(fetch(uri, "40:a"), fetch(uri, "40:d"))
+    assert standin.requests == 2
+    assert proxy.coalesced == 0
+    assert first != second
+
+
+@pytest.mark.asyncio
+async def test_cache() -> None:
+    async with serve() as (standin, proxy, uri):
+        first = await fetch(uri, "40:a")
+        progress: List[ProgressCallback] = []
+        assert await fetch(uri, "40:a", progress) == first
+    assert standin.requests == 1
+    assert progress == []
+
+
+@pytest.mark.asyncio
+async def test_join_in_flight() -> None:
+    """A client that joins a request in flight first receives the
+    latest progress message.
+    """
+    async with serve() as (standin, proxy, uri):
+        progress: List[List[ProgressCallback]] = [[], []]
+        first = asyncio.ensure_future(fetch(uri, "40:a", progress[0]))
+        while not progress[0]:
+            await asyncio.sleep(0.001)
+        await asyncio.gather(first, fetch(uri, "40:a", progress[1]))
+    assert standin.requests == 1
+    assert progress[1] == progress[0]
+
+
+@pytest.mark.asyncio
+async def test_upstream_unavailable() -> None:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    async with serve(f"ws://127.0.0.1:{port}") as (standin, proxy, uri):
+        with pytest.raises(GgrapherError) as exc_info:
+            await fetch(uri, "40:a")
+    assert exc_info.value.msg == "Request to Geneagrapher backend failed."
+    assert json.loads(exc_info.value.extra["Response"]) == {
+        "kind": "error",
+        "payload": "Geneagrapher backend is currently unavailable.",
+    }
+
+
+@pytest.mark.asyncio
+async def test_bad_request() -> None:
+    async with serve() as (standin, proxy, uri):
+        async with connect(uri) as ws:
+            await ws.send('{"kind": "other"}')
+            response = json.loads(await ws.recv())
+    assert response["kind"] == "error"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "start_nodes",
+    [
+        [],
+        "40:a",
+        [40],
+        [{"recordId": "40", "getAdvisors": True, "getDescendants": False}],
+        [{"recordId": 40, "getAdvisors": 1, "getDescendants": False}],
+        [{"recordId": 40, "getAdvisors": True}],
+    ],
+)
+async def test_invalid_start_nodes(start_nodes: object) -> None:
+    async with serve() as (standin, proxy, uri):
+        async with connect(uri) as ws:
+            await ws.send(
+                json.dumps(
+                    {
+                        "kind": "build-graph",
+                        "options": {"reportingCallback": False},
+                        "startNodes": start_nodes,
+                    }
+                )
+            )
+            response = json.loads(await ws.recv())
+        assert response["kind"] == "error"
+        assert not proxy.pending and proxy.coalesced == 0
+
+
+@pytest.mark.asyncio
+async def test_upstream_exception() -> None:
+    async with serve() as (standin, proxy, uri):
+        with patch.object(
+            proxy.client, "build_graph", side_effect=RuntimeError("it failed")
+        ):
+            with pytest.raises(GgrapherError) as exc_info:
+                await fetch(uri, "40:a")
+
+            # The connection is still open for the next request.
+            async with connect(uri) as ws:
+                payload = make_payload([StartNodeArg("40:a")], True)
+                await ws.send(json.dumps(payload))
+                response = json.loads(await ws.recv())
+                await ws.send(json.dumps(payload))
+                assert json.loads(await ws.recv()) == response
+    assert json.loads(exc_info.value.extra["Response"]) == {
+        "kind": "error",
+        "payload": "RuntimeError('it failed')",
+    }
@@ -0,0 +1,176 @@
+from geneagrapher.output.snapshot import SnapshotOutput
+from geneagrapher.query import AncestorIndex, run_query
+
+from .helpers import make_graph, make_record
+
+import json
+from pathlib import Path
+import pytest
+from typing import List, Optional, Set
+
+
+# 1 and 2 advised 3; 3 advised 4 and 5; 5 advised 6; 2 advised 7. 99 is
+# an advisor of 1 that is not in the graph.
+GRAPH = make_graph(
+    make_record(6, [5], []),
+    make_record(1, [99], [3]),
+    make_record(2, [], [3, 7]),
+    make_record(3, [1, 2], [4, 5]),
+    make_record(4, [3], []),
+    make_record(5, [3], [6]),
+    make_record(7, [], []),  # 2 is only listed in 2's descendants
+)
+
+
+@pytest.fixture
+def index() -> AncestorIndex:
+    return AncestorIndex(GRAPH)
+
+
+class TestAncestorIndex:
+    def test_ancestors(self, index: AncestorIndex) -> None:
+        assert len(index) == 7
+        assert index.ancestors(6) == {1, 2, 3, 5}
+        assert index.ancestors(7) == {2}
+        assert index.ancestors(1) == set()
+        assert index.is_ancestor(1, 6)
+        assert not index.is_ancestor(6, 1)
+        assert not index.is_ancestor(4, 6)
+
+    def test_unknown_record(self, index: AncestorIndex) -> None:
+        assert 99 not in index
+        with pytest.raises(KeyError):
+            index.ancestors(99)
+
+    @pytest.mark.parametrize(
+        "rid,expected", [(1, 0), (2, 0), (3, 1), (4, 2), (6, 3), (7, 1)]
+    )
+    def test_depth(self, index: AncestorIndex, rid: int, expected: int) -> None:
+        assert index.depth(rid) == expected
+
+    @pytest.mark.parametrize(
+        "rids,common,lowest",
+        [
+            ([4, 6], {1, 2, 3}, {3}),
+            ([4, 7], {2}, {2}),
+            ([3, 6], {1, 2, 3}, {3}),
+            ([1, 2], set(), set()),
+            ([4, 6, 7], {2}, {2}),
+        ],
+    )
+    def test_common_ancestors(
+        self,
+        index: AncestorIndex,
+        rids: List[int],
+        common: Set[int],
+        lowest: Set[int],
+    ) -> None:
+        assert index.common_ancestors(*rids) == common
+        assert index.lowest_common_ancestors(*rids) == lowest
+
+    @pytest.mark.parametrize(
+        "source,target,expected",
+        [
+            (6, 1, [6, 5, 3, 1]),
+            (1, 6, [1, 3, 5, 6]),
+            (4, 4, [4]),
+            (4, 6, None),
+            (7, 1, None),
+        ],
+    )
+    def test_shortest_path(
+        self,
+        index: AncestorIndex,
+        source: int,
+        target: int,
+        expected: Optional[List[int]],
+    ) -> None:
+        assert index.shortest_path(source, target) == expected
+
+    def test_shortest_path_picks_shortest(self) -> None:
+        # 1 advised 2, 2 advised 3, and 1 also advised 3 directly.
+        index = AncestorIndex(
+            make_graph(
+                make_record(3, [2, 1], []),
+                make_record(2, [1], [3]),
+                make_record(1, [], [2, 3]),
+            )
+        )
+        assert index.shortest_path(3, 1) == [3, 1]
+        assert index.depth(3) == 2
+
+    def test_cycle(self) -> None:
+        # 1 advised 2, 2 and 3 advised each other, and 3 advised 4.
+        index = AncestorIndex(
+            make_graph(
+                make_record(1, [], [2]),
+                make_record(2, [1, 3], [3]),
+                make_record(3, [2], [2, 4]),
+                make_record(4, [3], []),
+            )
+        )
+        assert index.ancestors(4) == {1, 2, 3}
+        assert index.ancestors(2) == {1, 2, 3}
+        assert index.lowest_common_ancestors(1, 4) == {1}
+        assert index.shortest_path(4, 1) == [4, 3, 2, 1]
+
+
+class TestRunQuery:
+    @pytest.fixture
+    def graph_file(self, tmp_path: Path) -> str:
+        path = tmp_path / "graph.json"
+        path.write_text(json.dumps(GRAPH))
+        return str(path)
+
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            (["lca", "4", "6"], "3\tName 3\n"),
+            (["common", "4", "6"], "1\tName 1\n2\tName 2\n3\tName 3\n"),
+            (["depth", "6", "7"], "6\t3\n7\t1\n"),
+            (["path", "6", "3"], "6\tName 6\n5\tName 5\n3\tName 3\n"),
+        ],
+    )
+    def test_query(
+        self,
+        capsys: pytest.CaptureFixture[str],
+        graph_file: str,
+        query: List[str],
+        expected: str,
+    ) -> None:
+        run_query([graph_file] + query)
+        assert capsys.readouterr().out == expected
+
+    def test_snapshot(self, capsys: pytest.CaptureFixture[str], tmp_path: Path) -> None:
+        path = tmp_path / "graph.snap"
+        with open(path, "w") as f:
+            SnapshotOutput(GRAPH).write(f)
+        run_query([str(path), "lca", "4", "7"])
+        assert capsys.readouterr().out == "2\tName 2\n"
+
+    @pytest.mark.parametrize(
+        "query,message",
+        [
+            (["lca", "1", "2"], "The records have no common ancestor.\n"),
+            (["path", "4", "6"], "Neither record is an ancestor of the other.\n"),
+        ],
+    )
+    def test_no_answer(
+        self,
+        capsys: pytest.CaptureFixture[str],
+        graph_file: str,
+        query: List[str],
+        message: str,
+    ) -> None:
+        with pytest.raises(SystemExit) as e:
+            run_query([graph_file] + query)
+        assert e.value.code == 1
+        assert capsys.readouterr().err == message
+
+    def test_unknown_record(
+        self, capsys: pytest.CaptureFixture[str], graph_file: str
+    ) -> None:
+        with pytest.raises(SystemExit) as e:
+            run_query([graph_file, "depth", "99"])
+        assert e.value.code == 2
+        assert "record 99 is not in" in capsys.readouterr().err
@@ -0,0 +1,73 @@
+from geneagrapher.output.ndjson import NdjsonGraph, NdjsonOutput
+from geneagrapher.output.snapshot import Snapshot, SnapshotOutput
+from geneagrapher.reader import load_graph, open_graph, read_graph
+from geneagrapher.types import Geneagraph, RecordId
+
+import json
+from pathlib import Path
+import pytest
+
+
+def test_read_graph(tmp_path: Path) -> None:
+    path = tmp_path / "graph.json"
+    path.write_text(
+        json.dumps(
+            {
+                "start_nodes": [6],
+                "nodes": {"6": {"id": 6, "advisors": [7]}},
+                "status": "complete",
+            }
+        )
+    )
+    assert read_graph(str(path)) == {
+        "start_nodes": [6],
+        "nodes": {6: {"id": 6, "advisors": [7]}},
+        "status": "complete",
+    }
+
+
+@pytest.mark.parametrize(
+    "contents", ["[]", '{"nodes": {}}', '{"start_nodes": [], "nodes": {"a": {}}}']
+)
+def test_read_graph_invalid(tmp_path: Path, contents: str) -> None:
+    path = tmp_path / "graph.json"
+    path.write_text(contents)
+    with pytest.raises(ValueError):
+        read_graph(str(path))
+
+
+def test_load_graph(tmp_path: Path) -> None:
+    graph: Geneagraph = {"start_nodes": [], "nodes": {}, "status": "complete"}
+    (tmp_path / "graph.json").write_text(json.dumps(graph))
+    with open(tmp_path / "graph.snap", "w") as f:
+        SnapshotOutput(graph).write(f)
+
+    assert load_graph(str(tmp_path / "graph.json")) == graph
+    snapshot = load_graph(str(tmp_path / "graph.snap"))
+    assert isinstance(snapshot, Snapshot)
+    assert snapshot.to_geneagraph() == graph
+
+
+def test_open_graph_ndjson(tmp_path: Path) -> None:
+    graph: Geneagraph = {
+        "start_nodes": [RecordId(6)],
+        "nodes": {
+            RecordId(6): {
+                "id": RecordId(6),
+                "name": "Name",
+                "institution": None,
+                "year": None,
+                "descendants": [],
+                "advisors": [],
+            }
+        },
+        "status": "complete",
+    }
+    path = str(tmp_path / "graph.ndjson")
+    with open(path, "w") as f:
+        NdjsonOutput(graph).write(f)
+
+    saved = open_graph(path)
+    assert isinstance(saved, NdjsonGraph)
+    assert saved.to_geneagraph() == graph
+    assert load_graph(path) == graph
@@ -0,0 +1,169 @@
+from geneagrapher.render import (
+    RenderError,
+    RenderJob,
+    print_render_report,
+    render_formats,
+    render_jobs,
+    run_graphviz,
+)
+
+import io
+from pathlib import Path
+import pytest
+import subprocess
+from typing import Callable, List, Optional
+from unittest.mock import MagicMock, patch
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("pdf", ["pdf"]),
+        ("pdf,png, svg", ["pdf", "png", "svg"]),
+        ("png:cairo", ["png:cairo"]),
+    ],
+)
+def test_render_formats(value: str, expected: List[str]) -> None:
+    assert render_formats(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", ",", "pdf;rm", "PDF"])
+def test_render_formats_invalid(value: str) -> None:
+    with pytest.raises(ValueError):
+        render_formats(value)
+
+
+class TestRunGraphviz:
+    @patch("subprocess.run")
+    def test_success(self, m_run: MagicMock) -> None:
+        m_run.return_value = subprocess.CompletedProcess([], 0, b"out", b"")
+        assert run_graphviz(["dot", "-Tdot"], b"in") == b"out"
+        m_run.assert_called_once_with(
+            ["dot", "-Tdot"], input=b"in", capture_output=True
+        )
+
+    @patch("subprocess.run")
+    def test_failure(self, m_run: MagicMock) -> None:
+        m_run.return_value = subprocess.CompletedProcess([], 1, b"", b"syntax error\n")
+        with pytest.raises(RenderError, match="^syntax error$"):
+            run_graphviz(["dot"])
+
+    @patch("subprocess.run", side_effect=FileNotFoundError)
+    def test_not_installed(self, m_run: MagicMock) -> None:
+        with pytest.raises(RenderError, match="'neato' program was not found"):
+            run_graphviz(["neato"])
+
+    @patch("subprocess.run", side_effect=PermissionError("Permission denied"))
+    def test_not_runnable(self, m_run: MagicMock) -> None:
+        with pytest.raises(
+            RenderError, match="'dot' program could not be run: Permission denied"
+        ):
+            run_graphviz(["dot"])
+
+
+@pytest.mark.parametrize(
+    "format,expected", [("pdf", "out/me.pdf"), ("png:cairo", "out/me.png")]
+)
+def test_output_path(format: str, expected: str) -> None:
+    assert RenderJob("out/me.dot", [format]).output_path(format) == expected
+
+
+def fake_graphviz(fail: Optional[str] = None) -> Callable[..., bytes]:
+    """Return a stand-in for `run_graphviz` that fails for commands
+    with the argument `fail`.
+    """
+
+    def run(args: List[str], input: Optional[bytes] = None) -> bytes:
+        if fail is not None and fail in args:
+            raise RenderError("it failed")
+        if args[0] == "dot":
+            return f"layout of {args[-1]}".encode()
+        assert input is not None
+        return b""
+
+    return run
+
+
+class TestRenderJobs:
+    def test_render(self) -> None:
+        jobs = [RenderJob("a.dot", ["pdf", "png"]), RenderJob("b.dot", ["svg"])]
+        with patch(
+            "geneagrapher.render.run_graphviz", side_effect=fake_graphviz()
+        ) as m_run:
+            render_jobs(jobs, workers=2)
+
+        calls = sorted(c.args for c in m_run.call_args_list)
+        assert calls == [
+            (["dot", "-Tdot", "a.dot"],),
+            (["dot", "-Tdot", "b.dot"],),
+            (["neato", "-n2", "-Tpdf", "-o", "a.pdf"], b"layout of a.dot"),
+            (["neato", "-n2", "-Tpng", "-o", "a.png"], b"layout of a.dot"),
+            (["neato", "-n2", "-Tsvg", "-o", "b.svg"], b"layout of b.dot"),
+        ]
+        assert [sorted(job.render_times) for job in jobs] == [["pdf", "png"], ["svg"]]
+        assert all(job.layout_time is not None and not job.errors for job in jobs)
+
+    def test_render_positioned(self, tmp_path: Path) -> None:
+        path = tmp_path / "a.dot"
+        path.write_text("digraph {}")
+        job = RenderJob(str(path), ["pdf"], positioned=True)
+        with patch(
+            "geneagrapher.render.run_graphviz", side_effect=fake_graphviz()
+        ) as m_run:
+            render_jobs([job])
+
+        # The file is rendered as it is, without a Graphviz layout.
+        m_run.assert_called_once_with(
+            ["neato", "-n2", "-Tpdf", "-o", str(tmp_path / "a.pdf")], b"digraph {}"
+        )
+        assert job.layout_time is not None and not job.errors
+
+    def test_layout_failure(self) -> None:
+        jobs = [RenderJob("a.dot", ["pdf"]), RenderJob("b.dot", ["pdf"])]
+        with patch(
+            "geneagrapher.render.run_graphviz", side_effect=fake_graphviz(fail="a.dot")
+        ) as m_run:
+            render_jobs(jobs)
+
+        assert m_run.call_count == 3
+        assert jobs[0].errors == ["layout failed: it failed"]
+        assert jobs[0].layout_time is None
+        assert jobs[1].errors == []
+
+    def test_render_failure(self) -> None:
+        job = RenderJob("a.dot", ["pdf", "png"])
+        with patch(
+            "geneagrapher.render.run_graphviz", side_effect=fake_graphviz(fail="-Tpng")
+        ):
+            render_jobs([job])
+
+        assert job.errors == ["png render failed: it failed"]
+        assert list(job.render_times) == ["pdf"]
+
+    def test_render_overwrite(self) -> None:
+        job = RenderJob("a.png", ["png", "pdf"])
+        with patch(
+            "geneagrapher.render.run_graphviz", side_effect=fake_graphviz()
+        ) as m_run:
+            render_jobs([job])
+
+        assert job.errors == ["png render failed: it would overwrite the DOT file"]
+        assert list(job.render_times) == ["pdf"]
+        assert m_run.call_count == 2
+
+
+def test_print_render_report() -> None:
+    rendered = RenderJob("a.dot", ["pdf", "png"])
+    rendered.layout_time = 1.5
+    rendered.render_times = {"png": 0.25, "pdf": 0.5}
+    failed = RenderJob("b.dot", ["pdf"])
+    failed.errors = ["layout failed: it failed"]
+
+    out = io.StringIO()
+    print_render_report([rendered, failed], out)
+    assert (
+        out.getvalue()
+        == """a.dot: layout 1.50 s, pdf 0.50 s, png 0.25 s
+b.dot: layout failed: it failed
+"""
+    )
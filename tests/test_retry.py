@@ -0,0 +1,165 @@
+from geneagrapher.retry import RetryPolicy, latest_progress
+from geneagrapher.timing import Timings
+from geneagrapher.types import Geneagraph, ProgressCallback, ProgressHandler
+
+import asyncio
+import pytest
+from typing import Any, Dict, List, Optional
+from websockets.exceptions import ConnectionClosedError
+
+GRAPH: Geneagraph = {"start_nodes": [], "nodes": {}, "status": "complete"}
+
+
+def progress(done: int) -> ProgressCallback:
+    return {"queued": 10 - done, "fetching": 0, "done": done}
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"connect_timeout": 0},
+        {"idle_timeout": -1},
+        {"total_timeout": 0},
+        {"hedge_after": 0},
+        {"retries": -1},
+        {"backoff": -0.5},
+    ],
+)
+def test_invalid_arguments(options: Dict[str, Any]) -> None:
+    with pytest.raises(ValueError):
+        RetryPolicy(**options)
+
+
+def test_delay() -> None:
+    policy = RetryPolicy(backoff=1, max_backoff=4)
+    delays = [[policy.delay(retry) for _ in range(100)] for retry in range(4)]
+    assert all(0 <= d <= 1 for d in delays[0])
+    assert all(0 <= d <= 2 for d in delays[1])
+    assert all(0 <= d <= 4 for d in delays[3])
+    # The delays are spread over the range, not fixed.
+    assert max(delays[3]) > 2 > min(delays[3])
+
+
+def test_latest_progress() -> None:
+    reports: List[ProgressCallback] = []
+    on_progress = latest_progress(reports.append)
+    for done in [1, 3, 2, 3, 5]:
+        on_progress(progress(done))
+    assert [p["done"] for p in reports] == [1, 3, 3, 5]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("retries,succeeds", [(2, True), (1, False)])
+async def test_retries(retries: int, succeeds: bool) -> None:
+    attempts = 0
+
+    async def attempt(on_progress: Optional[ProgressHandler]) -> Geneagraph:
+        nonlocal attempts
+        attempts += 1
+        if attempts <= 2:
+            raise ConnectionClosedError(None, None)
+        return GRAPH
+
+    policy = RetryPolicy(retries=retries, backoff=0.001)
+    timings = Timings()
+    if succeeds:
+        assert await policy.run(attempt, timings=timings) is GRAPH
+    else:
+        with pytest.raises(ConnectionClosedError):
+            await policy.run(attempt, timings=timings)
+    assert attempts == retries + 1
+    assert timings.counts == {"retries": retries}
+
+
+@pytest.mark.asyncio
+async def test_not_retried() -> None:
+    attempts = 0
+
+    async def attempt(on_progress: Optional[ProgressHandler]) -> Geneagraph:
+        nonlocal attempts
+        attempts += 1
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await RetryPolicy(retries=3, backoff=0).run(attempt)
+    assert attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_total_timeout() -> None:
+    attempts = 0
+
+    async def attempt(on_progress: Optional[ProgressHandler]) -> Geneagraph:
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.02)
+        raise asyncio.TimeoutError()
+
+    policy = RetryPolicy(total_timeout=0.1, retries=100, backoff=0.001)
+    with pytest.raises(asyncio.TimeoutError):
+        await policy.run(attempt)
+    # The retries stop at the deadline.
+    assert 2 <= attempts < 10
+
+
+@pytest.mark.asyncio
+async def test_hedge() -> None:
+    started: List[int] = []
+    cancelled: List[int] = []
+
+    async def attempt(on_progress: Optional[ProgressHandler]) -> Geneagraph:
+        i = len(started)
+        started.append(i)
+        assert on_progress is not None
+        try:
+            if i == 0:
+                # The first attempt stalls after some progress.
+                on_progress(progress(5))
+                await asyncio.Future()
+            await asyncio.sleep(0.01)
+            on_progress(progress(2))  # less than the first attempt's
+            on_progress(progress(6))
+            return GRAPH
+        except asyncio.CancelledError:
+            cancelled.append(i)
+            raise
+
+    reports: List[ProgressCallback] = []
+    timings = Timings()
+    policy = RetryPolicy(hedge_after=0.02)
+    assert await policy.run(attempt, reports.append, timings=timings) is GRAPH
+    assert started == [0, 1]
+    assert cancelled == [0]
+    assert [p["done"] for p in reports] == [5, 6]
+    assert timings.counts == {"hedged attempts": 1}
+
+
+@pytest.mark.asyncio
+async def test_hedge_not_needed() -> None:
+    attempts = 0
+
+    async def attempt(on_progress: Optional[ProgressHandler]) -> Geneagraph:
+        nonlocal attempts
+        attempts += 1
+        return GRAPH
+
+    assert await RetryPolicy(hedge_after=0.01).run(attempt) is GRAPH
+    await asyncio.sleep(0.02)
+    assert attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_fails() -> None:
+    attempts = 0
+
+    async def attempt(on_progress: Optional[ProgressHandler]) -> Geneagraph:
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(0.02)
+        raise ConnectionClosedError(None, None)
+
+    # Both attempts of each try fail, and each try is hedged.
+    policy = RetryPolicy(hedge_after=0.01, retries=1, backoff=0.001)
+    with pytest.raises(ConnectionClosedError):
+        await policy.run(attempt)
+    assert attempts == 4
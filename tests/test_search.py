@@ -0,0 +1,260 @@
+from geneagrapher.cache import RecordCache
+from geneagrapher.output.ndjson import NdjsonOutput
+from geneagrapher.search import (
+    MIN_SCORE,
+    RELATIVE_SCORE,
+    SearchIndex,
+    get_trigrams,
+    normalize,
+    resolve_name,
+    run_search,
+)
+from geneagrapher.types import Geneagraph, RecordId
+
+from .helpers import make_record
+
+import json
+from pathlib import Path
+import pytest
+import random
+from typing import List, Tuple
+from unittest.mock import patch
+
+NAMES = [
+    (30, "Carl Friedrich Gauß", "Universität Helmstedt"),
+    (31, "Carl Gustav Jacob Jacobi", "Universität Berlin"),
+    (32, "Friedrich Wilhelm Bessel", "Universität Göttingen"),
+    (33, "Bernhard Riemann", "Universität Göttingen"),
+    (34, "Richard Dedekind", "Universität Göttingen"),
+]
+
+
+@pytest.fixture
+def index_path(tmp_path: Path) -> str:
+    path = str(tmp_path / "index" / "search.db")
+    with SearchIndex(path) as index:
+        index.add_many(
+            make_record(rid, name=name, institution=institution)
+            for rid, name, institution in NAMES
+        )
+    return path
+
+
+def test_normalize() -> None:
+    assert normalize("  Gauß, Carl-Friedrich ") == "gauss carl friedrich"
+    assert normalize("Émile Borel") == "emile borel"
+
+
+def test_get_trigrams() -> None:
+    assert get_trigrams("Gauß") == {"  g", " ga", "gau", "aus", "uss", "ss "}
+    assert get_trigrams("a b") == {"  a", " a ", "  b", " b "}
+    assert get_trigrams(" - ") == set()
+
+
+def test_search(index_path: str) -> None:
+    with SearchIndex(index_path) as index:
+        assert len(index) == 5
+        assert [m["id"] for m in index.search("gauss")] == [30]
+        # Prefixes and misspellings match.
+        assert [m["id"] for m in index.search("Dedek")] == [34]
+        assert [m["id"] for m in index.search("Reimann")] == [33]
+        assert sorted(m["id"] for m in index.search("Carl")) == [30, 31]
+        # Shorter names that contain the query rank first.
+        assert [m["id"] for m in index.search("Friedrich")] == [30, 32]
+        assert [m["id"] for m in index.search("Friedrich", limit=1)] == [30]
+        assert index.search("Hilbert") == []
+        assert index.search("") == []
+
+        matches = index.search("Riemann", "Göttingen")
+        assert matches[0] == {
+            "id": 33,
+            "name": "Bernhard Riemann",
+            "institution": "Universität Göttingen",
+            "year": None,
+            "score": 1.0,
+        }
+        assert [m["id"] for m in index.search(institution="gottingen")] == [32, 33, 34]
+
+
+def test_add_incremental(index_path: str) -> None:
+    with SearchIndex(index_path) as index:
+        # Unchanged records are skipped.
+        assert (
+            index.add_many(
+                make_record(rid, name=name, institution=institution)
+                for rid, name, institution in NAMES
+            )
+            == 0
+        )
+
+        assert index.add_many([make_record(34, name="Julius Dedekind")]) == 1
+        assert 34 not in [m["id"] for m in index.search("Richard")]
+        assert [m["id"] for m in index.search("Julius Dedekind")] == [34]
+        assert len(index) == 5
+
+
+def test_search_matches_exhaustive(tmp_path: Path) -> None:
+    # Searches read only some posting lists, which must give the same
+    # results as scoring every record.
+    rng = random.Random(0)
+    syllables = ["an", "ber", "ca", "de", "ler", "mann", "ri", "stein", "to"]
+    given = ["Carl", "Maria", "Anna", "Johann"]
+    records = [
+        make_record(
+            rid,
+            name=" ".join(
+                rng.sample(given, rng.randint(1, 2))
+                + ["".join(rng.sample(syllables, rng.randint(2, 3)))]
+            ),
+        )
+        for rid in range(1, 1001)
+    ]
+
+    def exhaustive(query: str, limit: int) -> List[Tuple[int, float]]:
+        trigrams = get_trigrams(query)
+        scored = []
+        for record in records:
+            stored = get_trigrams(record["name"])
+            shared = len(trigrams & stored)
+            overlap = shared / len(trigrams | stored)
+            scored.append((shared / len(trigrams), overlap, record["id"]))
+        top = max(score for score, _, _ in scored)
+        ranked = sorted(
+            (s for s in scored if s[0] >= max(MIN_SCORE, RELATIVE_SCORE * top)),
+            key=lambda s: (-s[0], -s[1], s[2]),
+        )[:limit]
+        return [(rid, score) for score, _, rid in ranked]
+
+    with SearchIndex(str(tmp_path / "search.db")) as index:
+        index.add_many(records)
+        queries = [r["name"] for r in rng.sample(records, 20)]
+        queries += ["Carl", "Maria Anna", "bermann", "steinca", "Johan Deri"]
+        for query in queries:
+            for limit in [1, 3, 10]:
+                matches = index.search(query, limit=limit)
+                expected = exhaustive(query, limit)
+                assert [m["id"] for m in matches] == [rid for rid, _ in expected]
+                assert [m["score"] for m in matches] == pytest.approx(
+                    [score for _, score in expected]
+                )
+
+
+def test_resolve_name(index_path: str, tmp_path: Path) -> None:
+    assert resolve_name("riemann", index_path) == 33
+    with pytest.raises(ValueError, match="no record matches the name 'Hilbert'"):
+        resolve_name("Hilbert", index_path)
+
+    with SearchIndex(index_path) as index:
+        index.add_many([make_record(35, name="Bernhard Riemann")])
+    with pytest.raises(
+        ValueError,
+        match=r"ambiguous: Bernhard Riemann \(33\), Bernhard Riemann \(35\)",
+    ):
+        resolve_name("Riemann", index_path)
+
+    missing = str(tmp_path / "missing.db")
+    with pytest.raises(ValueError, match="no search index at"):
+        resolve_name("Riemann", missing)
+    assert not Path(missing).exists()
+
+
+@pytest.mark.parametrize(
+    "scores,resolved",
+    [
+        ([0.5], True),
+        ([1.0, 0.88], True),  # near-exact
+        ([0.8, 0.6], True),  # clear margin
+        ([1.0, 0.95], False),
+        ([0.8, 0.7, 0.65], False),
+    ],
+)
+def test_resolve_name_margin(
+    index_path: str, scores: List[float], resolved: bool
+) -> None:
+    matches = [
+        {
+            "id": rid,
+            "name": f"Name {rid}",
+            "institution": None,
+            "year": None,
+            "score": score,
+        }
+        for rid, score in enumerate(scores, 1)
+    ]
+    with patch.object(SearchIndex, "search", return_value=matches) as m_search:
+        if resolved:
+            assert resolve_name("Name", index_path) == 1
+        else:
+            candidates = ", ".join(
+                f"Name {rid} \\({rid}\\)" for rid, _ in enumerate(scores, 1)
+            )
+            with pytest.raises(ValueError, match=f"ambiguous: {candidates}$"):
+                resolve_name("Name", index_path)
+    m_search.assert_called_once_with("Name", limit=5)
+
+
+def test_run_search(
+    index_path: str, tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    run_search(["--index", index_path, "riemann"])
+    assert (
+        capsys.readouterr().out == "     33  Bernhard Riemann, Universität Göttingen\n"
+    )
+
+    with pytest.raises(SystemExit) as exc_info:
+        run_search(["--index", index_path, "Hilbert"])
+    assert exc_info.value.code == 1
+
+    # Records are added from saved graphs and record caches.
+    graph: Geneagraph = {
+        "start_nodes": [RecordId(7)],
+        "nodes": {RecordId(7): make_record(7, name="David Hilbert", year=1885)},
+        "status": "complete",
+    }
+    json_path = tmp_path / "graph.json"
+    json_path.write_text(json.dumps(graph))
+    ndjson_path = tmp_path / "graph.ndjson"
+    ndjson_path.write_text(NdjsonOutput(graph).output)
+    cache_path = str(tmp_path / "cache.sqlite3")
+    with RecordCache(cache_path) as cache:
+        cache.put_many([make_record(8, name="Hermann Minkowski")])
+
+    run_search(["--index", index_path, "--add", str(json_path), "Hilbert"])
+    captured = capsys.readouterr()
+    assert captured.out == "      7  David Hilbert (1885)\n"
+    assert captured.err == f"{json_path}: 1 records indexed\n"
+    run_search(["--index", index_path, "--add", str(ndjson_path)])
+    assert capsys.readouterr().err == f"{ndjson_path}: 0 records indexed\n"
+    run_search(["--index", index_path, "--add", cache_path, "-n", "1", "minkowsky"])
+    assert capsys.readouterr().out == "      8  Hermann Minkowski\n"
+
+
+@pytest.mark.parametrize(
+    "args,message",
+    [
+        ([], "a NAME, --institution, or --add is required"),
+        (["-n", "0", "Gauss"], "--limit must be at least 1"),
+        (["--add", "missing.json"], "missing.json: "),
+    ],
+)
+def test_run_search_invalid(
+    index_path: str,
+    args: List[str],
+    message: str,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    with pytest.raises(SystemExit):
+        run_search(["--index", index_path] + args)
+    assert message in capsys.readouterr().err
+
+
+def test_name_start_node(index_path: str) -> None:
+    from geneagrapher.geneagrapher import StartNodeArg
+
+    with patch("geneagrapher.search.INDEX_PATH", index_path):
+        arg = StartNodeArg("name:Carl Friedrich Gauss:ad")
+        assert arg.start_node == {
+            "recordId": 30,
+            "getAdvisors": True,
+            "getDescendants": True,
+        }
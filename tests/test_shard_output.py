@@ -0,0 +1,168 @@
+from geneagrapher.output.shard import (
+    ShardedDotOutput,
+    ShardStrategy,
+    breadth_first,
+    get_neighbors,
+    partition,
+)
+from geneagrapher.types import CompactGraph, Geneagraph, RecordId
+
+from .helpers import make_record
+
+from pathlib import Path
+import pytest
+from typing import List, Optional
+
+
+# 1 advised 2, 2 advised 3 and 4, and 4 advised 5. 6 advised 7, in a
+# separate component. 99 is not in the graph.
+GRAPH: Geneagraph = {
+    "start_nodes": [RecordId(5), RecordId(7)],
+    "nodes": {
+        r["id"]: r
+        for r in [
+            make_record(1, [99], [2]),
+            make_record(2, [1], [3, 4]),
+            make_record(3, [2], []),
+            make_record(4, [2], [5]),
+            make_record(5, [4], []),
+            make_record(6, [], [7]),
+            make_record(7, [6], []),
+        ]
+    },
+    "status": "complete",
+}
+
+
+@pytest.mark.parametrize(
+    "val,kind,size",
+    [
+        ("components", "components", None),
+        ("generations:2", "generations", 2),
+        ("size:100", "size", 100),
+    ],
+)
+def test_shard_strategy(val: str, kind: str, size: Optional[int]) -> None:
+    strategy = ShardStrategy(val)
+    assert strategy.kind == kind
+    assert strategy.size == size
+
+
+@pytest.mark.parametrize("val", ["", "component", "size", "size:0", "generations:x"])
+def test_shard_strategy_invalid(val: str) -> None:
+    with pytest.raises(ValueError):
+        ShardStrategy(val)
+
+
+def test_get_neighbors() -> None:
+    assert get_neighbors(GRAPH) == {
+        1: [2],
+        2: [1, 3, 4],
+        3: [2],
+        4: [2, 5],
+        5: [4],
+        6: [7],
+        7: [6],
+    }
+
+
+def test_breadth_first() -> None:
+    visits = breadth_first(get_neighbors(GRAPH), [RecordId(5), RecordId(99)])
+    assert visits == {
+        5: (0, None),
+        4: (1, 5),
+        2: (2, 4),
+        1: (3, 2),
+        3: (3, 2),
+        6: (0, None),
+        7: (1, 6),
+    }
+    assert list(visits) == [5, 4, 2, 1, 3, 6, 7]
+
+
+@pytest.mark.parametrize(
+    "strategy,expected",
+    [
+        ("components", [[1, 2, 3, 4, 5], [6, 7]]),
+        ("generations:1", [[5, 7], [4, 6], [2], [1, 3]]),
+        ("generations:2", [[4, 5, 6, 7], [1, 2, 3]]),
+        ("size:3", [[2, 4, 5], [1, 3, 7], [6]]),
+    ],
+)
+def test_partition(strategy: str, expected: List[List[int]]) -> None:
+    assert partition(GRAPH, ShardStrategy(strategy)) == expected
+    assert partition(CompactGraph(GRAPH), ShardStrategy(strategy)) == expected
+
+
+class TestShardedDotOutput:
+    def test_shard(self) -> None:
+        sharded = ShardedDotOutput(GRAPH, ShardStrategy("size:3"))
+        assert sharded.shard_of == {2: 1, 4: 1, 5: 1, 1: 2, 3: 2, 7: 2, 6: 3}
+
+        shard = sharded.shard(2)
+        assert shard.graph["start_nodes"] == [7]
+        assert list(shard.graph["nodes"]) == [1, 3, 7]
+        assert shard.crossing_edges == [(1, 2), (2, 3), (6, 7)]
+        assert (
+            shard.output
+            == r"""digraph {
+    graph [ordering="out"];
+    node [shape=plaintext];
+    edge [style=bold];
+
+    1 [label="Name 1"];
+    3 [label="Name 3"];
+    7 [label="Name 7"];
+    2 [label="Name 2\n(shard 1)", fontcolor=gray40];
+    6 [label="Name 6\n(shard 3)", fontcolor=gray40];
+
+    1 -> 2 [style=dashed];
+    2 -> 3 [style=dashed];
+    6 -> 7 [style=dashed];
+}"""
+        )
+
+    def test_unsharded(self) -> None:
+        sharded = ShardedDotOutput(GRAPH, ShardStrategy("components"))
+        assert sharded.shard(2).crossing_edges == []
+        assert "style=dashed" not in sharded.shard(1).output
+
+    def test_write_files(self, tmp_path: Path) -> None:
+        sharded = ShardedDotOutput(GRAPH, ShardStrategy("size:3"))
+        with open(tmp_path / "graph.dot", "w") as f:
+            paths = sharded.write_files(f)
+
+        assert paths == [str(tmp_path / f"graph-00{i}.dot") for i in [1, 2, 3]]
+        assert (tmp_path / "graph-002.dot").read_text() == sharded.shard(
+            2
+        ).output + "\n"
+        assert (
+            (tmp_path / "graph.dot").read_text()
+            == r"""digraph {
+    node [shape=box];
+
+    shard1 [label="graph-001.dot\n3 records"];
+    shard2 [label="graph-002.dot\n3 records"];
+    shard3 [label="graph-003.dot\n1 records"];
+
+    shard1 -> shard2;
+    shard2 -> shard1;
+    shard3 -> shard2;
+}
+"""
+        )
+
+    def test_empty(self, tmp_path: Path) -> None:
+        graph: Geneagraph = {"start_nodes": [], "nodes": {}, "status": "complete"}
+        with open(tmp_path / "graph.dot", "w") as f:
+            assert (
+                ShardedDotOutput(graph, ShardStrategy("components")).write_files(f)
+                == []
+            )
+        assert (
+            (tmp_path / "graph.dot").read_text()
+            == """digraph {
+    node [shape=box];
+}
+"""
+        )
@@ -0,0 +1,124 @@
+from geneagrapher.output.dot import DotOutput
+from geneagrapher.output.identity import IdentityOutput
+from geneagrapher.output.snapshot import HEADER, Snapshot, SnapshotOutput
+from geneagrapher.types import CompactGraph, Geneagraph, RecordId
+
+from io import BytesIO, TextIOWrapper
+from pathlib import Path
+import pytest
+
+
+@pytest.fixture
+def graph() -> Geneagraph:
+    return {
+        "start_nodes": [RecordId(30), RecordId(10)],
+        "status": "truncated",
+        "nodes": {
+            RecordId(30): {
+                "id": RecordId(30),
+                "name": "Carl Friedrich Gauß",
+                "institution": "Universität Helmstedt",
+                "year": 1799,
+                "descendants": [],
+                "advisors": [10, 20],
+            },
+            RecordId(10): {
+                "id": RecordId(10),
+                "name": "The Second Name",
+                "institution": None,
+                "year": None,
+                "descendants": [30],
+                "advisors": [],
+            },
+            RecordId(20): {
+                "id": RecordId(20),
+                "name": "The Second Name",
+                "institution": "Universität Helmstedt",
+                "year": 1750,
+                "descendants": [30, 40],
+                "advisors": [5],
+            },
+        },
+    }
+
+
+def write_snapshot(graph: Geneagraph, path: Path) -> None:
+    with open(path, "w") as f:
+        SnapshotOutput(graph).write(f)
+
+
+class TestSnapshotOutput:
+    def test_init(self, graph: Geneagraph) -> None:
+        assert SnapshotOutput(graph).graph is graph
+
+    def test_write(self, graph: Geneagraph) -> None:
+        buffer = BytesIO()
+        fp = TextIOWrapper(buffer)
+        fp.write("")
+        SnapshotOutput(graph).write(fp)
+
+        data = buffer.getvalue()
+        assert data.startswith(b"GGRSNAP\0")
+        assert len(data) % 8 == 0
+        assert HEADER.unpack_from(data)[3] == 3  # record count
+
+    def test_compact_input(self, graph: Geneagraph) -> None:
+        assert (
+            SnapshotOutput(CompactGraph(graph)).sections()
+            == SnapshotOutput(graph).sections()
+        )
+
+
+class TestSnapshot:
+    def test_round_trip(self, graph: Geneagraph, tmp_path: Path) -> None:
+        write_snapshot(graph, tmp_path / "graph.snap")
+
+        with Snapshot(str(tmp_path / "graph.snap")) as snapshot:
+            assert snapshot.to_geneagraph() == graph
+            assert list(snapshot["nodes"]) == list(graph["nodes"])
+            assert snapshot["start_nodes"] == graph["start_nodes"]
+            assert snapshot["status"] == "truncated"
+
+    def test_lookup(self, graph: Geneagraph, tmp_path: Path) -> None:
+        write_snapshot(graph, tmp_path / "graph.snap")
+
+        with Snapshot(str(tmp_path / "graph.snap")) as snapshot:
+            nodes = snapshot["nodes"]
+            assert nodes[RecordId(30)] == graph["nodes"][RecordId(30)]
+            assert 20 in nodes
+            assert 40 not in nodes
+            assert list(snapshot.name_table) == [
+                "Carl Friedrich Gauß",
+                "The Second Name",
+            ]
+
+    def test_empty_graph(self, tmp_path: Path) -> None:
+        graph: Geneagraph = {"start_nodes": [], "status": "complete", "nodes": {}}
+        write_snapshot(graph, tmp_path / "graph.snap")
+
+        with Snapshot(str(tmp_path / "graph.snap")) as snapshot:
+            assert snapshot.to_geneagraph() == graph
+
+    def test_formatters(self, graph: Geneagraph, tmp_path: Path) -> None:
+        write_snapshot(graph, tmp_path / "graph.snap")
+
+        with Snapshot(str(tmp_path / "graph.snap")) as snapshot:
+            assert DotOutput(snapshot).output == DotOutput(graph).output
+            assert IdentityOutput(snapshot).output == IdentityOutput(graph).output
+
+    @pytest.mark.parametrize(
+        "contents",
+        [b"", b"not a snapshot" * 10, b"GGRSNAP\0" + b"\0" * 100],
+    )
+    def test_invalid(self, contents: bytes, tmp_path: Path) -> None:
+        (tmp_path / "bad.snap").write_bytes(contents)
+        with pytest.raises(ValueError, match="not a geneagrapher snapshot"):
+            Snapshot(str(tmp_path / "bad.snap"))
+
+    def test_truncated(self, graph: Geneagraph, tmp_path: Path) -> None:
+        write_snapshot(graph, tmp_path / "graph.snap")
+        data = (tmp_path / "graph.snap").read_bytes()
+        (tmp_path / "graph.snap").write_bytes(data[:-16])
+
+        with pytest.raises(ValueError, match="truncated snapshot"):
+            Snapshot(str(tmp_path / "graph.snap"))
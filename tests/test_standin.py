@@ -0,0 +1,111 @@
+from geneagrapher.backend import connect, get_graph, request_graph
+from geneagrapher.geneagrapher import StartNodeArg, make_payload
+from geneagrapher.standin import StandinServer, get_uri, synthetic_records
+from geneagrapher.traverse import build_graph
+from geneagrapher.types import RecordId
+
+import asyncio
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+import websockets.client
+from websockets.exceptions import ConnectionClosedError
+
+
+def test_synthetic_records() -> None:
+    records = synthetic_records(50)
+    assert list(records) == list(range(1, 51))
+    assert records[RecordId(1)]["advisors"] == []
+    for rid, record in records.items():
+        assert all(aid < rid for aid in record["advisors"])
+        assert all(
+            rid in records[RecordId(aid)]["descendants"] for aid in record["advisors"]
+        )
+    assert records == synthetic_records(50)
+
+    graph, missing = build_graph([StartNodeArg("1:d").start_node], lambda ids: records)
+    assert len(graph["nodes"]) == 50
+
+
+class TestStandinServer:
+    @pytest.mark.asyncio
+    @patch("geneagrapher.backend.display_progress")
+    async def test_get_graph(self, m_display_progress: MagicMock) -> None:
+        records = synthetic_records(100)
+        standin = StandinServer(records, progress_messages=3)
+        payload = make_payload([StartNodeArg("40:a"), StartNodeArg("90:d")], False)
+
+        async with standin.serve() as server:
+            with patch(
+                "geneagrapher.backend.GGRAPHER_URI", get_uri(server, "127.0.0.1")
+            ):
+                graph = await get_graph(payload)
+
+        expected, _ = build_graph(payload["startNodes"], lambda ids: records)
+        assert graph == expected
+        assert m_display_progress.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_connection_reuse_and_truncation(self) -> None:
+        standin = StandinServer(synthetic_records(100), max_records=10)
+
+        async with standin.serve() as server:
+            with patch(
+                "geneagrapher.backend.GGRAPHER_URI", get_uri(server, "127.0.0.1")
+            ):
+                async with connect() as ws:
+                    for rid in (1, 2):
+                        payload = make_payload([StartNodeArg(f"{rid}:d")], True)
+                        graph = await request_graph(ws, payload)
+                        assert len(graph["nodes"]) == 10
+                        assert graph["status"] == "truncated"
+
+        assert standin.requests == 2
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "request_json",
+        ['{"kind": "other"}', '{"kind": "build-graph"}', "[]", "not json"],
+    )
+    async def test_bad_request(self, request_json: str) -> None:
+        standin = StandinServer(synthetic_records(10))
+
+        async with standin.serve() as server:
+            async with websockets.client.connect(get_uri(server, "127.0.0.1")) as ws:
+                await ws.send(request_json)
+                response = json.loads(await ws.recv())
+
+        assert response["kind"] == "error"
+        assert standin.requests == 0
+
+    @pytest.mark.asyncio
+    async def test_faults(self) -> None:
+        standin = StandinServer(synthetic_records(10), faults=["drop", None, "stall"])
+        payload = make_payload([StartNodeArg("1:d")], True)
+
+        async with standin.serve() as server:
+            uri = get_uri(server, "127.0.0.1")
+            async with websockets.client.connect(uri) as ws:
+                with pytest.raises(ConnectionClosedError):
+                    await request_graph(ws, payload)
+            async with websockets.client.connect(uri) as ws:
+                assert len((await request_graph(ws, payload))["nodes"]) == 10
+                with pytest.raises(asyncio.TimeoutError):
+                    await request_graph(ws, payload, idle_timeout=0.05)
+
+        assert standin.requests == 1
+        assert standin.faulted == 2
+
+    def test_fault_rates(self) -> None:
+        standin = StandinServer(synthetic_records(10), drop_rate=0.3, stall_rate=0.2)
+        faults = [standin.next_fault() for _ in range(1000)]
+        assert 250 < faults.count("drop") < 350
+        assert 150 < faults.count("stall") < 250
+
+    @pytest.mark.asyncio
+    async def test_handshake_latency(self) -> None:
+        standin = StandinServer(synthetic_records(10), handshake_latency=0.2)
+
+        async with standin.serve() as server:
+            with pytest.raises(asyncio.TimeoutError):
+                await connect(get_uri(server, "127.0.0.1"), timeout=0.05)
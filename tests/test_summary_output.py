@@ -0,0 +1,95 @@
+from geneagrapher.output.dot import DotOutput
+from geneagrapher.output.summary import summarize
+from geneagrapher.types import AnyGraph, CompactGraph, Geneagraph, RecordId
+
+from .helpers import make_record
+
+from copy import deepcopy
+import pytest
+from typing import Dict, List, Optional
+
+
+# 1 advised 2, 2 advised 3 and 4, and 4 advised 5 and 6. 7 advised 4, and
+# 8 advised 7. 9 is not connected to the others.
+GRAPH: Geneagraph = {
+    "start_nodes": [RecordId(1)],
+    "nodes": {
+        r["id"]: r
+        for r in [
+            make_record(1, [], [2]),
+            make_record(2, [1], [3, 4]),
+            make_record(3, [2], []),
+            make_record(4, [2, 7], [5, 6]),
+            make_record(5, [4], []),
+            make_record(6, [4], []),
+            make_record(7, [8], [4]),
+            make_record(8, [], [7]),
+            make_record(9, [], []),
+        ]
+    },
+    "status": "complete",
+}
+
+
+def summary_names(graph: Geneagraph) -> Dict[int, str]:
+    return {rid: r["name"] for rid, r in graph["nodes"].items() if rid < 0}
+
+
+@pytest.mark.parametrize(
+    "max_depth,max_nodes,kept,summaries",
+    [
+        (None, None, [1, 2, 3, 4, 5, 6, 7, 8, 9], {}),
+        (
+            1,
+            None,
+            [1, 2],
+            {-1: "+6 descendants", -2: "+1 more record"},
+        ),
+        (
+            2,
+            None,
+            [1, 2, 3, 4],
+            {-1: "+2 descendants", -2: "+2 advisors", -3: "+1 more record"},
+        ),
+        (
+            None,
+            5,
+            [1, 2, 3, 4, 5],
+            {-1: "+1 descendant", -2: "+2 advisors", -3: "+1 more record"},
+        ),
+        (
+            2,
+            4,
+            [1, 2, 3, 4],
+            {-1: "+2 descendants", -2: "+2 advisors", -3: "+1 more record"},
+        ),
+    ],
+)
+def test_summarize(
+    max_depth: Optional[int],
+    max_nodes: Optional[int],
+    kept: List[int],
+    summaries: Dict[int, str],
+) -> None:
+    original = deepcopy(GRAPH)
+    graphs: List[AnyGraph] = [GRAPH, CompactGraph(GRAPH)]
+    for graph in graphs:
+        summarized = summarize(graph, max_depth=max_depth, max_nodes=max_nodes)
+        assert sorted(rid for rid in summarized["nodes"] if rid > 0) == kept
+        assert summary_names(summarized) == summaries
+        assert summarized["start_nodes"] == [1]
+    assert GRAPH == original
+
+
+def test_summary_edges() -> None:
+    summarized = summarize(GRAPH, max_depth=2)
+    # The descendants of 4 hang below it, and its other advisor's line
+    # sits above it.
+    assert summarized["nodes"][RecordId(-1)]["advisors"] == [4]
+    assert summarized["nodes"][RecordId(4)]["advisors"] == [2, 7, -2]
+    assert GRAPH["nodes"][RecordId(4)]["advisors"] == [2, 7]
+
+    output = DotOutput(summarized).output
+    assert '-1 [label="+2 descendants", shape=box, style=dashed];' in output
+    assert "4 -> -1;" in output
+    assert "-2 -> 4;" in output
@@ -0,0 +1,70 @@
+from geneagrapher.output.svg import SvgOutput
+from geneagrapher.types import Geneagraph, RecordId
+
+from io import StringIO
+import pytest
+from xml.etree import ElementTree
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+@pytest.fixture
+def graph() -> Geneagraph:
+    return {
+        "start_nodes": [RecordId(2)],
+        "nodes": {
+            RecordId(1): {
+                "id": RecordId(1),
+                "name": "Carl Friedrich Gauß",
+                "institution": "Universität Helmstedt",
+                "year": 1799,
+                "descendants": [2],
+                "advisors": [],
+            },
+            RecordId(2): {
+                "id": RecordId(2),
+                "name": "A & B <C>",
+                "institution": None,
+                "year": None,
+                "descendants": [],
+                "advisors": [1],
+            },
+            RecordId(-1): {
+                "id": RecordId(-1),
+                "name": "+12 descendants",
+                "institution": None,
+                "year": None,
+                "descendants": [],
+                "advisors": [2],
+            },
+        },
+        "status": "complete",
+    }
+
+
+def test_output(graph: Geneagraph) -> None:
+    root = ElementTree.fromstring(SvgOutput(graph).output)
+    assert root.tag == f"{SVG}svg"
+
+    paths = root.findall(f"{SVG}g/{SVG}path")
+    assert len(paths) == 2
+
+    texts = root.findall(f"{SVG}g/{SVG}text")
+    assert ["".join(text.itertext()) for text in texts] == [
+        "+12 descendants",
+        "Carl Friedrich GaußUniversität Helmstedt (1799)",
+        "A & B <C>",
+    ]
+    # Advisors are drawn above their students.
+    ys = [float(text.attrib["y"]) for text in texts]
+    assert ys[1] < ys[2] < ys[0]
+
+    # The summary node is boxed.
+    assert len(root.findall(f"{SVG}g/{SVG}rect")) == 1
+
+
+def test_write(graph: Geneagraph) -> None:
+    output = SvgOutput(graph)
+    fp = StringIO()
+    output.write(fp)
+    assert fp.getvalue() == output.output + "\n"
@@ -0,0 +1,179 @@
+from geneagrapher.timing import TimedWriter, Timings, timed
+
+import asyncio
+import io
+import json
+from pathlib import Path
+from typing import Optional
+
+
+def make_timings() -> Timings:
+    timings = Timings()
+    with timings.phase("request"):
+        with timings.phase("receive"):
+            pass
+        with timings.phase("decode"):
+            pass
+        with timings.phase("receive"):
+            pass
+    with timings.phase("output"):
+        pass
+    timings.count("records", 3)
+    timings.count("records")
+    return timings
+
+
+def test_phase_parents() -> None:
+    timings = make_timings()
+    assert [(s["name"], s["parent"]) for s in timings.spans] == [
+        ("receive", "request"),
+        ("decode", "request"),
+        ("receive", "request"),
+        ("request", None),
+        ("output", None),
+    ]
+    assert all(s["wall"] >= 0 for s in timings.spans)
+    assert timings.counts == {"records": 4}
+
+
+def test_phase_exception() -> None:
+    timings = Timings()
+    try:
+        with timings.phase("request"):
+            raise ValueError()
+    except ValueError:
+        pass
+    with timings.phase("output"):
+        pass
+    assert [(s["name"], s["parent"]) for s in timings.spans] == [
+        ("request", None),
+        ("output", None),
+    ]
+
+
+def test_phase_tasks() -> None:
+    """Phases of concurrent tasks are not nested in each other."""
+    timings = Timings()
+
+    async def job() -> None:
+        with timings.phase("job"):
+            await asyncio.sleep(0)
+            with timings.phase("request"):
+                await asyncio.sleep(0)
+
+    async def main() -> None:
+        await asyncio.gather(job(), job())
+
+    asyncio.run(main())
+    assert sorted((s["name"], s["parent"]) for s in timings.spans) == [
+        ("job", None),
+        ("job", None),
+        ("request", "job"),
+        ("request", "job"),
+    ]
+
+
+def test_totals() -> None:
+    totals = make_timings().totals()
+    assert [(name, depth, calls) for name, depth, calls, *_ in totals] == [
+        ("request", 0, 1),
+        ("receive", 1, 2),
+        ("decode", 1, 1),
+        ("output", 0, 1),
+    ]
+
+
+def test_totals_same_start() -> None:
+    # Children that start at the same time as their parents, where
+    # the parent's span is the one that was recorded last.
+    timings = Timings()
+    timings.spans = [
+        {"name": "receive", "parent": "request", "start": 1.0, "wall": 0.5, "cpu": 0},
+        {"name": "request", "parent": None, "start": 1.0, "wall": 1.0, "cpu": 0.0},
+        {"name": "decode", "parent": "output", "start": 2.0, "wall": 0.0, "cpu": 0},
+        {"name": "output", "parent": None, "start": 2.0, "wall": 0.0, "cpu": 0.0},
+    ]
+    assert [(name, depth) for name, depth, *_ in timings.totals()] == [
+        ("request", 0),
+        ("receive", 1),
+        ("decode", 1),
+        ("output", 0),
+    ]
+
+
+def test_print_summary() -> None:
+    file = io.StringIO()
+    make_timings().print_summary(file)
+    lines = file.getvalue().splitlines()
+    assert lines[0].split() == ["Phase", "Count", "Wall", "(s)", "CPU", "(s)"]
+    assert [line.split()[:2] for line in lines[1:5]] == [
+        ["request", "1"],
+        ["receive", "2"],
+        ["decode", "1"],
+        ["output", "1"],
+    ]
+    assert lines[2].startswith("  receive")
+    assert lines[5].startswith("Total wall-clock time: ")
+    assert lines[6:] == ["records: 4"]
+
+
+def test_write_trace_jsonl(tmp_path: Path) -> None:
+    path = tmp_path / "trace.jsonl"
+    make_timings().write_trace(str(path))
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["kind"] for line in lines] == ["run"] + ["span"] * 5 + ["counts"]
+    assert {"argv", "pid", "started", "wall"} <= lines[0].keys()
+    assert lines[1]["name"] == "receive" and lines[1]["parent"] == "request"
+    assert lines[-1] == {"kind": "counts", "records": 4}
+
+
+def test_write_trace_chrome(tmp_path: Path) -> None:
+    path = tmp_path / "trace.json"
+    make_timings().write_trace(str(path))
+    trace = json.loads(path.read_text())
+    events = trace["traceEvents"]
+    assert [e["name"] for e in events] == [
+        "receive",
+        "decode",
+        "receive",
+        "request",
+        "output",
+        "counts",
+    ]
+    assert all(e["ph"] == "X" for e in events[:-1])
+    assert events[-1]["ph"] == "C" and events[-1]["args"] == {"records": 4}
+    assert trace["otherData"]["pid"] == events[0]["pid"]
+
+
+def test_timed_none() -> None:
+    timings: Optional[Timings] = None
+    with timed(timings, "request"):
+        pass
+
+
+def test_timed() -> None:
+    timings = Timings()
+    with timed(timings, "request"):
+        pass
+    assert [s["name"] for s in timings.spans] == ["request"]
+
+
+def test_timed_writer() -> None:
+    timings = Timings()
+    fp = io.StringIO()
+    writer = TimedWriter(fp, timings)
+    assert writer.write("abc") == 3
+    assert writer.write("de") == 2
+    assert writer.getvalue() == "abcde"  # forwarded to `fp`
+    assert timings.spans == []
+
+    writer.finish()
+    assert [s["name"] for s in timings.spans] == ["write"]
+    assert timings.counts == {"characters written": 5}
+
+
+def test_timed_writer_unused() -> None:
+    timings = Timings()
+    TimedWriter(io.StringIO(), timings).finish()
+    assert timings.spans == []
+    assert timings.counts == {}
@@ -0,0 +1,99 @@
+from geneagrapher.traverse import build_graph
+from geneagrapher.types import Record, RecordId, StartNodeRequest
+
+from .helpers import make_record
+
+from typing import Dict, Iterable, List, Mapping, Optional, Set
+from unittest.mock import MagicMock
+import pytest
+
+
+# 1 and 2 advised 3; 3 advised 4 and 5; 5 advised 6.
+RECORDS: Dict[RecordId, Record] = {
+    RecordId(1): make_record(1, [], [3]),
+    RecordId(2): make_record(2, [], [3]),
+    RecordId(3): make_record(3, [1, 2], [4, 5]),
+    RecordId(4): make_record(4, [3], []),
+    RecordId(5): make_record(5, [3], [6]),
+    RecordId(6): make_record(6, [5], []),
+}
+
+
+def lookup(record_ids: Iterable[RecordId]) -> Mapping[RecordId, Record]:
+    return {rid: RECORDS[rid] for rid in record_ids if rid in RECORDS}
+
+
+def start_node(rid: int, advisors: bool, descendants: bool) -> StartNodeRequest:
+    return {"recordId": rid, "getAdvisors": advisors, "getDescendants": descendants}
+
+
+@pytest.mark.parametrize(
+    "start_nodes,expected_nodes",
+    (
+        [[start_node(4, True, False)], {1, 2, 3, 4}],
+        [[start_node(3, False, True)], {3, 4, 5, 6}],
+        [[start_node(5, True, True)], {1, 2, 3, 5, 6}],
+        [[start_node(4, True, False), start_node(1, False, True)], set(RECORDS)],
+        [[start_node(1, False, False)], {1}],
+    ),
+)
+def test_build_graph(
+    start_nodes: List[StartNodeRequest], expected_nodes: Iterable[int]
+) -> None:
+    graph, missing = build_graph(start_nodes, lookup)
+    assert graph["start_nodes"] == [sn["recordId"] for sn in start_nodes]
+    assert set(graph["nodes"]) == set(expected_nodes)
+    assert all(graph["nodes"][rid] is RECORDS[rid] for rid in graph["nodes"])
+    assert graph["status"] == "complete"
+    assert missing == set()
+
+
+def test_build_graph_missing() -> None:
+    def partial_lookup(record_ids: Iterable[RecordId]) -> Mapping[RecordId, Record]:
+        return {rid: RECORDS[rid] for rid in record_ids if rid != 3}
+
+    graph, missing = build_graph([start_node(4, True, False)], partial_lookup)
+    assert set(graph["nodes"]) == {4}
+    assert missing == {3}
+
+
+def test_build_graph_lookup_per_level() -> None:
+    m_lookup = MagicMock(side_effect=lookup)
+    build_graph([start_node(6, True, False)], m_lookup)
+    assert [list(c.args[0]) for c in m_lookup.call_args_list] == [
+        [6],
+        [5],
+        [3],
+        [1, 2],
+    ]
+
+
+@pytest.mark.parametrize(
+    "max_records,expected_nodes,expected_status",
+    (
+        [None, {1, 2, 3, 4}, "complete"],
+        [4, {1, 2, 3, 4}, "complete"],
+        [3, {3, 4, 1}, "truncated"],
+        [1, {4}, "truncated"],
+        [0, set(), "truncated"],
+    ),
+)
+def test_build_graph_max_records(
+    max_records: Optional[int], expected_nodes: Set[int], expected_status: str
+) -> None:
+    graph, missing = build_graph(
+        [start_node(4, True, False)], lookup, max_records=max_records
+    )
+    assert set(graph["nodes"]) == expected_nodes
+    assert graph["status"] == expected_status
+    assert graph["start_nodes"] == [4]
+
+
+def test_build_graph_dedup() -> None:
+    # Record 3 is reached in both directions and from both start nodes,
+    # but appears once and counts once toward the limit.
+    graph, _ = build_graph(
+        [start_node(3, True, True), start_node(5, True, False)], lookup, max_records=6
+    )
+    assert list(graph["nodes"]) == [3, 5, 1, 2, 4, 6]
+    assert graph["status"] == "complete"
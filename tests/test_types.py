@@ -0,0 +1,93 @@
+from geneagrapher.output.dot import DotOutput
+from geneagrapher.output.identity import IdentityOutput
+from geneagrapher.types import CompactGraph, Geneagraph, RecordId
+
+from io import StringIO
+import pytest
+
+
+@pytest.fixture
+def graph() -> Geneagraph:
+    return {
+        "start_nodes": [RecordId(30), RecordId(10)],
+        "status": "truncated",
+        "nodes": {
+            RecordId(30): {
+                "id": RecordId(30),
+                "name": "The Name",
+                "institution": "The Institution",
+                "year": 1900,
+                "descendants": [],
+                "advisors": [10, 20, 20],
+            },
+            RecordId(10): {
+                "id": RecordId(10),
+                "name": "The Second Name",
+                "institution": None,
+                "year": None,
+                "descendants": [30, 40],
+                "advisors": [],
+            },
+            RecordId(20): {
+                "id": RecordId(20),
+                "name": "The Name",
+                "institution": "The Institution",
+                "year": -50,
+                "descendants": [30],
+                "advisors": [5],
+            },
+        },
+    }
+
+
+class TestCompactGraph:
+    def test_round_trip(self, graph: Geneagraph) -> None:
+        cg = CompactGraph(graph)
+        assert cg.to_geneagraph() == graph
+        assert list(cg.to_geneagraph()["nodes"]) == list(graph["nodes"])
+
+    def test_from_records(self, graph: Geneagraph) -> None:
+        records = iter(graph["nodes"].values())
+        cg = CompactGraph.from_records(graph["start_nodes"], records, graph["status"])
+        assert cg.to_geneagraph() == graph
+
+    def test_interning(self, graph: Geneagraph) -> None:
+        cg = CompactGraph(graph)
+        assert cg.name_table == ["The Name", "The Second Name"]
+        assert cg.institution_table == ["The Institution"]
+        assert list(cg.advisor_offsets) == [0, 3, 3, 4]
+
+    def test_getitem(self, graph: Geneagraph) -> None:
+        cg = CompactGraph(graph)
+        assert cg["start_nodes"] == graph["start_nodes"]
+        assert cg["status"] == graph["status"]
+        assert dict(cg["nodes"]) == graph["nodes"]
+        with pytest.raises(KeyError):
+            cg["other"]  # type: ignore[call-overload]
+
+    def test_nodes(self, graph: Geneagraph) -> None:
+        nodes = CompactGraph(graph)["nodes"]
+        assert len(nodes) == 3
+        assert list(nodes) == [30, 10, 20]
+        assert nodes[RecordId(20)] == graph["nodes"][RecordId(20)]
+        assert 20 in nodes
+        assert 5 not in nodes
+        assert "20" not in nodes  # type: ignore[comparison-overlap]
+        with pytest.raises(KeyError):
+            nodes[RecordId(5)]
+
+    def test_empty(self) -> None:
+        graph: Geneagraph = {"start_nodes": [], "status": "complete", "nodes": {}}
+        cg = CompactGraph(graph)
+        assert cg.to_geneagraph() == graph
+        assert RecordId(1) not in cg["nodes"]
+
+    def test_formatters(self, graph: Geneagraph) -> None:
+        cg = CompactGraph(graph)
+        for formatter in (DotOutput, IdentityOutput):
+            assert formatter(cg).output == formatter(graph).output
+
+            fp, cfp = StringIO(), StringIO()
+            formatter(graph).write(fp)
+            formatter(cg).write(cfp)
+            assert cfp.getvalue() == fp.getvalue()